@@ -0,0 +1,19 @@
+"""Local benchmark suite: synthetic dataset, service micro-benchmarks, HTTP load.
+
+Runs against a dedicated database (``--database-url`` / ``BENCH_DATABASE_URL``),
+never the app database unless explicitly allowed::
+
+    python -m backend.app.benchmarks generate --size 1m
+    python -m backend.app.benchmarks micro --out logs/bench/micro.json
+    python -m backend.app.benchmarks http --base-url http://localhost:8000
+    python -m backend.app.benchmarks compare logs/bench/micro.json --baseline logs/bench/baseline.json
+
+Leave ``REDIS_URL`` unset for micro-benchmarks to measure the database paths
+rather than cache hits.
+"""
+
+DATASET_SIZES = {
+    "100k": 100_000,
+    "1m": 1_000_000,
+    "5m": 5_000_000,
+}
@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
+from . import DATASET_SIZES
+from .baseline import build_report, compare_reports, load_report, save_report
+
+
+DEFAULT_OUT_DIR = Path("logs/bench")
+
+
+def _bench_engine(args: argparse.Namespace):
+    url = args.database_url or os.getenv("BENCH_DATABASE_URL")
+    if not url:
+        raise SystemExit("--database-url or BENCH_DATABASE_URL is required (use a dedicated benchmark database)")
+    from ..config import settings
+
+    app_url = make_url(settings.sync_database_url)
+    bench_url = make_url(url)
+    same_db = (bench_url.host, bench_url.port, bench_url.database) == (app_url.host, app_url.port, app_url.database)
+    if same_db and not args.allow_app_db:
+        raise SystemExit("refusing to benchmark against the application database; pass --allow-app-db to override")
+    return create_engine(url, future=True)
+
+
+def _default_out(kind: str) -> Path:
+    return DEFAULT_OUT_DIR / f"{kind}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+
+
+def _finish(report: dict, args: argparse.Namespace) -> int:
+    out = save_report(report, args.out or _default_out(report["kind"]))
+    print(f"[bench] report={out}")
+    if args.save_baseline:
+        save_report(report, args.save_baseline)
+        print(f"[bench] baseline={args.save_baseline}")
+    if args.baseline:
+        return _report_regressions(report, load_report(args.baseline), args.tolerance)
+    return 0
+
+
+def _report_regressions(current: dict, baseline: dict, tolerance: float) -> int:
+    regressions = compare_reports(current, baseline, tolerance=tolerance)
+    for item in regressions:
+        print(
+            f"[bench] REGRESSION {item['name']} {item['metric']} "
+            f"{item['baseline']} -> {item['current']} (x{item['ratio']})"
+        )
+    if not regressions:
+        print("[bench] no regressions")
+    return 1 if regressions else 0
+
+
+def cmd_generate(args: argparse.Namespace) -> int:
+    from ..models.source import Base
+    from .synthetic import generate_cars, write_mobilede_csv
+
+    if args.csv:
+        write_mobilede_csv(args.csv, args.rows or DATASET_SIZES[args.size], seed=args.seed)
+        print(f"[bench.generate] csv={args.csv}")
+        return 0
+    engine = _bench_engine(args)
+    if args.create_schema:
+        # Fine for sqlite/scratch DBs; on Postgres prefer `alembic upgrade head`
+        # so partial indexes from the migrations exist too.
+        Base.metadata.create_all(engine)
+    rows = args.rows or DATASET_SIZES[args.size]
+    written = generate_cars(engine, rows, seed=args.seed, batch_size=args.batch_size)
+    # The count/facet aggregates use Postgres-only SQL.
+    if not args.skip_aggregates and engine.dialect.name == "postgresql":
+        from ..services.payload_values_catalog import PayloadValuesCatalog
+        from ..tools.car_counts_refresh import refresh_counts
+
+        with Session(engine) as db:
+            print(f"[bench.generate] car_counts rows={refresh_counts(db)}")
+            print(f"[bench.generate] car_payload_values rows={PayloadValuesCatalog(db).rebuild()}")
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("VACUUM ANALYZE cars"))
+    print(f"[bench.generate] done rows={written}")
+    return 0
+
+
+def cmd_micro(args: argparse.Namespace) -> int:
+    from .micro import run_micro
+
+    engine = _bench_engine(args)
+    results = run_micro(
+        engine,
+        repeat=args.repeat,
+        warmup=args.warmup,
+        only=args.only or None,
+        importer_rows=args.importer_rows,
+    )
+    meta = {"dialect": engine.dialect.name, "repeat": args.repeat}
+    return _finish(build_report("micro", results, meta=meta), args)
+
+
+def cmd_http(args: argparse.Namespace) -> int:
+    from .http_load import run_http_load
+
+    results = run_http_load(
+        args.base_url,
+        requests=args.requests,
+        concurrency=args.concurrency,
+        warmup=args.warmup,
+        only=args.only or None,
+    )
+    meta = {"base_url": args.base_url, "requests": args.requests, "concurrency": args.concurrency}
+    return _finish(build_report("http", results, meta=meta), args)
+
+
+def cmd_compare(args: argparse.Namespace) -> int:
+    return _report_regressions(load_report(args.report), load_report(args.baseline), args.tolerance)
+
+
+def _add_db_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--database-url", default=None, help="SQLAlchemy URL of the benchmark DB (or BENCH_DATABASE_URL)")
+    parser.add_argument("--allow-app-db", action="store_true")
+
+
+def _add_report_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--out", default=None, help="report path (default logs/bench/<kind>_<ts>.json)")
+    parser.add_argument("--baseline", default=None, help="compare against this baseline; exit 1 on regressions")
+    parser.add_argument("--save-baseline", default=None, help="also write the report to this baseline path")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    parser.add_argument("--only", action="append", default=[], help="case/endpoint name prefix (repeatable)")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m backend.app.benchmarks", description="Local benchmark suite")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    gen = sub.add_parser("generate", help="load a synthetic dataset")
+    _add_db_args(gen)
+    gen.add_argument("--size", choices=sorted(DATASET_SIZES), default="100k")
+    gen.add_argument("--rows", type=int, default=None, help="explicit row count (overrides --size)")
+    gen.add_argument("--seed", type=int, default=42)
+    gen.add_argument("--batch-size", type=int, default=5000)
+    gen.add_argument("--create-schema", action="store_true")
+    gen.add_argument("--skip-aggregates", action="store_true")
+    gen.add_argument("--csv", default=None, help="write a mobile.de-style CSV instead of loading the DB")
+    gen.set_defaults(func=cmd_generate)
+
+    micro = sub.add_parser("micro", help="service hot-path micro-benchmarks")
+    _add_db_args(micro)
+    _add_report_args(micro)
+    micro.add_argument("--repeat", type=int, default=20)
+    micro.add_argument("--warmup", type=int, default=3)
+    micro.add_argument("--importer-rows", type=int, default=5000, help="0 disables the CSV importer cases")
+    micro.set_defaults(func=cmd_micro)
+
+    http = sub.add_parser("http", help="HTTP load scenario against a running server")
+    _add_report_args(http)
+    http.add_argument("--base-url", default=os.getenv("BASE_URL", "http://localhost:8000"))
+    http.add_argument("--requests", type=int, default=200)
+    http.add_argument("--concurrency", type=int, default=8)
+    http.add_argument("--warmup", type=int, default=5)
+    http.set_defaults(func=cmd_http)
+
+    cmp_ = sub.add_parser("compare", help="compare a saved report with a baseline")
+    cmp_.add_argument("report")
+    cmp_.add_argument("--baseline", required=True)
+    cmp_.add_argument("--tolerance", type=float, default=0.15)
+    cmp_.set_defaults(func=cmd_compare)
+
+    args = parser.parse_args(argv)
+    return int(args.func(args) or 0)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
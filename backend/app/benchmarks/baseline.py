@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import json
+import platform
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+
+# Metrics compared per case; higher is worse for all of them.
+COMPARED_METRICS = ("p50_ms", "p95_ms")
+
+
+def build_report(kind: str, results: Iterable[Any], *, meta: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    return {
+        "kind": kind,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "meta": dict(meta or {}),
+        "results": {item.name: item.as_dict() for item in results},
+    }
+
+
+def save_report(report: Dict[str, Any], path: str | Path) -> Path:
+    out = Path(path)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, ensure_ascii=False, indent=2, sort_keys=True), encoding="utf-8")
+    return out
+
+
+def load_report(path: str | Path) -> Dict[str, Any]:
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+def compare_reports(
+    current: Dict[str, Any],
+    baseline: Dict[str, Any],
+    *,
+    tolerance: float = 0.15,
+    min_delta_ms: float = 2.0,
+) -> List[Dict[str, Any]]:
+    """Cases whose metrics got slower than ``baseline`` beyond the tolerance.
+
+    A regression needs both the relative (``tolerance``) and the absolute
+    (``min_delta_ms``) threshold, so sub-millisecond jitter never trips it.
+    """
+    regressions: List[Dict[str, Any]] = []
+    base_results = baseline.get("results") or {}
+    for name, result in (current.get("results") or {}).items():
+        base = base_results.get(name)
+        if not base:
+            continue
+        for metric in COMPARED_METRICS:
+            now_val = result.get(metric)
+            base_val = base.get(metric)
+            if now_val is None or base_val is None:
+                continue
+            delta = float(now_val) - float(base_val)
+            if delta > min_delta_ms and float(now_val) > float(base_val) * (1.0 + tolerance):
+                regressions.append(
+                    {
+                        "name": name,
+                        "metric": metric,
+                        "baseline": base_val,
+                        "current": now_val,
+                        "ratio": round(float(now_val) / float(base_val), 3) if base_val else None,
+                    }
+                )
+    return regressions
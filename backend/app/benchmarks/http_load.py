@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+from .micro import _percentile
+
+
+# (name, path) pairs hit by the load scenario. Filter contexts follow the
+# same order the catalog page requests them in.
+DEFAULT_SCENARIO: Tuple[Tuple[str, str], ...] = (
+    ("home", "/"),
+    ("catalog", "/catalog"),
+    ("catalog_brand", "/catalog?region=EU&brand=BMW"),
+    ("api_cars", "/api/cars?region=EU&page=1&page_size=20"),
+    ("api_cars_price_asc", "/api/cars?region=EU&sort=price_asc&page=1&page_size=20"),
+    ("api_cars_brand_model", "/api/cars?region=EU&brand=BMW&model=X5&page=1&page_size=20"),
+    ("filter_ctx_base", "/api/filter_ctx_base?region=EU"),
+    ("filter_ctx_brand", "/api/filter_ctx_brand?region=EU&brand=BMW"),
+    ("filter_ctx_model", "/api/filter_ctx_model?region=EU&brand=BMW&model=X5"),
+)
+
+
+@dataclass
+class EndpointStats:
+    name: str
+    path: str
+    requests: int
+    errors: int
+    rps: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _hit(client: httpx.Client, path: str) -> Tuple[float, bool]:
+    t0 = time.perf_counter()
+    try:
+        resp = client.get(path)
+        resp.read()
+        ok = resp.status_code < 500
+    except httpx.HTTPError:
+        ok = False
+    return (time.perf_counter() - t0) * 1000, ok
+
+
+def run_endpoint(
+    base_url: str,
+    name: str,
+    path: str,
+    *,
+    requests: int = 200,
+    concurrency: int = 8,
+    warmup: int = 5,
+    timeout: float = 15.0,
+) -> EndpointStats:
+    samples: List[float] = []
+    errors = 0
+    lock = threading.Lock()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    with httpx.Client(base_url=base_url, timeout=timeout, limits=limits, headers={"Accept-Encoding": "gzip"}) as client:
+        for _ in range(max(0, warmup)):
+            _hit(client, path)
+
+        def worker(_: int) -> None:
+            nonlocal errors
+            elapsed, ok = _hit(client, path)
+            with lock:
+                samples.append(elapsed)
+                if not ok:
+                    errors += 1
+
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+            list(pool.map(worker, range(max(1, requests))))
+        wall = max(time.perf_counter() - t0, 1e-6)
+    ordered = sorted(samples)
+    return EndpointStats(
+        name=name,
+        path=path,
+        requests=len(ordered),
+        errors=errors,
+        rps=round(len(ordered) / wall, 2),
+        p50_ms=round(_percentile(ordered, 0.50), 2),
+        p95_ms=round(_percentile(ordered, 0.95), 2),
+        p99_ms=round(_percentile(ordered, 0.99), 2),
+        max_ms=round(ordered[-1], 2) if ordered else 0.0,
+    )
+
+
+def run_http_load(
+    base_url: str,
+    *,
+    scenario: Sequence[Tuple[str, str]] = DEFAULT_SCENARIO,
+    requests: int = 200,
+    concurrency: int = 8,
+    warmup: int = 5,
+    only: Optional[List[str]] = None,
+) -> List[EndpointStats]:
+    results: List[EndpointStats] = []
+    for name, path in scenario:
+        if only and name not in only:
+            continue
+        stats = run_endpoint(base_url, name, path, requests=requests, concurrency=concurrency, warmup=warmup)
+        print(
+            f"[bench.http] {stats.name} rps={stats.rps:.1f} p50={stats.p50_ms:.1f}ms "
+            f"p95={stats.p95_ms:.1f}ms p99={stats.p99_ms:.1f}ms errors={stats.errors}",
+            flush=True,
+        )
+        results.append(stats)
+    return results
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import gc
+import statistics
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from ..models import Car
+
+
+@dataclass
+class BenchResult:
+    name: str
+    runs: int
+    mean_ms: float
+    p50_ms: float
+    p95_ms: float
+    min_ms: float
+    max_ms: float
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[idx]
+
+
+def summarize(name: str, samples_ms: List[float]) -> BenchResult:
+    ordered = sorted(samples_ms)
+    return BenchResult(
+        name=name,
+        runs=len(ordered),
+        mean_ms=round(statistics.fmean(ordered), 3) if ordered else 0.0,
+        p50_ms=round(_percentile(ordered, 0.50), 3),
+        p95_ms=round(_percentile(ordered, 0.95), 3),
+        min_ms=round(ordered[0], 3) if ordered else 0.0,
+        max_ms=round(ordered[-1], 3) if ordered else 0.0,
+    )
+
+
+def time_case(name: str, fn: Callable[[], Any], *, repeat: int = 20, warmup: int = 3) -> BenchResult:
+    for _ in range(max(0, warmup)):
+        fn()
+    samples: List[float] = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(max(1, repeat)):
+            t0 = time.perf_counter()
+            fn()
+            samples.append((time.perf_counter() - t0) * 1000)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return summarize(name, samples)
+
+
+@dataclass
+class BenchContext:
+    """Inputs picked once from the dataset so every run measures the same work."""
+
+    brand: Optional[str]
+    model: Optional[str]
+    car_ids: List[int]
+    csv_path: Optional[Path] = None
+
+
+def build_context(db: Session) -> BenchContext:
+    row = db.execute(
+        select(Car.brand, Car.model)
+        .where(Car.is_available.is_(True), Car.country == "DE")
+        .order_by(Car.id)
+        .limit(1)
+    ).first()
+    car_ids = list(
+        db.execute(select(Car.id).where(Car.is_available.is_(True)).order_by(Car.id).limit(50)).scalars()
+    )
+    return BenchContext(brand=row[0] if row else None, model=row[1] if row else None, car_ids=car_ids)
+
+
+def service_cases(db: Session, ctx: BenchContext) -> Dict[str, Callable[[], Any]]:
+    from ..routers.catalog import _serialize_catalog_payload_items
+    from ..services.cars_service import CarsService
+
+    def svc() -> CarsService:
+        # Fresh service per run: no instance-level memo survives between runs.
+        db.expire_all()
+        return CarsService(db)
+
+    def serialize() -> Any:
+        service = svc()
+        items, _ = service.list_cars(region="EU", page=1, page_size=40, light=True, use_fast_count=True)
+        return _serialize_catalog_payload_items(service, items)
+
+    def similar() -> Any:
+        service = svc()
+        car = db.get(Car, ctx.car_ids[0]) if ctx.car_ids else None
+        return service.similar_cars(car, limit=10) if car is not None else []
+
+    return {
+        "list_cars.eu_default": lambda: svc().list_cars(region="EU", page=1, page_size=20, light=True),
+        "list_cars.eu_price_asc": lambda: svc().list_cars(region="EU", sort="price_asc", page=1, page_size=20, light=True),
+        "list_cars.brand_model": lambda: svc().list_cars(
+            region="EU", brand=ctx.brand, model=ctx.model, page=1, page_size=20, light=True
+        ),
+        "list_cars.deep_page": lambda: svc().list_cars(region="EU", page=200, page_size=20, light=True),
+        "list_cars.exact_count": lambda: svc().list_cars(region="EU", count_only=True, use_fast_count=False),
+        "facet_counts.brand": lambda: svc().facet_counts(field="brand", filters={"region": "EU"}),
+        "facet_counts.color_group": lambda: svc().facet_counts(field="color_group", filters={"region": "EU"}),
+        "similar_cars": similar,
+        "serialize_catalog_payload_items": serialize,
+    }
+
+
+def importer_cases(ctx: BenchContext, rows: int = 5000) -> Dict[str, Callable[[], Any]]:
+    from ..importing.mobilede_csv import iter_mobilede_csv_rows
+    from ..parsing.config import load_sites_config
+    from ..parsing.mobile_de_feed import MobileDeFeedParser
+    from .synthetic import write_mobilede_csv
+
+    if ctx.csv_path is None:
+        ctx.csv_path = Path(tempfile.gettempdir()) / f"bench_mobilede_{rows}.csv"
+        write_mobilede_csv(str(ctx.csv_path), rows)
+    feed_parser = MobileDeFeedParser(load_sites_config().get("mobile_de"))
+
+    def parse_csv() -> int:
+        return sum(1 for _ in iter_mobilede_csv_rows(str(ctx.csv_path)))
+
+    def parse_feed() -> int:
+        return sum(1 for _ in feed_parser.iter_parsed_from_csv(iter_mobilede_csv_rows(str(ctx.csv_path))))
+
+    return {
+        f"mobilede_csv.read_rows_{rows}": parse_csv,
+        f"mobilede_csv.parse_feed_{rows}": parse_feed,
+    }
+
+
+def run_micro(
+    engine: Engine,
+    *,
+    repeat: int = 20,
+    warmup: int = 3,
+    only: Optional[List[str]] = None,
+    importer_rows: int = 5000,
+) -> List[BenchResult]:
+    results: List[BenchResult] = []
+    with Session(engine) as db:
+        ctx = build_context(db)
+        cases = dict(service_cases(db, ctx))
+        if importer_rows > 0:
+            cases.update(importer_cases(ctx, importer_rows))
+        for name, fn in cases.items():
+            if only and not any(name.startswith(prefix) for prefix in only):
+                continue
+            # Importer cases are seconds long; a few runs are enough.
+            runs = max(3, repeat // 5) if name.startswith("mobilede_csv.") else repeat
+            try:
+                result = time_case(name, fn, repeat=runs, warmup=min(warmup, 1) if runs < repeat else warmup)
+            except Exception as exc:
+                db.rollback()
+                print(f"[bench.micro] {name} failed: {exc.__class__.__name__}: {str(exc).splitlines()[0]}", flush=True)
+                continue
+            print(
+                f"[bench.micro] {result.name} p50={result.p50_ms:.1f}ms p95={result.p95_ms:.1f}ms runs={result.runs}",
+                flush=True,
+            )
+            results.append(result)
+            db.rollback()
+    return results
@@ -0,0 +1,314 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from ..models import Car, Source
+
+
+# (brand, weight, base price EUR, models). Model lists are Zipf-weighted in
+# listed order, so the first model of each brand dominates like in the feeds.
+EU_BRANDS: Tuple[Tuple[str, int, int, Tuple[str, ...]], ...] = (
+    ("Volkswagen", 120, 24_000, ("Golf", "Passat", "Tiguan", "Polo", "Touareg", "T-Roc", "ID.4", "Arteon")),
+    ("Mercedes-Benz", 110, 42_000, ("C-Klasse", "E-Klasse", "GLC", "A-Klasse", "S-Klasse", "GLE", "EQE", "G-Klasse")),
+    ("BMW", 100, 40_000, ("3er", "5er", "X5", "X3", "1er", "X1", "7er", "i4", "iX")),
+    ("Audi", 90, 36_000, ("A4", "A6", "Q5", "A3", "Q7", "Q3", "e-tron", "A8")),
+    ("Opel", 50, 16_000, ("Astra", "Corsa", "Insignia", "Mokka", "Grandland")),
+    ("Ford", 50, 18_000, ("Focus", "Fiesta", "Kuga", "Mondeo", "Mustang")),
+    ("Skoda", 50, 20_000, ("Octavia", "Superb", "Kodiaq", "Fabia", "Enyaq")),
+    ("Renault", 40, 15_000, ("Clio", "Megane", "Captur", "Zoe")),
+    ("Peugeot", 40, 16_000, ("308", "208", "3008", "5008", "e-208")),
+    ("Toyota", 40, 25_000, ("Corolla", "RAV4", "Yaris", "C-HR", "Land Cruiser")),
+    ("Volvo", 30, 35_000, ("XC60", "XC90", "V60", "XC40")),
+    ("Porsche", 20, 85_000, ("Cayenne", "911", "Macan", "Panamera", "Taycan")),
+    ("Tesla", 10, 38_000, ("Model 3", "Model Y", "Model S", "Model X")),
+)
+KR_BRANDS: Tuple[Tuple[str, int, int, Tuple[str, ...]], ...] = (
+    ("Hyundai", 120, 18_000, ("Sonata", "Grandeur", "Tucson", "Santa Fe", "Palisade", "Ioniq 5")),
+    ("Kia", 110, 17_000, ("K5", "Sorento", "Sportage", "Carnival", "K8", "EV6")),
+    ("Genesis", 40, 35_000, ("G80", "GV80", "G90", "GV70")),
+    ("BMW", 25, 38_000, ("5er", "X5", "3er")),
+    ("Mercedes-Benz", 25, 40_000, ("E-Klasse", "S-Klasse", "GLE")),
+)
+EU_COUNTRIES: Tuple[Tuple[str, int], ...] = (
+    ("DE", 700), ("NL", 60), ("BE", 50), ("FR", 40), ("IT", 40), ("AT", 40), ("ES", 30), ("PL", 20), ("SE", 20),
+)
+KR_SHARE = 0.15
+
+ENGINE_TYPES = (("Diesel", 40), ("Petrol", 42), ("Hybrid", 10), ("Electric", 8))
+BODY_TYPES = (("SUV", 34), ("Limousine", 24), ("Kombi", 18), ("Kleinwagen", 12), ("Coupe", 6), ("Van", 6))
+TRANSMISSIONS = (("Automatik", 75), ("Schaltgetriebe", 25))
+DRIVE_TYPES = (("Front", 45), ("Allrad", 40), ("Hinterrad", 15))
+COLORS = (
+    ("Schwarz", "black", 28), ("Weiß", "white", 20), ("Grau", "gray", 22), ("Silber", "silver", 12),
+    ("Blau", "blue", 10), ("Rot", "red", 5), ("Grün", "green", 2), ("Braun", "brown", 1),
+)
+EMISSION_CLASSES = ("Euro6d", "Euro6d-TEMP", "Euro6", "Euro5")
+CLIMATISATION = ("Klimaautomatik", "2-Zonen-Klimaautomatik", "4-Zonen-Klimaautomatik", "Klimaanlage")
+AIRBAGS = ("Front-, Seiten- und weitere Airbags", "Front- und Seiten-Airbags", "Front-Airbags")
+INTERIOR = ("Vollleder, Schwarz", "Teilleder, Grau", "Stoff, Schwarz", "Alcantara, Schwarz")
+PRICE_RATINGS = ("Sehr guter Preis", "Guter Preis", "Fairer Preis", "Erhöhter Preis", None)
+FEATURES = (
+    "Navigationssystem", "Sitzheizung", "Einparkhilfe", "Tempomat", "LED-Scheinwerfer", "Panoramadach",
+    "Luftfederung", "Head-Up Display", "Anhängerkupplung", "Standheizung", "Apple CarPlay", "Android Auto",
+)
+
+SOURCES = (
+    # Same keys as production so region/source hints resolve identically.
+    {"key": "mobile_de", "name": "mobile.de CSV feed", "base_url": "csv://mobile_de", "country": "DE"},
+    {"key": "emavto_klg", "name": "EMAVTO", "base_url": "https://emavto.ru", "country": "KR"},
+)
+
+
+def _weighted(rng: random.Random, items: Sequence[Tuple[Any, ...]], weight_idx: int = 1) -> Tuple[Any, ...]:
+    total = sum(item[weight_idx] for item in items)
+    pick = rng.uniform(0, total)
+    acc = 0.0
+    for item in items:
+        acc += item[weight_idx]
+        if pick <= acc:
+            return item
+    return items[-1]
+
+
+def _zipf_pick(rng: random.Random, values: Sequence[str]) -> str:
+    weights = [1.0 / (idx + 1) for idx in range(len(values))]
+    return rng.choices(values, weights=weights, k=1)[0]
+
+
+class SyntheticCarFactory:
+    """Deterministic (per ``seed``) generator of car rows shaped like the feeds."""
+
+    def __init__(self, seed: int = 42, *, now: Optional[datetime] = None) -> None:
+        self.rng = random.Random(seed)
+        self.now = now or datetime(2026, 6, 1)
+
+    def make(self, idx: int, source_ids: Dict[str, int]) -> Dict[str, Any]:
+        rng = self.rng
+        is_kr = rng.random() < KR_SHARE
+        brand, _, base_price, models = _weighted(rng, KR_BRANDS if is_kr else EU_BRANDS)
+        model = _zipf_pick(rng, models)
+        country = "KR" if is_kr else _weighted(rng, EU_COUNTRIES)[0]
+        engine_type = _weighted(rng, ENGINE_TYPES)[0]
+        if brand == "Tesla" or model in {"ID.4", "EQE", "i4", "iX", "e-tron", "Enyaq", "Zoe", "e-208", "Taycan", "Ioniq 5", "EV6"}:
+            engine_type = "Electric"
+        year = min(2025, max(2008, int(round(rng.triangular(2008, 2026, 2022)))))
+        age = max(0, self.now.year - year)
+        reg_month = rng.randint(1, 12)
+        mileage = max(0, int(rng.gauss(14_000 * age + 5_000, 6_000 + 3_000 * age)))
+        power_hp = int(max(60, rng.gauss(150 + base_price / 600, 45)))
+        engine_cc = None if engine_type == "Electric" else int(rng.choice((999, 1395, 1498, 1598, 1968, 1995, 2487, 2993, 3982)))
+        price = round(base_price * (0.86 ** age) * rng.uniform(0.7, 1.5), 2)
+        color, color_group, _ = _weighted(rng, COLORS, weight_idx=2)
+        eur_rate = 99.0
+        price_rub = round(price * eur_rate, 2)
+        total_rub = round(price_rub * rng.uniform(1.25, 1.6), -4)
+        listing_date = self.now - timedelta(days=rng.expovariate(1 / 40))
+        payload = {
+            "num_seats": str(rng.choice((5, 5, 5, 4, 7))),
+            "doors_count": rng.choice(("4/5", "4/5", "2/3")),
+            "emission_class": rng.choice(EMISSION_CLASSES),
+            "efficiency_class": rng.choice(("A+", "A", "B", "C", "D")),
+            "climatisation": rng.choice(CLIMATISATION),
+            "airbags": rng.choice(AIRBAGS),
+            "interior_design": rng.choice(INTERIOR),
+            "price_rating_label": rng.choice(PRICE_RATINGS),
+            "owners_count": str(rng.choice((1, 1, 2, 3))),
+            "vat": rng.choice(("MwSt. ausweisbar", None)),
+            "features": rng.sample(FEATURES, k=rng.randint(3, 9)),
+            "sub_title": f"{model} {power_hp} PS {rng.choice(('Sport', 'Luxury', 'Business', 'Base'))}",
+            "price_eur_nt": round(price / 1.19, 2),
+        }
+        breakdown = [
+            {"title": "Покупка по НЕТТО", "amount_rub": round(price_rub * 0.84, 2)},
+            {"title": "Доставка Европа- МСК", "amount_rub": 250_000},
+            {"title": "Пошлина РФ", "amount_rub": round(price_rub * 0.2, 2)},
+            {"title": "Утилизационный сбор", "amount_rub": 5_200},
+            {"title": "Итого (RUB)", "amount_rub": total_rub},
+            {"title": "__config_version", "amount_rub": 0, "version": "bench"},
+        ]
+        return {
+            "source_id": source_ids["emavto_klg" if is_kr else "mobile_de"],
+            "external_id": f"bench-{idx}",
+            "country": country,
+            "brand": brand,
+            "model": model,
+            "variant": payload["sub_title"],
+            "year": year,
+            "mileage": mileage,
+            "price": price,
+            "currency": "USD" if is_kr else "EUR",
+            "price_rub_cached": price_rub,
+            "total_price_rub_cached": total_rub,
+            "display_price_rub": total_rub,
+            "display_price_group": 0,
+            "kr_market_type": rng.choice(("domestic", "import")) if is_kr else None,
+            "registration_year": year,
+            "registration_month": reg_month,
+            "body_type": _weighted(rng, BODY_TYPES)[0],
+            "engine_type": engine_type,
+            "engine_cc": engine_cc,
+            "power_hp": power_hp,
+            "power_kw": round(power_hp * 0.7355, 2),
+            "transmission": _weighted(rng, TRANSMISSIONS)[0],
+            "drive_type": _weighted(rng, DRIVE_TYPES)[0],
+            "color": color,
+            "color_group": color_group,
+            "description": None,
+            "source_url": f"https://example.invalid/{idx}",
+            "thumbnail_url": f"https://img.example.invalid/{idx % 5000}/1.jpg",
+            "source_payload": payload,
+            "calc_breakdown_json": breakdown,
+            "listing_date": listing_date,
+            "calc_updated_at": self.now,
+            "first_seen_at": listing_date,
+            "last_seen_at": self.now,
+            "created_at": listing_date,
+            "updated_at": self.now,
+            "is_available": rng.random() < 0.95,
+        }
+
+    def iter_rows(self, count: int, source_ids: Dict[str, int], *, start: int = 0) -> Iterator[Dict[str, Any]]:
+        for idx in range(start, start + count):
+            yield self.make(idx, source_ids)
+
+
+def _insert_columns() -> List[str]:
+    return [
+        column.name
+        for column in Car.__table__.columns
+        if column.computed is None and column.name != "id"
+    ]
+
+
+def ensure_sources(db: Session) -> Dict[str, int]:
+    out: Dict[str, int] = {}
+    for spec in SOURCES:
+        source = db.execute(select(Source).where(Source.key == spec["key"])).scalar_one_or_none()
+        if source is None:
+            source = Source(**spec)
+            db.add(source)
+            db.flush()
+        out[spec["key"]] = int(source.id)
+    db.commit()
+    return out
+
+
+def _copy_value(value: Any) -> Any:
+    if value is None:
+        return None
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    return value
+
+
+def _copy_batch(engine: Engine, columns: List[str], rows: List[Dict[str, Any]]) -> None:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in rows:
+        writer.writerow(["\\N" if (v := _copy_value(row.get(col))) is None else v for col in columns])
+    buf.seek(0)
+    raw = engine.raw_connection()
+    try:
+        with raw.cursor() as cur:
+            cur.copy_expert(
+                f"COPY cars ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+                buf,
+            )
+        raw.commit()
+    finally:
+        raw.close()
+
+
+def generate_cars(
+    engine: Engine,
+    count: int,
+    *,
+    seed: int = 42,
+    batch_size: int = 5000,
+    progress: bool = True,
+) -> int:
+    """Append ``count`` synthetic cars; COPY on Postgres, executemany elsewhere."""
+    with Session(engine) as db:
+        source_ids = ensure_sources(db)
+        start = int(
+            db.execute(select(func.count(Car.id)).where(Car.external_id.like("bench-%"))).scalar() or 0
+        )
+    factory = SyntheticCarFactory(seed + start)
+    columns = _insert_columns()
+    use_copy = engine.dialect.name == "postgresql"
+    written = 0
+    t0 = time.monotonic()
+    rows: List[Dict[str, Any]] = []
+
+    def flush() -> None:
+        nonlocal written
+        if not rows:
+            return
+        if use_copy:
+            _copy_batch(engine, columns, rows)
+        else:
+            with engine.begin() as conn:
+                conn.execute(insert(Car.__table__), [{col: row.get(col) for col in columns} for row in rows])
+        written += len(rows)
+        rows.clear()
+        if progress:
+            elapsed = max(time.monotonic() - t0, 1e-6)
+            print(f"[bench.generate] rows={written}/{count} rate={written / elapsed:.0f}/s", flush=True)
+
+    for row in factory.iter_rows(count, source_ids, start=start):
+        rows.append(row)
+        if len(rows) >= batch_size:
+            flush()
+    flush()
+    return written
+
+
+MOBILEDE_CSV_COLUMNS = (
+    "inner_id", "mark", "model", "title", "sub_title", "url", "price_eur", "price_eur_nt", "vat", "year",
+    "km_age", "color", "owners_count", "engine_type", "displacement", "horse_power", "power_kw", "body_type",
+    "transmission", "num_seats", "doors_count", "emission_class", "climatisation", "airbags",
+    "interior_design", "efficiency_class", "first_registration", "price_rating_label", "seller_country",
+    "created_at", "features", "image_urls",
+)
+
+
+def write_mobilede_csv(path: str, count: int, *, seed: int = 42) -> int:
+    """Write a pipe-delimited feed in the mobile.de export layout."""
+    factory = SyntheticCarFactory(seed)
+    source_ids = {"mobile_de": 1, "emavto_klg": 2}
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f, delimiter="|", quotechar='"')
+        writer.writerow(MOBILEDE_CSV_COLUMNS)
+        for idx in range(count):
+            row = factory.make(idx, source_ids)
+            payload = row["source_payload"]
+            writer.writerow(
+                (
+                    f"bench-{idx}", row["brand"], row["model"], f"{row['brand']} {row['model']}",
+                    payload["sub_title"], row["source_url"], row["price"], payload["price_eur_nt"],
+                    payload["vat"] or "", row["year"], row["mileage"], row["color"], payload["owners_count"],
+                    row["engine_type"], row["engine_cc"] or "", row["power_hp"], row["power_kw"],
+                    row["body_type"], row["transmission"], payload["num_seats"], payload["doors_count"],
+                    payload["emission_class"], payload["climatisation"], payload["airbags"],
+                    payload["interior_design"], payload["efficiency_class"],
+                    f"{row['registration_month']:02d}/{row['registration_year']}",
+                    payload["price_rating_label"] or "", "DE", row["listing_date"].isoformat(),
+                    json.dumps(payload["features"], ensure_ascii=False),
+                    json.dumps([row["thumbnail_url"]]),
+                )
+            )
+    return count
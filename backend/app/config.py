@@ -26,7 +26,18 @@ class Settings(BaseSettings):
     PARSER_REQUEST_TIMEOUT_SECONDS: int = Field(default=20)
     PARSER_MIN_DELAY_SECONDS: int = Field(default=1)
     PARSER_MAX_DELAY_SECONDS: int = Field(default=3)
+    # AIMD pacing per upstream host (utils/rate_limiter.AdaptiveRateController);
+    # off = fixed TokenBucket rates and random PARSER_*_DELAY_SECONDS sleeps.
+    PARSER_ADAPTIVE_RATE: bool = Field(default=True)
+    PARSER_RATE_LATENCY_TARGET_SECONDS: float = Field(default=3.0)
     PARSER_LOG_FILE: str = Field(default="logs/parsing.log")
+    # Raw page cache for offline re-parsing (empty = disabled), see parsing/html_cache.py
+    PARSER_HTML_CACHE_DIR: str = Field(default="")
+    PARSER_HTML_CACHE_TTL_DAYS: float = Field(default=14)
+    PARSER_HTML_CACHE_MAX_MB: int = Field(default=2048)
+    # ETag/Last-Modified detail requests; turn off for one run after a parser
+    # fix so unchanged pages are re-parsed instead of answered with 304.
+    PARSER_CONDITIONAL_DETAILS: bool = Field(default=True)
     MOBILE_DE_HTTP_PROXY: str | None = Field(default=None)
     ENCAR_CARAPIS_API_KEY: str | None = Field(default=None)
     ENCAR_CARAPIS_BASE_URL: str | None = Field(default=None)
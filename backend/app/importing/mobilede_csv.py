@@ -3,7 +3,7 @@ from __future__ import annotations
 from dataclasses import dataclass
 from datetime import datetime
 from decimal import Decimal
-from typing import Iterator, List, Optional
+from typing import Iterator, List, Optional, Tuple
 import csv
 import json
 import logging
@@ -195,13 +195,38 @@ def _parse_features(raw: str | None) -> List[str]:
 
 
 def iter_mobilede_csv_rows(file_path: str) -> Iterator[MobileDeCsvRow]:
-    with open(file_path, "r", encoding="utf-8", errors="ignore", newline="") as f:
-        reader = csv.reader(f, delimiter="|", quotechar='"',
+    for _, row in iter_mobilede_csv_rows_with_offsets(file_path):
+        yield row
+
+
+def iter_mobilede_csv_rows_with_offsets(
+    file_path: str, start_offset: int = 0
+) -> Iterator[Tuple[int, MobileDeCsvRow]]:
+    """Rows with the byte offset just past each record.
+
+    A later call with ``start_offset`` set to one of those offsets resumes
+    with the following record (the header is still read from the top).
+    """
+    with open(file_path, "rb") as fb:
+        pos = [0]
+
+        def lines() -> Iterator[str]:
+            # Binary lines split like newline="" text mode (\n, \r\n and a
+            # lone \r all end a line), so the byte position stays exact.
+            for raw in fb:
+                for part in (raw.splitlines(True) if b"\r" in raw else (raw,)):
+                    pos[0] += len(part)
+                    yield part.decode("utf-8", errors="ignore")
+
+        reader = csv.reader(lines(), delimiter="|", quotechar='"',
                             escapechar=None, strict=False)
         header = next(reader, None)
         name_to_idx = {}
         if header:
             name_to_idx = {name.strip(): i for i, name in enumerate(header)}
+        if start_offset > pos[0]:
+            fb.seek(start_offset)
+            pos[0] = start_offset
 
         for row in reader:
             def get(name: str, idx_fallback: int | None = None) -> Optional[str]:
@@ -214,7 +239,7 @@ def iter_mobilede_csv_rows(file_path: str) -> Iterator[MobileDeCsvRow]:
             inner_id = _to_str(get("inner_id")) or ""
             if not inner_id:
                 continue
-            yield MobileDeCsvRow(
+            yield pos[0], MobileDeCsvRow(
                 inner_id=inner_id,
                 mark=_to_str(get("mark")) or "",
                 model=_to_str(get("model")) or "",
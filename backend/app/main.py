@@ -1,4 +1,5 @@
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from starlette.middleware.gzip import GZipMiddleware
@@ -17,7 +18,15 @@ from .routers.favorites import router as favorites_router
 from .routers.calculator import router as calc_router
 from .routers.thumbs import router as thumbs_router
 from .schema_bootstrap import ensure_runtime_schema
+from .db import SessionLocal, engine
+from .services.fx_rates_service import start_fx_background_refresher, stop_fx_background_refresher
+from .services import deferred_aggregates
+from .services.cache_prewarmer import adaptive_prewarm_enabled, schedule_prewarm_for_version
+from .services import media_manifest
+from .utils.redis_cache import on_dataset_version_change
 from .middleware import PageVisitMiddleware
+from .utils.streaming_render import install_streaming_globals
+from .utils import request_metrics
 from pathlib import Path
 
 
@@ -33,20 +42,52 @@ def create_app() -> FastAPI:
     if media_dir.exists():
         app.mount("/media", StaticFiles(directory=str(media_dir)), name="media")
     app.state.templates = Jinja2Templates(directory=str(templates_dir))
+    install_streaming_globals(app.state.templates.env)
     app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
     app.add_middleware(SessionMiddleware, secret_key=settings.APP_SECRET)
     if os.getenv("ANALYTICS_DISABLED", "0") != "1":
         app.add_middleware(PageVisitMiddleware)
+    metrics_on = request_metrics.metrics_enabled()
+    if metrics_on:
+        request_metrics.install_sql_instrumentation(engine)
 
     @app.on_event("startup")
     def _bootstrap_runtime_schema() -> None:
         ensure_runtime_schema()
 
+    @app.on_event("startup")
+    def _start_fx_refresher() -> None:
+        if os.getenv("FX_REFRESHER", "1") != "0":
+            start_fx_background_refresher(SessionLocal)
+
+    @app.on_event("startup")
+    def _register_adaptive_prewarm() -> None:
+        if adaptive_prewarm_enabled():
+            on_dataset_version_change(schedule_prewarm_for_version)
+
+    @app.on_event("startup")
+    def _use_media_manifest() -> None:
+        if media_manifest.media_manifest_enabled():
+            media_manifest.install_request_index()
+
+    @app.on_event("shutdown")
+    def _stop_fx_refresher() -> None:
+        stop_fx_background_refresher()
+
+    @app.on_event("shutdown")
+    def _stop_deferred_aggregates() -> None:
+        deferred_aggregates.shutdown()
+
     @app.middleware("http")
     async def timing_middleware(request: Request, call_next):
         t0 = time.perf_counter()
         req_id = uuid.uuid4().hex[:8]
-        response = await call_next(request)
+        metrics, metrics_token = request_metrics.begin_request() if metrics_on else (None, None)
+        try:
+            response = await call_next(request)
+        finally:
+            if metrics_token is not None:
+                request_metrics.end_request(metrics_token)
         total = time.perf_counter() - t0
         response.headers["X-Process-Time"] = f"{total:.3f}"
         if request.url.path.startswith("/static/"):
@@ -82,16 +123,27 @@ def create_app() -> FastAPI:
                 total * 1000,
                 parts,
             )
-        if os.environ.get("REQ_TIMING", "0") == "1":
-            perf = getattr(request.state, "perf", {}) or {}
-            db_ms = perf.get("db_ms", 0.0)
-            redis_ms = perf.get("redis_ms", 0.0)
-            render_ms = perf.get("render_ms", 0.0)
-            response.headers["Server-Timing"] = (
-                f"app;dur={total*1000:.1f},db;dur={db_ms:.1f},redis;dur={redis_ms:.1f},render;dur={render_ms:.1f}"
+        perf = getattr(request.state, "perf", {}) or {}
+        render_ms = perf.get("render_ms")
+        if metrics is not None and not request.url.path.startswith("/static/"):
+            route = getattr(request.scope.get("route"), "path", None) or "unmatched"
+            request_metrics.finish_request(
+                metrics,
+                route=route,
+                method=request.method,
+                status=response.status_code,
+                total_sec=total,
+                request_id=req_id,
             )
+            if os.environ.get("SERVER_TIMING", "1") != "0":
+                response.headers["Server-Timing"] = request_metrics.server_timing_header(
+                    metrics, total_ms=total * 1000, render_ms=render_ms
+                )
+        if os.environ.get("REQ_TIMING", "0") == "1":
+            db_ms = metrics.sql_ms if metrics is not None else perf.get("db_ms", 0.0)
+            redis_ms = metrics.redis_ms if metrics is not None else perf.get("redis_ms", 0.0)
             print(
-                f"REQ_TIMING path={request.url.path} status={response.status_code} total_ms={total*1000:.1f} db_ms={db_ms:.1f} redis_ms={redis_ms:.1f} render_ms={render_ms:.1f}",
+                f"REQ_TIMING path={request.url.path} status={response.status_code} total_ms={total*1000:.1f} db_ms={db_ms:.1f} redis_ms={redis_ms:.1f} render_ms={render_ms or 0.0:.1f}",
                 flush=True,
             )
         return response
@@ -109,6 +161,21 @@ def create_app() -> FastAPI:
     def healthcheck():
         return {"status": "ok"}
 
+    @app.get("/metrics", include_in_schema=False)
+    def metrics_endpoint(request: Request):
+        allowed = request_metrics.metrics_access_allowed(
+            authorization=request.headers.get("Authorization"),
+            client_host=request.client.host if request.client else None,
+            forwarded_for=request.headers.get("X-Forwarded-For"),
+            real_ip=request.headers.get("X-Real-IP"),
+        )
+        if not allowed:
+            raise HTTPException(status_code=404)
+        return PlainTextResponse(
+            request_metrics.registry.render(),
+            media_type="text/plain; version=0.0.4; charset=utf-8",
+        )
+
     return app
 
 
@@ -14,6 +14,9 @@ from .phone_verification import PhoneVerificationChallenge
 from .email_verification import EmailVerificationChallenge
 from .notification import Notification
 from .page_visit import PageVisit
+from .car_payload_value import CarPayloadValue
+from .fx_rate import FxRate
+from .media_file import MediaFile
 
 __all__ = [
     "Source",
@@ -33,4 +36,7 @@ __all__ = [
     "EmailVerificationChallenge",
     "Notification",
     "PageVisit",
+    "CarPayloadValue",
+    "FxRate",
+    "MediaFile",
 ]
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from datetime import datetime
-from sqlalchemy import String, Integer, Numeric, Boolean, ForeignKey, UniqueConstraint, Text, JSON, Computed, TIMESTAMP
+from sqlalchemy import String, Integer, SmallInteger, Numeric, Boolean, ForeignKey, UniqueConstraint, Text, JSON, Computed, TIMESTAMP
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from .source import Base
 
@@ -26,6 +26,11 @@ class Car(Base):
     currency: Mapped[str | None] = mapped_column(String(3), nullable=True)
     price_rub_cached: Mapped[float | None] = mapped_column(Numeric(14, 2), nullable=True, index=True)
     total_price_rub_cached: Mapped[float | None] = mapped_column(Numeric(14, 2), nullable=True)
+    # Public catalog price and its sort tier (0 = full calc, 1 = without util
+    # fee / source price, 2 = no price), kept in sync by
+    # CarsService.sync_display_price_columns and scripts/update_fx_prices.
+    display_price_rub: Mapped[float | None] = mapped_column(Numeric(14, 2), nullable=True)
+    display_price_group: Mapped[int | None] = mapped_column(SmallInteger, nullable=True)
     listing_sort_ts: Mapped[datetime | None] = mapped_column(
         TIMESTAMP(timezone=True),
         Computed("COALESCE(listing_date, updated_at, created_at)", persisted=True),
@@ -39,6 +44,28 @@ class Car(Base):
         ),
         nullable=True,
     )
+    # Raw-or-inferred specs and registration-or-model year, stored so range
+    # filters can use plain btree indexes (see effective_*_value helpers).
+    effective_engine_cc: Mapped[int | None] = mapped_column(
+        Integer,
+        Computed("COALESCE(engine_cc, inferred_engine_cc)", persisted=True),
+        nullable=True,
+    )
+    effective_power_hp: Mapped[float | None] = mapped_column(
+        Numeric(10, 2),
+        Computed("COALESCE(power_hp, inferred_power_hp)", persisted=True),
+        nullable=True,
+    )
+    effective_power_kw: Mapped[float | None] = mapped_column(
+        Numeric(10, 2),
+        Computed("COALESCE(power_kw, inferred_power_kw)", persisted=True),
+        nullable=True,
+    )
+    effective_reg_year: Mapped[int | None] = mapped_column(
+        Integer,
+        Computed("COALESCE(registration_year, year)", persisted=True),
+        nullable=True,
+    )
     kr_market_type: Mapped[str | None] = mapped_column(String(16), nullable=True, index=True)
     registration_year: Mapped[int | None] = mapped_column(Integer, nullable=True, index=True)
     registration_month: Mapped[int | None] = mapped_column(Integer, nullable=True, index=True)
@@ -66,6 +93,9 @@ class Car(Base):
     source_payload: Mapped[dict | None] = mapped_column(JSON, nullable=True)
     calc_breakdown_json: Mapped[dict | None] = mapped_column(JSON, nullable=True)
     hash: Mapped[str | None] = mapped_column(String(128), nullable=True, index=True)
+    # HTTP validators of the last detail page fetch, sent back as If-None-Match / If-Modified-Since.
+    detail_etag: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    detail_last_modified: Mapped[str | None] = mapped_column(String(64), nullable=True)
     first_seen_at: Mapped[datetime | None] = mapped_column(nullable=True)
     last_seen_at: Mapped[datetime | None] = mapped_column(nullable=True)
     listing_date: Mapped[datetime | None] = mapped_column(nullable=True, index=True)
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from typing import Optional
+
 from sqlalchemy import Integer, String, Boolean, ForeignKey
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from .source import Base
@@ -13,6 +15,8 @@ class CarImage(Base):
     url: Mapped[str] = mapped_column(String(1000), nullable=False)
     is_primary: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
     position: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    # 64-bit dHash (hex) of the mirrored file; partial index idx_car_images_phash.
+    phash: Mapped[Optional[str]] = mapped_column(String(16), nullable=True)
 
     car = relationship("Car", back_populates="images")
 
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from datetime import datetime
+from sqlalchemy import String, Integer, Index, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .source import Base
+
+
+class CarPayloadValue(Base):
+    """Distinct advanced-filter values per (payload key, region, country, brand).
+
+    Maintained incrementally by ``ParsingDataService`` during upserts and
+    deactivations, and rebuilt from scratch by
+    ``tools/payload_values_refresh.py``. ``total`` is the number of
+    available cars carrying the value; rows at zero are kept and simply
+    filtered out on read.
+    """
+
+    __tablename__ = "car_payload_values"
+    __table_args__ = (
+        UniqueConstraint(
+            "payload_key",
+            "region",
+            "country",
+            "brand",
+            "value",
+            name="uq_car_payload_values_slice_value",
+        ),
+        Index("idx_car_payload_values_key_slice", "payload_key", "region", "country", "brand"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    payload_key: Mapped[str] = mapped_column(String(64), nullable=False)
+    # Empty strings instead of NULLs so the unique constraint doubles as
+    # the ON CONFLICT target for the incremental counters.
+    region: Mapped[str] = mapped_column(String(8), nullable=False, default="")
+    country: Mapped[str] = mapped_column(String(8), nullable=False, default="")
+    brand: Mapped[str] = mapped_column(String(120), nullable=False, default="")
+    value: Mapped[str] = mapped_column(String(255), nullable=False)
+    total: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    updated_at: Mapped[datetime] = mapped_column(default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+from datetime import datetime
+from sqlalchemy import String, Integer, Numeric, Index
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .source import Base
+
+
+class FxRate(Base):
+    """History of fetched exchange rates (RUB per one unit of ``currency``).
+
+    Written by ``services/fx_rates_service.FxRatesService.refresh`` whenever
+    the fetched rate differs from the latest stored one. ``rate`` is the raw
+    central-bank value; the ``FX_ADD_RUB`` markup is applied on read.
+    """
+
+    __tablename__ = "fx_rates"
+    __table_args__ = (
+        Index("idx_fx_rates_currency_fetched", "currency", "fetched_at"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    currency: Mapped[str] = mapped_column(String(8), nullable=False)
+    rate: Mapped[float] = mapped_column(Numeric(14, 6), nullable=False)
+    source: Mapped[str] = mapped_column(String(32), nullable=False, default="cbr")
+    rate_date: Mapped[datetime | None] = mapped_column(nullable=True)
+    fetched_at: Mapped[datetime] = mapped_column(default=datetime.utcnow, nullable=False)
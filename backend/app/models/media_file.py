@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+from datetime import datetime
+from sqlalchemy import BigInteger, DateTime, Float, Index, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .source import Base
+
+
+class MediaFile(Base):
+    """One file under the local media root (``фото-видео``).
+
+    ``rel_path`` is relative to the media root, i.e. the part after
+    ``/media/`` in a public URL. Maintained by the mirror scripts and by
+    ``scripts/media_manifest_scan``; see ``services/media_manifest``.
+    """
+
+    __tablename__ = "media_files"
+    __table_args__ = (Index("idx_media_files_dir", "dir"),)
+
+    rel_path: Mapped[str] = mapped_column(String(1024), primary_key=True)
+    dir: Mapped[str] = mapped_column(String(1024), nullable=False)
+    size: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    mtime: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    sha1: Mapped[str | None] = mapped_column(String(40), nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Iterable, List, Optional, Dict, Any
+from typing import Iterable, List, Optional, Dict, Any, Tuple
 from datetime import datetime
 import httpx
 import time
@@ -10,6 +10,8 @@ import logging
 from pathlib import Path
 from ..config import settings
 from .config import SiteConfig
+from .html_cache import HtmlCache
+from ..utils.rate_limiter import AdaptiveRateController, TokenBucket, host_key
 from bs4 import BeautifulSoup  # type: ignore
 from bs4 import FeatureNotFound  # type: ignore
 
@@ -59,12 +61,18 @@ class CarParsed:
     listing_date: Optional[datetime] = None
     # optional list of image URLs in display order (first is primary)
     images: Optional[List[str]] = None
+    # HTTP validators of the detail page, for conditional re-fetches
+    detail_etag: Optional[str] = None
+    detail_last_modified: Optional[str] = None
 
     def as_dict(self) -> dict:
         return self.__dict__.copy()
 
 
 class BaseParser:
+    # Parsers that fetch per-listing detail pages and honour detail_validators.
+    conditional_details: bool = False
+
     def __init__(self, config: SiteConfig) -> None:
         self.config = config
         self.last_warning: Optional[str] = None
@@ -81,8 +89,58 @@ class BaseParser:
             verify=True,
             http2=False,
         )
+        self.html_cache: Optional[HtmlCache] = HtmlCache.from_settings()
+        # source_url -> (ETag, Last-Modified) of the stored detail page. Set by
+        # the caller; matching requests are sent conditionally and a 304
+        # lands the listing in not_modified_ids instead of the results.
+        self.detail_validators: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+        self.not_modified_ids: List[str] = []
+        self._page_rate: Optional[AdaptiveRateController] = None
+
+    @property
+    def replaying(self) -> bool:
+        return self.html_cache is not None and self.html_cache.replay
+
+    def enable_replay(self, cache: HtmlCache) -> None:
+        """Serve every request from ``cache`` instead of the network."""
+        cache.replay = True
+        self.html_cache = cache
+
+    def rate_limiter(self, kind: str, rps: float, *, max_rps: Optional[float] = None, jitter: float = 0.0):
+        """Pacing for one request kind against this site's host.
+
+        Adaptive (``AdaptiveRateController``) unless ``PARSER_ADAPTIVE_RATE``
+        is off; site defaults ``<kind>_rps_min`` / ``<kind>_rps_max`` bound it
+        (``max_rps`` is the ceiling when the site sets none).
+        """
+        if not settings.PARSER_ADAPTIVE_RATE or self.replaying:
+            return TokenBucket(rate_per_sec=rps)
+        d = self.config.defaults
+        return AdaptiveRateController(
+            host_key(self.config.base_search_url, kind),
+            initial_rps=rps,
+            min_rps=d.get(f"{kind}_rps_min"),
+            max_rps=d.get(f"{kind}_rps_max", max_rps),
+            latency_target_sec=settings.PARSER_RATE_LATENCY_TARGET_SECONDS,
+            jitter=jitter,
+        )
+
+    def _page_limiter(self) -> Optional[AdaptiveRateController]:
+        if self._page_rate is None and settings.PARSER_ADAPTIVE_RATE and not self.replaying:
+            # Same politeness as the random PARSER_*_DELAY_SECONDS sleeps it
+            # replaces: gaps spread over [min, max] around the old mean, and
+            # never faster than that mean unless the site sets page_rps_max.
+            lo = max(float(settings.PARSER_MIN_DELAY_SECONDS), 0.0)
+            hi = max(float(settings.PARSER_MAX_DELAY_SECONDS), lo)
+            mean_delay = max((lo + hi) / 2, 0.1)
+            rps = 1.0 / mean_delay
+            self._page_rate = self.rate_limiter("page", rps, max_rps=rps, jitter=(hi - lo) / 2 / mean_delay)
+        return self._page_rate
 
     def _delay(self) -> None:
+        # With adaptive pacing _http_get already waits for its slot.
+        if self.replaying or self._page_limiter() is not None:
+            return
         delay = random.uniform(settings.PARSER_MIN_DELAY_SECONDS, settings.PARSER_MAX_DELAY_SECONDS)
         time.sleep(delay)
 
@@ -149,6 +207,42 @@ class BaseParser:
             return f"{parsed.scheme}://{parsed.host}{href}"
         return base.rstrip("/") + "/" + href.lstrip("/")
 
+    def _conditional_headers(self, url: str) -> Dict[str, str]:
+        etag, last_modified = self.detail_validators.get(url) or (None, None)
+        headers: Dict[str, str] = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return headers
+
+    @staticmethod
+    def response_validators(resp: Any) -> Tuple[Optional[str], Optional[str]]:
+        headers = getattr(resp, "headers", None) or {}
+        etag = (headers.get("etag") or "").strip() or None
+        last_modified = (headers.get("last-modified") or "").strip() or None
+        return (etag[:255] if etag else None), (last_modified[:64] if last_modified else None)
+
     def _http_get(self, url: str, *, params: Optional[Dict[str, Any]] = None):
+        if self.replaying:
+            return self.html_cache.response(url, params)
         logger.info(f"[{self.config.key}] GET {url} params={params}")
-        return self.client.get(url, params=params)
+        headers = self._conditional_headers(url) if not params else {}
+        limiter = self._page_limiter()
+        if limiter is None:
+            resp = self.client.get(url, params=params, headers=headers or None)
+        else:
+            limiter.acquire()
+            t0 = time.monotonic()
+            try:
+                resp = self.client.get(url, params=params, headers=headers or None)
+            except httpx.TransportError:
+                limiter.record(None, time.monotonic() - t0)
+                raise
+            limiter.record_response(resp, time.monotonic() - t0)
+        self._cache_response(url, params, resp)
+        return resp
+
+    def _cache_response(self, url: str, params: Optional[Dict[str, Any]], resp: Any) -> None:
+        if self.html_cache is not None:
+            self.html_cache.store_response(self.config.key, url, params, resp)
@@ -13,6 +13,7 @@ from ..utils.spec_inference import infer_engine_cc_from_text
 
 
 class Che168Parser(BaseParser):
+    conditional_details = True
     LIST_SELECTOR = "li.cards-li.list-photo-li[infoid]"
     PRICE_WAN_RE = re.compile(r"([0-9]+(?:\.[0-9]+)?)")
     YEAR_MONTH_RE = re.compile(r"(20\d{2})[/-年]\s*(\d{1,2})")
@@ -652,8 +653,19 @@ class Che168Parser(BaseParser):
                 if not skip_details and payload.get("source_url"):
                     if detail_limit <= 0 or detail_checked < detail_limit:
                         try:
-                            detail_html = self._fetch_html(str(payload["source_url"]))
+                            response = self._http_get(str(payload["source_url"]))
+                            if response.status_code == 304:
+                                # Unchanged since the stored fetch: the caller only bumps last_seen_at.
+                                self.not_modified_ids.append(str(payload.get("external_id")))
+                                detail_checked += 1
+                                self._delay()
+                                continue
+                            response.raise_for_status()
+                            detail_html = self._decode_html(response.content)
                             detail_payload.update(self.parse_detail_html(detail_html, fallback=payload))
+                            etag, last_modified = self.response_validators(response)
+                            detail_payload["detail_etag"] = etag
+                            detail_payload["detail_last_modified"] = last_modified
                             detail_checked += 1
                             self._delay()
                         except Exception as exc:
@@ -686,6 +698,8 @@ class Che168Parser(BaseParser):
                         source_payload=detail_payload.get("source_payload"),
                         listing_date=detail_payload.get("listing_date"),
                         images=detail_payload.get("images"),
+                        detail_etag=detail_payload.get("detail_etag"),
+                        detail_last_modified=detail_payload.get("detail_last_modified"),
                     )
                 )
             self._delay()
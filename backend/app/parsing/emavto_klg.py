@@ -2,9 +2,12 @@ from __future__ import annotations
 
 from typing import List, Dict, Any, Optional, Set, Tuple
 import os
+import queue
 import re
+import threading
 import time
 import random
+from dataclasses import dataclass, field
 from datetime import datetime
 
 import httpx
@@ -12,7 +15,8 @@ from bs4 import BeautifulSoup  # type: ignore
 
 from .base import BaseParser, CarParsed, logger
 from .config import SiteConfig
-from ..utils.rate_limiter import TokenBucket
+from .html_cache import HtmlCache
+from ..utils.rate_limiter import RateLimiter
 from ..utils.spec_inference import infer_engine_cc_from_text
 
 
@@ -48,14 +52,69 @@ def _load_brand_allowlist() -> Set[str]:
     return out
 
 
+@dataclass
+class _StreamState:
+    market_type: str
+    page_param: str
+    scope_selector: str
+    last_page: int
+    status: str = ""
+    pages_with_results: List[int] = field(default_factory=list)
+
+
+class _TaskSink:
+    """Detail tasks shared by the list producers and the detail workers.
+
+    Behaves like the task list ``_produce_page`` used to fill (``append`` and
+    ``len``), refuses tasks beyond ``max_items`` and hands every accepted
+    task to the workers through a queue.
+    """
+
+    def __init__(self, max_items: int = 0):
+        self.max_items = max_items
+        self.items: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[Optional[Tuple[int, Dict[str, Any]]]]" = queue.Queue()
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    @property
+    def full(self) -> bool:
+        return bool(self.max_items) and len(self.items) >= self.max_items
+
+    def append(self, task: Dict[str, Any]) -> None:
+        with self._lock:
+            if self.full:
+                return
+            seq = len(self.items)
+            self.items.append(task)
+        self._queue.put((seq, task))
+
+    def close(self, consumers: int) -> None:
+        for _ in range(consumers):
+            self._queue.put(None)
+
+    def get(self, deadline: float) -> Optional[Tuple[int, Dict[str, Any]]]:
+        """Next ``(seq, task)``; ``None`` once the producers are done or the deadline passed."""
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        try:
+            return self._queue.get(timeout=remaining)
+        except queue.Empty:
+            return None
+
+
 class EmAvtoKlgParser(BaseParser):
     """
     Two-stage pipeline:
-    - list producer obeying list rate-limit
-    - detail workers obeying detail rate-limit
+    - one list producer per market stream, sharing the list rate-limit
+    - detail workers obeying detail rate-limit, consuming tasks as they appear
     Supports modes: full / incremental (via profile["mode"]).
     """
 
+    conditional_details = True
     DETAILS_SEP_RE = re.compile(r"[·•|\u00b7]")
     DIGITS_RE = re.compile(r"\d+")
     REGISTRATION_LABELS = ["Дата постановки на учет", "Дата постановки на учёт"]
@@ -119,8 +178,11 @@ class EmAvtoKlgParser(BaseParser):
             "detail_latency": [],
             "skipped_below_min_price": 0,
             "skipped_leasing": 0,
+            "detail_not_modified": 0,
             "skipped_brand_not_allowed": 0,
         }
+        # List producers and detail workers update metrics from several threads.
+        self._metrics_lock = threading.Lock()
         # Опциональный allowlist брендов: EMAVTO_ALLOWED_BRANDS="BMW,Mercedes-Benz".
         # Работает case-insensitively и понимает алиасы ("Мерседес", "БМВ" и т.п.).
         self.allowed_brands: Set[str] = _load_brand_allowlist()
@@ -137,6 +199,15 @@ class EmAvtoKlgParser(BaseParser):
         self.last_reached_end: bool = False
         self.last_stop_reason: str = ""
 
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._metrics_lock:
+            self.metrics[name] = int(self.metrics.get(name, 0) or 0) + n
+
+    def enable_replay(self, cache: HtmlCache) -> None:
+        super().enable_replay(cache)
+        # Cached pages cost nothing, so the politeness limits do not apply.
+        self.list_rps = self.detail_rps = 1000.0
+
     def _build_query(self, profile: Dict[str, Any], page: int) -> Dict[str, str]:
         # Kept for compatibility with callers that still rely on the configured page param.
         qp = super()._build_query(profile, page)
@@ -184,80 +255,156 @@ class EmAvtoKlgParser(BaseParser):
         deadline_hit = False
         stop_reason = ""
 
-        list_bucket = TokenBucket(rate_per_sec=self.list_rps)
-        detail_bucket = TokenBucket(rate_per_sec=self.detail_rps)
+        list_bucket = self.rate_limiter("list", self.list_rps)
+        detail_bucket = self.rate_limiter("detail", self.detail_rps)
 
         results: List[CarParsed] = []
-        processed_pages: List[int] = []
-        tasks: List[Dict[str, Any]] = []
+        sink = _TaskSink(max_items)
         self.last_pages_processed = 0
         self.last_reached_end = False
         self.last_stop_reason = ""
-        stream_done = {str(stream["market_type"]): False for stream in self.MARKET_STREAMS}
+        streams = [
+            _StreamState(
+                market_type=str(stream["market_type"]),
+                page_param=str(stream["page_param"]),
+                scope_selector=str(stream["scope_selector"]),
+                last_page=start_page - 1,
+            )
+            for stream in self.MARKET_STREAMS
+        ]
 
-        for page in range(start_page, start_page + max_pages):
-            if time.monotonic() > deadline:
-                deadline_hit = True
-                stop_reason = "deadline"
-                break
-            page_had_results = False
-            attempted_streams = 0
-            section_stats: List[Tuple[str, str, int]] = []
-            for stream in self.MARKET_STREAMS:
-                market_type = str(stream["market_type"])
-                if stream_done.get(market_type):
-                    continue
-                attempted_streams += 1
-                logger.info(
-                    "[emavto_klg] list start market_type=%s page=%s",
-                    market_type,
-                    page,
-                )
-                page_status, added = self._produce_page(
-                    page,
-                    list_bucket,
-                    tasks,
-                    profile,
-                    skip_details,
-                    max_items,
-                    min_price_usd,
-                    deadline,
-                    page_param=str(stream["page_param"]),
-                    scope_selector=str(stream["scope_selector"]),
-                    market_type=market_type,
-                )
-                section_stats.append((market_type, page_status, added))
-                if page_status == "ok":
-                    page_had_results = page_had_results or added > 0
-                elif page_status == "empty":
-                    stream_done[market_type] = True
-                else:
-                    stop_reason = page_status
-                    break
-                if max_items and len(tasks) >= max_items:
-                    break
-            if stop_reason == "error":
-                break
-            if section_stats:
-                logger.info(
-                    "[emavto_klg] combined page=%s stats=%s tasks_total=%s",
-                    page,
-                    section_stats,
-                    len(tasks),
-                )
-            if page_had_results:
-                processed_pages.append(page)
-            if attempted_streams == 0 or all(stream_done.values()):
-                stop_reason = "empty"
-                self.last_reached_end = True
-                break
-            if max_items and len(tasks) >= max_items:
-                stop_reason = "max_items"
-                break
-        if not stop_reason and not deadline_hit:
+        # One producer per market stream: a slow or backing-off stream no longer
+        # holds up the other one. Both still share the list rate limit.
+        def produce(state: _StreamState) -> None:
+            try:
+                for page in range(start_page, start_page + max_pages):
+                    if time.monotonic() > deadline:
+                        state.status = "deadline"
+                        return
+                    if sink.full:
+                        state.status = "max_items"
+                        return
+                    logger.info(
+                        "[emavto_klg] list start market_type=%s page=%s",
+                        state.market_type,
+                        page,
+                    )
+                    page_status, added = self._produce_page(
+                        page,
+                        list_bucket,
+                        sink,
+                        profile,
+                        skip_details,
+                        max_items,
+                        min_price_usd,
+                        deadline,
+                        page_param=state.page_param,
+                        scope_selector=state.scope_selector,
+                        market_type=state.market_type,
+                    )
+                    logger.info(
+                        "[emavto_klg] list done market_type=%s page=%s status=%s added=%s tasks_total=%s",
+                        state.market_type,
+                        page,
+                        page_status,
+                        added,
+                        len(sink),
+                    )
+                    if page_status == "error" and time.monotonic() > deadline:
+                        page_status = "deadline"
+                    if page_status != "ok":
+                        state.status = page_status
+                        return
+                    state.last_page = page
+                    if added > 0:
+                        state.pages_with_results.append(page)
+                state.status = "page_limit"
+            except Exception:
+                logger.exception("[emavto_klg] list producer failed market_type=%s", state.market_type)
+                state.status = "error"
+
+        producers = [
+            threading.Thread(target=produce, args=(state,), name=f"emavto-list-{state.market_type}", daemon=True)
+            for state in streams
+        ]
+        for thread in producers:
+            thread.start()
+
+        # Detail workers start right away and pick tasks up as the producers
+        # emit them instead of waiting for the whole list stage.
+        processed: Set[int] = set()
+        results_lock = threading.Lock()
+        client: Optional[httpx.Client] = None
+        consumers: List[threading.Thread] = []
+        if not skip_details:
+            logger.info(
+                "[emavto_klg] detail workers start workers=%s max_items=%s",
+                max(1, self.detail_concurrency),
+                max_items or "inf",
+            )
+            client = httpx.Client(
+                headers={"User-Agent": self.client.headers.get("User-Agent")},
+                timeout=httpx.Timeout(10.0, read=20.0),
+                follow_redirects=True,
+            )
+
+            def consume() -> None:
+                while True:
+                    item = sink.get(deadline)
+                    if item is None:
+                        return
+                    if max_items and len(results) >= max_items:
+                        return
+                    seq, task = item
+                    logger.info(
+                        "[emavto_klg] detail start ext_id=%s url=%s",
+                        task.get("external_id"),
+                        task.get("source_url"),
+                    )
+                    detail = self._fetch_detail(task["source_url"], detail_bucket, client=client, deadline=deadline)
+                    car = self._car_from_detail(task, detail, phase="detail")
+                    with results_lock:
+                        processed.add(seq)
+                        if car is not None:
+                            results.append(car)
+
+            consumers = [
+                threading.Thread(target=consume, name=f"emavto-detail-{idx}", daemon=True)
+                for idx in range(max(1, self.detail_concurrency))
+            ]
+            for thread in consumers:
+                thread.start()
+
+        for thread in producers:
+            thread.join()
+        sink.close(len(consumers))
+        for thread in consumers:
+            thread.join()
+        if client is not None:
+            client.close()
+
+        tasks = list(sink.items)
+        statuses = {state.status for state in streams}
+        if all(state.status == "empty" for state in streams):
+            stop_reason = "empty"
+            self.last_reached_end = True
+        elif "error" in statuses:
+            stop_reason = "error"
+        elif sink.full:
+            stop_reason = "max_items"
+        elif "deadline" in statuses:
+            stop_reason = "deadline"
+        else:
             stop_reason = "page_limit"
+        deadline_hit = stop_reason == "deadline" or time.monotonic() > deadline
+        processed_pages = sorted({page for state in streams for page in state.pages_with_results})
         self.last_pages_processed = len(processed_pages)
-        self.last_stop_reason = stop_reason or ("deadline" if deadline_hit else "unknown")
+        self.last_stop_reason = stop_reason
+        logger.info(
+            "[emavto_klg] list stage done streams=%s tasks_total=%s",
+            {state.market_type: (state.status, state.last_page) for state in streams},
+            len(tasks),
+        )
 
         # If skipping details, we already appended results inside produce_page
         if skip_details:
@@ -269,80 +416,16 @@ class EmAvtoKlgParser(BaseParser):
         else:
             self.last_list_tasks = []
             self.last_tasks_total = len(tasks)
-            processed_detail_tasks = 0
-            logger.info(
-                "[emavto_klg] detail loop start tasks=%s max_items=%s", len(
-                    tasks), max_items or "inf"
-            )
-            client = httpx.Client(
-                headers={"User-Agent": self.client.headers.get("User-Agent")},
-                timeout=httpx.Timeout(10.0, read=20.0),
-                follow_redirects=True,
-            )
-            for task in tasks:
-                if time.monotonic() > deadline:
-                    deadline_hit = True
-                    break
-                if max_items and len(results) >= max_items:
-                    break
-                logger.info(
-                    "[emavto_klg] detail start ext_id=%s url=%s",
-                    task.get("external_id"),
-                    task.get("source_url"),
-                )
-                detail = self._fetch_detail(
-                    task["source_url"], detail_bucket, client=client, deadline=deadline)
-                processed_detail_tasks += 1
-                if detail.get("skip_reason") == "leasing":
-                    self.metrics["skipped_leasing"] = int(self.metrics.get("skipped_leasing", 0) or 0) + 1
-                    logger.info(
-                        "[emavto_klg] detail skip ext_id=%s reason=leasing",
-                        task.get("external_id"),
-                    )
-                    continue
-                detail_payload = dict(detail.get("source_payload") or {})
-                detail_payload["kr_market_type"] = task.get("kr_market_type")
-                detail_payload["kr_market_type_source"] = "emavto_tab"
-                car = CarParsed(
-                    source_key=self.config.key,
-                    external_id=task["external_id"],
-                    country=(self.config.country or "KR").upper(),
-                    kr_market_type=task.get("kr_market_type"),
-                    brand=task["brand"],
-                    model=task["model"],
-                    year=task["year"],
-                    registration_year=detail.get("registration_year"),
-                    registration_month=detail.get("registration_month"),
-                    mileage=task["mileage"],
-                    price=task["price"],
-                    currency=self.config.defaults.get("currency"),
-                    engine_type=task["engine_type"],
-                    body_type=detail.get("body_type"),
-                    transmission=detail.get("transmission"),
-                    drive_type=detail.get("drive_type"),
-                    color=detail.get("color"),
-                    vin=detail.get("vin"),
-                    source_url=task["source_url"],
-                    thumbnail_url=detail.get(
-                        "thumbnail") or task["thumbnail_url"],
-                    source_payload=detail_payload,
-                    images=detail.get("images"),
-                )
-                results.append(car)
-                logger.info(
-                    "[emavto_klg] detail done ext_id=%s images=%s",
-                    car.external_id,
-                    len(car.images or []),
-                )
-            client.close()
             self.last_details_done = len(results)
-            if processed_detail_tasks < len(tasks):
-                self.missing_tasks = tasks[processed_detail_tasks:]
-            else:
-                self.missing_tasks = []
+            self.missing_tasks = [task for seq, task in enumerate(tasks) if seq not in processed]
 
-        last_page_processed = max(
-            processed_pages) if processed_pages else (start_page - 1)
+        # Resume from the slowest stream that still has pages left; the faster
+        # one re-reads a few pages next time, which the upsert absorbs.
+        active = [state for state in streams if state.status != "empty"]
+        if active:
+            last_page_processed = min(state.last_page for state in active)
+        else:
+            last_page_processed = max(processed_pages) if processed_pages else (start_page - 1)
 
         if mode == "full":
             self.progress["last_page_full"] = last_page_processed
@@ -385,7 +468,7 @@ class EmAvtoKlgParser(BaseParser):
         """
         if not tasks:
             return []
-        detail_bucket = TokenBucket(rate_per_sec=self.detail_rps)
+        detail_bucket = self.rate_limiter("detail", self.detail_rps)
         deadline = time.monotonic() + max_runtime_sec
         results: List[CarParsed] = []
         client = httpx.Client(
@@ -404,55 +487,75 @@ class EmAvtoKlgParser(BaseParser):
                 task.get("source_url"),
             )
             detail = self._fetch_detail(task["source_url"], detail_bucket, client=client, deadline=deadline)
-            if detail.get("skip_reason") == "leasing":
-                self.metrics["skipped_leasing"] = int(self.metrics.get("skipped_leasing", 0) or 0) + 1
-                logger.info(
-                    "[emavto_klg] backfill detail skip ext_id=%s reason=leasing",
-                    task.get("external_id"),
-                )
+            car = self._car_from_detail(task, detail, phase="backfill detail")
+            if car is None:
                 continue
-            detail_payload = dict(detail.get("source_payload") or {})
-            detail_payload["kr_market_type"] = task.get("kr_market_type")
-            detail_payload["kr_market_type_source"] = "emavto_tab"
-            car = CarParsed(
-                source_key=self.config.key,
-                external_id=task["external_id"],
-                country=(self.config.country or "KR").upper(),
-                kr_market_type=task.get("kr_market_type"),
-                brand=task["brand"],
-                model=task["model"],
-                year=task["year"],
-                registration_year=detail.get("registration_year"),
-                registration_month=detail.get("registration_month"),
-                mileage=task["mileage"],
-                price=task["price"],
-                currency=self.config.defaults.get("currency"),
-                engine_type=task["engine_type"],
-                body_type=detail.get("body_type"),
-                transmission=detail.get("transmission"),
-                drive_type=detail.get("drive_type"),
-                color=detail.get("color"),
-                vin=detail.get("vin"),
-                source_url=task["source_url"],
-                thumbnail_url=detail.get("thumbnail") or task["thumbnail_url"],
-                source_payload=detail_payload,
-                images=detail.get("images"),
-            )
             results.append(car)
-            logger.info(
-                "[emavto_klg] backfill detail done ext_id=%s images=%s",
-                car.external_id,
-                len(car.images or []),
-            )
         client.close()
         return results
 
+    def _car_from_detail(self, task: Dict[str, Any], detail: Dict[str, Any], *, phase: str) -> Optional[CarParsed]:
+        if detail.get("not_modified"):
+            with self._metrics_lock:
+                self.metrics["detail_not_modified"] += 1
+                self.not_modified_ids.append(str(task["external_id"]))
+            logger.info(
+                "[emavto_klg] %s not modified ext_id=%s",
+                phase,
+                task.get("external_id"),
+            )
+            return None
+        if detail.get("skip_reason") == "leasing":
+            self._count("skipped_leasing")
+            logger.info(
+                "[emavto_klg] %s skip ext_id=%s reason=leasing",
+                phase,
+                task.get("external_id"),
+            )
+            return None
+        detail_payload = dict(detail.get("source_payload") or {})
+        detail_payload["kr_market_type"] = task.get("kr_market_type")
+        detail_payload["kr_market_type_source"] = "emavto_tab"
+        car = CarParsed(
+            source_key=self.config.key,
+            external_id=task["external_id"],
+            country=(self.config.country or "KR").upper(),
+            kr_market_type=task.get("kr_market_type"),
+            brand=task["brand"],
+            model=task["model"],
+            year=task["year"],
+            registration_year=detail.get("registration_year"),
+            registration_month=detail.get("registration_month"),
+            mileage=task["mileage"],
+            price=task["price"],
+            currency=self.config.defaults.get("currency"),
+            engine_type=task["engine_type"],
+            body_type=detail.get("body_type"),
+            transmission=detail.get("transmission"),
+            drive_type=detail.get("drive_type"),
+            color=detail.get("color"),
+            vin=detail.get("vin"),
+            source_url=task["source_url"],
+            thumbnail_url=detail.get("thumbnail") or task["thumbnail_url"],
+            source_payload=detail_payload,
+            images=detail.get("images"),
+            detail_etag=detail.get("detail_etag"),
+            detail_last_modified=detail.get("detail_last_modified"),
+        )
+        logger.info(
+            "[emavto_klg] %s done ext_id=%s images=%s",
+            phase,
+            car.external_id,
+            len(car.images or []),
+        )
+        return car
+
     # --- list producer ---
     def _produce_page(
         self,
         page: int,
-        bucket: TokenBucket,
-        tasks: List[Dict[str, Any]],
+        bucket: RateLimiter,
+        tasks: _TaskSink,
         profile: Dict[str, Any],
         skip_details: bool,
         max_items: int,
@@ -508,18 +611,16 @@ class EmAvtoKlgParser(BaseParser):
             brand, model = self._split_brand_model(title_text)
             if self.allowed_brands:
                 if _normalize_brand(brand) not in self.allowed_brands:
-                    self.metrics["skipped_brand_not_allowed"] = int(
-                        self.metrics.get("skipped_brand_not_allowed", 0) or 0
-                    ) + 1
+                    self._count("skipped_brand_not_allowed")
                     continue
             details_text = r.get("details") or ""
             mileage, year, fuel = self._parse_emavto_details(details_text)
             price = self._parse_price_usd(r.get("price"))
             if min_price_usd > 0 and price is not None and price < min_price_usd:
-                self.metrics["skipped_below_min_price"] += 1
+                self._count("skipped_below_min_price")
                 continue
             if bool(r.get("is_leasing")):
-                self.metrics["skipped_leasing"] = int(self.metrics.get("skipped_leasing", 0) or 0) + 1
+                self._count("skipped_leasing")
                 logger.info(
                     "[emavto_klg] list skip ext_id=%s reason=leasing",
                     external_id or f"emavto_klg_{page}_{idx}",
@@ -630,11 +731,13 @@ class EmAvtoKlgParser(BaseParser):
         self,
         url: str,
         params: Optional[Dict[str, Any]],
-        bucket: TokenBucket,
+        bucket: RateLimiter,
         is_detail: bool,
         client: Optional[httpx.Client] = None,
         deadline: Optional[float] = None,
     ) -> Optional[httpx.Response]:
+        if self.replaying:
+            return self.html_cache.response(url, params)
         last_resp: Optional[httpx.Response] = None
         for attempt in range(3):
             if deadline and time.monotonic() > deadline:
@@ -644,9 +747,12 @@ class EmAvtoKlgParser(BaseParser):
             bucket.acquire()
             t0 = time.monotonic()
             sess = client or self.client
+            headers = self._conditional_headers(url) if is_detail else {}
             try:
-                resp = sess.get(url, params=params)
+                resp = sess.get(url, params=params, headers=headers or None)
             except httpx.TimeoutException:
+                if hasattr(bucket, "record"):
+                    bucket.record(None, time.monotonic() - t0)
                 logger.warning(
                     f"[emavto_klg] timeout {'detail' if is_detail else 'list'} attempt={attempt+1} url={url}")
                 # Backoff similar to 5xx
@@ -659,6 +765,8 @@ class EmAvtoKlgParser(BaseParser):
                 time.sleep(max(1.0, delay))
                 continue
             except httpx.RemoteProtocolError as e:
+                if hasattr(bucket, "record"):
+                    bucket.record(None, time.monotonic() - t0)
                 logger.warning(
                     f"[emavto_klg] remote protocol error {'detail' if is_detail else 'list'} attempt={attempt+1} url={url} err={e}"
                 )
@@ -671,18 +779,15 @@ class EmAvtoKlgParser(BaseParser):
                 time.sleep(max(1.0, delay))
                 continue
             latency = time.monotonic() - t0
-            if is_detail:
-                self.metrics["detail_requests"] += 1
-                self.metrics["detail_latency"].append(latency)
-            else:
-                self.metrics["list_requests"] += 1
-                self.metrics["list_latency"].append(latency)
+            if hasattr(bucket, "record_response"):
+                bucket.record_response(resp, latency)
+            kind = "detail" if is_detail else "list"
+            with self._metrics_lock:
+                self.metrics[f"{kind}_requests"] += 1
+                self.metrics[f"{kind}_latency"].append(latency)
             last_resp = resp
             if resp.status_code == 429:
-                if is_detail:
-                    self.metrics["detail_429"] += 1
-                else:
-                    self.metrics["list_429"] += 1
+                self._count("detail_429" if is_detail else "list_429")
                 retry_after = resp.headers.get("Retry-After")
                 if retry_after:
                     try:
@@ -717,10 +822,11 @@ class EmAvtoKlgParser(BaseParser):
                     f"[emavto_klg] {resp.status_code} retry in {delay:.1f}s url={url}")
                 time.sleep(max(1.0, delay))
                 continue
+            self._cache_response(url, params, resp)
             return resp
         return last_resp
 
-    def _fetch_detail(self, url: str, bucket: TokenBucket, client: Optional[httpx.Client] = None, deadline: Optional[float] = None) -> Dict[str, Any]:
+    def _fetch_detail(self, url: str, bucket: RateLimiter, client: Optional[httpx.Client] = None, deadline: Optional[float] = None) -> Dict[str, Any]:
         out: Dict[str, Any] = {}
         close_client = False
         if client is None:
@@ -732,12 +838,17 @@ class EmAvtoKlgParser(BaseParser):
             close_client = True
         resp = self._request_with_backoff(
             url, None, bucket, is_detail=True, client=client, deadline=deadline)
+        if resp is not None and resp.status_code == 304:
+            if close_client:
+                client.close()
+            return {"not_modified": True}
         if not resp or resp.status_code != 200 or not resp.text:
             logger.warning("[emavto_klg] detail failed url=%s status=%s", url, getattr(
                 resp, "status_code", None))
             if close_client:
                 client.close()
             return out
+        out["detail_etag"], out["detail_last_modified"] = self.response_validators(resp)
         soup = BeautifulSoup(resp.text, "html.parser")
         page_text = soup.get_text(" ", strip=True)
         if self._detail_has_leasing_marker(soup, page_text):
@@ -0,0 +1,313 @@
+"""Content-addressed cache of the pages the parsers download.
+
+Bodies are zlib-compressed and stored once per sha256 under
+``<root>/blobs/``; ``<root>/index.sqlite3`` maps each request (URL plus
+query params) to the body versions seen for it. Live runs only write to the
+cache. A cache in replay mode answers every request from the index and
+never touches the network, so a parser fix can be re-run over the pages of
+the last few days (``backend.app.tools.html_cache_replay``).
+
+Enabled by ``PARSER_HTML_CACHE_DIR``; entries older than
+``PARSER_HTML_CACHE_TTL_DAYS`` and the oldest entries above
+``PARSER_HTML_CACHE_MAX_MB`` are pruned as the cache grows.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, Mapping, Optional
+
+import httpx
+
+from ..config import settings
+
+
+logger = logging.getLogger("parsing")
+
+_CACHEABLE_TYPES = ("html", "json", "xml", "text/")
+# Checking the size cap runs a SUM over the blob table, so it is amortised.
+_PRUNE_EVERY = 200
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS pages (
+        req_key TEXT NOT NULL,
+        digest TEXT NOT NULL,
+        source TEXT NOT NULL,
+        url TEXT NOT NULL,
+        status INTEGER NOT NULL,
+        content_type TEXT,
+        fetched_at REAL NOT NULL,
+        PRIMARY KEY (req_key, digest)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_pages_fetched ON pages (fetched_at)",
+    "CREATE INDEX IF NOT EXISTS idx_pages_source_fetched ON pages (source, fetched_at)",
+    """
+    CREATE TABLE IF NOT EXISTS blobs (
+        digest TEXT PRIMARY KEY,
+        stored_bytes INTEGER NOT NULL,
+        raw_bytes INTEGER NOT NULL
+    )
+    """,
+)
+
+
+def request_url(url: str, params: Optional[Mapping[str, Any]] = None) -> str:
+    """Canonical form of a GET request: the URL with params merged and sorted."""
+    merged = httpx.URL(url).copy_merge_params(params) if params else httpx.URL(url)
+    items = sorted(merged.params.multi_items())
+    return str(merged.copy_with(params=items)) if items else str(merged)
+
+
+def request_key(url: str, params: Optional[Mapping[str, Any]] = None) -> str:
+    return hashlib.sha1(request_url(url, params).encode("utf-8")).hexdigest()
+
+
+@dataclass(frozen=True)
+class CachedPage:
+    source: str
+    url: str
+    status: int
+    content_type: Optional[str]
+    fetched_at: float
+    body: bytes
+
+    def to_response(self) -> httpx.Response:
+        headers = {"x-html-cache": "hit"}
+        if self.content_type:
+            headers["content-type"] = self.content_type
+        return httpx.Response(
+            self.status,
+            content=self.body,
+            headers=headers,
+            request=httpx.Request("GET", self.url),
+        )
+
+
+class HtmlCache:
+    def __init__(
+        self,
+        root: Path | str,
+        *,
+        ttl_sec: float = 14 * 86400,
+        max_bytes: int = 1024 * 1024 * 1024,
+        replay: bool = False,
+        max_age_sec: Optional[float] = None,
+    ) -> None:
+        self.root = Path(root)
+        self.ttl_sec = float(ttl_sec)
+        self.max_bytes = int(max_bytes)
+        self.replay = bool(replay)
+        # Replay only serves pages fetched within this window (None = ttl).
+        self.max_age_sec = max_age_sec
+        self.stats: Dict[str, int] = {"stored": 0, "hits": 0, "misses": 0, "pruned": 0}
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._stores_since_prune = 0
+
+    @classmethod
+    def from_settings(cls, *, replay: bool = False, max_age_sec: Optional[float] = None) -> Optional["HtmlCache"]:
+        root = (settings.PARSER_HTML_CACHE_DIR or "").strip()
+        if not root:
+            return None
+        return cls(
+            root,
+            ttl_sec=max(0.0, float(settings.PARSER_HTML_CACHE_TTL_DAYS)) * 86400,
+            max_bytes=max(0, int(settings.PARSER_HTML_CACHE_MAX_MB)) * 1024 * 1024,
+            replay=replay,
+            max_age_sec=max_age_sec,
+        )
+
+    # --- storage ---
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.root.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.root / "index.sqlite3"), timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            for stmt in _SCHEMA:
+                conn.execute(stmt)
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.root / "blobs" / digest[:2] / f"{digest}.z"
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def store(
+        self,
+        source: str,
+        url: str,
+        params: Optional[Mapping[str, Any]],
+        body: bytes,
+        *,
+        status: int = 200,
+        content_type: Optional[str] = None,
+    ) -> Optional[str]:
+        if self.replay or not body:
+            return None
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._blob_path(digest)
+        with self._lock:
+            db = self._db()
+            known = db.execute("SELECT 1 FROM blobs WHERE digest = ?", (digest,)).fetchone()
+            if not known or not path.exists():
+                packed = zlib.compress(body, 6)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+                tmp.write_bytes(packed)
+                os.replace(tmp, path)
+                db.execute(
+                    "INSERT OR REPLACE INTO blobs (digest, stored_bytes, raw_bytes) VALUES (?, ?, ?)",
+                    (digest, len(packed), len(body)),
+                )
+            db.execute(
+                "INSERT INTO pages (req_key, digest, source, url, status, content_type, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (req_key, digest) DO UPDATE SET fetched_at = excluded.fetched_at",
+                (request_key(url, params), digest, source, request_url(url, params), int(status),
+                 content_type, time.time()),
+            )
+            db.commit()
+            self.stats["stored"] += 1
+            self._stores_since_prune += 1
+            due = self._stores_since_prune >= _PRUNE_EVERY
+        if due:
+            self.prune()
+        return digest
+
+    def store_response(self, source: str, url: str, params: Optional[Mapping[str, Any]], resp: Any) -> Optional[str]:
+        """Keep a successful text response; anything else is ignored."""
+        if getattr(resp, "status_code", None) != 200:
+            return None
+        headers = getattr(resp, "headers", None) or {}
+        content_type = headers.get("content-type") if hasattr(headers, "get") else None
+        if content_type and not any(t in content_type.lower() for t in _CACHEABLE_TYPES):
+            return None
+        try:
+            return self.store(source, url, params, resp.content, content_type=content_type)
+        except Exception as exc:  # noqa: BLE001 - the cache must never break a crawl
+            logger.warning("[html_cache] store failed url=%s err=%s", url, str(exc)[:200])
+            return None
+
+    # --- reads ---
+    def _read_blob(self, digest: str) -> Optional[bytes]:
+        try:
+            return zlib.decompress(self._blob_path(digest).read_bytes())
+        except (OSError, zlib.error):
+            return None
+
+    def lookup(self, url: str, params: Optional[Mapping[str, Any]] = None) -> Optional[CachedPage]:
+        """Latest version of the request within the replay window."""
+        max_age = self.max_age_sec if self.max_age_sec is not None else self.ttl_sec
+        cutoff = time.time() - max_age if max_age > 0 else 0.0
+        with self._lock:
+            row = self._db().execute(
+                "SELECT digest, source, url, status, content_type, fetched_at FROM pages "
+                "WHERE req_key = ? AND fetched_at >= ? ORDER BY fetched_at DESC LIMIT 1",
+                (request_key(url, params), cutoff),
+            ).fetchone()
+        body = self._read_blob(row[0]) if row else None
+        if body is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return CachedPage(source=row[1], url=row[2], status=int(row[3]), content_type=row[4],
+                          fetched_at=float(row[5]), body=body)
+
+    def response(self, url: str, params: Optional[Mapping[str, Any]] = None) -> httpx.Response:
+        """Replay answer for a request: the cached page or an empty 404."""
+        page = self.lookup(url, params)
+        if page is not None:
+            return page.to_response()
+        return httpx.Response(
+            404,
+            headers={"x-html-cache": "miss"},
+            request=httpx.Request("GET", request_url(url, params)),
+        )
+
+    def iter_pages(self, source: Optional[str] = None, *, since: float = 0.0) -> Iterator[CachedPage]:
+        """Every cached version fetched after ``since``, oldest first."""
+        sql = "SELECT digest, source, url, status, content_type, fetched_at FROM pages WHERE fetched_at >= ?"
+        args: list = [since]
+        if source:
+            sql += " AND source = ?"
+            args.append(source)
+        with self._lock:
+            rows = self._db().execute(sql + " ORDER BY fetched_at", args).fetchall()
+        for digest, src, url, status, content_type, fetched_at in rows:
+            body = self._read_blob(digest)
+            if body is not None:
+                yield CachedPage(src, url, int(status), content_type, float(fetched_at), body)
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            db = self._db()
+            pages, oldest, newest = db.execute(
+                "SELECT COUNT(*), MIN(fetched_at), MAX(fetched_at) FROM pages").fetchone()
+            blobs, stored, raw = db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(stored_bytes), 0), COALESCE(SUM(raw_bytes), 0) FROM blobs").fetchone()
+            by_source = dict(db.execute("SELECT source, COUNT(*) FROM pages GROUP BY source").fetchall())
+        return {
+            "pages": int(pages or 0),
+            "blobs": int(blobs or 0),
+            "stored_mb": round(stored / 1024 / 1024, 2),
+            "raw_mb": round(raw / 1024 / 1024, 2),
+            "oldest_age_h": round((time.time() - oldest) / 3600, 1) if oldest else None,
+            "newest_age_h": round((time.time() - newest) / 3600, 1) if newest else None,
+            "by_source": by_source,
+        }
+
+    # --- eviction ---
+    def prune(self) -> int:
+        """Drop entries past the TTL, then the oldest ones until under the size cap."""
+        removed = 0
+        with self._lock:
+            self._stores_since_prune = 0
+            db = self._db()
+            if self.ttl_sec > 0:
+                removed += db.execute("DELETE FROM pages WHERE fetched_at < ?", (time.time() - self.ttl_sec,)).rowcount
+            total = int(db.execute("SELECT COALESCE(SUM(stored_bytes), 0) FROM blobs").fetchone()[0])
+            if self.max_bytes and total > self.max_bytes:
+                # Evict down to 90% of the cap so the next few stores do not prune again.
+                target = int(self.max_bytes * 0.9)
+                rows = db.execute(
+                    "SELECT p.req_key, p.digest, b.stored_bytes FROM pages p JOIN blobs b ON b.digest = p.digest "
+                    "ORDER BY p.fetched_at"
+                ).fetchall()
+                refs: Dict[str, int] = dict(
+                    db.execute("SELECT digest, COUNT(*) FROM pages GROUP BY digest").fetchall())
+                for req_key, digest, size in rows:
+                    if total <= target:
+                        break
+                    db.execute("DELETE FROM pages WHERE req_key = ? AND digest = ?", (req_key, digest))
+                    removed += 1
+                    refs[digest] -= 1
+                    if refs[digest] == 0:
+                        total -= int(size)
+            orphans = [r[0] for r in db.execute(
+                "SELECT digest FROM blobs WHERE digest NOT IN (SELECT digest FROM pages)").fetchall()]
+            for digest in orphans:
+                self._blob_path(digest).unlink(missing_ok=True)
+            db.executemany("DELETE FROM blobs WHERE digest = ?", [(d,) for d in orphans])
+            db.commit()
+        self.stats["pruned"] += removed
+        if removed:
+            logger.info("[html_cache] pruned entries=%s blobs=%s", removed, len(orphans))
+        return removed
+
+
+__all__ = ["CachedPage", "HtmlCache", "request_key", "request_url"]
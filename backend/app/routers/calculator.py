@@ -89,13 +89,10 @@ def calc_endpoint(payload: CalcRequest, db: Session = Depends(get_db)):
             )
         data["is_electric"] = is_electric
 
-        cfg_svc = CalculatorConfigService(db)
-        cfg = cfg_svc.ensure_default_from_yaml(Path("/app/backend/app/config/calculator.yml"))
-        if not cfg:
-            cfg = cfg_svc.ensure_default_from_path(Path("/app/Калькулятор Авто под заказ.xlsx"))
+        cfg = CalculatorConfigService(db).current_compiled()
         if not cfg:
             raise HTTPException(status_code=400, detail="calculator config not found")
-        from ..services.calculator_runtime import EstimateRequest, calculate
+        from ..services.calculator_runtime import EstimateRequest
 
         # auto eur_rate from CB if not provided
         fx = CarsService(db).get_fx_rates() or {}
@@ -115,7 +112,7 @@ def calc_endpoint(payload: CalcRequest, db: Session = Depends(get_db)):
             reg_year=data.get("first_registration_year"),
             reg_month=data.get("first_registration_month"),
         )
-        result = calculate(cfg.payload, req_obj)
+        result = cfg.calculate(req_obj)
         # локализация и приведение к RUB для UI
         label_map = cfg.payload.get("label_map", {})
         eur_rate_used = result.get("euro_rate_used") or data.get("eur_rate")
@@ -3,6 +3,14 @@ from sqlalchemy.orm import Session
 from typing import Optional, List, Any
 import os
 from ..db import get_db
+from ..services.approx_count import approx_count_mode
+from ..services.cache_prewarmer import internal_calls, record_cache_access
+from ..services.deferred_aggregates import (
+    get_state as get_aggregates_state,
+    job_token,
+    split_count_enabled,
+    submit as submit_aggregates,
+)
 from ..services.cars_service import (
     CarsService,
     canonicalize_free_text_filters,
@@ -11,6 +19,7 @@ from ..services.cars_service import (
     effective_power_hp_value,
     effective_power_kw_value,
 )
+from ..services.image_dedup import unique_images
 from ..schemas import CarDetailOut
 from ..utils.country_map import resolve_display_country, normalize_country_code, country_label_ru
 from ..utils.taxonomy import (
@@ -41,7 +50,7 @@ from ..utils.brand_groups import (
     load_priority_override,
     models_priority_for_brand,
 )
-from ..utils.thumbs import normalize_classistatic_url, resolve_thumbnail_url
+from ..utils.thumbs import normalize_classistatic_url, resolve_thumbnail_urls
 from ..utils.redis_cache import (
     redis_get_json,
     redis_set_json,
@@ -486,8 +495,18 @@ def _serialize_catalog_payload_items(
     kr_sources = set(service._source_ids_for_hints(service.KOREA_SOURCE_HINTS))
     eu_countries = set(service.EU_COUNTRIES)
     thumb_replaced = 0
+    # One Redis MGET and no stats/probes for the whole page.
+    resolved_thumbs = resolve_thumbnail_urls(
+        [
+            (
+                _normalize_thumb_candidate(c.get("thumbnail_url")) or image_first.get(c.get("id")),
+                c.get("thumbnail_local_path"),
+            )
+            for c in items
+        ]
+    )
 
-    for c in items:
+    for c, thumb_url in zip(items, resolved_thumbs):
         country_raw = c.get("country") if isinstance(c, dict) else None
         country_norm = normalize_country_code(country_raw) if country_raw else None
         source_id = c.get("source_id") if isinstance(c, dict) else None
@@ -500,8 +519,6 @@ def _serialize_catalog_payload_items(
         else:
             region_val = country_norm or None
         img_count = image_counts.get(c.get("id"), 0)
-        raw_thumb = _normalize_thumb_candidate(c.get("thumbnail_url")) or image_first.get(c.get("id"))
-        thumb_url = resolve_thumbnail_url(raw_thumb, c.get("thumbnail_local_path"))
         if not thumb_url:
             thumb_url = "/static/img/no-photo.svg"
         if isinstance(thumb_url, str) and "rule=mo-" in thumb_url:
@@ -633,6 +650,10 @@ def list_cars(
     ),
     page: int = Query(default=1, ge=1),
     page_size: int = Query(default=20, ge=1, le=100),
+    split: bool = Query(
+        default=False,
+        description="Return items without waiting for an uncached total; poll /api/cars_aggregates",
+    ),
     db: Session = Depends(get_db),
 ):
     service = CarsService(db)
@@ -737,6 +758,11 @@ def list_cars(
             strict_photo_mode,
         )
         cached = redis_get_json(cache_key)
+        record_cache_access(
+            "cars_list",
+            {**canon, "sort": sort, "page": page, "page_size": page_size},
+            hit=cached is not None,
+        )
         if cached is not None:
             print("CARS_LIST_CACHE hit=1 source=redis key=%s" % cache_key, flush=True)
             cached_response = cached
@@ -823,18 +849,20 @@ def list_cars(
             f"brand={canon.get('brand')} model={canon.get('model')}",
             flush=True,
         )
+    aggregates_token = None
     if cached_response is not None:
         cached_items = cached_response.get("items") if isinstance(cached_response, dict) else None
         items = [dict(item) for item in (cached_items or []) if isinstance(item, dict)]
         total = _to_int(cached_response.get("total")) if isinstance(cached_response, dict) else None
         total = total if total is not None else 0
+        approximate = bool(cached_response.get("approximate")) if isinstance(cached_response, dict) else False
         if items:
             try:
                 service.sync_light_rows_from_db(items, refresh_prices=refresh_cached_list_prices)
             except Exception:
                 logger.exception("catalog_cache_refresh_failed")
     else:
-        items, total = service.list_cars(
+        count_filters = dict(
             region=canon.get("region"),
             country=canon.get("country"),
             brand=canon.get("brand"),
@@ -877,13 +905,27 @@ def list_cars(
             price_rating_label=price_rating_label,
             owners_count=owners_count,
             condition=condition,
+        )
+        count_options = dict(
+            use_fast_count=os.getenv("CATALOG_USE_FAST_COUNT", "1") != "0",
+            hide_no_local_photo=(strict_photo_mode == "1"),
+            allow_approximate_count=approx_count_mode() != "off",
+        )
+        items, total = service.list_cars(
+            **count_filters,
+            **count_options,
             sort=sort,
             page=page,
             page_size=page_size,
             light=True,
-            use_fast_count=os.getenv("CATALOG_USE_FAST_COUNT", "1") != "0",
-            hide_no_local_photo=(strict_photo_mode == "1"),
+            defer_count=split and split_count_enabled(),
         )
+        approximate = service.last_count_approximate
+        if service.last_count_deferred:
+            aggregates_token, aggregates_state = _schedule_catalog_aggregates(count_filters, count_options)
+            if aggregates_state.get("status") == "ready":
+                total = aggregates_state.get("total")
+                approximate = bool(aggregates_state.get("approximate"))
     t1 = time.perf_counter()
     if items and not isinstance(items[0], dict):
         items = [dict(row) for row in items]
@@ -961,10 +1003,14 @@ def list_cars(
     resp = {
         "items": payload_items,
         "total": total,
+        "approximate": approximate,
         "page": page,
         "page_size": page_size,
     }
-    if cache_key:
+    if total is None:
+        resp["count_pending"] = True
+        resp["aggregates_token"] = aggregates_token
+    if cache_key and total is not None:
         list_ttl = int(os.getenv("CARS_LIST_CACHE_TTL_SEC", "21600") or 21600)
         redis_set_json(cache_key, resp, ttl_sec=max(300, list_ttl))
     if cache_lock_key and cache_lock_token:
@@ -972,6 +1018,63 @@ def list_cars(
     return resp
 
 
+def _schedule_catalog_aggregates(count_filters: dict, count_options: dict) -> tuple[str, dict]:
+    """Count (and warm the filter panel facets) for a split-mode /api/cars call in the background."""
+    token = job_token("cars", {**count_filters, **count_options})
+
+    def _job(job_db: Session) -> dict:
+        with internal_calls():
+            return _compute(job_db)
+
+    def _compute(job_db: Session) -> dict:
+        job_service = CarsService(job_db)
+        _, job_total = job_service.list_cars(
+            **count_filters,
+            **count_options,
+            page=1,
+            page_size=1,
+            light=True,
+            count_only=True,
+        )
+        result = {"total": int(job_total or 0), "approximate": job_service.last_count_approximate}
+        # The facet contexts the filter panel requests next, stored under their normal keys.
+        region, country, brand = count_filters.get("region"), count_filters.get("country"), count_filters.get("brand")
+        try:
+            filter_ctx_base(request=None, region=region, country=country, db=job_db)
+            if brand:
+                filter_ctx_brand(
+                    request=None,
+                    region=region,
+                    country=country,
+                    kr_type=count_filters.get("kr_type"),
+                    brand=brand,
+                    db=job_db,
+                )
+                if count_filters.get("model"):
+                    filter_ctx_model(
+                        request=None,
+                        region=region,
+                        country=country,
+                        brand=brand,
+                        model=count_filters.get("model"),
+                        db=job_db,
+                    )
+        except Exception:
+            job_db.rollback()
+            logger.exception("deferred_filter_ctx_failed token=%s", token)
+        return result
+
+    return token, submit_aggregates(token, _job)
+
+
+@router.get("/cars_aggregates")
+def cars_aggregates(token: str = Query(min_length=8, max_length=64)):
+    state = get_aggregates_state(token)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Unknown aggregates token")
+    return {key: value for key, value in state.items() if key != "ts"}
+
+
 @router.get("/cars_count")
 def cars_count(
     request: Request,
@@ -1153,6 +1256,7 @@ def cars_count(
     cache_lock_token = None
     if not price_cache_bypass:
         cached = redis_get_json(cache_key)
+        record_cache_access("cars_count", params, hit=cached is not None)
         if cached is not None:
             print("CARS_COUNT_FULL_CACHE hit=1 source=redis key=%s" % cache_key, flush=True)
             return {"count": int(cached)}
@@ -1478,7 +1582,7 @@ def get_car(car_id: int, db: Session = Depends(get_db)):
     detail.power_hp = effective_power_hp_value(car)
     detail.power_kw = effective_power_kw_value(car)
     if car.images:
-        detail.images = [im.url for im in car.images if im.url]
+        detail.images = [im.url for im in unique_images(car.images) if im.url]
     detail.display_price_rub = resolve_public_display_price_rub(
         car.total_price_rub_cached,
         car.price_rub_cached,
@@ -1612,6 +1716,7 @@ def filter_ctx_base(
         ):
             cached = None
         else:
+            record_cache_access("filter_ctx_base", params, hit=True)
             print("FILTER_CTX_BASE_CACHE hit=1 source=redis", flush=True)
             if os.getenv("FILTER_CTX_DEBUG") == "1":
                 total_ms = (time.perf_counter() - t0) * 1000
@@ -1620,6 +1725,7 @@ def filter_ctx_base(
                     flush=True,
                 )
             return cached
+    record_cache_access("filter_ctx_base", params, hit=False)
     print("FILTER_CTX_BASE_CACHE hit=0 source=fallback", flush=True)
     base_filters = {"region": params.get("region"), "country": params.get("country")}
     regions_raw = [r["value"] for r in service.facet_counts(field="region", filters={}) if r.get("value")]
@@ -1789,11 +1895,13 @@ def filter_ctx_brand(
     t0 = time.perf_counter()
     cached = redis_get_json(cache_key)
     if cached:
+        record_cache_access("filter_ctx_brand", params, hit=True)
         print("FILTER_CTX_BRAND_CACHE hit=1 source=redis", flush=True)
         if os.getenv("FILTER_CTX_DEBUG") == "1":
             total_ms = (time.perf_counter() - t0) * 1000
             print(f"FILTER_CTX_BRAND ms={total_ms:.2f} models={len(cached.get('models', []))}", flush=True)
         return cached
+    record_cache_access("filter_ctx_brand", params, hit=False)
     print("FILTER_CTX_BRAND_CACHE hit=0 source=fallback", flush=True)
     brand_norm = normalize_brand(canon.get("brand")).strip() if canon.get("brand") else None
     models = service.models_for_brand_filtered(
@@ -1847,11 +1955,13 @@ def filter_ctx_model(
     t0 = time.perf_counter()
     cached = redis_get_json(cache_key)
     if cached:
+        record_cache_access("filter_ctx_model", params, hit=True)
         print("FILTER_CTX_MODEL_CACHE hit=1 source=redis", flush=True)
         if os.getenv("FILTER_CTX_DEBUG") == "1":
             total_ms = (time.perf_counter() - t0) * 1000
             print(f"FILTER_CTX_MODEL ms={total_ms:.2f} generations={len(cached.get('generations', []))}", flush=True)
         return cached
+    record_cache_access("filter_ctx_model", params, hit=False)
     print("FILTER_CTX_MODEL_CACHE hit=0 source=fallback", flush=True)
     from ..models import Car
     stmt = (
@@ -3,7 +3,7 @@ import time
 import logging
 import re
 import hashlib
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from pathlib import Path
 
 from fastapi import APIRouter, Request, Depends, Query, Form
@@ -13,7 +13,7 @@ import smtplib
 import random
 import math
 from email.mime.text import MIMEText
-from ..db import get_db
+from ..db import SessionLocal, get_db
 from ..services.cars_service import (
     CarsService,
     normalize_brand,
@@ -24,8 +24,16 @@ from ..services.cars_service import (
 )
 from ..utils.recommended_config import load_config
 from ..services.content_service import ContentService
+from ..services.car_loader import load_cars_by_ids
+from ..services.image_dedup import unique_images
+from ..utils.streaming_render import (
+    Deferred,
+    html_streaming_enabled,
+    stream_template_response,
+    submit_block,
+)
 from sqlalchemy.orm import Session
-from sqlalchemy import select, and_, func, exists, case
+from sqlalchemy import select, and_, func, exists
 from cachetools import TTLCache
 from ..utils.redis_cache import (
     redis_get_json,
@@ -65,7 +73,12 @@ from ..utils.price_utils import (
 normalize_color = _normalize_color
 from ..utils.country_map import country_label_ru, resolve_display_country, normalize_country_code
 from ..utils.color_groups import split_color_facets
-from ..utils.thumbs import local_media_exists, normalize_classistatic_url, resolve_thumbnail_url
+from ..utils.thumbs import (
+    local_media_index,
+    normalize_classistatic_url,
+    resolve_thumbnail_url,
+    resolve_thumbnail_urls,
+)
 from ..utils.home_content import build_home_content
 from ..utils.home_recommendation_blocks import (
     HOME_RECOMMENDATION_BLOCKS_CONTENT_KEY,
@@ -196,16 +209,7 @@ def _home_recommendation_block_has_auto_filters(block: Dict[str, Any]) -> bool:
 
 
 def _load_cars_by_ids(db: Session, ids: List[int]) -> List[Car]:
-    if not ids:
-        return []
-    ordering = case({car_id: idx for idx, car_id in enumerate(ids)}, value=Car.id)
-    return list(
-        db.execute(
-            select(Car)
-            .where(Car.id.in_(ids))
-            .order_by(ordering)
-        ).scalars().all()
-    )
+    return load_cars_by_ids(db, ids, profile="card")
 
 
 def _coerce_cached_recommendation_block_ids(raw: Any) -> List[int]:
@@ -1014,8 +1018,8 @@ def _build_filter_context(
             "price_rating_label",
         ]
         t0 = time.perf_counter()
-        eu_payload = service.payload_values_bulk(payload_keys, source_ids=eu_source_ids)
-        kr_payload = service.payload_values_bulk(payload_keys, source_ids=kr_source_ids)
+        eu_payload = service.payload_values_bulk(payload_keys, source_ids=eu_source_ids, region="EU")
+        kr_payload = service.payload_values_bulk(payload_keys, source_ids=kr_source_ids, region="KR")
         if timing_enabled:
             print(f"FILTER_CTX_STAGE name=payload_values ms={(time.perf_counter()-t0)*1000:.2f}", flush=True)
         seats_options = []
@@ -1440,6 +1444,12 @@ def _apply_public_catalog_default_scope(params: Dict[str, Any]) -> Dict[str, Any
     return normalized
 
 
+def _run_block_with_session(fn: Any) -> Any:
+    """Run a deferred page block on its own session (sessions are not thread-safe)."""
+    with SessionLocal() as block_db:
+        return fn(CarsService(block_db), block_db)
+
+
 def _build_home_media_context(db: Session) -> Dict[str, Any]:
     cache_key = f"home_media:{_home_media_cache_version()}"
     cached = _HOME_MEDIA_CACHE.get(cache_key)
@@ -1603,8 +1613,7 @@ def _build_home_media_context(db: Session) -> Dict[str, Any]:
             .scalars()
             .all()
         )
-        for raw in rows:
-            thumb = resolve_thumbnail_url(raw, None)
+        for thumb in resolve_thumbnail_urls([(raw, None) for raw in rows]):
             if not thumb:
                 continue
             if "img.classistatic.de" in thumb:
@@ -1640,7 +1649,14 @@ def _home_context(
     db: Session,
     extra: Optional[Dict[str, Any]] = None,
     timing: Optional[Dict[str, float]] = None,
+    stream: bool = False,
 ) -> Dict[str, Any]:
+    """Build the home page context.
+
+    With ``stream`` the showcase blocks, hero media and the car count are
+    computed concurrently on their own sessions and returned as
+    :class:`Deferred` values for :func:`stream_template_response`.
+    """
     timing_enabled = os.environ.get("HTML_TIMING", "0") == "1"
 
     def _stage(name: str, started_at: float):
@@ -1658,6 +1674,7 @@ def _home_context(
     body_type_stats = home_filter_ctx.get("body_type_stats") or []
     reco_cfg = load_config()
     fx_rates = service.get_fx_rates() or {}
+    showcase_fx_rates = fx_rates
     t0 = time.perf_counter()
     content = ContentService(db).content_map(
         [
@@ -1681,28 +1698,65 @@ def _home_context(
     home_content = build_home_content(content)
     recommendation_blocks_cfg = load_home_recommendation_blocks(content.get(HOME_RECOMMENDATION_BLOCKS_CONTENT_KEY))
     _stage("content_ms", t0)
-    t0 = time.perf_counter()
-    recommendation_blocks = _get_home_recommendation_blocks(service, db, recommendation_blocks_cfg)
-    recommended = [] if recommendation_blocks else _get_home_recommended(service, db, reco_cfg, limit=20)
-    _stage("recommended_ms", t0)
-    if os.getenv("HOME_REFRESH_VISIBLE_PRICES", "0") == "1" and recommendation_blocks:
+
+    def _load_showcase(service: CarsService, db: Session) -> Dict[str, Any]:
+        t0 = time.perf_counter()
+        recommendation_blocks = _get_home_recommendation_blocks(service, db, recommendation_blocks_cfg)
+        recommended = [] if recommendation_blocks else _get_home_recommended(service, db, reco_cfg, limit=20)
+        _stage("recommended_ms", t0)
+        if os.getenv("HOME_REFRESH_VISIBLE_PRICES", "0") == "1" and recommendation_blocks:
+            for block in recommendation_blocks:
+                service.refresh_visible_price_cache(block.get("items") or [])
+        if os.getenv("HOME_REFRESH_VISIBLE_PRICES", "0") == "1":
+            service.refresh_visible_price_cache(recommended)
         for block in recommendation_blocks:
-            service.refresh_visible_price_cache(block.get("items") or [])
-    if os.getenv("HOME_REFRESH_VISIBLE_PRICES", "0") == "1":
-        service.refresh_visible_price_cache(recommended)
-    for block in recommendation_blocks:
-        for car in block.get("items") or []:
-            _decorate_showcase_car(car, fx_rates=fx_rates)
-    for car in recommended:
-        _decorate_showcase_car(car, fx_rates=fx_rates)
+            for car in block.get("items") or []:
+                _decorate_showcase_car(car, fx_rates=showcase_fx_rates)
+        for car in recommended:
+            _decorate_showcase_car(car, fx_rates=showcase_fx_rates)
+        return {"recommendation_blocks": recommendation_blocks, "recommended_cars": recommended}
+
+    def _load_media(service: CarsService, db: Session) -> Dict[str, Any]:
+        t0 = time.perf_counter()
+        media_ctx = _build_home_media_context(db)
+        _stage("media_ms", t0)
+        return media_ctx
+
+    def _load_total(service: CarsService, db: Session) -> int:
+        t0 = time.perf_counter()
+        count_params = normalize_filter_params(dict(request.query_params))
+        total = _get_cars_count(service, count_params, timing_enabled)
+        _stage("total_cars_ms", t0)
+        return total
+
+    if stream:
+        showcase_future = submit_block(_run_block_with_session, _load_showcase)
+        media_future = submit_block(_run_block_with_session, _load_media)
+        total_future = submit_block(_run_block_with_session, _load_total)
+        recommendation_blocks: Any = Deferred(
+            showcase_future, default=[], pick=lambda r: r["recommendation_blocks"], name="home_blocks"
+        )
+        recommended: Any = Deferred(
+            showcase_future, default=[], pick=lambda r: r["recommended_cars"], name="home_recommended"
+        )
+        hero_videos: Any = Deferred(
+            media_future, default=[], pick=lambda r: r.get("hero_videos") or [], name="home_media"
+        )
+        collage_images: Any = Deferred(
+            media_future, default=[], pick=lambda r: r.get("collage_images") or [], name="home_media"
+        )
+        total_cars: Any = Deferred(total_future, default=0, name="home_total")
+    else:
+        showcase = _load_showcase(service, db)
+        recommendation_blocks = showcase["recommendation_blocks"]
+        recommended = showcase["recommended_cars"]
     t0 = time.perf_counter()
     fx_rates = service.get_fx_rates(allow_fetch=False) or {}
     _stage("fx_rates_ms", t0)
-    t0 = time.perf_counter()
-    media_ctx = _build_home_media_context(db)
-    _stage("media_ms", t0)
-    hero_videos = media_ctx.get("hero_videos") or []
-    collage_images = media_ctx.get("collage_images") or []
+    if not stream:
+        media_ctx = _load_media(service, db)
+        hero_videos = media_ctx.get("hero_videos") or []
+        collage_images = media_ctx.get("collage_images") or []
 
     # brand logos: map brands that have logo files in static/img/brand-logos
     static_root = Path(__file__).resolve().parent.parent / \
@@ -1782,10 +1836,8 @@ def _home_context(
         {"value": c, "label": country_labels.get(c, c)}
         for c in countries_list
     ]
-    t0 = time.perf_counter()
-    count_params = normalize_filter_params(dict(request.query_params))
-    total_cars = _get_cars_count(service, count_params, timing_enabled)
-    _stage("total_cars_ms", t0)
+    if not stream:
+        total_cars = _load_total(service, db)
     context = {
         "request": request,
         "user": getattr(request.state, "user", None),
@@ -1825,7 +1877,8 @@ def index(request: Request, db=Depends(get_db), user=Depends(get_current_user)):
     service = CarsService(db)
     timing: Dict[str, float] = {}
     t_start = time.perf_counter()
-    ctx = _home_context(request, service, db, timing=timing)
+    stream = html_streaming_enabled()
+    ctx = _home_context(request, service, db, timing=timing, stream=stream)
     timing["total_ms"] = (time.perf_counter() - t_start) * 1000
     request.state.perf = {
         "db_ms": float(
@@ -1844,7 +1897,12 @@ def index(request: Request, db=Depends(get_db), user=Depends(get_current_user)):
         )
         logger.info("HOME_TIMING %s", request.state.html_parts)
     t_render = time.perf_counter()
-    resp = templates.TemplateResponse("home.html", ctx)
+    if stream:
+        # Deferred blocks finish after the response starts; their stage
+        # timings are not part of HOME_TIMING in this mode.
+        resp = stream_template_response(request, templates, "home.html", ctx)
+    else:
+        resp = templates.TemplateResponse("home.html", ctx)
     # Главная рендерится из БД; без этого общие прокси/CDN могут отдавать старый HTML после деплоя.
     resp.headers["Cache-Control"] = "private, no-cache"
     request.state.perf["render_ms"] = (time.perf_counter() - t_render) * 1000
@@ -1967,6 +2025,7 @@ def _catalog_should_defer_initial_items(
 def catalog_page(request: Request, db=Depends(get_db), user=Depends(get_current_user)):
     templates = request.app.state.templates
     service = CarsService(db)
+    stream = html_streaming_enabled()
     timing: Dict[str, float] = {}
     t_start = time.perf_counter()
     t0 = time.perf_counter()
@@ -2225,137 +2284,152 @@ def catalog_page(request: Request, db=Depends(get_db), user=Depends(get_current_
                         flush=True,
                     )
         if not defer_initial_items and not cache_hit_used:
-            t0 = time.perf_counter()
-            items, initial_total = service.list_cars(
-                region=canon_region,
-                country=canon_country,
-                kr_type=canon_kr_type,
-                brand=canon_brand,
-                lines=qp.getlist("line") if hasattr(qp, "getlist") else None,
-                source_key=source_value,
-                q=params.get("q"),
-                model=canon_model,
-                generation=params.get("generation"),
-                color=params.get("color"),
-                body_type=params.get("body_type"),
-                engine_type=params.get("engine_type"),
-                transmission=params.get("transmission"),
-                drive_type=params.get("drive_type"),
-                price_min=_float_val("price_min"),
-                price_max=_float_val("price_max"),
-                power_hp_min=_float_val("power_hp_min"),
-                power_hp_max=_float_val("power_hp_max"),
-                engine_cc_min=_int_val("engine_cc_min"),
-                engine_cc_max=_int_val("engine_cc_max"),
-                year_min=_int_val("year_min"),
-                year_max=_int_val("year_max"),
-                mileage_min=_int_val("mileage_min"),
-                mileage_max=_int_val("mileage_max"),
-                reg_year_min=_int_val("reg_year_min"),
-                reg_month_min=_int_val("reg_month_min"),
-                reg_year_max=_int_val("reg_year_max"),
-                reg_month_max=_int_val("reg_month_max"),
-                num_seats=params.get("num_seats"),
-                doors_count=params.get("doors_count"),
-                emission_class=params.get("emission_class"),
-                efficiency_class=params.get("efficiency_class"),
-                climatisation=params.get("climatisation"),
-                airbags=params.get("airbags"),
-                interior_design=params.get("interior_design"),
-                interior_color=params.get("interior_color"),
-                interior_material=params.get("interior_material"),
-                vat_reclaimable=params.get("vat_reclaimable"),
-                air_suspension=_bool_val("air_suspension"),
-                price_rating_label=params.get("price_rating_label"),
-                owners_count=params.get("owners_count"),
-                condition=params.get("condition"),
-                sort=sort_value,
-                page=current_page,
-                page_size=12,
-                light=True,
-            )
-            timing["initial_list_ms"] = (time.perf_counter() - t0) * 1000
-
-            def _normalize_thumb(url: str | None) -> str | None:
-                normalized = normalize_classistatic_url(url)
-                if normalized:
-                    return normalized
-                raw = (url or "").strip()
-                return raw or None
 
-            if isinstance(items, list):
-                initial_items = items
-                t0 = time.perf_counter()
-                for c in initial_items:
-                    if not isinstance(c, dict):
-                        continue
-                    c["display_price_rub"] = resolve_public_display_price_rub(
-                        c.get("total_price_rub_cached"),
-                        c.get("price_rub_cached"),
-                        calc_breakdown=c.get("calc_breakdown_json"),
-                        raw_price=c.get("price"),
-                        currency=c.get("currency"),
-                        fx_eur=fx_eur,
-                        fx_usd=fx_usd,
-                        fx_cny=fx_cny,
-                    )
-                    c["price_note"] = price_without_util_note(
-                        display_price=c.get("display_price_rub"),
-                        total_price_rub_cached=c.get("total_price_rub_cached"),
-                        calc_breakdown=c.get("calc_breakdown_json"),
-                        region=params.get("region"),
-                        country=c.get("country"),
-                    )
-                    c["display_engine_type"] = translate_payload_value("engine_type", c.get("engine_type")) or c.get("engine_type")
-                    c["display_transmission"] = translate_payload_value("transmission", c.get("transmission")) or c.get("transmission")
-                    c["display_drive_type"] = translate_payload_value("drive_type", c.get("drive_type")) or c.get("drive_type")
-                    c["engine_cc"] = effective_engine_cc_value(c)
-                    c["power_hp"] = effective_power_hp_value(c)
-                    c["power_kw"] = effective_power_kw_value(c)
-                    c["display_body_type"] = ru_body(c.get("body_type")) or display_body(c.get("body_type")) or c.get("body_type")
-                    normalized_color = normalize_color(c.get("color"))
-                    c["display_color"] = (
-                        ru_color(c.get("color"))
-                        or display_color(c.get("color"))
-                        or (ru_color(normalized_color) if normalized_color else None)
-                        or (display_color(normalized_color) if normalized_color else None)
-                        or c.get("color")
-                    )
-                timing["initial_decorate_ms"] = (time.perf_counter() - t0) * 1000
-                sort_items_by_display_price(initial_items, sort=sort_value)
-                ids = [
-                    c.get("id")
-                    for c in initial_items
-                    if (
-                        isinstance(c, dict)
-                        and c.get("id")
-                        and not c.get("thumbnail_url")
-                        and not c.get("thumbnail_local_path")
-                    )
-                ]
+            def _load_initial_items(list_service: CarsService, list_db: Session) -> Tuple[List[dict], Optional[int]]:
+                loaded_items: List[dict] = []
                 t0 = time.perf_counter()
-                if ids:
-                    rows = db.execute(
-                        select(CarImage.car_id, func.min(CarImage.url))
-                        .where(CarImage.car_id.in_(ids))
-                        .group_by(CarImage.car_id)
-                    ).all()
-                    first_urls = {car_id: _normalize_thumb(url) for car_id, url in rows if url}
-                    for c in initial_items:
+                items, loaded_total = list_service.list_cars(
+                    region=canon_region,
+                    country=canon_country,
+                    kr_type=canon_kr_type,
+                    brand=canon_brand,
+                    lines=qp.getlist("line") if hasattr(qp, "getlist") else None,
+                    source_key=source_value,
+                    q=params.get("q"),
+                    model=canon_model,
+                    generation=params.get("generation"),
+                    color=params.get("color"),
+                    body_type=params.get("body_type"),
+                    engine_type=params.get("engine_type"),
+                    transmission=params.get("transmission"),
+                    drive_type=params.get("drive_type"),
+                    price_min=_float_val("price_min"),
+                    price_max=_float_val("price_max"),
+                    power_hp_min=_float_val("power_hp_min"),
+                    power_hp_max=_float_val("power_hp_max"),
+                    engine_cc_min=_int_val("engine_cc_min"),
+                    engine_cc_max=_int_val("engine_cc_max"),
+                    year_min=_int_val("year_min"),
+                    year_max=_int_val("year_max"),
+                    mileage_min=_int_val("mileage_min"),
+                    mileage_max=_int_val("mileage_max"),
+                    reg_year_min=_int_val("reg_year_min"),
+                    reg_month_min=_int_val("reg_month_min"),
+                    reg_year_max=_int_val("reg_year_max"),
+                    reg_month_max=_int_val("reg_month_max"),
+                    num_seats=params.get("num_seats"),
+                    doors_count=params.get("doors_count"),
+                    emission_class=params.get("emission_class"),
+                    efficiency_class=params.get("efficiency_class"),
+                    climatisation=params.get("climatisation"),
+                    airbags=params.get("airbags"),
+                    interior_design=params.get("interior_design"),
+                    interior_color=params.get("interior_color"),
+                    interior_material=params.get("interior_material"),
+                    vat_reclaimable=params.get("vat_reclaimable"),
+                    air_suspension=_bool_val("air_suspension"),
+                    price_rating_label=params.get("price_rating_label"),
+                    owners_count=params.get("owners_count"),
+                    condition=params.get("condition"),
+                    sort=sort_value,
+                    page=current_page,
+                    page_size=12,
+                    light=True,
+                )
+                timing["initial_list_ms"] = (time.perf_counter() - t0) * 1000
+
+                def _normalize_thumb(url: str | None) -> str | None:
+                    normalized = normalize_classistatic_url(url)
+                    if normalized:
+                        return normalized
+                    raw = (url or "").strip()
+                    return raw or None
+
+                if isinstance(items, list):
+                    loaded_items = items
+                    t0 = time.perf_counter()
+                    for c in loaded_items:
                         if not isinstance(c, dict):
                             continue
-                        cid = c.get("id")
-                        if cid in first_urls and first_urls[cid]:
-                            c["thumbnail_url"] = first_urls[cid]
-                        thumb = resolve_thumbnail_url(
-                            _normalize_thumb(c.get("thumbnail_url")),
-                            c.get("thumbnail_local_path"),
+                        c["display_price_rub"] = resolve_public_display_price_rub(
+                            c.get("total_price_rub_cached"),
+                            c.get("price_rub_cached"),
+                            calc_breakdown=c.get("calc_breakdown_json"),
+                            raw_price=c.get("price"),
+                            currency=c.get("currency"),
+                            fx_eur=fx_eur,
+                            fx_usd=fx_usd,
+                            fx_cny=fx_cny,
+                        )
+                        c["price_note"] = price_without_util_note(
+                            display_price=c.get("display_price_rub"),
+                            total_price_rub_cached=c.get("total_price_rub_cached"),
+                            calc_breakdown=c.get("calc_breakdown_json"),
+                            region=params.get("region"),
+                            country=c.get("country"),
+                        )
+                        c["display_engine_type"] = translate_payload_value("engine_type", c.get("engine_type")) or c.get("engine_type")
+                        c["display_transmission"] = translate_payload_value("transmission", c.get("transmission")) or c.get("transmission")
+                        c["display_drive_type"] = translate_payload_value("drive_type", c.get("drive_type")) or c.get("drive_type")
+                        c["engine_cc"] = effective_engine_cc_value(c)
+                        c["power_hp"] = effective_power_hp_value(c)
+                        c["power_kw"] = effective_power_kw_value(c)
+                        c["display_body_type"] = ru_body(c.get("body_type")) or display_body(c.get("body_type")) or c.get("body_type")
+                        normalized_color = normalize_color(c.get("color"))
+                        c["display_color"] = (
+                            ru_color(c.get("color"))
+                            or display_color(c.get("color"))
+                            or (ru_color(normalized_color) if normalized_color else None)
+                            or (display_color(normalized_color) if normalized_color else None)
+                            or c.get("color")
+                        )
+                    timing["initial_decorate_ms"] = (time.perf_counter() - t0) * 1000
+                    sort_items_by_display_price(loaded_items, sort=sort_value)
+                    ids = [
+                        c.get("id")
+                        for c in loaded_items
+                        if (
+                            isinstance(c, dict)
+                            and c.get("id")
+                            and not c.get("thumbnail_url")
+                            and not c.get("thumbnail_local_path")
+                        )
+                    ]
+                    t0 = time.perf_counter()
+                    if ids:
+                        rows = list_db.execute(
+                            select(CarImage.car_id, func.min(CarImage.url))
+                            .where(CarImage.car_id.in_(ids))
+                            .group_by(CarImage.car_id)
+                        ).all()
+                        first_urls = {car_id: _normalize_thumb(url) for car_id, url in rows if url}
+                        card_items = [c for c in loaded_items if isinstance(c, dict)]
+                        for c in card_items:
+                            cid = c.get("id")
+                            if cid in first_urls and first_urls[cid]:
+                                c["thumbnail_url"] = first_urls[cid]
+                        thumbs = resolve_thumbnail_urls(
+                            [
+                                (_normalize_thumb(c.get("thumbnail_url")), c.get("thumbnail_local_path"))
+                                for c in card_items
+                            ]
                         )
-                        if thumb:
-                            c["thumbnail_url"] = thumb
-                        if not c.get("thumbnail_url"):
-                            c["thumbnail_url"] = "/static/img/no-photo.svg"
-                timing["initial_images_ms"] = (time.perf_counter() - t0) * 1000
+                        for c, thumb in zip(card_items, thumbs):
+                            if thumb:
+                                c["thumbnail_url"] = thumb
+                            if not c.get("thumbnail_url"):
+                                c["thumbnail_url"] = "/static/img/no-photo.svg"
+                    timing["initial_images_ms"] = (time.perf_counter() - t0) * 1000
+                return loaded_items, loaded_total
+
+            if stream:
+                # Listing cache miss: stream the shell now and fill the cards
+                # when the listing query finishes.
+                initial_future = submit_block(_run_block_with_session, _load_initial_items)
+                initial_items = Deferred(initial_future, default=[], pick=lambda r: r[0], name="catalog_items")
+                initial_total = Deferred(initial_future, default=None, pick=lambda r: r[1], name="catalog_items")
+            else:
+                initial_items, initial_total = _load_initial_items(service, db)
         else:
             timing["initial_list_ms"] = 0.0
             timing["initial_decorate_ms"] = 0.0
@@ -2394,13 +2468,19 @@ def catalog_page(request: Request, db=Depends(get_db), user=Depends(get_current_
         logger.info("CATALOG_TIMING %s", request.state.html_parts)
     print(
         "CATALOG_SSR "
-        f"items={len(initial_items)} deferred={1 if defer_initial_items else 0} region={canon_region} country={canon_country} "
+        f"items={'stream' if isinstance(initial_items, Deferred) else len(initial_items)} "
+        f"deferred={1 if defer_initial_items else 0} region={canon_region} country={canon_country} "
         f"brand={canon_brand} model={canon_model} sort={params.get('sort') or 'price_asc'}",
         flush=True,
     )
 
     t_render = time.perf_counter()
-    resp = templates.TemplateResponse(
+    render = (
+        (lambda name, ctx: stream_template_response(request, templates, name, ctx))
+        if stream
+        else templates.TemplateResponse
+    )
+    resp = render(
         "catalog.html",
         {
             "request": request,
@@ -2625,19 +2705,21 @@ def car_detail_page(car_id: int, request: Request, db=Depends(get_db), user=Depe
             if raw.startswith("http://"):
                 return f"https://{raw[7:]}"
             if raw.startswith("/media/"):
-                return raw if local_media_exists(raw) else None
+                return raw if local_media_index.exists(raw) else None
             if raw.startswith("https://"):
                 return raw
             return None
 
         if getattr(car, "images", None):
-            ordered_images = sorted(
-                list(car.images),
-                key=lambda im: (
-                    0 if getattr(im, "is_primary", False) else 1,
-                    int(getattr(im, "position", 0) or 0),
-                    int(getattr(im, "id", 0) or 0),
-                ),
+            ordered_images = unique_images(
+                sorted(
+                    list(car.images),
+                    key=lambda im: (
+                        0 if getattr(im, "is_primary", False) else 1,
+                        int(getattr(im, "position", 0) or 0),
+                        int(getattr(im, "id", 0) or 0),
+                    ),
+                )
             )
             for im in ordered_images:
                 try:
@@ -24,6 +24,18 @@ def ensure_runtime_schema() -> None:
         if not inspector.has_table("parser_run_sources"):
             ParserRunSource.__table__.create(bind=engine, checkfirst=True)
         inspector = inspect(engine)
+        if inspector.has_table("car_images"):
+            image_columns = {col["name"] for col in inspector.get_columns("car_images")}
+            if "phash" not in image_columns:
+                with engine.begin() as conn:
+                    conn.execute(text("ALTER TABLE car_images ADD COLUMN phash VARCHAR(16)"))
+        if inspector.has_table("cars"):
+            car_columns = {col["name"] for col in inspector.get_columns("cars")}
+            with engine.begin() as conn:
+                if "detail_etag" not in car_columns:
+                    conn.execute(text("ALTER TABLE cars ADD COLUMN detail_etag VARCHAR(255)"))
+                if "detail_last_modified" not in car_columns:
+                    conn.execute(text("ALTER TABLE cars ADD COLUMN detail_last_modified VARCHAR(64)"))
         if not inspector.has_table("users"):
             with engine.begin() as conn:
                 if inspector.has_table("parser_runs"):
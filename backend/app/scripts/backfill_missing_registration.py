@@ -4,12 +4,31 @@ import argparse
 import time
 from datetime import datetime
 
-from sqlalchemy import and_, cast, func, or_, select
+from sqlalchemy import String, and_, cast, func, or_, select
 from sqlalchemy.dialects.postgresql import JSONB
 
 from backend.app.db import SessionLocal
 from backend.app.models import Car, Source
-from backend.app.utils.registration_defaults import get_missing_registration_default
+from backend.app.utils.registration_defaults import (
+    apply_missing_registration_fallback,
+    get_missing_registration_default,
+)
+
+
+def _legacy_fallback(payload: dict, year: int | None, month: int | None) -> bool:
+    """True when year/month are a fallback an older run wrote into the real columns.
+
+    Those rows predate the per-field ``*_defaulted`` flags and carry only
+    ``registration_defaulted`` plus the default that was written.
+    """
+    if year is None or month is None or payload.get("registration_defaulted") is not True:
+        return False
+    if "registration_year_defaulted" in payload or "registration_month_defaulted" in payload:
+        return False
+    return (
+        str(payload.get("registration_default_year") or "") == str(year)
+        and str(payload.get("registration_default_month") or "") == str(month)
+    )
 
 
 def main() -> None:
@@ -41,21 +60,35 @@ def main() -> None:
             func.jsonb_extract_path_text(payload_json, "registration_default_month"),
             "",
         )
+        has_field_flags = or_(
+            func.jsonb_extract_path_text(payload_json, "registration_year_defaulted").is_not(None),
+            func.jsonb_extract_path_text(payload_json, "registration_month_defaulted").is_not(None),
+        )
         missing_registration_expr = or_(
             Car.registration_year.is_(None),
             Car.registration_month.is_(None),
         )
-        stale_default_expr = and_(
-            defaulted_expr,
+        # Metadata absent or pointing at an older default. The stored default
+        # keeps a real year/month when only the other half is missing.
+        stale_metadata_expr = and_(
+            missing_registration_expr,
             or_(
-                Car.registration_year != fallback_year,
-                Car.registration_month != fallback_month,
-                default_year_expr != str(fallback_year),
-                default_month_expr != str(fallback_month),
+                ~defaulted_expr,
+                ~has_field_flags,
+                default_year_expr != func.coalesce(cast(Car.registration_year, String), str(fallback_year)),
+                default_month_expr != func.coalesce(cast(Car.registration_month, String), str(fallback_month)),
             ),
         )
+        # Fallback values an older version of this script wrote into the real
+        # columns before the per-field flags existed.
+        persisted_fallback_expr = and_(
+            defaulted_expr,
+            ~has_field_flags,
+            cast(Car.registration_year, String) == default_year_expr,
+            cast(Car.registration_month, String) == default_month_expr,
+        )
         base = db.query(Car.id).filter(
-            or_(missing_registration_expr, stale_default_expr)
+            or_(stale_metadata_expr, persisted_fallback_expr)
         )
         region = (args.region or "").strip().upper()
         if region == "EU":
@@ -106,35 +139,21 @@ def main() -> None:
                     batch_ids = ids[i : i + args.batch]
                     cars = db.query(Car).filter(Car.id.in_(batch_ids)).all()
                     for car in cars:
+                        # Only the fallback metadata is persisted; the real
+                        # columns stay NULL so filters fall back to car.year.
                         payload = dict(car.source_payload or {})
-                        is_defaulted = payload.get("registration_defaulted") is True
-                        needs_rewrite = is_defaulted and (
-                            int(car.registration_year or 0) != fallback_year
-                            or int(car.registration_month or 0) != fallback_month
-                            or int(payload.get("registration_default_year") or 0) != fallback_year
-                            or int(payload.get("registration_default_month") or 0) != fallback_month
-                        )
-                        needs_fill = (
-                            car.registration_year is None
-                            or car.registration_month is None
-                        )
-                        changed = False
-                        if car.registration_year is None or needs_rewrite:
-                            car.registration_year = fallback_year
-                            changed = True
-                        if car.registration_month is None or needs_rewrite:
-                            car.registration_month = fallback_month
-                            changed = True
-                        if changed or needs_fill or needs_rewrite:
-                            payload["registration_defaulted"] = True
-                            payload["registration_default_year"] = int(
-                                car.registration_year or fallback_year
-                            )
-                            payload["registration_default_month"] = int(
-                                car.registration_month or fallback_month
-                            )
-                            car.source_payload = payload
-                        if changed:
+                        cleared = _legacy_fallback(payload, car.registration_year, car.registration_month)
+                        if cleared:
+                            car.registration_year = None
+                            car.registration_month = None
+                        item = {
+                            "registration_year": car.registration_year,
+                            "registration_month": car.registration_month,
+                            "source_payload": payload,
+                        }
+                        apply_missing_registration_fallback(item, persist_fields=False)
+                        if cleared or item["source_payload"] != (car.source_payload or {}):
+                            car.source_payload = item["source_payload"]
                             car.updated_at = datetime.utcnow()
                             updated += 1
                         processed += 1
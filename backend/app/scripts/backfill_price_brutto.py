@@ -28,6 +28,9 @@ Strategy
   gross EUR price using the current FX rate snapshot. Without this
   step the catalogue would still show the wrong RUB price even after
   ``price`` is fixed.
+* Recompute the stored ``display_price_rub``/``display_price_group``
+  sort key of the same rows (``CarsService.sync_display_price_columns``),
+  otherwise CATALOG_DISPLAY_PRICE_COLUMN=1 keeps sorting by old prices.
 * Bump dataset_version at the end so all versioned caches drop the
   stale price values.
 
@@ -42,9 +45,11 @@ from __future__ import annotations
 import argparse
 from typing import Optional
 
-from sqlalchemy import text
+from sqlalchemy import select, text
+from sqlalchemy.orm import load_only
 
 from ..db import SessionLocal
+from ..models import Car
 from ..utils.redis_cache import bump_dataset_version
 
 
@@ -97,8 +102,8 @@ def _count_affected(db, src_id: int) -> int:
     )
 
 
-def _get_eur_rate(db) -> Optional[float]:
-    """Pull the EUR -> RUB rate from CarsService.
+def _get_fx_rates(db) -> dict:
+    """Pull the FX snapshot from CarsService.
 
     We import lazily to avoid hauling SQLAlchemy at module import
     time and to share the same FX snapshot strategy with the live
@@ -107,7 +112,10 @@ def _get_eur_rate(db) -> Optional[float]:
 
     from ..services.cars_service import CarsService
 
-    rates = CarsService(db).get_fx_rates() or {}
+    return CarsService(db).get_fx_rates() or {}
+
+
+def _get_eur_rate(rates: dict) -> Optional[float]:
     eur = rates.get("EUR")
     if not eur:
         return None
@@ -117,7 +125,36 @@ def _get_eur_rate(db) -> Optional[float]:
         return None
 
 
-def _apply(db, src_id: int, eur_rate: Optional[float]) -> tuple[int, int]:
+def _sync_display_prices(db, ids: list[int], rates: dict) -> None:
+    """Recompute the stored catalog sort key for rows repaired in this batch."""
+
+    if not ids:
+        return
+    from ..services.cars_service import CarsService
+
+    service = CarsService(db)
+    stmt = (
+        select(Car)
+        .options(
+            load_only(
+                Car.id,
+                Car.price,
+                Car.currency,
+                Car.country,
+                Car.price_rub_cached,
+                Car.total_price_rub_cached,
+                Car.calc_breakdown_json,
+                Car.display_price_rub,
+                Car.display_price_group,
+            )
+        )
+        .where(Car.id.in_(ids))
+    )
+    for car in db.execute(stmt).scalars():
+        service.sync_display_price_columns(car, rates)
+
+
+def _apply(db, src_id: int, eur_rate: Optional[float], rates: dict) -> tuple[int, int]:
     max_id = _max_id(db)
     if not max_id:
         return 0, 0
@@ -150,11 +187,13 @@ def _apply(db, src_id: int, eur_rate: Optional[float]) -> tuple[int, int]:
                       AND price IS NOT NULL
                       AND abs(price - (source_payload->>'price_eur')::numeric)
                           / greatest((source_payload->>'price_eur')::numeric, 1) > 0.005
+                    RETURNING id
                     """
                 ),
                 {"lo": cur_id, "hi": cur_id + BATCH_SIZE, "src": src_id, "eur": float(eur_rate)},
             )
-            rub_updated += int(res.rowcount or 0)
+            ids = [int(row_id) for row_id in res.scalars()]
+            rub_updated += len(ids)
         else:
             res = db.execute(
                 text(
@@ -172,11 +211,14 @@ def _apply(db, src_id: int, eur_rate: Optional[float]) -> tuple[int, int]:
                       AND price IS NOT NULL
                       AND abs(price - (source_payload->>'price_eur')::numeric)
                           / greatest((source_payload->>'price_eur')::numeric, 1) > 0.005
+                    RETURNING id
                     """
                 ),
                 {"lo": cur_id, "hi": cur_id + BATCH_SIZE, "src": src_id},
             )
-        n = int(res.rowcount or 0)
+            ids = [int(row_id) for row_id in res.scalars()]
+        _sync_display_prices(db, ids, rates)
+        n = len(ids)
         db.commit()
         total += n
         if n:
@@ -246,7 +288,8 @@ def main() -> None:
                   flush=True)
             return
 
-        eur_rate = _get_eur_rate(db)
+        rates = _get_fx_rates(db)
+        eur_rate = _get_eur_rate(rates)
         if not eur_rate:
             print(
                 "ВНИМАНИЕ: курс EUR недоступен — обновим только price, "
@@ -254,7 +297,7 @@ def main() -> None:
                 "следующий daily import).",
                 flush=True,
             )
-        updated, with_rub = _apply(db, src_id, eur_rate)
+        updated, with_rub = _apply(db, src_id, eur_rate, rates)
         print(f"\nГотово. price обновлён: {updated} строк", flush=True)
         if eur_rate:
             print(f"price_rub_cached одновременно пересчитан для тех же {with_rub} строк.",
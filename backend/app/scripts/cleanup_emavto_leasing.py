@@ -14,6 +14,7 @@ from backend.app.db import SessionLocal
 from backend.app.models import Car, Source
 from backend.app.parsing.config import load_sites_config
 from backend.app.parsing.emavto_klg import EmAvtoKlgParser
+from backend.app.services.payload_values_catalog import PayloadValuesCatalog
 from backend.app.utils.rate_limiter import TokenBucket
 from backend.app.utils.redis_cache import bump_dataset_version
 
@@ -223,8 +224,12 @@ def main() -> None:
                     payloads = {car_id: payload for car_id, _, _, payload in write_chunk}
                     match_ids = list(payloads.keys())
                     with SessionLocal() as write_db:
+                        payload_catalog = PayloadValuesCatalog(write_db)
                         cars = write_db.execute(select(Car).where(Car.id.in_(match_ids))).scalars().all()
                         for car in cars:
+                            # Counted under the old payload while available.
+                            if car.is_available:
+                                payload_catalog.add_car(car, source_key=source.key, sign=-1)
                             car.source_payload = payloads.get(int(car.id), car.source_payload)
                             if args.delete:
                                 write_db.delete(car)
@@ -233,6 +238,7 @@ def main() -> None:
                                 if car.is_available:
                                     car.is_available = False
                                 deactivated += 1
+                        payload_catalog.apply()
                         write_db.commit()
 
             print(
@@ -4,7 +4,8 @@ import argparse
 from pathlib import Path
 
 from backend.app.db import SessionLocal
-from backend.app.models import Car
+from backend.app.models import Car, MediaFile
+from backend.app.services.media_manifest import existing_paths, manifest_table_exists, to_rel
 
 
 def _media_root() -> Path:
@@ -26,6 +27,12 @@ def main() -> None:
     ap.add_argument("--batch", type=int, default=5000)
     ap.add_argument("--limit", type=int, default=0, help="0 = unlimited")
     ap.add_argument("--dry-run", action="store_true")
+    ap.add_argument(
+        "--source",
+        choices=("manifest", "disk"),
+        default="manifest",
+        help="check paths against the media_files manifest (default) or stat each file",
+    )
     args = ap.parse_args()
 
     checked = 0
@@ -35,6 +42,13 @@ def main() -> None:
     limit = args.limit if args.limit and args.limit > 0 else None
 
     with SessionLocal() as db:
+        use_manifest = (
+            args.source == "manifest"
+            and manifest_table_exists(db)
+            and db.query(MediaFile.rel_path).limit(1).first() is not None
+        )
+        if args.source == "manifest" and not use_manifest:
+            print("[clear_missing_local_thumbs] manifest is empty, checking the disk", flush=True)
         while True:
             q = (
                 db.query(Car.id, Car.thumbnail_local_path)
@@ -50,12 +64,18 @@ def main() -> None:
             if not rows:
                 break
             last_id = rows[-1][0]
+            present = existing_paths(db, (to_rel(p) for _, p in rows)) if use_manifest else set()
             for car_id, local_path in rows:
                 if limit is not None and checked >= limit:
                     break
                 checked += 1
                 path = _resolve_local_file(str(local_path or ""))
-                if path is None or path.exists():
+                if path is None:
+                    continue
+                if use_manifest:
+                    if to_rel(local_path) in present:
+                        continue
+                elif path.exists():
                     continue
                 missing += 1
                 if not args.dry_run:
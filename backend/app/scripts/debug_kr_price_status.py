@@ -15,9 +15,9 @@ def main() -> None:
     args = ap.parse_args()
 
     with SessionLocal() as db:
-        engine_cc_expr = func.coalesce(Car.engine_cc, Car.inferred_engine_cc)
-        power_hp_expr = func.coalesce(Car.power_hp, Car.inferred_power_hp)
-        power_kw_expr = func.coalesce(Car.power_kw, Car.inferred_power_kw)
+        engine_cc_expr = Car.effective_engine_cc
+        power_hp_expr = Car.effective_power_hp
+        power_kw_expr = Car.effective_power_kw
         payload_expr = cast(func.coalesce(Car.calc_breakdown_json, "[]"), String)
         without_util_expr = payload_expr.like("%__without_util_fee%")
         kr_scope = and_(Car.is_available.is_(True), Car.country.like("KR%"))
@@ -0,0 +1,53 @@
+"""Hash mirrored car images and point duplicate pictures at one file.
+
+Run after the mirror jobs, then ``prune_unused_local_media`` to delete the
+copies nothing references any more:
+
+    python -m backend.app.scripts.dedup_car_images [--dry-run] [--hash-only]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from backend.app.db import SessionLocal
+from backend.app.services.image_dedup import collapse_duplicates, count_unique_images, hash_pending
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Perceptual-hash dedup of mirrored car_images")
+    ap.add_argument("--batch", type=int, default=500)
+    ap.add_argument("--limit", type=int, default=0, help="max images to hash (0 = all pending)")
+    ap.add_argument("--workers", type=int, default=0, help="hashing processes (0 = cpu count)")
+    ap.add_argument("--limit-groups", type=int, default=0, help="max duplicate groups to merge (0 = all)")
+    ap.add_argument("--hash-only", action="store_true", help="fill car_images.phash without merging")
+    ap.add_argument("--dry-run", action="store_true", help="report duplicate groups without rewriting URLs")
+    ap.add_argument("--report-json", default="/app/artifacts/dedup_car_images.json")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    report: dict = {}
+    with SessionLocal() as db:
+        with ProcessPoolExecutor(max_workers=args.workers or None) as pool:
+            report["hashed"] = hash_pending(db, batch=max(1, args.batch), limit=max(0, args.limit), executor=pool)
+        print(f"[dedup_car_images] hashed={report['hashed']}", flush=True)
+        if not args.hash_only:
+            report.update(collapse_duplicates(db, dry_run=args.dry_run, limit_groups=max(0, args.limit_groups)))
+        report["unique_images"] = count_unique_images(db)
+    report["dry_run"] = bool(args.dry_run)
+    report["elapsed_sec"] = round(time.perf_counter() - t0, 2)
+
+    report_path = Path(args.report_json)
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    report_path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"[dedup_car_images] {json.dumps(report, ensure_ascii=False)}", flush=True)
+    if report.get("merged_urls") and not args.dry_run:
+        print("[dedup_car_images] run prune_unused_local_media to delete the orphaned copies", flush=True)
+
+
+if __name__ == "__main__":
+    main()
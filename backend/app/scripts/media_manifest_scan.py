@@ -0,0 +1,34 @@
+"""Sync the ``media_files`` manifest with the local media tree.
+
+Run periodically (cron/systemd timer) after the mirror jobs; the default
+incremental mode only lists directories that changed since the last run.
+
+    python -m backend.app.scripts.media_manifest_scan [--full] [--hash]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+
+from backend.app.db import SessionLocal
+from backend.app.services.media_manifest import media_root, scan
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Sync media_files with the media directory")
+    ap.add_argument("--full", action="store_true", help="list every directory, not only changed ones")
+    ap.add_argument("--hash", action="store_true", help="store sha1 of new/changed files")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    with SessionLocal() as db:
+        stats = scan(db, full=args.full, with_hash=args.hash)
+    stats["elapsed_sec"] = round(time.perf_counter() - t0, 2)
+    stats["root"] = str(media_root())
+    print(f"[media_manifest_scan] {json.dumps(stats, ensure_ascii=False)}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
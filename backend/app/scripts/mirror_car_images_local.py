@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import argparse
+import asyncio
 import hashlib
 import io
 import json
@@ -18,6 +19,16 @@ from sqlalchemy import func, select
 
 from backend.app.db import SessionLocal
 from backend.app.models import Car, CarImage, Source
+from backend.app.services.image_dedup import BlobIndex, dhash_image
+from backend.app.services.image_mirror import (
+    AsyncImageMirror,
+    MirrorJob,
+    MirrorOptions,
+    MirrorProgress,
+    ThroughputStats,
+    read_timeout_for,
+)
+from backend.app.services.media_manifest import record_files, to_rel
 from backend.app.utils.telegram import send_telegram_message
 from backend.app.utils.thumbs import normalize_classistatic_url
 
@@ -96,13 +107,7 @@ def _candidate_urls(url: str | None, *, max_width: int) -> list[str]:
 
 
 def _request_timeout(src_url: str, timeout_sec: float) -> tuple[float, float]:
-    # Large classistatic variants frequently stall on RU VPS. Keep the attempt
-    # short, but give 1024 a slightly longer read timeout before we fall back.
-    if "img.classistatic.de" in src_url and "rule=mo-1024" in src_url:
-        return (3.0, min(timeout_sec, 3.5))
-    if "img.classistatic.de" in src_url and "rule=mo-640" in src_url:
-        return (3.0, min(timeout_sec, 2.5))
-    return (3.0, timeout_sec)
+    return (3.0, read_timeout_for(src_url, timeout_sec))
 
 
 def _target_paths(
@@ -133,7 +138,7 @@ def _download_convert(
     fmt: str,
 ) -> dict:
     last_error = "no_candidates"
-    for src_url in candidates:
+    for candidate, src_url in enumerate(candidates):
         if src_url.startswith("/media/"):
             return {
                 "image_id": image_id,
@@ -142,6 +147,7 @@ def _download_convert(
                 "web_path": src_url,
                 "cached": True,
                 "source": "already_local",
+                "candidate": candidate,
             }
         dst_abs, dst_web = _target_paths(base_dir, car_id, image_id, src_url, fmt)
         if dst_abs.exists() and dst_abs.stat().st_size > 0:
@@ -153,6 +159,7 @@ def _download_convert(
                 "cached": True,
                 "source": "cache_hit",
                 "url": src_url,
+                "candidate": candidate,
             }
         try:
             with requests.get(
@@ -187,6 +194,7 @@ def _download_convert(
                 save_kwargs["method"] = 6
             img.save(tmp_abs, **save_kwargs)
             tmp_abs.replace(dst_abs)
+            phash = dhash_image(img)
             return {
                 "image_id": image_id,
                 "car_id": car_id,
@@ -195,6 +203,10 @@ def _download_convert(
                 "cached": False,
                 "source": "download",
                 "url": src_url,
+                "candidate": candidate,
+                "bytes_in": total,
+                "bytes_out": dst_abs.stat().st_size,
+                "phash": phash,
             }
         except Exception as exc:  # noqa: BLE001
             last_error = str(exc)[:180]
@@ -207,6 +219,58 @@ def _download_convert(
     }
 
 
+def _progress_scope(args: argparse.Namespace, country: Optional[str], brands: list[str]) -> str:
+    """Stable id of the selection, so only a rerun of the same command resumes."""
+    selection = {
+        "region": args.region.upper(),
+        "country": country,
+        "source_key": args.source_key.lower(),
+        "brands": sorted(b.lower() for b in brands),
+        "limit_cars": args.limit_cars,
+        "offset_cars": args.offset_cars,
+        "max_images_per_car": args.max_images_per_car,
+        "order_by": args.order_by,
+        "updated_since_hours": args.updated_since_hours,
+        "max_width": args.max_width,
+        "quality": args.quality,
+        "format": args.format,
+    }
+    raw = json.dumps(selection, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def _resumed_result(
+    base_dir: Path,
+    fmt: str,
+    image_id: int,
+    car_id: int,
+    candidates: list[str],
+    done: Optional[dict[int, int]],
+) -> Optional[dict]:
+    """Rebuild the result of an image mirrored by an interrupted run, if its file is still there."""
+    if not done or image_id not in done:
+        return None
+    idx = done[image_id]
+    if idx < 0 or idx >= len(candidates):
+        return None
+    src_url = candidates[idx]
+    if src_url.startswith("/media/"):
+        web_path = src_url
+    else:
+        dst_abs, web_path = _target_paths(base_dir, car_id, image_id, src_url, fmt)
+        if not dst_abs.exists():
+            return None
+    return {
+        "image_id": image_id,
+        "car_id": car_id,
+        "ok": True,
+        "web_path": web_path,
+        "cached": True,
+        "source": "resumed",
+        "candidate": idx,
+    }
+
+
 def main() -> None:
     ap = argparse.ArgumentParser(description="Mirror car_images to local /media and rewrite URLs")
     ap.add_argument("--region", default="EU")
@@ -217,7 +281,17 @@ def main() -> None:
     ap.add_argument("--offset-cars", type=int, default=0)
     ap.add_argument("--max-images-per-car", type=int, default=20)
     ap.add_argument("--order-by", choices=["id_asc", "updated_desc", "listing_desc"], default="id_asc")
-    ap.add_argument("--workers", type=int, default=16)
+    ap.add_argument("--engine", choices=["async", "threads"], default="async")
+    ap.add_argument("--workers", type=int, default=16, help="concurrent downloads")
+    ap.add_argument("--per-host", type=int, default=8, help="async engine: concurrent downloads per host")
+    ap.add_argument("--retries", type=int, default=2, help="async engine: retries on 429/5xx/connect errors")
+    ap.add_argument("--convert-workers", type=int, default=0, help="async engine: decode processes (0 = cpu count)")
+    ap.add_argument("--no-resume", action="store_true", help="ignore per-car progress from an interrupted run")
+    ap.add_argument(
+        "--no-dedup",
+        action="store_true",
+        help="download every image even if the same source URL is already mirrored for another car",
+    )
     ap.add_argument("--timeout", type=float, default=6.0)
     ap.add_argument("--max-bytes", type=int, default=8_000_000)
     ap.add_argument("--max-width", type=int, default=1280)
@@ -252,7 +326,10 @@ def main() -> None:
     deleted = 0
     thumb_updated = 0
     skipped_by_cap = 0
+    resumed = 0
+    deduped = 0
     problems: list[dict] = []
+    throughput = ThroughputStats()
 
     def snapshot() -> tuple[float, int, float, str]:
         elapsed = max(time.time() - started, 1.0)
@@ -376,40 +453,138 @@ def main() -> None:
             normalized_payload.append((image_id, car_id, candidates, pos, is_primary))
 
         results_by_id: dict[int, dict] = {}
-        with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
-            futures = [
-                pool.submit(
-                    _download_convert,
-                    image_id=image_id,
-                    car_id=car_id,
-                    candidates=candidates,
-                    base_dir=base_dir,
+        progress = MirrorProgress(_progress_scope(args, country, brands))
+        done_by_car = {} if args.no_resume else progress.load(db)
+        pending: list[tuple[int, int, list[str], int, bool]] = []
+        for _, car_id, _, _, _ in normalized_payload:
+            progress.expect(car_id, 1)
+        for item in normalized_payload:
+            image_id, car_id, candidates, _, _ = item
+            res = _resumed_result(base_dir, args.format, image_id, car_id, candidates, done_by_car.get(car_id))
+            if res is None:
+                pending.append(item)
+                continue
+            # Keep resumed images in the car's checkpoint when it is rewritten.
+            progress.record(car_id, image_id, int(res["candidate"]))
+            results_by_id[image_id] = res
+            checked += 1
+            mirrored += 1
+            resumed += 1
+        if resumed:
+            print(f"[mirror_car_images_local] resumed={resumed} from {progress.prefix}*", flush=True)
+
+        # Images whose source URL is already mirrored (for this or another car)
+        # reference the existing file; repeats within this run wait for the
+        # first download instead of fetching the same picture again.
+        followers: dict[tuple[str, ...], list[tuple[int, int]]] = {}
+        if not args.no_dedup and pending:
+            blobs = BlobIndex.build(db)
+            leaders: list[tuple[int, int, list[str], int, bool]] = []
+            for item in pending:
+                image_id, car_id, candidates, _, _ = item
+                known = next(
+                    ((idx, web) for idx, url in enumerate(candidates) if (web := blobs.lookup(url, args.format))),
+                    None,
+                )
+                if known is not None:
+                    idx, web = known
+                    results_by_id[image_id] = {
+                        "image_id": image_id,
+                        "car_id": car_id,
+                        "ok": True,
+                        "web_path": web,
+                        "cached": True,
+                        "source": "dedup",
+                        "candidate": idx,
+                    }
+                    progress.record(car_id, image_id, idx)
+                    checked += 1
+                    mirrored += 1
+                    deduped += 1
+                    continue
+                key = tuple(candidates)
+                if key in followers:
+                    followers[key].append((image_id, car_id))
+                    continue
+                followers[key] = []
+                leaders.append(item)
+            pending = leaders
+            print(
+                f"[mirror_car_images_local] dedup known={deduped} "
+                f"repeats={sum(len(v) for v in followers.values())} blobs={len(blobs)}",
+                flush=True,
+            )
+        candidates_by_id = {image_id: tuple(candidates) for image_id, _, candidates, _, _ in pending}
+
+        def handle(res: dict) -> None:
+            image_id = int(res["image_id"])
+            for follower_id, follower_car in followers.get(candidates_by_id.get(image_id, ()), ()):
+                record({**res, "image_id": follower_id, "car_id": follower_car, "cached": True, "source": "dedup"})
+            record(res)
+
+        def record(res: dict) -> None:
+            nonlocal checked, mirrored, failed
+            image_id = int(res["image_id"])
+            results_by_id[image_id] = res
+            progress.record(int(res["car_id"]), image_id, res.get("candidate") if res.get("ok") else None)
+            if progress.should_flush():
+                progress.flush(db)
+            checked += 1
+            if res.get("ok"):
+                mirrored += 1
+            else:
+                failed += 1
+                problems.append(
+                    {
+                        "image_id": image_id,
+                        "car_id": int(res.get("car_id") or 0),
+                        "error": res.get("error") or "unknown",
+                    }
+                )
+            log("progress")
+            notify("progress")
+
+        if args.engine == "async":
+            mirror = AsyncImageMirror(
+                lambda job, src_url: _target_paths(base_dir, job.car_id, job.image_id, src_url, args.format),
+                MirrorOptions(
                     timeout_sec=args.timeout,
                     max_bytes=args.max_bytes,
                     max_width=args.max_width,
                     quality=args.quality,
                     fmt=args.format,
-                )
-                for image_id, car_id, candidates, _, _ in normalized_payload
-            ]
-            for fut in as_completed(futures):
-                res = fut.result()
-                image_id = int(res["image_id"])
-                results_by_id[image_id] = res
-                checked += 1
-                if res.get("ok"):
-                    mirrored += 1
-                else:
-                    failed += 1
-                    problems.append(
-                        {
-                            "image_id": image_id,
-                            "car_id": int(res.get("car_id") or 0),
-                            "error": res.get("error") or "unknown",
-                        }
+                    concurrency=max(1, args.workers),
+                    per_host=max(1, args.per_host),
+                    retries=max(0, args.retries),
+                    convert_workers=max(0, args.convert_workers),
+                ),
+                stats=throughput,
+            )
+            jobs = [MirrorJob(image_id, car_id, tuple(candidates)) for image_id, car_id, candidates, _, _ in pending]
+            asyncio.run(mirror.run(jobs, on_result=handle))
+        else:
+            with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+                futures = [
+                    pool.submit(
+                        _download_convert,
+                        image_id=image_id,
+                        car_id=car_id,
+                        candidates=candidates,
+                        base_dir=base_dir,
+                        timeout_sec=args.timeout,
+                        max_bytes=args.max_bytes,
+                        max_width=args.max_width,
+                        quality=args.quality,
+                        fmt=args.format,
                     )
-                log("progress")
-                notify("progress")
+                    for image_id, car_id, candidates, _, _ in pending
+                ]
+                for fut in as_completed(futures):
+                    res = fut.result()
+                    throughput.record(res)
+                    handle(res)
+        progress.flush(db)
+        print(f"[mirror_car_images_local] throughput {throughput.summary_line()}", flush=True)
 
         if not args.dry_run:
             # Rewrite URLs for mirrored images.
@@ -420,7 +595,10 @@ def main() -> None:
                     new_url = str(res["web_path"])
                     if (row.url or "").strip() != new_url:
                         row.url = new_url
+                        row.phash = res.get("phash") or None
                         rewritten += 1
+                    elif res.get("phash"):
+                        row.phash = str(res["phash"])
                 elif args.delete_unmirrored:
                     db.delete(row)
                     deleted += 1
@@ -449,6 +627,13 @@ def main() -> None:
                             thumb_updated += 1
 
             db.commit()
+            record_files(
+                db,
+                filter(None, (to_rel(str(res.get("web_path") or "")) for res in results_by_id.values() if res.get("ok"))),
+            )
+            db.commit()
+            # URLs are rewritten now; the next run starts from the database.
+            progress.clear(db)
 
         log("done")
         notify("done")
@@ -465,6 +650,10 @@ def main() -> None:
         "deleted": deleted,
         "thumb_updated": thumb_updated,
         "skipped_by_cap": skipped_by_cap,
+        "resumed": resumed,
+        "deduped": deduped,
+        "engine": args.engine,
+        "throughput": throughput.snapshot(),
         "dry_run": bool(args.dry_run),
         "format": args.format,
         "quality": args.quality,
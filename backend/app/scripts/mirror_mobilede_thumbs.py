@@ -18,6 +18,7 @@ from sqlalchemy import func, select
 
 from backend.app.db import SessionLocal
 from backend.app.models import Car, CarImage, Source
+from backend.app.services.media_manifest import record_files, to_rel
 from backend.app.utils.thumbs import normalize_classistatic_url
 from backend.app.utils.telegram import send_telegram_message
 
@@ -379,6 +380,8 @@ def main() -> None:
                     )
                     updated_rows += 1
                 db.commit()
+                record_files(db, filter(None, (to_rel(p) for p in updates.values())))
+                db.commit()
             save_state(last_id)
             maybe_notify("progress")
 
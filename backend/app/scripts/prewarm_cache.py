@@ -1,4 +1,3 @@
-import inspect
 import os
 import time
 from typing import Dict, Any, List, Tuple
@@ -6,6 +5,12 @@ from typing import Dict, Any, List, Tuple
 from starlette.datastructures import QueryParams
 
 from backend.app.db import SessionLocal
+from backend.app.services.cache_prewarmer import (
+    adaptive_prewarm_enabled,
+    call_route_with_defaults as _call_route_with_defaults,
+    internal_calls,
+    prewarm_top,
+)
 from backend.app.services.cars_service import CarsService, normalize_brand
 from backend.app.routers.catalog import (
     filter_ctx_base,
@@ -23,26 +28,6 @@ from backend.app.utils.redis_cache import (
 )
 
 
-def _param_default(param: inspect.Parameter) -> Any:
-    default = param.default
-    if default is inspect._empty:
-        return None
-    query_default = getattr(default, "default", inspect._empty)
-    if query_default is not inspect._empty:
-        return query_default
-    return default
-
-
-def _call_route_with_defaults(fn, /, **overrides):
-    kwargs: Dict[str, Any] = {}
-    for name, param in inspect.signature(fn).parameters.items():
-        if name in overrides:
-            kwargs[name] = overrides[name]
-            continue
-        kwargs[name] = _param_default(param)
-    return fn(**kwargs)
-
-
 def _prewarm_base(db, params: Dict[str, Any]) -> Tuple[str, float]:
     started = time.perf_counter()
     normalized = normalize_filter_params(params)
@@ -350,8 +335,15 @@ def main() -> None:
                     break
                 params["page_size"] = list_page_size
                 _prewarm_list(params)
+    # Then whatever real traffic asked for most (see services/cache_prewarmer.py).
+    if adaptive_prewarm_enabled() and os.getenv("PREWARM_INCLUDE_ADAPTIVE", "1") != "0":
+        remaining = max(0.0, max_sec - (time.monotonic() - started)) if max_sec else None
+        stats = prewarm_top(max_sec=remaining)
+        print(f"[prewarm] adaptive {stats}")
     print(f"[prewarm] done in {(time.monotonic()-started)*1000:.2f} ms")
 
 
 if __name__ == "__main__":
-    main()
+    # Prewarm calls must not be counted as visitor traffic.
+    with internal_calls():
+        main()
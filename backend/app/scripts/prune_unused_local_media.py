@@ -8,6 +8,7 @@ from sqlalchemy import func, select
 
 from backend.app.db import SessionLocal
 from backend.app.models import Car, CarImage
+from backend.app.services.media_manifest import forget_files, iter_manifest, manifest_table_exists
 
 
 def media_root() -> Path:
@@ -28,10 +29,30 @@ def iter_files(root: Path) -> list[Path]:
     return [p for p in root.rglob("*") if p.is_file()]
 
 
+def iter_candidates(db, base_dir: Path, roots: list[Path], source: str) -> list[tuple[str, int | None]]:
+    """``(rel_path, size)`` of every file under ``roots``; size is ``None`` when unknown."""
+    if source == "manifest" and manifest_table_exists(db):
+        out = [
+            (rel, size)
+            for root in roots
+            for rel, size in iter_manifest(db, root.relative_to(base_dir).as_posix())
+        ]
+        if out:
+            return out
+        print("[prune_unused_local_media] manifest is empty, walking the disk", flush=True)
+    return [(path.relative_to(base_dir).as_posix(), None) for root in roots for path in iter_files(root)]
+
+
 def main() -> None:
     ap = argparse.ArgumentParser(description="Delete local media files not referenced by active cars")
     ap.add_argument("--dry-run", action="store_true")
     ap.add_argument("--report-json", default="/app/artifacts/prune_unused_local_media.json")
+    ap.add_argument(
+        "--source",
+        choices=("manifest", "disk"),
+        default="manifest",
+        help="list files from the media_files manifest (default) or by walking the disk",
+    )
     args = ap.parse_args()
 
     base_dir = media_root()
@@ -58,39 +79,50 @@ def main() -> None:
         ).scalars().all()
         keep.update(filter(None, (to_rel(v) for v in thumb_rows)))
 
-    deleted = 0
-    kept = 0
-    reclaimed_bytes = 0
-    scanned = 0
+        candidates = iter_candidates(db, base_dir, [gallery_dir, thumbs_dir], args.source)
+
+        deleted = 0
+        kept = 0
+        reclaimed_bytes = 0
+        scanned = 0
+        removed: list[str] = []
 
-    for root in (gallery_dir, thumbs_dir):
-        for path in iter_files(root):
+        for rel, size in candidates:
             scanned += 1
-            rel = path.relative_to(base_dir).as_posix()
             if rel in keep:
                 kept += 1
                 continue
-            try:
-                size = path.stat().st_size
-            except OSError:
-                size = 0
+            path = base_dir / rel
+            if size is None:
+                try:
+                    size = path.stat().st_size
+                except OSError:
+                    size = 0
             reclaimed_bytes += size
             deleted += 1
             if not args.dry_run:
                 try:
                     path.unlink()
-                except OSError:
+                except FileNotFoundError:
                     pass
+                except OSError:
+                    continue
+                removed.append(rel)
+
+        if removed:
+            forget_files(db, removed)
+            db.commit()
 
     if not args.dry_run:
-        for root in (gallery_dir, thumbs_dir):
-            if not root.exists():
+        # Only directories that just lost files can have become empty.
+        parents = {(base_dir / rel).parent for rel in removed}
+        for path in sorted(parents, key=lambda p: len(p.parts), reverse=True):
+            if path in (gallery_dir, thumbs_dir):
                 continue
-            for path in sorted((p for p in root.rglob("*") if p.is_dir()), reverse=True):
-                try:
-                    path.rmdir()
-                except OSError:
-                    pass
+            try:
+                path.rmdir()
+            except OSError:
+                pass
 
     report = {
         "base_dir": str(base_dir),
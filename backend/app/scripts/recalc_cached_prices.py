@@ -52,6 +52,7 @@ def main() -> None:
                         continue
                     rub = ceil_to_step(rub, 10000)
                     car.price_rub_cached = rub
+                    svc.sync_display_price_columns(car, rates)
                     updated += 1
                 except Exception:
                     errors += 1
@@ -6,17 +6,19 @@ import time
 from datetime import datetime
 from typing import Any, Iterable
 
+from sqlalchemy import String, and_, cast, or_
 from sqlalchemy.exc import OperationalError
 
 from backend.app.db import SessionLocal
 from backend.app.models import Car
 from backend.app.services.cars_service import CarsService
+from backend.app.services.fx_rates_service import FX_CURRENCIES, FxRatesService, reload_fx_snapshot
 from backend.app.utils.telegram import (
     resolve_telegram_chat_id,
     send_telegram_message,
     telegram_enabled,
 )
-from backend.app.utils.price_utils import ceil_to_step, get_round_step_rub
+from backend.app.utils.price_utils import ceil_to_step, get_round_step_rub, public_display_price_fields
 
 
 def _iter_steps(raw: Any) -> list[dict]:
@@ -111,6 +113,139 @@ def _is_retryable_write_error(exc: Exception) -> bool:
     )
 
 
+def run_fx_price_update(
+    db,
+    rates: dict,
+    *,
+    batch: int = 2000,
+    sleep: float = 0.0,
+    country: str = "",
+    only_ids: list[int] | None = None,
+    dry_run: bool = False,
+    fx_dependent_only: bool = False,
+    changed_currencies: Iterable[str] | None = None,
+) -> tuple[int, int]:
+    """Re-price available cars from stored breakdowns with ``rates``.
+
+    Returns ``(checked, updated)``. ``fx_dependent_only`` limits the pass to
+    rows the new rates can move: cars priced in one of ``changed_currencies``
+    (default: all FX currencies) and cars whose breakdown does not carry the
+    current ``__fx_signature`` yet.
+    """
+    svc = CarsService(db)
+    eur_rate = float(rates.get("EUR") or 0)
+    usd_rate = float(rates.get("USD") or 0)
+    cny_rate = float(rates.get("CNY") or 0)
+    fx_signature = svc._fx_signature({"EUR": eur_rate, "USD": usd_rate, "CNY": cny_rate})
+
+    if eur_rate <= 0 or usd_rate <= 0 or cny_rate <= 0:
+        raise SystemExit("EUR/USD/CNY rates missing")
+
+    query = db.query(Car).filter(Car.is_available.is_(True))
+    if country:
+        query = query.filter(Car.country == country)
+    if only_ids:
+        query = query.filter(Car.id.in_(only_ids))
+    if fx_dependent_only:
+        currencies = [c.upper() for c in (FX_CURRENCIES if changed_currencies is None else changed_currencies)]
+        stale_breakdown = Car.calc_breakdown_json.is_not(None)
+        if fx_signature:
+            stale_breakdown = and_(
+                stale_breakdown,
+                cast(Car.calc_breakdown_json, String).not_like(f"%{fx_signature}%"),
+            )
+        query = query.filter(or_(Car.currency.in_(currencies), stale_breakdown))
+
+    last_id = 0
+    total_checked = 0
+    total_updated = 0
+    while True:
+        batch_rows = (
+            query.filter(Car.id > last_id)
+            .order_by(Car.id.asc())
+            .limit(batch)
+            .all()
+        )
+        if not batch_rows:
+            break
+        updates = []
+        for car in batch_rows:
+            last_id = car.id
+            total_checked += 1
+            steps = _iter_steps(car.calc_breakdown_json)
+            total_rub = recompute_total_from_breakdown(steps, eur_rate, usd_rate, cny_rate)
+
+            price_rub = None
+            if car.currency == "EUR" and car.price is not None:
+                price_rub = float(car.price) * eur_rate
+            elif car.currency == "USD" and car.price is not None:
+                price_rub = float(car.price) * usd_rate
+            elif car.currency == "CNY" and car.price is not None:
+                price_rub = float(car.price) * cny_rate
+            elif car.currency in {"RUB", "₽"} and car.price is not None:
+                price_rub = float(car.price)
+
+            if total_rub is None and price_rub is None:
+                continue
+
+            if total_rub is not None:
+                total_rub = ceil_to_step(total_rub, get_round_step_rub())
+                _update_rate_steps(steps, eur_rate, usd_rate)
+                _update_total_step(steps, total_rub)
+            if steps and fx_signature:
+                _upsert_breakdown_version(steps, "__fx_signature", fx_signature)
+
+            new_price_rub = price_rub if price_rub is not None else car.price_rub_cached
+            new_total_rub = total_rub if total_rub is not None else car.total_price_rub_cached
+            new_breakdown = steps if steps else car.calc_breakdown_json
+            # Keep the stored catalog sort key in step with the new rates.
+            display_price, display_group = public_display_price_fields(
+                new_total_rub,
+                new_price_rub,
+                calc_breakdown=new_breakdown,
+                raw_price=car.price,
+                currency=car.currency,
+                country=car.country,
+                fx_eur=eur_rate,
+                fx_usd=usd_rate,
+                fx_cny=cny_rate,
+            )
+            updates.append(
+                {
+                    "id": car.id,
+                    "price_rub_cached": new_price_rub,
+                    "total_price_rub_cached": new_total_rub,
+                    "calc_breakdown_json": new_breakdown,
+                    "display_price_rub": display_price,
+                    "display_price_group": display_group,
+                    "calc_updated_at": datetime.utcnow(),
+                }
+            )
+        if updates and not dry_run:
+            attempt = 0
+            while True:
+                try:
+                    db.bulk_update_mappings(Car, updates)
+                    db.commit()
+                    total_updated += len(updates)
+                    break
+                except OperationalError as exc:
+                    db.rollback()
+                    attempt += 1
+                    if attempt >= 5 or not _is_retryable_write_error(exc):
+                        raise
+                    wait_sec = min(2.0, 0.25 * (2 ** (attempt - 1)))
+                    print(
+                        f"[update_fx_prices] retryable_write_error attempt={attempt} "
+                        f"sleep={wait_sec:.2f}s",
+                        flush=True,
+                    )
+                    time.sleep(wait_sec)
+        if sleep:
+            time.sleep(sleep)
+    return total_checked, total_updated
+
+
 def main() -> None:
     parser = argparse.ArgumentParser()
     parser.add_argument("--batch", type=int, default=2000)
@@ -119,22 +254,22 @@ def main() -> None:
     parser.add_argument("--only-ids", type=str, default="")
     parser.add_argument("--dry-run", action="store_true")
     parser.add_argument("--telegram", action="store_true")
+    parser.add_argument("--fx-dependent-only", action="store_true")
+    parser.add_argument("--no-fetch", action="store_true", help="use stored fx_rates without fetching CBR first")
     args = parser.parse_args()
 
     with SessionLocal() as db:
-        svc = CarsService(db)
-        rates = svc.get_fx_rates(allow_fetch=True) or {}
+        changed_currencies = None
+        if not args.no_fetch:
+            try:
+                changed_currencies = FxRatesService(db).refresh().changed or None
+            except Exception as exc:
+                db.rollback()
+                print(f"[update_fx_prices] fx_fetch_failed error={exc!r}; using stored rates", flush=True)
+        rates = reload_fx_snapshot(db).rates
         eur_rate = float(rates.get("EUR") or 0)
         usd_rate = float(rates.get("USD") or 0)
         cny_rate = float(rates.get("CNY") or 0)
-        fx_signature = svc._fx_signature({"EUR": eur_rate, "USD": usd_rate, "CNY": cny_rate})
-
-        if eur_rate <= 0 or usd_rate <= 0 or cny_rate <= 0:
-            raise SystemExit("EUR/USD/CNY rates missing")
-
-        query = db.query(Car).filter(Car.is_available.is_(True))
-        if args.country:
-            query = query.filter(Car.country == args.country)
 
         only_ids = []
         if args.only_ids:
@@ -143,79 +278,18 @@ def main() -> None:
                     line = line.strip()
                     if line.isdigit():
                         only_ids.append(int(line))
-            if only_ids:
-                query = query.filter(Car.id.in_(only_ids))
-
-        last_id = 0
-        total_checked = 0
-        total_updated = 0
-        while True:
-            batch = (
-                query.filter(Car.id > last_id)
-                .order_by(Car.id.asc())
-                .limit(args.batch)
-                .all()
-            )
-            if not batch:
-                break
-            updates = []
-            for car in batch:
-                last_id = car.id
-                total_checked += 1
-                steps = _iter_steps(car.calc_breakdown_json)
-                total_rub = recompute_total_from_breakdown(steps, eur_rate, usd_rate, cny_rate)
-
-                price_rub = None
-                if car.currency == "EUR" and car.price is not None:
-                    price_rub = float(car.price) * eur_rate
-                elif car.currency == "USD" and car.price is not None:
-                    price_rub = float(car.price) * usd_rate
-                elif car.currency == "CNY" and car.price is not None:
-                    price_rub = float(car.price) * cny_rate
-                elif car.currency in {"RUB", "₽"} and car.price is not None:
-                    price_rub = float(car.price)
-
-                if total_rub is None and price_rub is None:
-                    continue
-
-                if total_rub is not None:
-                    total_rub = ceil_to_step(total_rub, get_round_step_rub())
-                    _update_rate_steps(steps, eur_rate, usd_rate)
-                    _update_total_step(steps, total_rub)
-                if steps and fx_signature:
-                    _upsert_breakdown_version(steps, "__fx_signature", fx_signature)
-
-                updates.append(
-                    {
-                        "id": car.id,
-                        "price_rub_cached": price_rub if price_rub is not None else car.price_rub_cached,
-                        "total_price_rub_cached": total_rub if total_rub is not None else car.total_price_rub_cached,
-                        "calc_breakdown_json": steps if steps else car.calc_breakdown_json,
-                        "calc_updated_at": datetime.utcnow(),
-                    }
-                )
-            if updates and not args.dry_run:
-                attempt = 0
-                while True:
-                    try:
-                        db.bulk_update_mappings(Car, updates)
-                        db.commit()
-                        total_updated += len(updates)
-                        break
-                    except OperationalError as exc:
-                        db.rollback()
-                        attempt += 1
-                        if attempt >= 5 or not _is_retryable_write_error(exc):
-                            raise
-                        wait_sec = min(2.0, 0.25 * (2 ** (attempt - 1)))
-                        print(
-                            f"[update_fx_prices] retryable_write_error attempt={attempt} "
-                            f"sleep={wait_sec:.2f}s",
-                            flush=True,
-                        )
-                        time.sleep(wait_sec)
-            if args.sleep:
-                time.sleep(args.sleep)
+
+        total_checked, total_updated = run_fx_price_update(
+            db,
+            rates,
+            batch=args.batch,
+            sleep=args.sleep,
+            country=args.country,
+            only_ids=only_ids,
+            dry_run=args.dry_run,
+            fx_dependent_only=args.fx_dependent_only,
+            changed_currencies=changed_currencies,
+        )
         summary = f"fx_update checked={total_checked} updated={total_updated} eur={eur_rate} usd={usd_rate} cny={cny_rate}"
         print(summary)
         if args.telegram and telegram_enabled():
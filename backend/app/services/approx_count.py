@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from sqlalchemy import func, select, tablesample, text
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.util import ClauseAdapter
+
+from ..models import Car
+
+
+# z for a two-sided 95% interval.
+_Z95 = 1.96
+
+
+@dataclass(frozen=True)
+class ApproxCount:
+    value: int
+    low: int
+    high: int
+    method: str
+
+
+def approx_count_mode() -> str:
+    """``off`` (default), ``planner`` or ``sample`` (planner gate + TABLESAMPLE)."""
+    mode = (os.getenv("CATALOG_APPROX_COUNT", "off") or "off").strip().lower()
+    return mode if mode in {"planner", "sample"} else "off"
+
+
+def approx_count_threshold() -> int:
+    try:
+        return max(1, int(os.getenv("CATALOG_APPROX_COUNT_MIN", "100000")))
+    except ValueError:
+        return 100000
+
+
+def planner_rows(db: Session, where_expr: Any) -> Optional[int]:
+    """Planner row estimate for ``cars WHERE where_expr`` (no execution)."""
+    stmt = select(Car.id).where(where_expr) if where_expr is not None else select(Car.id)
+    sql = str(
+        stmt.compile(
+            dialect=db.get_bind().dialect,
+            compile_kwargs={"literal_binds": True, "render_postcompile": True},
+        )
+    )
+    raw = db.connection().exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}").scalar_one()
+    plan = json.loads(raw) if isinstance(raw, str) else raw
+    rows = ((plan[0] if isinstance(plan, list) else plan).get("Plan") or {}).get("Plan Rows")
+    return int(rows) if rows is not None else None
+
+
+def _table_rows(db: Session) -> Optional[int]:
+    value = db.execute(text("SELECT reltuples::bigint FROM pg_class WHERE oid = 'cars'::regclass")).scalar()
+    return int(value) if value and value > 0 else None
+
+
+def sampled_count(db: Session, where_expr: Any, *, percent: float) -> Optional[ApproxCount]:
+    """Scale the matching share of a ``TABLESAMPLE SYSTEM`` sample up to the table size.
+
+    The interval is the binomial one; SYSTEM samples whole pages, so with
+    strongly clustered filters the real error can be wider.
+    """
+    table_rows = _table_rows(db)
+    if not table_rows:
+        return None
+    sampled = tablesample(Car.__table__, func.system(percent), name="cars_sample")
+    matched_expr = func.count()
+    if where_expr is not None:
+        matched_expr = func.count().filter(ClauseAdapter(sampled).traverse(where_expr))
+    row = db.execute(select(func.count(), matched_expr).select_from(sampled)).first()
+    if not row or not row[0]:
+        return None
+    n, k = int(row[0]), int(row[1] or 0)
+    share = k / n
+    margin = _Z95 * math.sqrt(share * (1 - share) / n)
+    return ApproxCount(
+        value=int(round(share * table_rows)),
+        low=max(0, int(share * table_rows - margin * table_rows)),
+        high=int(share * table_rows + margin * table_rows),
+        method="sample",
+    )
+
+
+def approximate_count(
+    db: Session,
+    where_expr: Any,
+    *,
+    mode: Optional[str] = None,
+    threshold: Optional[int] = None,
+) -> Optional[ApproxCount]:
+    """Approximate count when it is safely above ``threshold``; ``None`` means count exactly."""
+    mode = mode or approx_count_mode()
+    if mode == "off" or db.get_bind().dialect.name != "postgresql":
+        return None
+    threshold = threshold or approx_count_threshold()
+    estimate = planner_rows(db, where_expr)
+    # Planner estimates for multi-column filters are often far too low, never
+    # too high by orders of magnitude; below the threshold the exact count is cheap enough.
+    if estimate is None or estimate < threshold:
+        return None
+    if mode == "planner":
+        return ApproxCount(value=estimate, low=estimate, high=estimate, method="planner")
+    try:
+        percent = float(os.getenv("CATALOG_APPROX_SAMPLE_PCT", "1"))
+    except ValueError:
+        percent = 1.0
+    result = sampled_count(db, where_expr, percent=min(100.0, max(0.01, percent)))
+    if result is None or result.low < threshold:
+        return None
+    return result
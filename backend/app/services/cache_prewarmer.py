@@ -0,0 +1,317 @@
+from __future__ import annotations
+
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from ..utils.redis_cache import (
+    get_redis,
+    normalize_count_params,
+    normalize_filter_params,
+    redis_try_lock,
+    redis_unlock,
+)
+
+
+logger = logging.getLogger(__name__)
+
+# Sorted sets: member = normalized request (JSON), score = decayed request count.
+TRAFFIC_KEY = "prewarm:traffic"
+MISS_KEY = "prewarm:traffic:miss"
+_DECAY_LOCK_KEY = "prewarm:traffic:decay"
+_RUN_LOCK_PREFIX = "prewarm:adaptive"
+_RUN_LOCK_TTL_SEC = 3600
+# Held while a prewarm runs so bumps seen by several workers never overlap.
+_ACTIVE_LOCK_KEY = f"{_RUN_LOCK_PREFIX}:running"
+
+# Kinds whose cache entries can be recomputed by calling the route function.
+KINDS = ("filter_ctx_base", "filter_ctx_brand", "filter_ctx_model", "cars_count", "cars_list")
+_LIST_EXTRA = ("sort", "page", "page_size")
+
+
+def adaptive_prewarm_enabled() -> bool:
+    return os.getenv("PREWARM_ADAPTIVE", "1") != "0"
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)) or default)
+    except ValueError:
+        return default
+
+
+def _param_default(param: inspect.Parameter) -> Any:
+    default = param.default
+    if default is inspect._empty:
+        return None
+    query_default = getattr(default, "default", inspect._empty)
+    if query_default is not inspect._empty:
+        return query_default
+    return default
+
+
+def call_route_with_defaults(fn, /, **overrides):
+    """Call a FastAPI route function directly, unwrapping ``Query(...)`` defaults."""
+    kwargs: Dict[str, Any] = {}
+    for name, param in inspect.signature(fn).parameters.items():
+        if name in overrides:
+            kwargs[name] = overrides[name]
+            continue
+        kwargs[name] = _param_default(param)
+    return fn(**kwargs)
+
+
+def normalize_request(kind: str, params: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Same normalization the cache keys use, so equivalent requests collapse."""
+    params = params or {}
+    if kind == "cars_count":
+        normalized = normalize_count_params(params)
+    else:
+        normalized = normalize_filter_params(params)
+    if kind == "cars_list":
+        for key in _LIST_EXTRA:
+            if params.get(key) is not None:
+                normalized[key] = params[key]
+    return normalized
+
+
+def traffic_member(kind: str, params: Optional[Dict[str, Any]]) -> str:
+    return json.dumps({"k": kind, "p": normalize_request(kind, params)}, sort_keys=True, ensure_ascii=False, default=str)
+
+
+class TrafficRecorder:
+    """Buffers hits/misses in process and flushes them to Redis in one pipeline.
+
+    Scores decay by ``PREWARM_DECAY`` every ``PREWARM_DECAY_SEC`` and the sets
+    are trimmed to ``PREWARM_TOP_K`` members, which makes them a decaying
+    top-K of what visitors actually ask for.
+    """
+
+    def __init__(self, *, flush_sec: float = 2.0, flush_size: int = 200) -> None:
+        self.flush_sec = flush_sec
+        self.flush_size = flush_size
+        self._lock = threading.Lock()
+        self._requests: Counter = Counter()
+        self._misses: Counter = Counter()
+        self._last_flush = time.monotonic()
+
+    def add(self, member: str, hit: bool) -> None:
+        with self._lock:
+            self._requests[member] += 1
+            if not hit:
+                self._misses[member] += 1
+            due = (
+                sum(self._requests.values()) >= self.flush_size
+                or time.monotonic() - self._last_flush >= self.flush_sec
+            )
+        if due:
+            self.flush()
+
+    def flush(self) -> int:
+        with self._lock:
+            requests, misses = self._requests, self._misses
+            self._requests, self._misses = Counter(), Counter()
+            self._last_flush = time.monotonic()
+        if not requests:
+            return 0
+        client = get_redis()
+        if client is None:
+            return 0
+        try:
+            pipe = client.pipeline(transaction=False)
+            for member, count in requests.items():
+                pipe.zincrby(TRAFFIC_KEY, count, member)
+            for member, count in misses.items():
+                pipe.zincrby(MISS_KEY, count, member)
+            pipe.execute()
+            self._maybe_decay(client)
+        except Exception as exc:
+            logger.warning("prewarm traffic flush failed: %s", exc)
+        return len(requests)
+
+    def _maybe_decay(self, client: Any) -> None:
+        interval = _env_int("PREWARM_DECAY_SEC", 3600)
+        if not client.set(_DECAY_LOCK_KEY, "1", nx=True, ex=max(60, interval)):
+            return
+        factor = float(os.getenv("PREWARM_DECAY", "0.5") or 0.5)
+        top_k = _env_int("PREWARM_TOP_K", 2000)
+        for key in (TRAFFIC_KEY, MISS_KEY):
+            # Multiply-and-store keeps every member, then trim the tail.
+            client.zunionstore(key, {key: factor})
+            client.zremrangebyscore(key, "-inf", 0.05)
+            client.zremrangebyrank(key, 0, -(top_k + 1))
+
+
+_recorder = TrafficRecorder()
+_internal = threading.local()
+
+
+@contextmanager
+def internal_calls() -> Iterator[None]:
+    """Route calls made by background jobs are not visitor traffic."""
+    previous = getattr(_internal, "active", False)
+    _internal.active = True
+    try:
+        yield
+    finally:
+        _internal.active = previous
+
+
+def record_cache_access(kind: str, params: Optional[Dict[str, Any]], hit: bool) -> None:
+    """Count one request for ``kind`` with ``params``; never raises."""
+    if not adaptive_prewarm_enabled() or getattr(_internal, "active", False):
+        return
+    try:
+        _recorder.add(traffic_member(kind, params), hit)
+    except Exception:
+        logger.exception("prewarm_record_failed kind=%s", kind)
+
+
+def top_requests(limit: int) -> List[Tuple[str, Dict[str, Any], float, float]]:
+    """``(kind, params, score, miss_score)`` for the most requested entries."""
+    client = get_redis()
+    if client is None:
+        return []
+    rows = client.zrevrange(TRAFFIC_KEY, 0, max(0, limit - 1), withscores=True)
+    pipe = client.pipeline(transaction=False)
+    for member, _ in rows:
+        pipe.zscore(MISS_KEY, member)
+    misses = pipe.execute() if rows else []
+    out: List[Tuple[str, Dict[str, Any], float, float]] = []
+    for (member, score), miss in zip(rows, misses or [None] * len(rows)):
+        try:
+            doc = json.loads(member)
+        except (TypeError, ValueError):
+            continue
+        if doc.get("k") in KINDS:
+            out.append((doc["k"], dict(doc.get("p") or {}), float(score), float(miss or 0)))
+    return out
+
+
+def _warm_one(kind: str, params: Dict[str, Any], db: Session) -> None:
+    from ..routers import catalog
+
+    if kind == "filter_ctx_base":
+        catalog.filter_ctx_base(request=None, region=params.get("region"), country=params.get("country"), db=db)
+    elif kind == "filter_ctx_brand":
+        catalog.filter_ctx_brand(
+            request=None,
+            region=params.get("region"),
+            country=params.get("country"),
+            kr_type=params.get("kr_type"),
+            brand=params.get("brand"),
+            db=db,
+        )
+    elif kind == "filter_ctx_model":
+        catalog.filter_ctx_model(
+            request=None,
+            region=params.get("region"),
+            country=params.get("country"),
+            brand=params.get("brand"),
+            model=params.get("model"),
+            db=db,
+        )
+    else:
+        route = catalog.cars_count if kind == "cars_count" else catalog.list_cars
+        accepted = inspect.signature(route).parameters
+        kwargs = {key: value for key, value in params.items() if key in accepted}
+        if "line" in kwargs:
+            kwargs["line"] = [item for item in str(kwargs["line"]).split("|") if item] or None
+        call_route_with_defaults(route, request=None, db=db, **kwargs)
+
+
+def prewarm_top(
+    *,
+    limit: Optional[int] = None,
+    workers: Optional[int] = None,
+    session_factory: Optional[Callable[[], Session]] = None,
+    max_sec: Optional[float] = None,
+) -> Dict[str, int]:
+    """Recompute the ``limit`` most requested cache entries with a bounded pool."""
+    if session_factory is None:
+        from ..db import SessionLocal
+
+        session_factory = SessionLocal
+    limit = limit or _env_int("PREWARM_ADAPTIVE_TOP_N", 200)
+    workers = max(1, workers or _env_int("PREWARM_ADAPTIVE_WORKERS", 3))
+    budget = max_sec if max_sec is not None else float(os.getenv("PREWARM_MAX_SEC", "600") or 0)
+    deadline = time.monotonic() + budget if budget else None
+    stats = {"warmed": 0, "failed": 0, "skipped": 0}
+    stats_lock = threading.Lock()
+
+    def _task(item: Tuple[str, Dict[str, Any], float, float]) -> None:
+        kind, params, _, _ = item
+        if deadline is not None and time.monotonic() > deadline:
+            with stats_lock:
+                stats["skipped"] += 1
+            return
+        db = session_factory()
+        try:
+            with internal_calls():
+                _warm_one(kind, params, db)
+            outcome = "warmed"
+        except Exception:
+            db.rollback()
+            logger.exception("prewarm_adaptive_failed kind=%s params=%s", kind, params)
+            outcome = "failed"
+        finally:
+            db.close()
+        with stats_lock:
+            stats[outcome] += 1
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prewarm") as pool:
+        list(pool.map(_task, top_requests(limit)))
+    return stats
+
+
+_background_lock = threading.Lock()
+_background_thread: Optional[threading.Thread] = None
+
+
+def _acquire_active_lock(max_wait_sec: float, poll_sec: float = 1.0) -> Optional[str]:
+    deadline = time.monotonic() + max_wait_sec
+    while True:
+        token = redis_try_lock(_ACTIVE_LOCK_KEY, ttl_sec=int(max_wait_sec) or 1)
+        if token is not None or time.monotonic() >= deadline:
+            return token
+        time.sleep(poll_sec)
+
+
+def schedule_prewarm_for_version(version: str) -> bool:
+    """Dataset-version listener: one worker per version recomputes the hot keys."""
+    global _background_thread
+    if not adaptive_prewarm_enabled():
+        return False
+    with _background_lock:
+        if _background_thread is not None and _background_thread.is_alive():
+            return False
+        # Every web worker notices the same bump. The per-version lock is
+        # left to expire, so workers that see the bump later skip it too.
+        if redis_try_lock(f"{_RUN_LOCK_PREFIX}:{version}", ttl_sec=_RUN_LOCK_TTL_SEC) is None:
+            return False
+
+        def _run() -> None:
+            budget = float(os.getenv("PREWARM_MAX_SEC", "600") or 600)
+            token = _acquire_active_lock(budget)
+            if token is None:
+                logger.warning("prewarm_adaptive_skipped version=%s reason=busy", version)
+                return
+            try:
+                _recorder.flush()
+                stats = prewarm_top()
+                logger.info("prewarm_adaptive version=%s %s", version, stats)
+            finally:
+                redis_unlock(_ACTIVE_LOCK_KEY, token)
+
+        _background_thread = threading.Thread(target=_run, name="prewarm-adaptive", daemon=True)
+        _background_thread.start()
+    return True
@@ -7,7 +7,7 @@ from sqlalchemy.orm import Session
 from ..models.car import Car
 from ..services.cars_service import CarsService, electric_vehicle_hint_text
 from ..services.calculator_config_service import CalculatorConfigService
-from ..services.calculator_runtime import EstimateRequest, calculate, is_bev
+from ..services.calculator_runtime import EstimateRequest, is_bev
 from ..utils.registration_defaults import get_missing_registration_default
 
 
@@ -24,10 +24,7 @@ def build_calc_debug(
 
     service = CarsService(db)
     pricing = service.price_info(car)
-    cfg_svc = CalculatorConfigService(db)
-    cfg = cfg_svc.ensure_default_from_yaml("/app/backend/app/config/calculator.yml")
-    if not cfg:
-        cfg = cfg_svc.ensure_default_from_path("/app/Калькулятор Авто под заказ.xlsx")
+    cfg = CalculatorConfigService(db).current_compiled()
     if not cfg:
         raise ValueError("calculator config not found")
 
@@ -95,7 +92,7 @@ def build_calc_debug(
             reg_year=car.registration_year or fallback_reg_year,
             reg_month=car.registration_month or fallback_reg_month,
         )
-        result = calculate(cfg.payload, req)
+        result = cfg.calculate(req)
     else:
         notes.append("missing_or_nonpositive_price: calc skipped")
         req = EstimateRequest(
@@ -195,10 +192,7 @@ def build_calc_compare(
     Compare current calc steps with Excel-aligned steps (same formula pipeline).
     """
     base = build_calc_debug(db, car_id=car_id, eur_rate=eur_rate, usd_rate=usd_rate, scenario=scenario)
-    cfg_svc = CalculatorConfigService(db)
-    cfg = cfg_svc.ensure_default_from_yaml("/app/backend/app/config/calculator.yml")
-    if not cfg:
-        cfg = cfg_svc.ensure_default_from_path("/app/Калькулятор Авто под заказ.xlsx")
+    cfg = CalculatorConfigService(db).current_compiled()
     if not cfg:
         raise ValueError("calculator config not found")
 
@@ -233,7 +227,7 @@ def build_calc_compare(
         reg_year=car.get("registration_year"),
         reg_month=car.get("registration_month"),
     )
-    excel_result = calculate(cfg.payload, req)
+    excel_result = cfg.calculate(req)
     excel_steps = [
         {"name": "price_net_eur", "value": inp.get("price_net_eur"), "note": "input"},
         {"name": "eur_rate", "value": inp.get("eur_rate")},
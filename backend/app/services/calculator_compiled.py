@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .customs_config import CustomsConfig, UtilTable, _pick_util_tables, get_customs_config
+from ..utils.price_utils import get_round_step_rub
+
+
+logger = logging.getLogger(__name__)
+
+# Range tables of the scenario payload, keyed by payload name.
+_SCENARIO_RANGE_TABLES: Dict[str, Tuple[str, str, str]] = {
+    "excise_by_kw": ("from_kw", "to_kw", "rub_per_kw"),
+    "excise_by_hp": ("from_hp", "to_hp", "rub_per_hp"),
+}
+
+
+class CompiledRangeTable:
+    """Inclusive ``[lo, hi] -> value`` ranges with bisect lookups.
+
+    Lookups return the same row as a linear first-match scan: overlapping
+    tables (never the case for shipped configs) keep scanning linearly.
+    """
+
+    __slots__ = ("los", "his", "values", "_disjoint")
+
+    def __init__(self, ranges: Iterable[Tuple[float, float, Any]]) -> None:
+        ordered = [(float(lo), float(hi), value) for lo, hi, value in ranges]
+        items = sorted(ordered, key=lambda item: (item[0], item[1]))
+        self._disjoint = all(items[i + 1][0] > items[i][1] for i in range(len(items) - 1))
+        if not self._disjoint:
+            items = ordered
+        self.los: List[float] = [lo for lo, _, _ in items]
+        self.his: List[float] = [hi for _, hi, _ in items]
+        self.values: List[Any] = [value for _, _, value in items]
+
+    @classmethod
+    def from_mappings(
+        cls,
+        rows: Sequence[Dict[str, Any]],
+        from_key: str,
+        to_key: str,
+        value_key: str,
+    ) -> "CompiledRangeTable":
+        return cls((row[from_key], row[to_key], row[value_key]) for row in rows or [])
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def index_of(self, value: float) -> Optional[int]:
+        if self._disjoint:
+            idx = bisect_right(self.los, value) - 1
+            if idx >= 0 and value <= self.his[idx]:
+                return idx
+            return None
+        for idx, (lo, hi) in enumerate(zip(self.los, self.his)):
+            if lo <= value <= hi:
+                return idx
+        return None
+
+    def lookup(self, value: float, default: Any = None) -> Any:
+        idx = self.index_of(value)
+        return self.values[idx] if idx is not None else default
+
+
+class _CompiledUtilTable:
+    __slots__ = ("kw", "hp", "kw_first", "kw_last", "hp_first", "hp_last", "hp_head")
+
+    def __init__(self, table: UtilTable) -> None:
+        self.kw = CompiledRangeTable((r.from_, r.to, r) for r in table.kw)
+        self.hp = CompiledRangeTable((r.from_, r.to, r) for r in table.hp)
+        kw_sorted = sorted(table.kw, key=lambda r: r.from_)
+        hp_sorted = sorted(table.hp, key=lambda r: r.from_)
+        self.kw_first = kw_sorted[0] if kw_sorted else None
+        self.kw_last = kw_sorted[-1] if kw_sorted else None
+        self.hp_first = hp_sorted[0] if hp_sorted else None
+        self.hp_last = hp_sorted[-1] if hp_sorted else None
+        self.hp_head = table.hp[0] if table.hp else None
+
+    @staticmethod
+    def _clamp(first: Any, last: Any, val: float) -> Any:
+        # Mirrors customs_config._clamp_range_util, including the gap fallback.
+        if val < first.from_:
+            return first
+        if val > last.to:
+            return last
+        return first
+
+
+class CompiledCustoms:
+    """``CustomsConfig`` with duty/util tables turned into bisect lookups."""
+
+    def __init__(self, cfg: CustomsConfig) -> None:
+        self.source = cfg
+        self.version = cfg.version
+        self.duty = CompiledRangeTable((r.from_cc, r.to_cc, float(r.eur_per_cc)) for r in cfg.duty_eur_per_cc)
+        duty_sorted = sorted(cfg.duty_eur_per_cc, key=lambda r: r.from_cc)
+        self._duty_first = duty_sorted[0] if duty_sorted else None
+        self._duty_last = duty_sorted[-1] if duty_sorted else None
+        self.buckets = CompiledRangeTable((b.from_cc, b.to_cc, b) for b in cfg.util_cc_buckets)
+        buckets_sorted = sorted(cfg.util_cc_buckets, key=lambda b: b.from_cc)
+        self._bucket_first = buckets_sorted[0] if buckets_sorted else None
+        self._bucket_last = buckets_sorted[-1] if buckets_sorted else None
+        self._util: Dict[Tuple[Optional[str], str], _CompiledUtilTable] = {}
+        for age_bucket in (None, "under_3", "3_5", "electric"):
+            tables = _pick_util_tables(cfg, age_bucket)
+            for name, table in tables.items():
+                self._util[(age_bucket, name)] = _CompiledUtilTable(table)
+
+    def duty_eur(self, engine_cc: int) -> float:
+        rate = self.duty.lookup(engine_cc)
+        if rate is not None:
+            return float(engine_cc) * rate
+        if self._duty_first is None:
+            raise ValueError("duty_eur_per_cc not found for engine_cc")
+        if engine_cc < self._duty_first.from_cc:
+            logger.warning("duty_cc_below_range cc=%s using_min=%s", engine_cc, self._duty_first.from_cc)
+            return float(engine_cc) * float(self._duty_first.eur_per_cc)
+        logger.warning("duty_cc_above_range cc=%s using_max=%s", engine_cc, self._duty_last.to_cc)
+        return float(engine_cc) * float(self._duty_last.eur_per_cc)
+
+    def util_fee_rub(
+        self,
+        engine_cc: int,
+        kw: Optional[float],
+        hp: Optional[int],
+        age_bucket: Optional[str] = None,
+    ) -> int:
+        """Same contract as ``customs_config.calc_util_fee_rub``."""
+        bucket = self.buckets.lookup(engine_cc)
+        if bucket is None:
+            if self._bucket_first is None:
+                raise ValueError("util_cc_bucket not found for engine_cc")
+            if engine_cc < self._bucket_first.from_cc:
+                bucket = self._bucket_first
+                logger.warning("util_cc_below_range cc=%s using_min=%s", engine_cc, bucket.from_cc)
+            else:
+                bucket = self._bucket_last
+                logger.warning("util_cc_above_range cc=%s using_max=%s", engine_cc, bucket.to_cc)
+        table_key = age_bucket if age_bucket in {"under_3", "3_5", "electric"} else None
+        table = self._util.get((table_key, bucket.table))
+        if table is None:
+            raise ValueError(f"util table {bucket.table} not found")
+
+        use_kw = kw is not None and float(kw) > 0
+        rng = None
+        if use_kw:
+            rng = table.kw.lookup(float(kw))
+            if rng is None and hp is not None:
+                rng = table.hp.lookup(float(hp))
+            if rng is None and table.kw_first is not None:
+                rng = table._clamp(table.kw_first, table.kw_last, float(kw))
+                logger.warning("util_power_above_range cc=%s kw=%s age_bucket=%s", engine_cc, kw, age_bucket)
+        else:
+            if hp is None:
+                if table.hp_head is not None:
+                    logger.warning("util_fee_missing_power_cc=%s age_bucket=%s", engine_cc, age_bucket)
+                    rng = table.hp_head
+                else:
+                    raise ValueError("hp is required when kw is not provided")
+            else:
+                rng = table.hp.lookup(float(hp))
+            if rng is None and hp is not None and table.hp_first is not None:
+                rng = table._clamp(table.hp_first, table.hp_last, float(hp))
+                logger.warning("util_power_above_range cc=%s hp=%s age_bucket=%s", engine_cc, hp, age_bucket)
+        if rng is None:
+            raise ValueError("util range not found for provided power")
+        return int(rng.price_rub)
+
+
+def _memo_size() -> int:
+    try:
+        return max(0, int(os.getenv("CALC_MEMO_SIZE", "4096")))
+    except ValueError:
+        return 4096
+
+
+def _round_key(value: Any, digits: int = 2) -> Optional[float]:
+    if value is None:
+        return None
+    try:
+        return round(float(value), digits)
+    except (TypeError, ValueError):
+        return None
+
+
+class CompiledCalculatorConfig:
+    """A calculator config version prepared for repeated calculations.
+
+    Built once per stored config version (see
+    ``CalculatorConfigService.current_compiled``). Exposes ``payload`` and
+    ``version`` like the ORM row, so it can stand in for it.
+    """
+
+    def __init__(self, payload: Dict[str, Any], *, version: Optional[int] = None, source: Optional[str] = None) -> None:
+        self.payload = payload
+        self.version = version
+        self.source = source
+        self.meta_version = (payload.get("meta") or {}).get("version")
+        self._scenario_tables: Dict[str, Dict[str, CompiledRangeTable]] = {}
+        for key, cfg in (payload.get("scenarios") or {}).items():
+            if not isinstance(cfg, dict):
+                continue
+            self._scenario_tables[key] = {
+                name: CompiledRangeTable.from_mappings(cfg.get(name) or [], *keys)
+                for name, keys in _SCENARIO_RANGE_TABLES.items()
+            }
+        self._customs: Optional[CompiledCustoms] = None
+        self._memo: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def customs(self) -> CompiledCustoms:
+        source = get_customs_config()
+        compiled = self._customs
+        if compiled is None or compiled.source is not source:
+            compiled = CompiledCustoms(source)
+            self._customs = compiled
+            self.clear_memo()
+        return compiled
+
+    def scenario_tables(self, scenario_key: str) -> Dict[str, CompiledRangeTable]:
+        return self._scenario_tables.get(scenario_key, {})
+
+    def clear_memo(self) -> None:
+        with self._lock:
+            self._memo.clear()
+
+    def _memo_key(self, scenario_key: str, req: Any) -> tuple:
+        return (
+            scenario_key,
+            _round_key(req.price_net_eur),
+            int(req.engine_cc) if req.engine_cc else None,
+            _round_key(req.power_kw),
+            _round_key(req.power_hp),
+            _round_key(req.eur_rate or (self.payload.get("meta") or {}).get("eur_rate_default") or 95.0, 4),
+            get_round_step_rub(),
+        )
+
+    def calculate(self, req: Any) -> Dict[str, Any]:
+        """``calculator_runtime.calculate`` memoized per spec and rate.
+
+        The age only selects the scenario, so it is keyed through it.
+        Callers get a copy and may annotate it freely.
+        """
+        from .calculator_runtime import calculate, choose_scenario
+
+        customs = self.customs
+        limit = _memo_size()
+        if limit <= 0:
+            return calculate(self.payload, req, compiled=self)
+        key = (customs.version,) + self._memo_key(choose_scenario(req, self.payload), req)
+        with self._lock:
+            cached = self._memo.get(key)
+            if cached is not None:
+                self._memo.move_to_end(key)
+        if cached is None:
+            cached = calculate(self.payload, req, compiled=self)
+            with self._lock:
+                self._memo[key] = cached
+                while len(self._memo) > limit:
+                    self._memo.popitem(last=False)
+        return _copy_result(cached)
+
+
+def _copy_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    out = dict(result)
+    out["breakdown"] = [dict(item) for item in result.get("breakdown") or []]
+    return out
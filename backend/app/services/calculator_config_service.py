@@ -1,14 +1,67 @@
 from __future__ import annotations
 
-from typing import Optional
+import os
+import threading
+import time
+import weakref
+from dataclasses import dataclass
+from typing import Any, Iterable, Optional, Tuple
 from pathlib import Path
 
+from .calculator_compiled import CompiledCalculatorConfig
 from .calculator_config_loader import load_runtime_payload
 from sqlalchemy import select, func
 from sqlalchemy.orm import Session
 from ..models import CalculatorConfig
 
 
+DEFAULT_YAML_PATHS: Tuple[Path, ...] = (
+    Path("/app/backend/app/config/calculator.yml"),
+    Path("/app/config/calculator.yml"),
+    Path(__file__).resolve().parent.parent / "config" / "calculator.yml",
+)
+DEFAULT_XLSX_PATHS: Tuple[Path, ...] = (
+    Path("/app/Калькулятор Авто под заказ.xlsx"),
+    Path("/mnt/data/Калькулятор Авто под заказ.xlsx"),
+    Path(__file__).resolve().parent.parent / "resources" / "Калькулятор Авто под заказ.xlsx",
+)
+
+
+@dataclass
+class _CompiledEntry:
+    compiled: CompiledCalculatorConfig
+    yaml_sig: Optional[tuple]
+    checked_at: float
+
+
+# One compiled config per database (engine); dropped with the engine.
+_compiled_cache: "weakref.WeakKeyDictionary[Any, _CompiledEntry]" = weakref.WeakKeyDictionary()
+_compiled_lock = threading.Lock()
+
+
+def _recheck_sec() -> float:
+    try:
+        return float(os.getenv("CALC_CONFIG_RECHECK_SEC", "30"))
+    except ValueError:
+        return 30.0
+
+
+def _yaml_signature(paths: Iterable[Path]) -> Optional[tuple]:
+    for p in paths:
+        try:
+            st = Path(p).stat()
+        except OSError:
+            continue
+        return (str(p), st.st_mtime_ns, st.st_size)
+    return None
+
+
+def invalidate_compiled_calculator_config() -> None:
+    """Forget compiled configs (after an upload or in tests)."""
+    with _compiled_lock:
+        _compiled_cache.clear()
+
+
 class CalculatorConfigService:
     def __init__(self, db: Session) -> None:
         self.db = db
@@ -33,8 +86,62 @@ class CalculatorConfigService:
         self.db.add(cfg)
         self.db.commit()
         self.db.refresh(cfg)
+        invalidate_compiled_calculator_config()
         return cfg
 
+    def current_compiled(
+        self,
+        yaml_paths: Iterable[Path] = DEFAULT_YAML_PATHS,
+        xlsx_paths: Iterable[Path] = DEFAULT_XLSX_PATHS,
+    ) -> Optional[CompiledCalculatorConfig]:
+        """Compiled form of the active config, built once per config version.
+
+        Within ``CALC_CONFIG_RECHECK_SEC`` no I/O happens at all. After that
+        the YAML is re-parsed only if the file changed; otherwise a single
+        ``latest()`` query picks up new versions stored by other workers.
+        """
+        yaml_paths = tuple(yaml_paths)
+        bind = self.db.get_bind()
+        now = time.monotonic()
+        entry = _compiled_cache.get(bind)
+        if entry is not None and now - entry.checked_at < _recheck_sec():
+            return entry.compiled
+
+        yaml_sig = _yaml_signature(yaml_paths)
+        cfg = None
+        if entry is not None and yaml_sig == entry.yaml_sig:
+            latest = self.latest()
+            # A non-YAML latest row is replaced by the YAML config, exactly
+            # as ensure_default_from_yaml would do.
+            if latest is not None and (yaml_sig is None or latest.source == "yaml"):
+                cfg = latest
+        if not cfg:
+            for p in yaml_paths:
+                cfg = self.ensure_default_from_yaml(p)
+                if cfg:
+                    break
+        if not cfg:
+            for p in xlsx_paths:
+                cfg = self.ensure_default_from_path(p)
+                if cfg:
+                    break
+        if not cfg:
+            return None
+
+        version = getattr(cfg, "version", None)
+        if (
+            entry is not None
+            and version is not None
+            and entry.compiled.version == version
+            and entry.compiled.payload == cfg.payload
+        ):
+            compiled = entry.compiled
+        else:
+            compiled = CompiledCalculatorConfig(cfg.payload, version=version, source=getattr(cfg, "source", None))
+        with _compiled_lock:
+            _compiled_cache[bind] = _CompiledEntry(compiled=compiled, yaml_sig=yaml_sig, checked_at=now)
+        return compiled
+
     def ensure_default_from_path(self, path) -> CalculatorConfig | None:
         """If no configs exist, try to load from provided Excel path."""
         if self.latest():
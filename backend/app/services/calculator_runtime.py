@@ -166,15 +166,25 @@ def _percent_fixed(amount: Decimal, cfg: Dict[str, Any]) -> Decimal:
     return amount * percent + fixed
 
 
-def _calc_excise_rub(power_kw: Optional[float], power_hp: Optional[float], cfg: Dict[str, Any]) -> Decimal:
+def _calc_excise_rub(
+    power_kw: Optional[float],
+    power_hp: Optional[float],
+    cfg: Dict[str, Any],
+    tables: Optional[Dict[str, Any]] = None,
+) -> Decimal:
+    def _rate(value: float, name: str, from_key: str, to_key: str, value_key: str):
+        if tables and name in tables:
+            return tables[name].lookup(value)
+        return lookup_range(value, cfg.get(name, []), from_key, to_key, value_key)
+
     if power_kw is not None and float(power_kw) > 0:
-        rate = lookup_range(float(power_kw), cfg.get("excise_by_kw", []), "from_kw", "to_kw", "rub_per_kw")
+        rate = _rate(float(power_kw), "excise_by_kw", "from_kw", "to_kw", "rub_per_kw")
         if not rate:
             return Decimal("0")
         return Decimal(str(rate)) * Decimal(str(power_kw))
     if power_hp is None:
         return Decimal("0")
-    rate = lookup_range(float(power_hp), cfg.get("excise_by_hp", []), "from_hp", "to_hp", "rub_per_hp")
+    rate = _rate(float(power_hp), "excise_by_hp", "from_hp", "to_hp", "rub_per_hp")
     if not rate:
         return Decimal("0")
     return Decimal(str(rate)) * Decimal(str(power_hp))
@@ -203,7 +213,12 @@ LABELS = {
 }
 
 
-def calculate(payload: Dict[str, Any], req: EstimateRequest) -> Dict[str, Any]:
+def calculate(payload: Dict[str, Any], req: EstimateRequest, *, compiled: Any = None) -> Dict[str, Any]:
+    """Price breakdown for ``req``.
+
+    ``compiled`` (a ``CompiledCalculatorConfig`` built from ``payload``)
+    switches the duty/util/excise range lookups to its bisect tables.
+    """
     def d(x) -> Decimal:
         if x is None:
             return Decimal("0")
@@ -315,17 +330,28 @@ def calculate(payload: Dict[str, Any], req: EstimateRequest) -> Dict[str, Any]:
                 breakdown.append({"title": LABELS.get(k, k), "amount": out(v), "currency": "RUB"})
 
         customs_cfg = get_customs_config()
+        customs_tables = compiled.customs if compiled is not None else None
         duty_rub = Decimal("0")
         # железобетонно: under_3 НИКОГДА не включает пошлину РФ
         if scenario_key != "under_3" and cfg.get("duty_enabled", True):
-            duty_eur = calc_duty_eur(req.engine_cc, customs_cfg)
+            if customs_tables is not None:
+                duty_eur = customs_tables.duty_eur(req.engine_cc)
+            else:
+                duty_eur = calc_duty_eur(req.engine_cc, customs_cfg)
             duty_rub = Decimal(str(duty_eur)) * eur_rate
 
         power_kw_val = float(req.power_kw) if req.power_kw is not None else None
         power_hp_val = float(req.power_hp) if req.power_hp is not None else None
         has_power = bool((power_kw_val and power_kw_val > 0) or (power_hp_val and power_hp_val > 0))
         util_rub = None
-        if has_power:
+        if has_power and customs_tables is not None:
+            util_rub = customs_tables.util_fee_rub(
+                req.engine_cc,
+                power_kw_val,
+                int(power_hp_val) if power_hp_val is not None else None,
+                age_bucket=scenario_key,
+            )
+        elif has_power:
             util_rub = calc_util_fee_rub(
                 engine_cc=req.engine_cc,
                 kw=power_kw_val,
@@ -383,6 +409,7 @@ def calculate(payload: Dict[str, Any], req: EstimateRequest) -> Dict[str, Any]:
             float(power_kw) if power_kw is not None else None,
             float(power_hp) if power_hp is not None else None,
             cfg,
+            compiled.scenario_tables(scenario_key) if compiled is not None else None,
         )
     else:
         excise_rub = Decimal("0")
@@ -390,7 +417,14 @@ def calculate(payload: Dict[str, Any], req: EstimateRequest) -> Dict[str, Any]:
     vat_rub = vat_base * d(cfg.get("vat_percent"))
 
     util_rub: int | None = None
-    if has_power:
+    if has_power and compiled is not None:
+        util_rub = compiled.customs.util_fee_rub(
+            req.engine_cc or 0,
+            float(power_kw) if power_kw is not None else None,
+            int(power_hp) if power_hp is not None else None,
+            age_bucket="electric",
+        )
+    elif has_power:
         customs_cfg = get_customs_config()
         util_rub = calc_util_fee_rub(
             engine_cc=req.engine_cc or 0,
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, defer, selectinload
+
+from ..models import Car
+
+
+# Projection profiles, ordered from lightest to richest. A row cached under a
+# richer profile satisfies requests for a lighter one.
+CAR_LOAD_PROFILES: Tuple[str, ...] = ("card", "detail", "admin")
+
+# Columns cards never render. calc_breakdown_json stays: the public display
+# price and its note are resolved from it.
+_CARD_DEFERRED_COLUMNS = (
+    Car.source_payload,
+    Car.description,
+    Car.vin,
+    Car.hash,
+    Car.inferred_source_car_id,
+    Car.inferred_confidence,
+    Car.inferred_rule,
+    Car.spec_inferred_at,
+    Car.first_seen_at,
+    Car.last_seen_at,
+)
+
+_IDENTITY_CACHE_KEY = "car_loader_identity"
+# Request sessions stay far below this; long-lived script sessions would
+# otherwise pin every car they ever loaded.
+_IDENTITY_CACHE_MAX = 2000
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _drop_identity_cache(session: Session) -> None:
+    # Commit/rollback expires the cached rows, so reusing them would only
+    # trade the batch query for per-row refreshes.
+    session.info.pop(_IDENTITY_CACHE_KEY, None)
+
+
+def _profile_rank(profile: str) -> int:
+    try:
+        return CAR_LOAD_PROFILES.index(profile)
+    except ValueError:
+        raise ValueError(f"unknown car load profile: {profile!r}") from None
+
+
+def car_profile_options(profile: str = "card") -> List[Any]:
+    """Loader options for ``select(Car)`` matching ``profile``."""
+    rank = _profile_rank(profile)
+    options: List[Any] = [selectinload(Car.images)]
+    if rank == 0:
+        options.extend(defer(column) for column in _CARD_DEFERRED_COLUMNS)
+        return options
+    if profile == "admin":
+        options.append(selectinload(Car.source))
+    return options
+
+
+def _normalize_ids(ids: Iterable[Any]) -> List[int]:
+    out: List[int] = []
+    seen: set[int] = set()
+    for raw in ids:
+        try:
+            car_id = int(raw)
+        except (TypeError, ValueError):
+            continue
+        if car_id <= 0 or car_id in seen:
+            continue
+        seen.add(car_id)
+        out.append(car_id)
+    return out
+
+
+class CarBatchLoader:
+    """Load cars by id in one round trip, preserving the caller's order.
+
+    With ``use_cache`` rows are remembered on ``Session.info`` — sessions are
+    per request (``get_db``), so home blocks sharing cars reuse the same rows.
+    The cache is bounded and dropped on commit/rollback.
+    """
+
+    def __init__(self, db: Session) -> None:
+        self.db = db
+
+    def _identity_cache(self) -> Dict[int, Tuple[int, Car]]:
+        return self.db.info.setdefault(_IDENTITY_CACHE_KEY, {})
+
+    def load(
+        self,
+        ids: Iterable[Any],
+        *,
+        profile: str = "card",
+        use_cache: bool = True,
+    ) -> List[Car]:
+        rank = _profile_rank(profile)
+        wanted = _normalize_ids(ids)
+        if not wanted:
+            return []
+        cache = self._identity_cache() if use_cache else {}
+        found: Dict[int, Car] = {}
+        missing: List[int] = []
+        for car_id in wanted:
+            entry = cache.get(car_id)
+            if entry is not None and entry[0] >= rank:
+                found[car_id] = entry[1]
+            else:
+                missing.append(car_id)
+        if missing:
+            stmt = select(Car).options(*car_profile_options(profile)).where(Car.id.in_(missing))
+            if use_cache and len(cache) + len(missing) > _IDENTITY_CACHE_MAX:
+                cache.clear()
+            for car in self.db.execute(stmt).scalars().unique().all():
+                found[int(car.id)] = car
+                if use_cache:
+                    cache[int(car.id)] = (rank, car)
+        return [found[car_id] for car_id in wanted if car_id in found]
+
+    def load_one(self, car_id: Any, *, profile: str = "detail", use_cache: bool = True) -> Optional[Car]:
+        items = self.load([car_id], profile=profile, use_cache=use_cache)
+        return items[0] if items else None
+
+
+def load_cars_by_ids(
+    db: Session,
+    ids: Iterable[Any],
+    *,
+    profile: str = "card",
+    use_cache: bool = True,
+) -> List[Car]:
+    return CarBatchLoader(db).load(ids, profile=profile, use_cache=use_cache)
@@ -2,8 +2,7 @@ from __future__ import annotations
 
 from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime
-from pathlib import Path
-from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.orm import Session
 from sqlalchemy import select, func, and_, or_, case, cast, String, text, literal, not_, Integer
 from sqlalchemy.exc import ProgrammingError
 from sqlalchemy.dialects.postgresql import JSONB
@@ -14,7 +13,6 @@ import unicodedata
 logger = logging.getLogger(__name__)
 import re
 import os
-import requests
 import time
 from ..models import Car, Source, FeaturedCar
 from ..utils.localization import display_color
@@ -42,18 +40,21 @@ from ..utils.taxonomy import (
     parse_interior_trim_token,
 )
 from ..utils.breakdown_labels import label_for
+from ..utils.memo import memoize_normalizer
 from ..utils.price_utils import (
+    annotate_display_prices_vectorized,
     ceil_to_step,
     get_round_step_rub,
-    price_without_util_note,
+    public_display_price_fields,
     raw_price_to_rub,
-    resolve_public_display_price_rub,
-    sort_items_by_display_price,
 )
 from .calculator_config_service import CalculatorConfigService
 from .calculator import get_util_fee_rub as legacy_util_fee_rub
-from .calculator_runtime import EstimateRequest, calculate, is_bev
+from .calculator_runtime import EstimateRequest, is_bev
 from .customs_config import calc_util_fee_rub, get_customs_config
+from .car_loader import CarBatchLoader, car_profile_options
+from .approx_count import approximate_count
+from .fx_rates_service import current_fx_rates, fx_signature
 
 BRAND_ALIASES = {
     "alfa": "Alfa Romeo",
@@ -89,6 +90,7 @@ _FREE_TEXT_FUEL_MAP = {
 }
 
 
+@memoize_normalizer
 def normalize_brand(value: Optional[str]) -> str:
     if not value:
         return ""
@@ -353,6 +355,9 @@ class CarsService:
         self.logger = logging.getLogger(__name__)
         self._filtered_models_cache: Dict[tuple, List[Dict[str, Any]]] = {}
         self._resolved_model_alias_cache: Dict[tuple, List[str]] = {}
+        # Whether the total of the last list_cars() call is an estimate / was skipped.
+        self.last_count_approximate = False
+        self.last_count_deferred = False
 
     def _available_expr(self):
         base = Car.is_available.is_(True)
@@ -497,10 +502,9 @@ class CarsService:
 
     @classmethod
     def _effective_registration_year_expr(cls):
-        return case(
-            (cls._registration_uses_model_year_expr(), Car.year),
-            else_=Car.registration_year,
-        )
+        # Legacy KR rows with a persisted fallback year were reset to NULL by
+        # migration 0044, so the stored COALESCE matches the defaulted rules.
+        return Car.effective_reg_year
 
     @classmethod
     def _effective_registration_month_floor_expr(cls):
@@ -719,7 +723,7 @@ class CarsService:
         return self._fallback_model_label(brand, raw_model)
 
     def _power_hp_expr(self):
-        return func.coalesce(Car.power_hp, Car.inferred_power_hp)
+        return Car.effective_power_hp
 
     def _power_hp_bucket_expr(self):
         power_expr = self._power_hp_expr()
@@ -1233,6 +1237,24 @@ class CarsService:
     _fx_cache: dict | None = None
     _fx_cache_ts: float | None = None
     _count_cache: TTLCache = TTLCache(maxsize=1024, ttl=120)
+    _approx_count_cache: TTLCache = TTLCache(maxsize=512, ttl=600)
+
+    def _approximate_total(self, count_key: tuple, where_expr: Any) -> Optional[int]:
+        """Estimated total for broad filters, or ``None`` when an exact count is due."""
+        estimate = self._approx_count_cache.get(count_key)
+        if estimate is None:
+            try:
+                # Savepoint: a failed EXPLAIN/TABLESAMPLE must not abort the request transaction.
+                with self.db.begin_nested():
+                    estimate = approximate_count(self.db, where_expr)
+            except Exception:
+                self.logger.exception("approx_count_failed filters=%s", count_key)
+                return None
+            if estimate is None:
+                return None
+            self._approx_count_cache[count_key] = estimate
+        self.last_count_approximate = True
+        return estimate.value
 
     def _can_fast_count(
         self,
@@ -1632,44 +1654,12 @@ class CarsService:
         return out
 
     def get_fx_rates(self, *, allow_fetch: bool = True) -> dict | None:
-        now = time.time()
-        ttl_sec = 3600
-        if self._fx_cache and self._fx_cache_ts and now - self._fx_cache_ts < ttl_sec:
+        # Rates come from the process-wide snapshot kept fresh by
+        # fx_rates_service; request code never fetches. ``allow_fetch`` is
+        # accepted for older callers. Scripts may pin rates via _fx_cache.
+        if self._fx_cache:
             return self._fx_cache
-        if not allow_fetch:
-            return self._fx_cache or {}
-        fx_add_rub = float(os.environ.get("FX_ADD_RUB", "4.0"))
-        eur_env = float(os.environ.get("EURO_RATE", "95.0")) + fx_add_rub
-        usd_env = float(os.environ.get("USD_RATE", "85.0")) + fx_add_rub
-        cny_env = float(os.environ.get("CNY_RATE", "12.0")) + fx_add_rub
-        eur, usd, cny = eur_env, usd_env, cny_env
-        cached = self._fx_cache
-
-        def _rate(data: dict, code: str, default: float) -> float:
-            try:
-                row = data["Valute"][code]
-                value = float(row["Value"])
-                nominal = float(row.get("Nominal") or 1.0) or 1.0
-                return (value / nominal) + fx_add_rub
-            except Exception:
-                return default
-
-        try:
-            res = requests.get(
-                "https://www.cbr-xml-daily.ru/daily_json.js",
-                timeout=(0.3, 0.7),
-            )
-            data = res.json()
-            eur = _rate(data, "EUR", eur_env)
-            usd = _rate(data, "USD", usd_env)
-            cny = _rate(data, "CNY", cny_env)
-            self._fx_cache = {"EUR": eur, "USD": usd, "CNY": cny, "RUB": 1.0}
-            self._fx_cache_ts = now
-            return self._fx_cache
-        except Exception:
-            if cached:
-                return cached
-            return {"EUR": eur_env, "USD": usd_env, "CNY": cny_env, "RUB": 1.0}
+        return current_fx_rates(self.db)
 
     def _raw_price_rub_expr(self):
         rates = self.get_fx_rates() or {}
@@ -1791,6 +1781,41 @@ class CarsService:
             else_=base_price,
         )
 
+    def _display_price_column_enabled(self) -> bool:
+        # Opt-in until scripts/update_fx_prices has backfilled display_price_rub
+        # on an existing database; rows not synced yet sort as "no price".
+        return os.getenv("CATALOG_DISPLAY_PRICE_COLUMN", "0") == "1"
+
+    def _stored_display_price_order_clause(self, sort: Optional[str]) -> List[Any]:
+        if sort == "price_desc":
+            return [
+                Car.display_price_group.asc().nullslast(),
+                Car.display_price_rub.desc().nullslast(),
+                Car.id.asc(),
+            ]
+        return [
+            Car.display_price_group.asc().nullslast(),
+            Car.display_price_rub.asc().nullslast(),
+            Car.id.asc(),
+        ]
+
+    def sync_display_price_columns(self, car: Car, rates: dict | None = None) -> None:
+        """Recompute ``display_price_rub``/``display_price_group`` on ``car`` (no commit)."""
+        fx = rates if rates is not None else (self.get_fx_rates(allow_fetch=False) or {})
+        display, group = public_display_price_fields(
+            car.total_price_rub_cached,
+            car.price_rub_cached,
+            calc_breakdown=car.calc_breakdown_json,
+            raw_price=car.price,
+            currency=car.currency,
+            country=car.country,
+            fx_eur=float(fx.get("EUR") or 0),
+            fx_usd=float(fx.get("USD") or 0),
+            fx_cny=float(fx.get("CNY") or 0),
+        )
+        car.display_price_rub = display
+        car.display_price_group = group
+
     def _cheap_light_price_order_clause(self, sort: Optional[str]) -> List[Any]:
         price_expr = self._cheap_public_price_sort_expr()
         if sort == "price_desc":
@@ -1807,6 +1832,8 @@ class CarsService:
     ) -> bool:
         if not light or sort not in {"price_asc", "price_desc"}:
             return False
+        if self._display_price_column_enabled():
+            return False
         try:
             max_page = max(1, int(os.getenv("CATALOG_LIGHT_PRICE_WINDOW_MAX_PAGE", "5") or 5))
         except Exception:
@@ -2353,13 +2380,13 @@ class CarsService:
             if drive_values:
                 conditions.append(or_(*[drive_expr == value for value in drive_values]))
         if power_hp_min is not None and "power_hp_min" not in exclude:
-            conditions.append(Car.power_hp >= power_hp_min)
+            conditions.append(Car.effective_power_hp >= power_hp_min)
         if power_hp_max is not None and "power_hp_max" not in exclude:
-            conditions.append(Car.power_hp <= power_hp_max)
+            conditions.append(Car.effective_power_hp <= power_hp_max)
         if engine_cc_min is not None and "engine_cc_min" not in exclude:
-            conditions.append(Car.engine_cc >= engine_cc_min)
+            conditions.append(Car.effective_engine_cc >= engine_cc_min)
         if engine_cc_max is not None and "engine_cc_max" not in exclude:
-            conditions.append(Car.engine_cc <= engine_cc_max)
+            conditions.append(Car.effective_engine_cc <= engine_cc_max)
         if condition and "condition" not in exclude:
             cond = condition.strip().lower()
             if cond == "new":
@@ -2386,6 +2413,116 @@ class CarsService:
             "strict_local_photo_mode": strict_local_photo_mode,
         }
 
+    def _list_items_stmt(
+        self,
+        where_expr: Any,
+        *,
+        sort: Optional[str],
+        page: int,
+        page_size: int,
+        light: bool,
+    ) -> Any:
+        use_light_price_window_sort = self._should_use_light_price_window_sort(
+            sort=sort,
+            light=light,
+            page=page,
+            page_size=page_size,
+        )
+        order_clause = (
+            self._cheap_light_price_order_clause(sort)
+            if use_light_price_window_sort
+            else self._list_order_clause(sort)
+        )
+
+        thumb_rank = case(
+            (
+                or_(
+                    and_(Car.thumbnail_local_path.is_not(None), Car.thumbnail_local_path != ""),
+                    and_(Car.thumbnail_url.is_not(None), Car.thumbnail_url != ""),
+                ),
+                1,
+            ),
+            else_=0,
+        ).desc()
+        # For large price sorts in light mode, avoid extra DB sorting by thumbnail rank
+        # to keep first-page latency low. We'll push no-photo items to the end in-memory.
+        use_thumb_rank = not light or sort not in ("price_asc", "price_desc")
+        if light:
+            stmt = (
+                select(
+                    Car.id,
+                    Car.brand,
+                    Car.model,
+                    Car.variant,
+                    Car.year,
+                    Car.registration_year,
+                    Car.registration_month,
+                    Car.mileage,
+                    Car.total_price_rub_cached,
+                    Car.price_rub_cached,
+                    Car.calc_breakdown_json,
+                    Car.calc_updated_at,
+                    Car.updated_at,
+                    Car.spec_inferred_at,
+                    Car.price,
+                    Car.currency,
+                    Car.thumbnail_url,
+                    Car.thumbnail_local_path,
+                    Car.country,
+                    Car.source_id,
+                    Car.color,
+                    Car.body_type,
+                    Car.engine_type,
+                    Car.transmission,
+                    Car.drive_type,
+                    Car.engine_cc,
+                    Car.power_hp,
+                    Car.power_kw,
+                    Car.inferred_engine_cc,
+                    Car.inferred_power_hp,
+                    Car.inferred_power_kw,
+                )
+                .where(where_expr)
+                .order_by(*(([thumb_rank] if use_thumb_rank else [])), *order_clause)
+            )
+            if use_light_price_window_sort:
+                stmt = stmt.limit(self._light_price_window_limit(page=page, page_size=page_size))
+            else:
+                stmt = stmt.offset((page - 1) * page_size).limit(page_size)
+        else:
+            stmt = (
+                select(Car)
+                .where(where_expr)
+                .order_by(thumb_rank, *order_clause)
+                .offset((page - 1) * page_size)
+                .limit(page_size)
+            )
+        return stmt
+
+    def catalog_query_statements(
+        self,
+        *,
+        sort: Optional[str] = None,
+        page: int = 1,
+        page_size: int = 20,
+        light: bool = True,
+        **filters: Any,
+    ) -> Dict[str, Any]:
+        """Exact-count and page statements ``list_cars`` would run for ``filters``.
+
+        Used by the query-plan guard; nothing is executed here apart from what
+        ``_build_list_conditions`` needs to resolve sources.
+        """
+        for key in ("color", "interior_design", "interior_color", "interior_material"):
+            if filters.get(key):
+                filters[key] = normalize_csv_values(filters[key]) or filters[key]
+        conditions, _ = self._build_list_conditions(**filters)
+        where_expr = and_(*conditions) if conditions else None
+        return {
+            "count": select(func.count()).select_from(Car).where(where_expr),
+            "list": self._list_items_stmt(where_expr, sort=sort, page=page, page_size=page_size, light=light),
+        }
+
     def list_cars(
         self,
         *,
@@ -2438,7 +2575,13 @@ class CarsService:
         count_only: bool = False,
         use_fast_count: bool = True,
         hide_no_local_photo: bool = False,
-    ) -> Tuple[List[Car] | List[dict], int]:
+        allow_approximate_count: bool = False,
+        defer_count: bool = False,
+    ) -> Tuple[List[Car] | List[dict], Optional[int]]:
+        """Page of cars and the total; with ``defer_count`` the total is ``None``
+        (and ``last_count_deferred`` set) unless it is already cached."""
+        self.last_count_approximate = False
+        self.last_count_deferred = False
         normalized_color = normalize_csv_values(color) or color
         normalized_interior_design = normalize_csv_values(interior_design) or interior_design
         normalized_interior_color = normalize_csv_values(interior_color) or interior_color
@@ -2764,12 +2907,20 @@ class CarsService:
                     brand=brand,
                     model=model,
                 )
-            if total is None:
-                total_stmt = select(func.count()).select_from(Car).where(where_expr)
-                total = self.db.execute(total_stmt).scalar_one()
-            self._count_cache[count_key] = total
-            if redis_count_key:
-                redis_set_json(redis_count_key, int(total), ttl_sec=1800)
+            if total is None and defer_count and not count_only:
+                # The caller computes the count in the background (split mode).
+                self.last_count_deferred = True
+            else:
+                if total is None and allow_approximate_count:
+                    total = self._approximate_total(count_key, where_expr)
+                if total is None:
+                    total_stmt = select(func.count()).select_from(Car).where(where_expr)
+                    total = self.db.execute(total_stmt).scalar_one()
+                # Estimates stay out of the shared count caches: count endpoints read them as exact.
+                if not self.last_count_approximate:
+                    self._count_cache[count_key] = total
+                    if redis_count_key:
+                        redis_set_json(redis_count_key, int(total), ttl_sec=1800)
             elapsed = time.perf_counter() - total_t0
             if elapsed > 2:
                 self.logger.warning("count_slow total=%.3fs filters=%s", elapsed, count_key)
@@ -2785,75 +2936,7 @@ class CarsService:
             page=page,
             page_size=page_size,
         )
-        order_clause = (
-            self._cheap_light_price_order_clause(sort)
-            if use_light_price_window_sort
-            else self._list_order_clause(sort)
-        )
-
-        thumb_rank = case(
-            (
-                or_(
-                    and_(Car.thumbnail_local_path.is_not(None), Car.thumbnail_local_path != ""),
-                    and_(Car.thumbnail_url.is_not(None), Car.thumbnail_url != ""),
-                ),
-                1,
-            ),
-            else_=0,
-        ).desc()
-        # For large price sorts in light mode, avoid extra DB sorting by thumbnail rank
-        # to keep first-page latency low. We'll push no-photo items to the end in-memory.
-        use_thumb_rank = not light or sort not in ("price_asc", "price_desc")
-        if light:
-            stmt = (
-                select(
-                    Car.id,
-                    Car.brand,
-                    Car.model,
-                    Car.variant,
-                    Car.year,
-                    Car.registration_year,
-                    Car.registration_month,
-                    Car.mileage,
-                    Car.total_price_rub_cached,
-                    Car.price_rub_cached,
-                    Car.calc_breakdown_json,
-                    Car.calc_updated_at,
-                    Car.updated_at,
-                    Car.spec_inferred_at,
-                    Car.price,
-                    Car.currency,
-                    Car.thumbnail_url,
-                    Car.thumbnail_local_path,
-                    Car.country,
-                    Car.source_id,
-                    Car.color,
-                    Car.body_type,
-                    Car.engine_type,
-                    Car.transmission,
-                    Car.drive_type,
-                    Car.engine_cc,
-                    Car.power_hp,
-                    Car.power_kw,
-                    Car.inferred_engine_cc,
-                    Car.inferred_power_hp,
-                    Car.inferred_power_kw,
-                )
-                .where(where_expr)
-                .order_by(*(([thumb_rank] if use_thumb_rank else [])), *order_clause)
-            )
-            if use_light_price_window_sort:
-                stmt = stmt.limit(self._light_price_window_limit(page=page, page_size=page_size))
-            else:
-                stmt = stmt.offset((page - 1) * page_size).limit(page_size)
-        else:
-            stmt = (
-                select(Car)
-                .where(where_expr)
-                .order_by(thumb_rank, *order_clause)
-                .offset((page - 1) * page_size)
-                .limit(page_size)
-            )
+        stmt = self._list_items_stmt(where_expr, sort=sort, page=page, page_size=page_size, light=light)
         if os.environ.get("CAR_API_TIMING", "0") == "1" and os.environ.get("CAR_API_SQL", "0") == "1":
             try:
                 compiled = stmt.compile(compile_kwargs={"literal_binds": True})
@@ -2883,7 +2966,9 @@ class CarsService:
         # Guard against stale/undercounted fast_count: ensure total >= offset+items
         try:
             offset = (page - 1) * page_size
-            if total is not None and total < (offset + len(items)):
+            if total is not None and total < (offset + len(items)) and self.last_count_approximate:
+                total = offset + len(items)
+            elif total is not None and total < (offset + len(items)):
                 total_stmt = select(func.count()).select_from(Car).where(where_expr)
                 total = self.db.execute(total_stmt).scalar_one()
                 self._count_cache[count_key] = total
@@ -2916,34 +3001,23 @@ class CarsService:
                     row["engine_cc"] = effective_engine_cc_value(row)
                     row["power_hp"] = effective_power_hp_value(row)
                     row["power_kw"] = effective_power_kw_value(row)
-                if use_light_price_window_sort:
+                stored_price_sort = (
+                    sort in {"price_asc", "price_desc"} and self._display_price_column_enabled()
+                )
+                if use_light_price_window_sort or stored_price_sort:
                     fx_rates = self.get_fx_rates(allow_fetch=False) or self.get_fx_rates() or {}
-                    fx_eur = float(fx_rates.get("EUR") or 0)
-                    fx_usd = float(fx_rates.get("USD") or 0)
-                    fx_cny = float(fx_rates.get("CNY") or 0)
-                    for row in items:
-                        if not isinstance(row, dict):
-                            continue
-                        row["display_price_rub"] = resolve_public_display_price_rub(
-                            row.get("total_price_rub_cached"),
-                            row.get("price_rub_cached"),
-                            calc_breakdown=row.get("calc_breakdown_json"),
-                            raw_price=row.get("price"),
-                            currency=row.get("currency"),
-                            fx_eur=fx_eur,
-                            fx_usd=fx_usd,
-                            fx_cny=fx_cny,
-                        )
-                        row["price_note"] = price_without_util_note(
-                            display_price=row.get("display_price_rub"),
-                            total_price_rub_cached=row.get("total_price_rub_cached"),
-                            calc_breakdown=row.get("calc_breakdown_json"),
-                            region=region,
-                            country=row.get("country"),
-                        )
-                    sort_items_by_display_price(items, sort=sort)
-                    offset = max(0, (page - 1) * page_size)
-                    items = items[offset: offset + page_size]
+                    items = annotate_display_prices_vectorized(
+                        items,
+                        # The DB already ordered the page by the stored columns.
+                        sort=sort if use_light_price_window_sort else None,
+                        region=region,
+                        fx_eur=float(fx_rates.get("EUR") or 0),
+                        fx_usd=float(fx_rates.get("USD") or 0),
+                        fx_cny=float(fx_rates.get("CNY") or 0),
+                    )
+                    if use_light_price_window_sort:
+                        offset = max(0, (page - 1) * page_size)
+                        items = items[offset: offset + page_size]
             if self._should_catalog_inline_price_refresh(page=page, page_size=page_size):
                 try:
                     if light:
@@ -2961,15 +3035,7 @@ class CarsService:
         return None
 
     def _fx_signature(self, rates: dict[str, Any] | None = None) -> str | None:
-        fx = rates if rates is not None else (self.get_fx_rates() or {})
-        try:
-            eur = float(fx.get("EUR") or 0)
-            usd = float(fx.get("USD") or 0)
-        except Exception:
-            return None
-        if eur <= 0 and usd <= 0:
-            return None
-        return f"eur:{eur:.4f}|usd:{usd:.4f}"
+        return fx_signature(rates if rates is not None else (self.get_fx_rates() or {}))
 
     def _load_lazy_recalc_versions(self) -> tuple[bool, str | None, str | None, str | None]:
         lazy_enabled = os.getenv("LAZY_RECALC_ENABLED", "1") != "0"
@@ -2985,17 +3051,7 @@ class CarsService:
 
         cfg_version = None
         try:
-            cfg_svc = CalculatorConfigService(self.db)
-            cfg = None
-            yaml_paths = [
-                Path("/app/backend/app/config/calculator.yml"),
-                Path("/app/config/calculator.yml"),
-                Path(__file__).resolve().parent.parent / "config" / "calculator.yml",
-            ]
-            for p in yaml_paths:
-                cfg = cfg_svc.ensure_default_from_yaml(p)
-                if cfg:
-                    break
+            cfg = CalculatorConfigService(self.db).current_compiled()
             if cfg:
                 cfg_version = cfg.payload.get("meta", {}).get("version")
         except Exception:
@@ -3531,6 +3587,7 @@ class CarsService:
             _upsert_version(car.calc_breakdown_json, "__customs_version", customs_version or "")
             _upsert_version(car.calc_breakdown_json, "__fx_signature", fx_signature or "")
             car.calc_updated_at = datetime.utcnow()
+            self.sync_display_price_columns(car, fx_local)
             self.db.commit()
             self.logger.info("calc_fallback_total car=%s reason=%s", car.id, reason)
             return {"total_rub": total, "breakdown": car.calc_breakdown_json or []}
@@ -3663,28 +3720,8 @@ class CarsService:
             reg_month = fallback_reg_month
             reg_fallback_missing = True
         # кеш
-        cfg_svc = CalculatorConfigService(self.db)
-        cfg = None
-        yaml_paths = [
-            Path("/app/backend/app/config/calculator.yml"),
-            Path("/app/config/calculator.yml"),
-            Path(__file__).resolve().parent.parent / "config" / "calculator.yml",
-        ]
-        for p in yaml_paths:
-            cfg = cfg_svc.ensure_default_from_yaml(p)
-            if cfg:
-                break
-        if not cfg:
-            # fallback to legacy Excel bootstrap only if YAML is missing
-            base_paths = [
-                Path("/app/Калькулятор Авто под заказ.xlsx"),
-                Path("/mnt/data/Калькулятор Авто под заказ.xlsx"),
-                Path(__file__).resolve().parent.parent / "resources" / "Калькулятор Авто под заказ.xlsx",
-            ]
-            for p in base_paths:
-                cfg = cfg_svc.ensure_default_from_path(p)
-                if cfg:
-                    break
+        # YAML first, legacy Excel bootstrap only if YAML is missing.
+        cfg = CalculatorConfigService(self.db).current_compiled()
         if not cfg:
             return None
         cfg_version = cfg.payload.get("meta", {}).get("version")
@@ -3779,7 +3816,7 @@ class CarsService:
                 reg_month=reg_month,
             )
             try:
-                result = calculate(cfg.payload, req)
+                result = cfg.calculate(req)
             except Exception:
                 self.logger.exception("calc_failed car=%s src=%s", car.id, getattr(car.source, "key", None))
                 return _fallback_total("calc_failed")
@@ -3810,12 +3847,12 @@ class CarsService:
         car.total_price_rub_cached = total_rub
         car.calc_breakdown_json = display
         car.calc_updated_at = datetime.utcnow()
+        self.sync_display_price_columns(car)
         self.db.commit()
         return {"total_rub": total_rub, "breakdown": display, "vat_reclaim": vat_reclaim, "used_price": used_price, "used_currency": used_currency}
 
     def get_car(self, car_id: int) -> Optional[Car]:
-        stmt = select(Car).options(selectinload(Car.images)).where(Car.id == car_id)
-        return self.db.execute(stmt).scalar_one_or_none()
+        return CarBatchLoader(self.db).load_one(car_id, profile="detail")
 
     def brands(self, country: Optional[str] = None) -> List[str]:
         filters: Dict[str, Any] = {"country": country} if country else {}
@@ -3916,15 +3953,45 @@ class CarsService:
                 break
         return sorted(results)
 
+    def _payload_catalog_values(
+        self,
+        keys: List[str],
+        *,
+        limit: int,
+        region: Optional[str] = None,
+        country: Optional[str] = None,
+        brand: Optional[str] = None,
+    ) -> Optional[Dict[str, List[str]]]:
+        # PAYLOAD_VALUES_CATALOG=0 forces the legacy source_payload scan, e.g.
+        # right after deploy while tools/payload_values_refresh has not run yet.
+        if os.getenv("PAYLOAD_VALUES_CATALOG", "1") == "0":
+            return None
+        from .payload_values_catalog import PayloadValuesCatalog
+
+        return PayloadValuesCatalog(self.db).values(
+            keys,
+            limit=limit,
+            region=region,
+            country=country,
+            brand=brand,
+        )
+
+    _PAYLOAD_CATALOG_SLICE_FILTERS = frozenset({"region", "country", "brand"})
+
     def payload_values_bulk(
         self,
         keys: List[str],
         limit: int = 120,
         source_ids: Optional[List[int]] = None,
         max_scan: int = 50000,
+        region: Optional[str] = None,
     ) -> Dict[str, List[str]]:
         if not keys:
             return {}
+        if region:
+            catalog = self._payload_catalog_values(keys, limit=limit, region=region)
+            if catalog is not None:
+                return catalog
         stmt = (
             select(Car.source_payload)
             .where(self._available_expr(), Car.source_payload.is_not(None))
@@ -3977,6 +4044,22 @@ class CarsService:
     ) -> Dict[str, List[str]]:
         if not keys:
             return {}
+        # Only (region, country, brand) slices are materialised; any other
+        # active filter still needs the scan over matching rows.
+        if not any(
+            value not in (None, "", [], False)
+            for name, value in filters.items()
+            if name not in self._PAYLOAD_CATALOG_SLICE_FILTERS
+        ):
+            catalog = self._payload_catalog_values(
+                keys,
+                limit=limit,
+                region=filters.get("region"),
+                country=filters.get("country"),
+                brand=filters.get("brand"),
+            )
+            if catalog is not None:
+                return catalog
         conditions, _ = self._build_list_conditions(**filters)
         stmt = (
             select(Car.source_payload)
@@ -4493,8 +4576,8 @@ class CarsService:
         now_month = func.extract("month", func.now())
         reg_year_expr = self._effective_registration_year_expr()
         reg_month_expr = self._effective_registration_month_ceil_expr()
-        power_hp_expr = func.coalesce(Car.power_hp, Car.inferred_power_hp)
-        engine_cc_expr = func.coalesce(Car.engine_cc, Car.inferred_engine_cc)
+        power_hp_expr = Car.effective_power_hp
+        engine_cc_expr = Car.effective_engine_cc
         price_expr = self._public_display_price_rub_expr()
 
         if max_age_years is not None:
@@ -4524,6 +4607,7 @@ class CarsService:
 
         stmt = (
             select(Car)
+            .options(*car_profile_options("card"))
             .where(and_(*conditions))
             .order_by(
                 price_expr.asc().nullslast(),
@@ -4570,8 +4654,8 @@ class CarsService:
         target_mileage = car.mileage
 
         reg_year_expr = self._effective_registration_year_expr()
-        power_hp_expr = func.coalesce(Car.power_hp, Car.inferred_power_hp)
-        engine_cc_expr = func.coalesce(Car.engine_cc, Car.inferred_engine_cc)
+        power_hp_expr = Car.effective_power_hp
+        engine_cc_expr = Car.effective_engine_cc
         price_expr = self._public_display_price_rub_expr()
 
         model_rank = (
@@ -4684,6 +4768,7 @@ class CarsService:
 
         stmt = (
             select(Car)
+            .options(*car_profile_options("card"))
             .where(Car.id.in_(candidate_ids))
             .order_by(
                 model_rank.asc(),
@@ -4780,6 +4865,7 @@ class CarsService:
             conditions.append(self._available_expr())
         stmt = (
             select(Car)
+            .options(*car_profile_options("card"))
             .join(FeaturedCar, FeaturedCar.car_id == Car.id)
             .where(*conditions)
             .order_by(FeaturedCar.position.asc(), Car.created_at.desc(), Car.id.desc())
@@ -4791,6 +4877,7 @@ class CarsService:
         # Fallback to fresh cars when featured is empty
         fallback_stmt = (
             select(Car)
+            .options(*car_profile_options("card"))
             .where(
                 self._available_expr(),
                 Car.thumbnail_url.is_not(None),
@@ -4928,6 +5015,8 @@ class CarsService:
         return int(total)
 
     def _list_order_clause(self, sort: Optional[str]) -> List[Any]:
+        if sort in {"price_asc", "price_desc"} and self._display_price_column_enabled():
+            return self._stored_display_price_order_clause(sort)
         if sort == "price_asc":
             price_expr = self._public_display_price_rub_expr()
             price_group_expr = self._public_display_price_group_expr()
@@ -5079,6 +5168,7 @@ class CarsService:
         ).desc()
         stmt = (
             select(Car)
+            .options(*car_profile_options("card"))
             .where(where_expr)
             .order_by(thumb_rank, mileage_rank, *self._list_order_clause(sort))
             .limit(max(1, int(limit or 8)))
@@ -5108,6 +5198,9 @@ class CarsService:
         }
 
     def upsert_cars(self, source: Source, parsed: List[Dict[str, Any]]) -> Tuple[int, int]:
+        from .payload_values_catalog import PayloadValuesCatalog
+
+        payload_catalog = PayloadValuesCatalog(self.db)
         inserted = 0
         updated = 0
         for item in parsed:
@@ -5118,30 +5211,40 @@ class CarsService:
                 )
             ).scalar_one_or_none()
             if existing:
+                if existing.is_available:
+                    payload_catalog.add_car(existing, source_key=source.key, sign=-1)
                 for key, value in item.items():
                     if hasattr(existing, key) and key not in ("id", "created_at"):
                         setattr(existing, key, value)
                 existing.is_available = True
+                payload_catalog.add_car(existing, source_key=source.key)
                 updated += 1
             else:
                 car = Car(source_id=source.id, **item)
                 self.db.add(car)
+                payload_catalog.add_car(car, source_key=source.key)
                 inserted += 1
+        payload_catalog.apply()
         self.db.commit()
         return inserted, updated
 
     def mark_unavailable_except(self, source: Source, external_ids: List[str]) -> int:
+        from .payload_values_catalog import PayloadValuesCatalog
+
         # Mark cars from this source that are not in the latest external_ids as unavailable
         stmt = select(Car).where((Car.source_id == source.id)
                                  & (self._available_expr()))
         cars = self.db.execute(stmt).scalars().all()
+        payload_catalog = PayloadValuesCatalog(self.db)
         changed = 0
         external_set = set(external_ids)
         for car in cars:
             if car.external_id not in external_set:
+                payload_catalog.add_car(car, source_key=source.key, sign=-1)
                 car.is_available = False
                 changed += 1
         if changed:
+            payload_catalog.apply()
             self.db.commit()
         return changed
 
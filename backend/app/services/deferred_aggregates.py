@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from cachetools import TTLCache
+from sqlalchemy.orm import Session
+
+from ..utils.redis_cache import redis_get_json, redis_set_json
+
+
+logger = logging.getLogger(__name__)
+
+# Job state lives in Redis so any worker can answer the poll; the local
+# cache covers setups without Redis (single worker, dev).
+_STATE_PREFIX = "cars_agg"
+_STATE_TTL_SEC = 300
+# A pending job older than this is assumed lost (worker restarted) and resubmitted.
+_STALE_PENDING_SEC = 60
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_inflight: set[str] = set()
+_inflight_lock = threading.Lock()
+_local_state: TTLCache = TTLCache(maxsize=2048, ttl=_STATE_TTL_SEC)
+
+
+def split_count_enabled() -> bool:
+    return os.getenv("CATALOG_SPLIT_COUNT", "1") != "0"
+
+
+def job_token(kind: str, params: Dict[str, Any]) -> str:
+    raw = json.dumps({"kind": kind, **params}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:24]
+
+
+def _state_key(token: str) -> str:
+    return f"{_STATE_PREFIX}:{token}"
+
+
+def _set_state(token: str, state: Dict[str, Any]) -> None:
+    _local_state[token] = state
+    redis_set_json(_state_key(token), state, ttl_sec=_STATE_TTL_SEC)
+
+
+def get_state(token: str) -> Optional[Dict[str, Any]]:
+    state = _local_state.get(token)
+    if state is not None and state.get("status") != "pending":
+        return state
+    return redis_get_json(_state_key(token)) or state
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = max(1, int(os.getenv("DEFERRED_AGG_WORKERS", "2") or 2))
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="deferred-agg")
+        return _executor
+
+
+def _run(token: str, fn: Callable[[Session], Dict[str, Any]], session_factory: Callable[[], Session]) -> None:
+    db = session_factory()
+    try:
+        result = fn(db)
+        _set_state(token, {"status": "ready", **result})
+    except Exception as exc:
+        db.rollback()
+        logger.exception("deferred_aggregates_failed token=%s", token)
+        _set_state(token, {"status": "error", "error": exc.__class__.__name__})
+    finally:
+        db.close()
+        with _inflight_lock:
+            _inflight.discard(token)
+
+
+def submit(
+    token: str,
+    fn: Callable[[Session], Dict[str, Any]],
+    *,
+    session_factory: Optional[Callable[[], Session]] = None,
+) -> Dict[str, Any]:
+    """Run ``fn(db)`` in the background unless the same job is running or done.
+
+    ``fn`` must store its aggregates under their usual cache keys; its return
+    value is what pollers receive.
+    """
+    state = get_state(token)
+    if state is not None:
+        if state.get("status") == "ready":
+            return state
+        if state.get("status") == "pending" and time.time() - float(state.get("ts") or 0) < _STALE_PENDING_SEC:
+            return state
+    with _inflight_lock:
+        if token in _inflight:
+            return {"status": "pending"}
+        _inflight.add(token)
+    if session_factory is None:
+        from ..db import SessionLocal
+
+        session_factory = SessionLocal
+    pending = {"status": "pending", "ts": time.time()}
+    _set_state(token, pending)
+    try:
+        _get_executor().submit(_run, token, fn, session_factory)
+    except RuntimeError:
+        with _inflight_lock:
+            _inflight.discard(token)
+        raise
+    return pending
+
+
+def shutdown(wait: bool = False) -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait)
+            _executor = None
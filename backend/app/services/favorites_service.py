@@ -4,6 +4,7 @@ from sqlalchemy import select, delete
 from sqlalchemy.orm import Session
 
 from ..models import Favorite, Car, User
+from .car_loader import load_cars_by_ids
 
 
 class FavoritesService:
@@ -28,10 +29,9 @@ class FavoritesService:
 
     def list_cars(self, user: User) -> list[Car]:
         stmt = (
-            select(Car)
-            .join(Favorite, Favorite.car_id == Car.id)
+            select(Favorite.car_id)
             .where(Favorite.user_id == user.id)
             .order_by(Favorite.created_at.desc())
         )
-        return list(self.db.scalars(stmt))
+        return load_cars_by_ids(self.db, self.db.scalars(stmt), profile="card")
 
@@ -0,0 +1,375 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+import weakref
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import requests
+from sqlalchemy import func, inspect, select
+from sqlalchemy.orm import Session
+
+from ..models import FxRate
+
+
+logger = logging.getLogger(__name__)
+
+FX_CURRENCIES: Tuple[str, ...] = ("EUR", "USD", "CNY")
+CBR_DAILY_URL = "https://www.cbr-xml-daily.ru/daily_json.js"
+
+_ENV_RATE_KEYS = {"EUR": ("EURO_RATE", "95.0"), "USD": ("USD_RATE", "85.0"), "CNY": ("CNY_RATE", "12.0")}
+_RATE_EPSILON = 1e-6
+
+
+def _env_float(name: str, default: str) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return float(default)
+
+
+def fx_add_rub() -> float:
+    return _env_float("FX_ADD_RUB", "4.0")
+
+
+def env_raw_rates() -> Dict[str, float]:
+    return {code: _env_float(name, default) for code, (name, default) in _ENV_RATE_KEYS.items()}
+
+
+def apply_fx_markup(raw: Dict[str, float]) -> Dict[str, float]:
+    """Raw central-bank rates -> the rates prices are computed with."""
+    add = fx_add_rub()
+    fallback = env_raw_rates()
+    out = {code: float(raw.get(code) or fallback[code]) + add for code in FX_CURRENCIES}
+    out["RUB"] = 1.0
+    return out
+
+
+def fx_signature(rates: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Version tag stored as ``__fx_signature`` in calc breakdowns."""
+    fx = rates or {}
+    try:
+        eur = float(fx.get("EUR") or 0)
+        usd = float(fx.get("USD") or 0)
+    except Exception:
+        return None
+    if eur <= 0 and usd <= 0:
+        return None
+    return f"eur:{eur:.4f}|usd:{usd:.4f}"
+
+
+def fetch_cbr_rates(*, timeout: Tuple[float, float] = (3.0, 10.0)) -> Tuple[Dict[str, float], Optional[datetime]]:
+    """Fetch raw CBR rates (RUB per unit). Raises on network/format errors."""
+    res = requests.get(CBR_DAILY_URL, timeout=timeout)
+    res.raise_for_status()
+    data = res.json()
+    out: Dict[str, float] = {}
+    for code in FX_CURRENCIES:
+        row = data["Valute"][code]
+        nominal = float(row.get("Nominal") or 1.0) or 1.0
+        out[code] = float(row["Value"]) / nominal
+    rate_date = None
+    raw_date = data.get("Date")
+    if raw_date:
+        try:
+            rate_date = datetime.fromisoformat(str(raw_date)).replace(tzinfo=None)
+        except ValueError:
+            rate_date = None
+    return out, rate_date
+
+
+@dataclass(frozen=True)
+class FxSnapshot:
+    rates: Dict[str, float]
+    signature: Optional[str]
+    source: str
+    as_of: Optional[datetime] = None
+    loaded_at: float = field(default_factory=time.time)
+
+
+@dataclass
+class FxRefreshResult:
+    rates: Dict[str, float]
+    stored: int
+    old_signature: Optional[str]
+    new_signature: Optional[str]
+    changed: Tuple[str, ...] = ()
+
+    @property
+    def signature_changed(self) -> bool:
+        return bool(self.new_signature) and self.new_signature != self.old_signature
+
+
+_snapshot: Optional[FxSnapshot] = None
+_snapshot_lock = threading.Lock()
+_refresher: Optional[threading.Thread] = None
+_refresher_stop = threading.Event()
+_listeners: List[Callable[[FxRefreshResult], None]] = []
+_last_fetch_attempt = 0.0
+_session_factory: Optional[Callable[[], Session]] = None
+_price_refresh_lock = threading.Lock()
+_PRICE_REFRESH_LOCK = "fx_rates:price_refresh"
+_table_exists_cache: "weakref.WeakKeyDictionary[Any, bool]" = weakref.WeakKeyDictionary()
+
+
+def _snapshot_ttl_sec() -> float:
+    return _env_float("FX_SNAPSHOT_TTL_SEC", "300")
+
+
+def _env_snapshot() -> FxSnapshot:
+    rates = apply_fx_markup(env_raw_rates())
+    return FxSnapshot(rates=rates, signature=fx_signature(rates), source="env")
+
+
+def _fx_table_exists(db: Session) -> bool:
+    bind = db.get_bind()
+    if _table_exists_cache.get(bind):
+        return True
+    try:
+        exists = inspect(db.connection()).has_table(FxRate.__tablename__)
+    except Exception:
+        exists = False
+    if exists:
+        _table_exists_cache[bind] = True
+    return exists
+
+
+def on_fx_signature_change(listener: Callable[[FxRefreshResult], None]) -> None:
+    """Register a callback fired after a refresh stores rates with a new signature."""
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+
+def _emit_signature_change(result: FxRefreshResult) -> None:
+    logger.info(
+        "fx_signature_changed old=%s new=%s",
+        result.old_signature,
+        result.new_signature,
+    )
+    for listener in list(_listeners):
+        try:
+            listener(result)
+        except Exception:
+            logger.exception("fx_signature_listener_failed listener=%r", listener)
+
+
+def reload_fx_snapshot(db: Session) -> FxSnapshot:
+    """Rebuild the process-wide snapshot from ``fx_rates`` (env fallback)."""
+    global _snapshot
+    raw, as_of = FxRatesService(db).latest_raw()
+    if raw:
+        rates = apply_fx_markup(raw)
+        snap = FxSnapshot(rates=rates, signature=fx_signature(rates), source="db", as_of=as_of)
+    else:
+        snap = _env_snapshot()
+    with _snapshot_lock:
+        _snapshot = snap
+    return snap
+
+
+def current_fx_snapshot(db: Optional[Session] = None) -> FxSnapshot:
+    """Return the in-memory snapshot; never touches the network.
+
+    The web app keeps it fresh from a background thread. Processes without
+    the refresher (scripts, importers) reload it from ``db`` once it is
+    older than ``FX_SNAPSHOT_TTL_SEC``.
+    """
+    global _snapshot
+    snap = _snapshot
+    refresher_alive = _refresher is not None and _refresher.is_alive()
+    stale = snap is None or (not refresher_alive and time.time() - snap.loaded_at > _snapshot_ttl_sec())
+    if not stale:
+        return snap
+    if db is not None:
+        try:
+            return reload_fx_snapshot(db)
+        except Exception:
+            logger.exception("fx_snapshot_reload_failed")
+    if snap is not None:
+        return snap
+    snap = _env_snapshot()
+    with _snapshot_lock:
+        _snapshot = snap
+    return snap
+
+
+def current_fx_rates(db: Optional[Session] = None) -> Dict[str, float]:
+    return dict(current_fx_snapshot(db).rates)
+
+
+def reset_fx_snapshot() -> None:
+    global _snapshot
+    with _snapshot_lock:
+        _snapshot = None
+
+
+class FxRatesService:
+    """Persisted FX history plus the fetch-and-store step of the scheduler."""
+
+    def __init__(self, db: Session) -> None:
+        self.db = db
+
+    def latest_raw(self) -> Tuple[Dict[str, float], Optional[datetime]]:
+        if not _fx_table_exists(self.db):
+            return {}, None
+        latest = (
+            select(FxRate.currency, func.max(FxRate.id).label("max_id"))
+            .where(FxRate.currency.in_(FX_CURRENCIES))
+            .group_by(FxRate.currency)
+            .subquery()
+        )
+        rows = self.db.execute(
+            select(FxRate.currency, FxRate.rate, FxRate.fetched_at).join(latest, FxRate.id == latest.c.max_id)
+        ).all()
+        raw = {code: float(rate) for code, rate, _ in rows if rate is not None}
+        as_of = max((fetched_at for _, _, fetched_at in rows if fetched_at), default=None)
+        return raw, as_of
+
+    def history(self, currency: str, *, limit: int = 30) -> List[FxRate]:
+        stmt = (
+            select(FxRate)
+            .where(FxRate.currency == currency.upper())
+            .order_by(FxRate.fetched_at.desc(), FxRate.id.desc())
+            .limit(limit)
+        )
+        return list(self.db.execute(stmt).scalars().all())
+
+    def store(self, raw: Dict[str, float], *, source: str = "cbr", rate_date: Optional[datetime] = None) -> FxRefreshResult:
+        """Insert rows for currencies whose rate moved, commit, refresh the snapshot."""
+        previous, _ = self.latest_raw()
+        old_signature = fx_signature(apply_fx_markup(previous)) if previous else None
+        now = datetime.utcnow()
+        changed: List[str] = []
+        for code in FX_CURRENCIES:
+            value = raw.get(code)
+            if value is None or value <= 0:
+                continue
+            if code in previous and abs(previous[code] - float(value)) < _RATE_EPSILON:
+                continue
+            self.db.add(FxRate(currency=code, rate=float(value), source=source, rate_date=rate_date, fetched_at=now))
+            changed.append(code)
+        stored = len(changed)
+        if stored:
+            self.db.commit()
+        snap = reload_fx_snapshot(self.db)
+        result = FxRefreshResult(
+            rates=dict(snap.rates),
+            stored=stored,
+            old_signature=old_signature,
+            new_signature=snap.signature if snap.source == "db" else None,
+            changed=tuple(changed),
+        )
+        if stored and result.signature_changed:
+            _emit_signature_change(result)
+        return result
+
+    def refresh(self, *, timeout: Tuple[float, float] = (3.0, 10.0)) -> FxRefreshResult:
+        raw, rate_date = fetch_cbr_rates(timeout=timeout)
+        return self.store(raw, source="cbr", rate_date=rate_date)
+
+
+def _reprice_on_change(result: FxRefreshResult) -> None:
+    """Listener: re-price FX-dependent cars on a side thread, off the refresher loop."""
+    if _session_factory is None:
+        from ..utils.redis_cache import bump_dataset_version
+
+        bump_dataset_version()
+        return
+    threading.Thread(
+        target=_run_price_refresh,
+        args=(_session_factory, result),
+        name="fx-price-refresh",
+        daemon=True,
+    ).start()
+
+
+def _run_price_refresh(session_factory: Callable[[], Session], result: FxRefreshResult) -> None:
+    """Targeted ``run_fx_price_update``; one worker runs it, then caches are bumped."""
+    from ..scripts.update_fx_prices import run_fx_price_update
+    from ..utils.redis_cache import bump_dataset_version, get_redis, redis_try_lock, redis_unlock
+
+    if not _price_refresh_lock.acquire(blocking=False):
+        return
+    token: Optional[str] = None
+    try:
+        if get_redis() is not None:
+            token = redis_try_lock(_PRICE_REFRESH_LOCK, ttl_sec=int(_env_float("FX_PRICE_REFRESH_LOCK_SEC", "1800")))
+            if token is None:
+                # Another worker re-prices and bumps the dataset version.
+                return
+        try:
+            with session_factory() as db:
+                checked, updated = run_fx_price_update(
+                    db,
+                    result.rates,
+                    fx_dependent_only=True,
+                    changed_currencies=result.changed,
+                )
+            logger.info("fx_price_refresh checked=%s updated=%s signature=%s", checked, updated, result.new_signature)
+        except Exception:
+            logger.exception("fx_price_refresh_failed")
+        # Bump even after a failure: rates in responses moved regardless.
+        bump_dataset_version()
+    finally:
+        if token:
+            redis_unlock(_PRICE_REFRESH_LOCK, token)
+        _price_refresh_lock.release()
+
+
+def _refresher_loop(session_factory: Callable[[], Session]) -> None:
+    global _last_fetch_attempt
+    interval = max(5.0, _env_float("FX_SNAPSHOT_REFRESH_SEC", "60"))
+    fetch_enabled = os.getenv("FX_BACKGROUND_FETCH", "1") != "0"
+    fetch_interval = max(60, int(_env_float("FX_FETCH_INTERVAL_SEC", "3600")))
+    while not _refresher_stop.is_set():
+        try:
+            with session_factory() as db:
+                snap = reload_fx_snapshot(db)
+                # Rows are only written when a rate moves, so as_of alone
+                # would keep an unchanged rate "due" forever.
+                due = time.time() - _last_fetch_attempt >= fetch_interval and (
+                    snap.source != "db"
+                    or snap.as_of is None
+                    or (datetime.utcnow() - snap.as_of).total_seconds() >= fetch_interval
+                )
+                if fetch_enabled and due and _claim_fetch_slot(fetch_interval):
+                    _last_fetch_attempt = time.time()
+                    result = FxRatesService(db).refresh()
+                    logger.info("fx_rates_refreshed stored=%s signature=%s", result.stored, result.new_signature)
+        except Exception:
+            logger.exception("fx_refresher_iteration_failed")
+        _refresher_stop.wait(interval)
+
+
+def _claim_fetch_slot(fetch_interval: int) -> bool:
+    """One worker per interval fetches; without Redis every worker may."""
+    from ..utils.redis_cache import get_redis, redis_try_lock
+
+    if get_redis() is None:
+        return True
+    return redis_try_lock("fx_rates:fetch", ttl_sec=fetch_interval) is not None
+
+
+def start_fx_background_refresher(session_factory: Callable[[], Session]) -> None:
+    """Start the daemon thread that keeps the snapshot (and optionally the table) fresh."""
+    global _refresher, _session_factory
+    if _refresher is not None and _refresher.is_alive():
+        return
+    _session_factory = session_factory
+    on_fx_signature_change(_reprice_on_change)
+    _refresher_stop.clear()
+    _refresher = threading.Thread(
+        target=_refresher_loop,
+        args=(session_factory,),
+        name="fx-rates-refresher",
+        daemon=True,
+    )
+    _refresher.start()
+
+
+def stop_fx_background_refresher() -> None:
+    _refresher_stop.set()
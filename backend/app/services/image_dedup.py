@@ -0,0 +1,294 @@
+"""Perceptual-hash deduplication of mirrored car images.
+
+Each mirrored file gets a 64-bit difference hash (dHash) stored in
+``car_images.phash``. Rows whose files hash identically are pointed at one
+canonical file, and ``prune_unused_local_media`` then deletes the orphaned
+copies, so the same dealer or stock photo is stored once no matter how many
+listings use it. The mirror
+scripts also consult ``BlobIndex`` before downloading: a remote URL that was
+already mirrored for another car is referenced instead of fetched again.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import re
+from concurrent.futures import Executor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from ..models import Car, CarImage
+from .media_manifest import iter_manifest, manifest_table_exists, media_root, to_rel
+
+
+logger = logging.getLogger(__name__)
+
+HASH_SIZE = 8
+# Second-stage check before two files are merged: a finer hash and the
+# aspect ratio must agree too, so a 64-bit collision never merges photos.
+_CONFIRM_HASH_SIZE = 16
+_CONFIRM_MAX_DISTANCE = 12
+_CONFIRM_ASPECT_TOLERANCE = 0.02
+_MIRROR_PREFIXES = ("машины/gallery_mirror/", "машины/mirror/")
+_DIGEST_RE = re.compile(r"_([0-9a-f]{12})\.(webp|jpg|jpeg)$")
+
+
+def dhash_image(img: Any, size: int = HASH_SIZE) -> str:
+    """Hex dHash of a PIL image: ``size * size`` bits of horizontal gradient signs."""
+    from PIL import Image
+
+    gray = img.convert("L").resize((size + 1, size), Image.LANCZOS)
+    pixels = list(gray.getdata())
+    value = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for col in range(size):
+            value = (value << 1) | (1 if pixels[offset + col] > pixels[offset + col + 1] else 0)
+    return f"{value:0{size * size // 4}x}"
+
+
+def dhash_file(path: Path, size: int = HASH_SIZE) -> Optional[str]:
+    from PIL import Image
+
+    try:
+        with Image.open(path) as img:
+            return dhash_image(img, size)
+    except Exception:  # noqa: BLE001
+        return None
+
+
+def hamming(a: str, b: str) -> int:
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+
+def _fingerprint(path: Path) -> Optional[Tuple[str, float]]:
+    from PIL import Image
+
+    try:
+        with Image.open(path) as img:
+            return dhash_image(img, _CONFIRM_HASH_SIZE), img.width / max(img.height, 1)
+    except Exception:  # noqa: BLE001
+        return None
+
+
+def same_picture(a: Path, b: Path) -> bool:
+    fa, fb = _fingerprint(a), _fingerprint(b)
+    if fa is None or fb is None:
+        return False
+    if abs(fa[1] - fb[1]) > _CONFIRM_ASPECT_TOLERANCE * max(fa[1], fb[1]):
+        return False
+    return hamming(fa[0], fb[0]) <= _CONFIRM_MAX_DISTANCE
+
+
+def _image_key(url: str) -> Tuple[str, str]:
+    """Identity of an image for display: the source-URL digest of a mirrored
+    file (one remote picture saved for several cars), else the URL itself."""
+    match = _DIGEST_RE.search(url)
+    if match and url.startswith("/media/"):
+        return "d", match.group(1)
+    return "u", url
+
+
+def unique_images(images: Iterable[Any]) -> List[Any]:
+    """Order-preserving dedup of image rows for display.
+
+    A bare ``phash`` match is not enough to hide a photo: only
+    ``collapse_duplicates`` merges hash-equal files, after ``same_picture``
+    confirms them, by pointing the rows at one URL. Request code therefore
+    dedups on that URL (or the source-URL digest in a mirrored file name).
+    """
+    out: List[Any] = []
+    seen: set = set()
+    for im in images:
+        url = (getattr(im, "url", None) or "").strip()
+        if url:
+            key = _image_key(url)
+            if key in seen:
+                continue
+            seen.add(key)
+        out.append(im)
+    return out
+
+
+def unique_images_query(car_ids: Optional[Sequence[int]] = None):
+    """``CarImage`` rows with one representative (lowest id) per distinct URL.
+
+    Confirmed duplicates share a URL once ``collapse_duplicates`` has run, so
+    this counts pictures without trusting an unconfirmed ``phash`` match.
+    """
+    firsts = select(func.min(CarImage.id).label("id")).group_by(CarImage.url)
+    if car_ids is not None:
+        firsts = firsts.where(CarImage.car_id.in_(list(car_ids)))
+    return select(CarImage).where(CarImage.id.in_(firsts.scalar_subquery())).order_by(CarImage.id)
+
+
+def count_unique_images(db: Session, car_ids: Optional[Sequence[int]] = None) -> int:
+    stmt = select(func.count(func.distinct(CarImage.url)))
+    if car_ids is not None:
+        stmt = stmt.where(CarImage.car_id.in_(list(car_ids)))
+    return int(db.execute(stmt).scalar_one() or 0)
+
+
+def url_digest(src_url: str) -> str:
+    """The 12-hex source-URL digest the mirror scripts embed in file names."""
+    return hashlib.sha1(src_url.encode("utf-8")).hexdigest()[:12]
+
+
+class BlobIndex:
+    """Source-URL digest -> already mirrored ``/media/...`` path.
+
+    Built from the ``media_files`` manifest when it is populated, otherwise by
+    listing the mirror directories once.
+    """
+
+    def __init__(self, entries: Optional[Dict[Tuple[str, str], str]] = None):
+        self._entries: Dict[Tuple[str, str], str] = dict(entries or {})
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, rel_path: str) -> None:
+        match = _DIGEST_RE.search(rel_path)
+        if match:
+            ext = "jpg" if match.group(2) == "jpeg" else match.group(2)
+            self._entries.setdefault((match.group(1), ext), "/media/" + rel_path)
+
+    def lookup(self, src_url: str, fmt: str) -> Optional[str]:
+        return self._entries.get((url_digest(src_url), fmt))
+
+    @classmethod
+    def build(cls, db: Optional[Session] = None, *, root: Optional[Path] = None) -> "BlobIndex":
+        index = cls()
+        if db is not None and manifest_table_exists(db):
+            for prefix in _MIRROR_PREFIXES:
+                for rel, size in iter_manifest(db, prefix.rstrip("/")):
+                    if size > 0:
+                        index.add(rel)
+        if len(index):
+            return index
+        root = root or media_root()
+        for prefix in _MIRROR_PREFIXES:
+            base = root / prefix
+            if not base.exists():
+                continue
+            for path in base.rglob("*"):
+                if path.is_file() and ".tmp." not in path.name:
+                    index.add(path.relative_to(root).as_posix())
+        return index
+
+
+def _hash_local(url: str) -> Optional[str]:
+    rel = to_rel(url)
+    return dhash_file(media_root() / rel) if rel else None
+
+
+def hash_pending(
+    db: Session,
+    *,
+    batch: int = 500,
+    limit: int = 0,
+    executor: Optional[Executor] = None,
+) -> int:
+    """Fill ``phash`` for local images that do not have one yet. Commits per batch."""
+    hashed = 0
+    last_id = 0
+    while True:
+        rows = db.execute(
+            select(CarImage.id, CarImage.url)
+            .where(CarImage.id > last_id, CarImage.phash.is_(None), CarImage.url.like("/media/%"))
+            .order_by(CarImage.id)
+            .limit(batch)
+        ).all()
+        if not rows:
+            return hashed
+        last_id = int(rows[-1][0])
+        urls = sorted({str(url) for _, url in rows})
+        hashes = dict(zip(urls, executor.map(_hash_local, urls) if executor else map(_hash_local, urls)))
+        ids_by_hash: Dict[str, List[int]] = {}
+        for image_id, url in rows:
+            phash = hashes.get(str(url))
+            if phash:
+                ids_by_hash.setdefault(phash, []).append(int(image_id))
+        for phash, ids in ids_by_hash.items():
+            db.execute(
+                update(CarImage)
+                .where(CarImage.id.in_(ids))
+                .values(phash=phash)
+                .execution_options(synchronize_session=False)
+            )
+        db.commit()
+        hashed += sum(len(ids) for ids in ids_by_hash.values())
+        if limit and hashed >= limit:
+            return hashed
+
+
+def collapse_duplicates(db: Session, *, dry_run: bool = False, limit_groups: int = 0) -> Dict[str, int]:
+    """Point rows with the same ``phash`` at one file.
+
+    The canonical file is the one referenced by most rows (lowest id on ties).
+    A copy is merged only if ``same_picture`` confirms it. Copies left without
+    references are removed by ``prune_unused_local_media``, which already
+    checks every reference before deleting anything.
+    """
+    stats = {"groups": 0, "merged_urls": 0, "rows_rewritten": 0, "thumbs_rewritten": 0, "rejected": 0,
+             "bytes_reclaimable": 0}
+    dup_hashes = db.execute(
+        select(CarImage.phash)
+        .where(CarImage.phash.is_not(None), CarImage.url.like("/media/%"))
+        .group_by(CarImage.phash)
+        .having(func.count(func.distinct(CarImage.url)) > 1)
+        .order_by(CarImage.phash)
+    ).scalars().all()
+    root = media_root()
+    for phash in dup_hashes:
+        if limit_groups and stats["groups"] >= limit_groups:
+            break
+        stats["groups"] += 1
+        rows = db.execute(
+            select(CarImage.id, CarImage.car_id, CarImage.url)
+            .where(CarImage.phash == phash, CarImage.url.like("/media/%"))
+        ).all()
+        by_url: Dict[str, List[Tuple[int, int]]] = {}
+        for image_id, car_id, url in rows:
+            by_url.setdefault(str(url), []).append((int(image_id), int(car_id)))
+        ranked = sorted(by_url, key=lambda u: (-len(by_url[u]), min(i for i, _ in by_url[u])))
+        canonical = next((u for u in ranked if (root / (to_rel(u) or "")).is_file()), None)
+        if canonical is None:
+            continue
+        canonical_path = root / (to_rel(canonical) or "")
+        for url in ranked:
+            if url == canonical:
+                continue
+            rel = to_rel(url)
+            path = root / rel if rel else None
+            if path is not None and path.is_file():
+                if not same_picture(canonical_path, path):
+                    stats["rejected"] += 1
+                    continue
+                stats["bytes_reclaimable"] += path.stat().st_size
+            stats["merged_urls"] += 1
+            stats["rows_rewritten"] += len(by_url[url])
+            if dry_run:
+                continue
+            image_ids = [image_id for image_id, _ in by_url[url]]
+            car_ids = sorted({car_id for _, car_id in by_url[url]})
+            db.execute(
+                update(CarImage)
+                .where(CarImage.id.in_(image_ids))
+                .values(url=canonical)
+                .execution_options(synchronize_session=False)
+            )
+            for column in (Car.thumbnail_local_path, Car.thumbnail_url):
+                stats["thumbs_rewritten"] += db.execute(
+                    update(Car)
+                    .where(Car.id.in_(car_ids), column == url)
+                    .values({column.key: canonical})
+                    .execution_options(synchronize_session=False)
+                ).rowcount or 0
+        if not dry_run:
+            db.commit()
+    return stats
@@ -0,0 +1,448 @@
+"""Asyncio engine for mirroring remote car images into the local media tree.
+
+Downloads run on one pooled ``httpx.AsyncClient`` (HTTP/2 when ``h2`` is
+installed) with a global and a per-host concurrency limit; PIL decoding and
+encoding run in a process pool so they never stall the event loop. Files are
+written to a temp name and renamed into place, so a crash never leaves a
+truncated image behind. ``MirrorProgress`` checkpoints finished cars in
+``progress_kv`` so an interrupted run resumes where it stopped.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import io
+import json
+import logging
+import os
+import random
+import time
+from collections import Counter
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlparse
+
+import httpx
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from ..models import ProgressKV
+
+try:
+    import h2  # noqa: F401
+
+    _HTTP2 = True
+except Exception:  # pragma: no cover - optional dependency
+    _HTTP2 = False
+
+
+logger = logging.getLogger(__name__)
+
+_RETRY_STATUSES = {429, 500, 502, 503, 504}
+_MAX_RETRY_AFTER_SEC = 30.0
+# A variant that stalls this many times in a row is tried last until it
+# succeeds again (classistatic throttles mo-1024 for everyone at once).
+_DEMOTE_AFTER_FAILURES = 5
+_PROGRESS_PREFIX = "image_mirror:"
+
+TargetFn = Callable[["MirrorJob", str], Tuple[Path, str]]
+
+
+class MirrorFetchError(Exception):
+    def __init__(self, code: str, *, retryable: bool = False, retry_after: Optional[float] = None):
+        super().__init__(code)
+        self.code = code
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+@dataclass(frozen=True)
+class MirrorJob:
+    image_id: int
+    car_id: int
+    candidates: Tuple[str, ...]
+
+
+@dataclass
+class MirrorOptions:
+    timeout_sec: float = 6.0
+    connect_timeout_sec: float = 3.0
+    max_bytes: int = 8_000_000
+    max_width: int = 1280
+    quality: int = 76
+    fmt: str = "webp"
+    concurrency: int = 32
+    per_host: int = 8
+    retries: int = 2
+    backoff_sec: float = 0.5
+    convert_workers: int = 0
+
+
+@dataclass
+class ThroughputStats:
+    started: float = field(default_factory=time.time)
+    downloaded: int = 0
+    cached: int = 0
+    failed: int = 0
+    retries: int = 0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    failures_by_code: Counter = field(default_factory=Counter)
+
+    def record(self, result: Dict[str, object]) -> None:
+        if result.get("ok"):
+            if result.get("cached"):
+                self.cached += 1
+            else:
+                self.downloaded += 1
+                self.bytes_in += int(result.get("bytes_in") or 0)
+                self.bytes_out += int(result.get("bytes_out") or 0)
+        else:
+            self.failed += 1
+            self.failures_by_code[str(result.get("error") or "unknown")] += 1
+
+    def snapshot(self) -> Dict[str, object]:
+        elapsed = max(time.time() - self.started, 1e-6)
+        done = self.downloaded + self.cached + self.failed
+        return {
+            "elapsed_sec": round(elapsed, 1),
+            "images": done,
+            "downloaded": self.downloaded,
+            "cached": self.cached,
+            "failed": self.failed,
+            "retries": self.retries,
+            "images_per_sec": round(done / elapsed, 2),
+            "downloads_per_sec": round(self.downloaded / elapsed, 2),
+            "mb_in": round(self.bytes_in / 1_048_576, 2),
+            "mb_out": round(self.bytes_out / 1_048_576, 2),
+            "mb_per_sec": round(self.bytes_in / 1_048_576 / elapsed, 3),
+            "failures_by_code": dict(self.failures_by_code.most_common()),
+        }
+
+    def summary_line(self) -> str:
+        snap = self.snapshot()
+        failures = ",".join(f"{code}:{count}" for code, count in snap["failures_by_code"].items()) or "-"
+        return (
+            f"images={snap['images']} downloaded={snap['downloaded']} cached={snap['cached']} "
+            f"failed={snap['failed']} retries={snap['retries']} "
+            f"images_per_sec={snap['images_per_sec']} mb_per_sec={snap['mb_per_sec']} "
+            f"failures={failures}"
+        )
+
+
+def variant_key(url: str) -> str:
+    """``host`` or ``host:rule`` for classistatic-style size variants."""
+    parsed = urlparse(url)
+    rule = next((v for k, v in parse_qsl(parsed.query) if k.lower() == "rule"), "")
+    host = parsed.hostname or ""
+    return f"{host}:{rule}" if rule else host
+
+
+class VariantScoreboard:
+    """Consecutive failures per URL variant; repeatedly stalling variants go last."""
+
+    def __init__(self, demote_after: int = _DEMOTE_AFTER_FAILURES):
+        self.demote_after = demote_after
+        self._streak: Dict[str, int] = {}
+
+    def order(self, candidates: Iterable[str]) -> List[str]:
+        items = list(candidates)
+        return sorted(items, key=lambda url: self._streak.get(variant_key(url), 0) >= self.demote_after)
+
+    def success(self, url: str) -> None:
+        self._streak.pop(variant_key(url), None)
+
+    def failure(self, url: str) -> None:
+        key = variant_key(url)
+        self._streak[key] = self._streak.get(key, 0) + 1
+
+
+def convert_to_file(data: bytes, dst: str, max_width: int, quality: int, fmt: str) -> Tuple[int, str]:
+    """Decode, downscale and encode ``data`` into ``dst`` atomically. Runs in a worker process.
+
+    Returns the written size and the perceptual hash of the stored picture.
+    """
+    from PIL import Image
+
+    from .image_dedup import dhash_image
+
+    img = Image.open(io.BytesIO(data)).convert("RGB")
+    if max_width > 0 and img.width > max_width:
+        h = int(img.height * max_width / img.width)
+        img = img.resize((max_width, h), Image.LANCZOS)
+    dst_path = Path(dst)
+    dst_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = dst_path.with_suffix(f".tmp.{fmt}")
+    save_fmt = "JPEG" if fmt in {"jpg", "jpeg"} else "WEBP"
+    save_kwargs: Dict[str, object] = {"format": save_fmt, "quality": quality}
+    if save_fmt == "WEBP":
+        save_kwargs["method"] = 6
+    try:
+        img.save(tmp_path, **save_kwargs)
+        os.replace(tmp_path, dst_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    return dst_path.stat().st_size, dhash_image(img)
+
+
+def _retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return min(max(float(value), 0.0), _MAX_RETRY_AFTER_SEC)
+    except ValueError:
+        pass
+    try:
+        delta = parsedate_to_datetime(value).timestamp() - time.time()
+    except (TypeError, ValueError):
+        return None
+    return min(max(delta, 0.0), _MAX_RETRY_AFTER_SEC)
+
+
+def read_timeout_for(src_url: str, timeout_sec: float) -> float:
+    # Large classistatic variants frequently stall on RU VPS. Keep the attempt
+    # short, but give 1024 a slightly longer read timeout before we fall back.
+    if "img.classistatic.de" in src_url and "rule=mo-1024" in src_url:
+        return min(timeout_sec, 3.5)
+    if "img.classistatic.de" in src_url and "rule=mo-640" in src_url:
+        return min(timeout_sec, 2.5)
+    return timeout_sec
+
+
+class AsyncImageMirror:
+    def __init__(
+        self,
+        target: TargetFn,
+        options: Optional[MirrorOptions] = None,
+        *,
+        client: Optional[httpx.AsyncClient] = None,
+        executor: Optional[Executor] = None,
+        stats: Optional[ThroughputStats] = None,
+    ):
+        self.target = target
+        self.options = options or MirrorOptions()
+        self.stats = stats or ThroughputStats()
+        self.scoreboard = VariantScoreboard()
+        self._client = client
+        self._executor = executor
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).hostname or ""
+        sem = self._host_limits.get(host)
+        if sem is None:
+            sem = asyncio.Semaphore(max(1, self.options.per_host))
+            self._host_limits[host] = sem
+        return sem
+
+    async def _fetch_once(self, client: httpx.AsyncClient, url: str) -> bytes:
+        opts = self.options
+        timeout = httpx.Timeout(read_timeout_for(url, opts.timeout_sec), connect=opts.connect_timeout_sec)
+        try:
+            async with self._host_limit(url):
+                async with client.stream("GET", url, timeout=timeout, follow_redirects=True) as resp:
+                    if resp.status_code != 200:
+                        raise MirrorFetchError(
+                            f"http_{resp.status_code}",
+                            retryable=resp.status_code in _RETRY_STATUSES,
+                            retry_after=_retry_after(resp.headers.get("retry-after")),
+                        )
+                    declared = resp.headers.get("content-length")
+                    if declared and declared.isdigit() and int(declared) > opts.max_bytes:
+                        raise MirrorFetchError("too_large")
+                    buf = bytearray()
+                    async for chunk in resp.aiter_bytes(128 * 1024):
+                        buf.extend(chunk)
+                        if len(buf) > opts.max_bytes:
+                            raise MirrorFetchError("too_large")
+                    return bytes(buf)
+        except httpx.TimeoutException as exc:
+            # A stalled variant is better served by the next (smaller) one.
+            raise MirrorFetchError("timeout") from exc
+        except httpx.TransportError as exc:
+            raise MirrorFetchError("connect", retryable=True) from exc
+
+    async def _fetch(self, client: httpx.AsyncClient, url: str) -> bytes:
+        opts = self.options
+        attempt = 0
+        while True:
+            try:
+                return await self._fetch_once(client, url)
+            except MirrorFetchError as exc:
+                if not exc.retryable or attempt >= opts.retries:
+                    raise
+                delay = exc.retry_after
+                if delay is None:
+                    delay = opts.backoff_sec * (2**attempt) * (0.5 + random.random())
+                attempt += 1
+                self.stats.retries += 1
+                await asyncio.sleep(delay)
+
+    async def mirror_one(self, client: httpx.AsyncClient, job: MirrorJob) -> Dict[str, object]:
+        opts = self.options
+        loop = asyncio.get_running_loop()
+        result: Dict[str, object] = {"image_id": job.image_id, "car_id": job.car_id}
+        last_error = "no_candidates"
+        for src_url in self.scoreboard.order(job.candidates):
+            candidate = job.candidates.index(src_url)
+            if src_url.startswith("/media/"):
+                return {**result, "ok": True, "web_path": src_url, "cached": True,
+                        "source": "already_local", "candidate": candidate}
+            dst_abs, dst_web = self.target(job, src_url)
+            if dst_abs.exists() and dst_abs.stat().st_size > 0:
+                return {**result, "ok": True, "web_path": dst_web, "cached": True,
+                        "source": "cache_hit", "url": src_url, "candidate": candidate}
+            try:
+                data = await self._fetch(client, src_url)
+            except MirrorFetchError as exc:
+                last_error = exc.code
+                self.scoreboard.failure(src_url)
+                continue
+            try:
+                written, phash = await loop.run_in_executor(
+                    self._executor, convert_to_file, data, str(dst_abs), opts.max_width, opts.quality, opts.fmt
+                )
+            except Exception as exc:  # noqa: BLE001
+                last_error = f"decode:{type(exc).__name__}"
+                continue
+            self.scoreboard.success(src_url)
+            return {**result, "ok": True, "web_path": dst_web, "cached": False, "source": "download",
+                    "url": src_url, "candidate": candidate, "bytes_in": len(data), "bytes_out": written,
+                    "phash": phash}
+        return {**result, "ok": False, "error": last_error}
+
+    def _make_client(self) -> httpx.AsyncClient:
+        opts = self.options
+        limits = httpx.Limits(
+            max_connections=max(1, opts.concurrency),
+            max_keepalive_connections=max(1, opts.concurrency),
+        )
+        return httpx.AsyncClient(
+            http2=_HTTP2,
+            limits=limits,
+            headers={"User-Agent": "Mozilla/5.0 (compatible; car-mirror/1.0)"},
+        )
+
+    async def run(
+        self,
+        jobs: Iterable[MirrorJob],
+        on_result: Optional[Callable[[Dict[str, object]], None]] = None,
+    ) -> ThroughputStats:
+        queue: asyncio.Queue = asyncio.Queue()
+        for job in jobs:
+            queue.put_nowait(job)
+        own_client = self._client is None
+        client = self._client or self._make_client()
+        own_executor = self._executor is None
+        if own_executor:
+            self._executor = ProcessPoolExecutor(max_workers=self.options.convert_workers or None)
+
+        async def worker() -> None:
+            while True:
+                try:
+                    job = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    res = await self.mirror_one(client, job)
+                except Exception as exc:  # noqa: BLE001
+                    logger.exception("image_mirror_failed image_id=%s", job.image_id)
+                    res = {"image_id": job.image_id, "car_id": job.car_id, "ok": False,
+                           "error": f"internal:{type(exc).__name__}"}
+                self.stats.record(res)
+                if on_result is not None:
+                    on_result(res)
+
+        try:
+            workers = max(1, min(self.options.concurrency, queue.qsize() or 1))
+            await asyncio.gather(*(worker() for _ in range(workers)))
+        finally:
+            if own_client:
+                await client.aclose()
+            if own_executor and self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+        return self.stats
+
+
+class MirrorProgress:
+    """Per-car checkpoints in ``progress_kv`` under ``image_mirror:<scope>:<car_id>``.
+
+    The value maps ``image_id`` to the index of the candidate URL that was
+    mirrored, so the web path can be rebuilt without touching the network.
+    Cars are only checkpointed once every selected image has a result.
+    """
+
+    def __init__(self, scope: str, *, flush_every: int = 200, flush_interval_sec: float = 10.0):
+        self.prefix = f"{_PROGRESS_PREFIX}{scope}:"
+        self.flush_every = flush_every
+        self.flush_interval_sec = flush_interval_sec
+        self._expected: Dict[int, int] = {}
+        self._done: Dict[int, Dict[int, int]] = {}
+        self._pending: Dict[int, str] = {}
+        self._last_flush = time.time()
+
+    def load(self, db: Session) -> Dict[int, Dict[int, int]]:
+        out: Dict[int, Dict[int, int]] = {}
+        rows = db.execute(
+            select(ProgressKV.key, ProgressKV.value).where(ProgressKV.key.like(f"{self.prefix}%"))
+        ).all()
+        for key, value in rows:
+            try:
+                car_id = int(key[len(self.prefix):])
+                out[car_id] = {int(k): int(v) for k, v in json.loads(value).items()}
+            except (ValueError, TypeError, AttributeError):
+                continue
+        return out
+
+    def expect(self, car_id: int, images: int) -> None:
+        self._expected[car_id] = self._expected.get(car_id, 0) + images
+
+    def record(self, car_id: int, image_id: int, candidate: Optional[int]) -> None:
+        done = self._done.setdefault(car_id, {})
+        # Failures are kept out of the checkpoint so a resumed run retries them.
+        done[image_id] = -1 if candidate is None else int(candidate)
+        if len(done) >= self._expected.get(car_id, 0):
+            finished = {str(k): v for k, v in done.items() if v >= 0}
+            value = json.dumps(finished, separators=(",", ":"))
+            if len(value) <= 2048:
+                self._pending[car_id] = value
+            self._done.pop(car_id, None)
+
+    def should_flush(self) -> bool:
+        return bool(self._pending) and (
+            len(self._pending) >= self.flush_every or time.time() - self._last_flush >= self.flush_interval_sec
+        )
+
+    def flush(self, db: Session) -> int:
+        self._last_flush = time.time()
+        if not self._pending:
+            return 0
+        dialect = db.get_bind().dialect.name
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        now = datetime.utcnow()
+        rows = [
+            {"key": f"{self.prefix}{car_id}", "value": value, "updated_at": now}
+            for car_id, value in sorted(self._pending.items())
+        ]
+        stmt = dialect_insert(ProgressKV.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["key"],
+            set_={"value": stmt.excluded.value, "updated_at": stmt.excluded.updated_at},
+        )
+        db.execute(stmt, rows)
+        db.commit()
+        self._pending.clear()
+        return len(rows)
+
+    def clear(self, db: Session) -> int:
+        removed = db.execute(delete(ProgressKV).where(ProgressKV.key.like(f"{self.prefix}%"))).rowcount or 0
+        db.commit()
+        return removed
@@ -0,0 +1,311 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, inspect, select
+from sqlalchemy.orm import Session
+
+from ..models import MediaFile, ProgressKV
+
+
+logger = logging.getLogger(__name__)
+
+_LAST_SCAN_KEY = "media_manifest.last_scan"
+# Directory mtimes have one-second resolution on some filesystems; rescan a
+# little further back than the previous scan start.
+_SCAN_SLACK_SEC = 5.0
+_table_exists_cache: Dict[str, bool] = {}
+
+
+def media_root() -> Path:
+    return Path(__file__).resolve().parents[3] / "фото-видео"
+
+
+def media_manifest_enabled() -> bool:
+    """Request code reads the manifest instead of the disk with ``MEDIA_MANIFEST=1``."""
+    return os.getenv("MEDIA_MANIFEST", "0") == "1"
+
+
+def to_rel(url: Optional[str]) -> Optional[str]:
+    """``/media/a/b.webp`` -> ``a/b.webp``; ``None`` for anything else."""
+    value = (url or "").strip()
+    if not value.startswith("/media/"):
+        return None
+    rel = value.removeprefix("/media/").strip("/")
+    if not rel or ".." in rel.split("/"):
+        return None
+    return rel
+
+
+def _dir_of(rel_path: str) -> str:
+    return rel_path.rsplit("/", 1)[0] if "/" in rel_path else ""
+
+
+def manifest_table_exists(db: Session) -> bool:
+    cache_key = str(db.get_bind().url)
+    if _table_exists_cache.get(cache_key):
+        return True
+    try:
+        exists = inspect(db.connection()).has_table(MediaFile.__tablename__)
+    except Exception:
+        exists = False
+    if exists:
+        _table_exists_cache[cache_key] = True
+    return exists
+
+
+def _file_sha1(path: Path) -> Optional[str]:
+    digest = hashlib.sha1()
+    try:
+        with path.open("rb") as fh:
+            for chunk in iter(lambda: fh.read(1 << 20), b""):
+                digest.update(chunk)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+def _upsert(db: Session, rows: List[Dict[str, object]]) -> None:
+    if not rows:
+        return
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    table = MediaFile.__table__
+    stmt = dialect_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["rel_path"],
+        set_={
+            "dir": stmt.excluded.dir,
+            "size": stmt.excluded.size,
+            "mtime": stmt.excluded.mtime,
+            "sha1": stmt.excluded.sha1,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    db.execute(stmt, rows)
+
+
+def record_files(db: Session, rel_paths: Iterable[str], *, with_hash: bool = False) -> int:
+    """Stat ``rel_paths`` under the media root and upsert them (no commit).
+
+    Paths that no longer exist are removed from the manifest instead.
+    """
+    if not manifest_table_exists(db):
+        return 0
+    root = media_root()
+    now = datetime.utcnow()
+    rows: List[Dict[str, object]] = []
+    gone: List[str] = []
+    for rel in {r for r in rel_paths if r}:
+        path = root / rel
+        try:
+            st = path.stat()
+        except OSError:
+            gone.append(rel)
+            continue
+        rows.append(
+            {
+                "rel_path": rel,
+                "dir": _dir_of(rel),
+                "size": int(st.st_size),
+                "mtime": float(st.st_mtime),
+                "sha1": _file_sha1(path) if with_hash else None,
+                "updated_at": now,
+            }
+        )
+    _upsert(db, rows)
+    forget_files(db, gone)
+    return len(rows)
+
+
+def forget_files(db: Session, rel_paths: Iterable[str]) -> int:
+    paths = sorted({r for r in rel_paths if r})
+    if not paths or not manifest_table_exists(db):
+        return 0
+    removed = 0
+    for start in range(0, len(paths), 500):
+        chunk = paths[start : start + 500]
+        removed += db.execute(delete(MediaFile).where(MediaFile.rel_path.in_(chunk))).rowcount or 0
+    return removed
+
+
+def existing_paths(db: Session, rel_paths: Iterable[str]) -> Set[str]:
+    """Subset of ``rel_paths`` present in the manifest (one query per 500 paths)."""
+    paths = sorted({r for r in rel_paths if r})
+    found: Set[str] = set()
+    for start in range(0, len(paths), 500):
+        chunk = paths[start : start + 500]
+        found.update(db.execute(select(MediaFile.rel_path).where(MediaFile.rel_path.in_(chunk))).scalars())
+    return found
+
+
+def iter_manifest(db: Session, prefix: str = "", *, batch: int = 5000) -> Iterator[Tuple[str, int]]:
+    """``(rel_path, size)`` for every manifest entry under ``prefix``, keyset-paginated."""
+    last = ""
+    like = f"{prefix.rstrip('/')}/%" if prefix else "%"
+    while True:
+        rows = db.execute(
+            select(MediaFile.rel_path, MediaFile.size)
+            .where(MediaFile.rel_path.like(like), MediaFile.rel_path > last)
+            .order_by(MediaFile.rel_path)
+            .limit(batch)
+        ).all()
+        if not rows:
+            return
+        for rel, size in rows:
+            yield rel, int(size or 0)
+        last = rows[-1][0]
+
+
+def dir_listing(db: Session, rel_dir: str) -> FrozenSet[str]:
+    rows = db.execute(select(MediaFile.rel_path).where(MediaFile.dir == rel_dir)).scalars()
+    return frozenset(rel.rsplit("/", 1)[-1] for rel in rows)
+
+
+def _known_subdirs(db: Session) -> Dict[str, Set[str]]:
+    """``rel_dir -> child directory names``, derived from the manifest's ``dir`` column."""
+    children: Dict[str, Set[str]] = defaultdict(set)
+    for (rel_dir,) in db.execute(select(MediaFile.dir).distinct()):
+        parts = rel_dir.split("/") if rel_dir else []
+        for depth in range(len(parts)):
+            children["/".join(parts[:depth])].add(parts[depth])
+    return children
+
+
+def _forget_tree(db: Session, rel_dir: str) -> int:
+    if not rel_dir:
+        return 0
+    return db.execute(
+        delete(MediaFile).where((MediaFile.dir == rel_dir) | MediaFile.dir.like(f"{rel_dir}/%"))
+    ).rowcount or 0
+
+
+def scan(
+    db: Session,
+    *,
+    full: bool = False,
+    with_hash: bool = False,
+    root: Optional[Path] = None,
+) -> Dict[str, int]:
+    """Sync the manifest with the disk. Commits per directory.
+
+    Incremental runs only list directories whose mtime moved since the last
+    scan started: creating, deleting or renaming a file (the mirror scripts
+    write via ``tmp.replace``) bumps the parent directory's mtime. An
+    unchanged directory costs one ``stat``; its subdirectories come from the
+    manifest. Directories that hold no files are therefore only found when
+    their parent changes; ``full`` lists every directory, e.g. after files
+    were edited in place.
+    """
+    root = root or media_root()
+    stats = {"dirs": 0, "listed": 0, "upserted": 0, "removed": 0}
+    if not root.exists() or not manifest_table_exists(db):
+        return stats
+    started = time.time()
+    since = 0.0
+    if not full:
+        row = db.execute(select(ProgressKV).where(ProgressKV.key == _LAST_SCAN_KEY)).scalar_one_or_none()
+        try:
+            since = float(row.value) - _SCAN_SLACK_SEC if row is not None else 0.0
+        except ValueError:
+            since = 0.0
+    subdirs = _known_subdirs(db)
+
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        stats["dirs"] += 1
+        rel_dir = directory.relative_to(root).as_posix()
+        rel_dir = "" if rel_dir == "." else rel_dir
+        try:
+            dir_mtime = directory.stat().st_mtime
+        except FileNotFoundError:
+            stats["removed"] += _forget_tree(db, rel_dir)
+            db.commit()
+            continue
+        except OSError as exc:
+            logger.warning("media_manifest_scan_failed dir=%s err=%s", directory, exc)
+            continue
+        if not full and dir_mtime < since:
+            stack.extend(directory / name for name in subdirs.get(rel_dir, ()))
+            continue
+        files: Dict[str, os.stat_result] = {}
+        on_disk_dirs: Set[str] = set()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        on_disk_dirs.add(entry.name)
+                        stack.append(Path(entry.path))
+                    elif entry.is_file(follow_symlinks=False) and not entry.name.endswith(".tmp.webp"):
+                        files[entry.name] = entry.stat()
+        except OSError as exc:
+            logger.warning("media_manifest_scan_failed dir=%s err=%s", directory, exc)
+            continue
+        stats["listed"] += 1
+        for name in subdirs.get(rel_dir, set()) - on_disk_dirs:
+            stats["removed"] += _forget_tree(db, f"{rel_dir}/{name}" if rel_dir else name)
+        known = {
+            rel: (size, mtime)
+            for rel, size, mtime in db.execute(
+                select(MediaFile.rel_path, MediaFile.size, MediaFile.mtime).where(MediaFile.dir == rel_dir)
+            ).all()
+        }
+        now = datetime.utcnow()
+        rows = []
+        for name, st in files.items():
+            rel = f"{rel_dir}/{name}" if rel_dir else name
+            if known.get(rel) == (int(st.st_size), float(st.st_mtime)):
+                continue
+            rows.append(
+                {
+                    "rel_path": rel,
+                    "dir": rel_dir,
+                    "size": int(st.st_size),
+                    "mtime": float(st.st_mtime),
+                    "sha1": _file_sha1(directory / name) if with_hash else None,
+                    "updated_at": now,
+                }
+            )
+        on_disk = {f"{rel_dir}/{name}" if rel_dir else name for name in files}
+        _upsert(db, rows)
+        stats["upserted"] += len(rows)
+        stats["removed"] += forget_files(db, [rel for rel in known if rel not in on_disk])
+        db.commit()
+
+    row = db.execute(select(ProgressKV).where(ProgressKV.key == _LAST_SCAN_KEY)).scalar_one_or_none()
+    if row is None:
+        db.add(ProgressKV(key=_LAST_SCAN_KEY, value=str(started)))
+    else:
+        row.value = str(started)
+        row.updated_at = datetime.utcnow()
+    db.commit()
+    return stats
+
+
+def install_request_index() -> None:
+    """Point ``utils.thumbs.local_media_index`` at the manifest instead of ``scandir``."""
+    from ..db import SessionLocal
+    from ..utils.thumbs import local_media_index
+
+    root = media_root()
+
+    def _lister(directory: Path) -> FrozenSet[str]:
+        try:
+            rel_dir = directory.relative_to(root).as_posix()
+        except ValueError:
+            return frozenset()
+        with SessionLocal() as db:
+            return dir_listing(db, "" if rel_dir == "." else rel_dir)
+
+    local_media_index.set_lister(_lister)
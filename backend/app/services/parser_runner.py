@@ -5,6 +5,7 @@ from datetime import datetime
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 from sqlalchemy import select
+from ..config import settings
 from ..db import SessionLocal
 from ..models import Source, SearchProfile
 from ..models.parser_run import ParserRun, ParserRunSource
@@ -17,6 +18,7 @@ from ..parsing.che168 import Che168Parser
 from ..models import Car
 from .cars_service import CarsService
 from .parsing_data_service import ParsingDataService
+from ..utils.redis_cache import bump_slice_versions, region_for_country
 
 
 class ParserRunSummary(BaseModel):
@@ -195,6 +197,8 @@ class ParserRunner:
                 )
             ]
         parser = self._parser_for(site_cfg)
+        if parser.conditional_details and settings.PARSER_CONDITIONAL_DETAILS:
+            parser.detail_validators = data_service.detail_validators(source)
         seen_all: List[str] = []
         inserted = updated = total_seen = 0
         for p in profiles:
@@ -216,6 +220,10 @@ class ParserRunner:
             inserted += inserted_i
             updated += updated_i
             seen_all.extend([c.external_id for c in parsed])
+        if parser.not_modified_ids:
+            data_service.touch_seen(source, parser.not_modified_ids)
+            total_seen += len(parser.not_modified_ids)
+            seen_all.extend(parser.not_modified_ids)
         # Record advisory warning from parser if any (e.g. mobile.de 403)
         if getattr(parser, "last_warning", None):
             warn = f"{site_cfg.key}: {parser.last_warning}"
@@ -244,6 +252,8 @@ class ParserRunner:
         )
         db.add(prs)
         db.commit()
+        if inserted or updated or deactivated:
+            bump_slice_versions(source=site_cfg.key, region=region_for_country(site_cfg.country))
         print(
             f"[parser] done source={site_cfg.key} seen={total_seen} ins={inserted} upd={updated} deact={deactivated}"
         )
@@ -1,14 +1,15 @@
 from __future__ import annotations
 
-from typing import Iterable, Tuple, List, Dict, Any
+from typing import Iterable, Tuple, List, Dict, Any, Optional
 from datetime import datetime
 import hashlib
 import logging
 import os
 from sqlalchemy.orm import Session
-from sqlalchemy import select, update, or_
+from sqlalchemy import delete, select, update, or_
 from ..models import Car, Source, CarImage, ProgressKV
 from ..services.cars_service import CarsService
+from ..services.payload_values_catalog import PayloadValuesCatalog, payload_value_slices
 from ..utils.pricing import to_rub
 from ..utils.color_groups import normalize_color_group
 from ..utils.drive_type import canonicalize_drive_type, infer_drive_type_from_variant
@@ -106,6 +107,7 @@ class ParsingDataService:
         updated = 0
         cars_service = CarsService(self.db)
         rates = cars_service.get_fx_rates() or {}
+        payload_catalog = PayloadValuesCatalog(self.db)
         recalc_car_ids: set[int] = set()
         # Normalize and de-duplicate by external_id
         unique_items: Dict[str, Dict[str, Any]] = {}
@@ -187,7 +189,16 @@ class ParsingDataService:
             if new_thumb:
                 payload["thumbnail_url"] = payload.get(
                     "thumbnail_url") or new_thumb
+            # Validators only move forward: an item parsed without a detail
+            # fetch must not erase the ones stored by an earlier run.
+            validators = {
+                key: payload.pop(key)
+                for key in ("detail_etag", "detail_last_modified")
+                if key in payload
+            }
             existing = existing_by_eid.get(eid)
+            if existing is not None and existing.is_available:
+                payload_catalog.add_car(existing, source_key=source.key, sign=-1)
             if existing:
                 sticky_emavto_leasing = self._has_sticky_emavto_leasing_flag(source, existing.source_payload)
                 if payload.get("source_payload") is not None:
@@ -246,6 +257,13 @@ class ParsingDataService:
                 inserted += 1
                 car_row = car
                 needs_recalc = True
+            if validators.get("detail_etag") or validators.get("detail_last_modified"):
+                for key, value in validators.items():
+                    if getattr(car_row, key, None) != value:
+                        setattr(car_row, key, value)
+            if car_row.is_available:
+                payload_catalog.add_car(car_row, source_key=source.key)
+            cars_service.sync_display_price_columns(car_row, rates)
             # Sync images for this car: if provided, use them; else fallback to thumbnail_url
             # Flush only newly created rows to obtain the car id.
             if getattr(car_row, "id", None) is None:
@@ -300,6 +318,7 @@ class ParsingDataService:
                                 )
                             )
 
+        payload_catalog.apply()
         self.db.commit()
         if recalc_car_ids and os.getenv("PARSER_AUTO_CALC_KR", "1") != "0":
             cars = self.db.execute(select(Car).where(Car.id.in_(sorted(recalc_car_ids)))).scalars().all()
@@ -333,12 +352,15 @@ class ParsingDataService:
         external_set = set(seen_external_ids)
         cars = self.db.execute(select(Car).where(
             Car.source_id == source.id)).scalars().all()
+        payload_catalog = PayloadValuesCatalog(self.db)
         changed = 0
         for car in cars:
             if car.external_id not in external_set and car.is_available:
+                payload_catalog.add_car(car, source_key=source.key, sign=-1)
                 car.is_available = False
                 changed += 1
         if changed:
+            payload_catalog.apply()
             self.db.commit()
         return changed
 
@@ -354,25 +376,85 @@ class ParsingDataService:
         reliable age signal we had — see cleanup_old_inactive_cars
         for the consumer side.
         """
-        stmt = (
-            update(Car)
-            .where(
-                Car.source_id == source.id,
-                Car.is_available.is_(True),
-                or_(Car.last_seen_at.is_(None), Car.last_seen_at < run_started_at),
-            )
-            .values(is_available=False)
+        stale = (
+            Car.source_id == source.id,
+            Car.is_available.is_(True),
+            or_(Car.last_seen_at.is_(None), Car.last_seen_at < run_started_at),
         )
+        # Drop the departing rows from the advanced-filter catalog in the
+        # same transaction.
+        payload_catalog = PayloadValuesCatalog(self.db)
+        payload_catalog.add_cars_where(*stale, source_key=source.key, sign=-1)
+        stmt = update(Car).where(*stale).values(is_available=False)
         result = self.db.execute(stmt)
+        payload_catalog.apply()
         self.db.commit()
         return int(result.rowcount or 0)
 
+    def detail_validators(
+        self, source: Source, external_ids: Optional[Iterable[str]] = None
+    ) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+        """source_url -> (ETag, Last-Modified) for available cars with stored validators.
+
+        Cars whose registration is missing or defaulted (the chunk runner's
+        ``needs_detail_refresh``) get no validators, so their detail page is
+        always fetched and re-parsed in full.
+        """
+        stmt = select(
+            Car.source_url,
+            Car.detail_etag,
+            Car.detail_last_modified,
+            Car.source_payload["registration_defaulted"],
+        ).where(
+            Car.source_id == source.id,
+            Car.is_available.is_(True),
+            Car.source_url.is_not(None),
+            Car.registration_year.is_not(None),
+            Car.registration_month.is_not(None),
+            or_(Car.detail_etag.is_not(None), Car.detail_last_modified.is_not(None)),
+        )
+        if external_ids is not None:
+            ids = [str(eid) for eid in external_ids if eid]
+            if not ids:
+                return {}
+            stmt = stmt.where(Car.external_id.in_(ids))
+        return {
+            str(url): (etag, last_modified)
+            for url, etag, last_modified, defaulted in self.db.execute(stmt)
+            # sqlite's JSON_EXTRACT hands JSON true back as 1.
+            if not (defaulted is True or defaulted == 1)
+        }
+
+    def touch_seen(self, source: Source, external_ids: Iterable[str]) -> int:
+        """Bump last_seen_at for listings whose detail page answered 304."""
+        ids = sorted({str(eid) for eid in external_ids if eid})
+        if not ids:
+            return 0
+        now = datetime.utcnow()
+        touched = 0
+        for start in range(0, len(ids), 1000):
+            result = self.db.execute(
+                update(Car)
+                .where(Car.source_id == source.id, Car.external_id.in_(ids[start:start + 1000]))
+                .values(last_seen_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            touched += int(result.rowcount or 0)
+        self.db.commit()
+        return touched
+
     # --- progress helpers ---
     def get_progress(self, key: str) -> str | None:
         row = self.db.execute(select(ProgressKV).where(
             ProgressKV.key == key)).scalar_one_or_none()
         return row.value if row else None
 
+    def clear_progress(self, key: str, *, prefix: bool = False) -> int:
+        cond = ProgressKV.key.like(f"{key}%") if prefix else ProgressKV.key == key
+        result = self.db.execute(delete(ProgressKV).where(cond))
+        self.db.commit()
+        return int(result.rowcount or 0)
+
     def set_progress(self, key: str, value: str) -> None:
         row = self.db.execute(select(ProgressKV).where(
             ProgressKV.key == key)).scalar_one_or_none()
@@ -0,0 +1,323 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import logging
+
+from sqlalchemy import and_, func, inspect, select
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.orm import Session
+
+from ..models import Car, CarPayloadValue, Source
+from ..utils.country_map import normalize_country_code
+from .cars_service import CarsService, normalize_brand
+
+
+logger = logging.getLogger(__name__)
+
+# Advanced-filter dropdowns backed by source_payload. Keep in sync with the
+# payload_keys lists in routers/catalog.py::filter_payload and
+# routers/pages.py::_build_filter_context.
+PAYLOAD_OPTION_KEYS: Tuple[str, ...] = (
+    "num_seats",
+    "doors_count",
+    "owners_count",
+    "emission_class",
+    "efficiency_class",
+    "climatisation",
+    "airbags",
+    "interior_design",
+    "price_rating_label",
+)
+
+_VALUE_MAX_LEN = 255
+
+SliceKey = Tuple[str, str, str, str, str]
+
+_table_exists_cache: Dict[str, bool] = {}
+
+
+def _catalog_table_exists(db: Session) -> bool:
+    bind = db.get_bind()
+    cache_key = str(bind.url)
+    cached = _table_exists_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    try:
+        # Inspect through the session's own connection: a pooled side
+        # connection would be reset on return and could roll back the
+        # caller's pending work on single-connection pools.
+        exists = inspect(db.connection()).has_table(CarPayloadValue.__tablename__)
+    except Exception:
+        exists = False
+    if not exists:
+        logger.warning("payload_values_catalog_table_missing url=%s", bind.url.render_as_string(hide_password=True))
+    # Only positive answers are cached: the migration may land while the
+    # process is running.
+    if exists:
+        _table_exists_cache[cache_key] = True
+    return exists
+
+
+def payload_catalog_region(source_key: Optional[str], country: Optional[str]) -> str:
+    """Mirror the region CASE of ``CarsService._facet_counts_from_cars``."""
+    key = str(source_key or "").lower()
+    code = str(country or "").strip().upper()
+    if code.startswith("KR") or any(hint in key for hint in CarsService.KOREA_SOURCE_HINTS):
+        return "KR"
+    if CarsService.EUROPE_SOURCE_PREFIX in key or code in CarsService.EU_COUNTRIES:
+        return "EU"
+    return code[:8]
+
+
+def payload_catalog_brand(brand: Optional[str]) -> str:
+    return normalize_brand(brand).strip().strip(".,;").lower()[:120]
+
+
+def payload_option_values(payload: Any, keys: Iterable[str] = PAYLOAD_OPTION_KEYS) -> List[Tuple[str, str]]:
+    if not isinstance(payload, dict):
+        return []
+    out: List[Tuple[str, str]] = []
+    for key in keys:
+        if key not in payload:
+            continue
+        raw = payload.get(key)
+        items = raw if isinstance(raw, list) else [raw]
+        seen: set[str] = set()
+        for item in items:
+            if item is None:
+                continue
+            text = str(item).strip()[:_VALUE_MAX_LEN]
+            if not text or text in seen:
+                continue
+            seen.add(text)
+            out.append((key, text))
+    return out
+
+
+def payload_value_slices(
+    *,
+    source_key: Optional[str],
+    country: Optional[str],
+    brand: Optional[str],
+    payload: Any,
+) -> List[SliceKey]:
+    values = payload_option_values(payload)
+    if not values:
+        return []
+    region = payload_catalog_region(source_key, country)
+    country_code = (normalize_country_code(country) or "")[:8]
+    brand_key = payload_catalog_brand(brand)
+    return [(key, region, country_code, brand_key, value) for key, value in values]
+
+
+class PayloadValuesCatalog:
+    """Read/write access to ``car_payload_values``.
+
+    Writers collect signed deltas with :meth:`add` and flush them in one
+    statement with :meth:`apply`; readers get complete option lists with a
+    single indexed GROUP BY instead of streaming ``source_payload`` blobs.
+
+    Membership is ``Car.is_available`` alone in every path. The price guard
+    of ``CarsService._available_expr`` (CATALOG_REQUIRE_PRICE) flips with
+    price recalcs that never touch the catalog, so it is not applied here.
+    """
+
+    def __init__(self, db: Session) -> None:
+        self.db = db
+        self._deltas: Dict[SliceKey, int] = defaultdict(int)
+
+    # --- writers ---
+    def add(self, slices: Iterable[SliceKey], sign: int = 1) -> None:
+        for item in slices:
+            self._deltas[item] += sign
+
+    def add_car(self, car: Any, *, source_key: Optional[str], sign: int = 1) -> None:
+        self.add(
+            payload_value_slices(
+                source_key=source_key,
+                country=getattr(car, "country", None),
+                brand=getattr(car, "brand", None),
+                payload=getattr(car, "source_payload", None),
+            ),
+            sign,
+        )
+
+    def add_cars_where(self, *conditions: Any, source_key: Optional[str], sign: int = 1) -> None:
+        """Collect the slices of every car matching ``conditions``.
+
+        Only the filter columns are streamed, not full rows; callers pass the
+        same conditions as the bulk UPDATE/DELETE they are about to run.
+        """
+        rows = self.db.execute(
+            select(Car.country, Car.brand, Car.source_payload)
+            .where(*conditions, Car.source_payload.is_not(None))
+            .execution_options(stream_results=True)
+        )
+        for country, brand, payload in rows.yield_per(1000):
+            self.add(
+                payload_value_slices(source_key=source_key, country=country, brand=brand, payload=payload),
+                sign,
+            )
+
+    def pending(self) -> Dict[SliceKey, int]:
+        return {k: v for k, v in self._deltas.items() if v}
+
+    def apply(self) -> int:
+        """Upsert pending deltas inside the caller's transaction (no commit)."""
+        pending = self.pending()
+        self._deltas.clear()
+        if not pending:
+            return 0
+        dialect = self.db.get_bind().dialect.name
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        elif dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            logger.warning("payload_values_catalog_unsupported_dialect dialect=%s", dialect)
+            return 0
+        now = datetime.utcnow()
+        rows = [
+            {
+                "payload_key": key,
+                "region": region,
+                "country": country,
+                "brand": brand,
+                "value": value,
+                "total": delta,
+                "updated_at": now,
+            }
+            for (key, region, country, brand, value), delta in sorted(pending.items())
+        ]
+        table = CarPayloadValue.__table__
+        stmt = dialect_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["payload_key", "region", "country", "brand", "value"],
+            set_={
+                "total": table.c.total + stmt.excluded.total,
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+        # A failed statement would abort the importer's transaction, so check
+        # for the table up front instead of catching errors afterwards.
+        if not _catalog_table_exists(self.db):
+            return 0
+        self.db.execute(stmt, rows)
+        return len(rows)
+
+    def rebuild(self, *, batch_size: int = 1000) -> int:
+        """Recount the whole catalog from available cars. Commits."""
+        self._deltas.clear()
+        stmt = (
+            select(Source.key, Car.country, Car.brand, Car.source_payload)
+            .join(Source, Car.source_id == Source.id)
+            .where(Car.is_available.is_(True), Car.source_payload.is_not(None))
+            .execution_options(stream_results=True)
+        )
+        for source_key, country, brand, payload in self.db.execute(stmt).yield_per(batch_size):
+            self.add(
+                payload_value_slices(
+                    source_key=source_key,
+                    country=country,
+                    brand=brand,
+                    payload=payload,
+                )
+            )
+        pending = self.pending()
+        self._deltas.clear()
+        self.db.query(CarPayloadValue).delete(synchronize_session=False)
+        now = datetime.utcnow()
+        rows = [
+            {
+                "payload_key": key,
+                "region": region,
+                "country": country,
+                "brand": brand,
+                "value": value,
+                "total": total,
+                "updated_at": now,
+            }
+            for (key, region, country, brand, value), total in sorted(pending.items())
+            if total > 0
+        ]
+        for start in range(0, len(rows), batch_size):
+            self.db.execute(CarPayloadValue.__table__.insert(), rows[start:start + batch_size])
+        self.db.commit()
+        return len(rows)
+
+    # --- readers ---
+    def is_built(self) -> bool:
+        try:
+            return self.db.execute(select(CarPayloadValue.id).limit(1)).first() is not None
+        except (ProgrammingError, OperationalError):
+            self.db.rollback()
+            return False
+
+    def value_counts(
+        self,
+        keys: Iterable[str],
+        *,
+        region: Optional[str] = None,
+        country: Optional[str] = None,
+        brand: Optional[str] = None,
+    ) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+        """Return ``{key: [{"value", "count"}, ...]}`` or ``None`` if the catalog is unavailable."""
+        key_list = [k for k in keys if k]
+        if not key_list:
+            return {}
+        region_key = str(region or "").strip().upper()
+        country_key = normalize_country_code(country) if country else None
+        if country_key == "EU":
+            region_key = region_key or "EU"
+            country_key = None
+        elif country_key == "KR":
+            region_key = "KR"
+        conditions = [CarPayloadValue.payload_key.in_(key_list)]
+        if region_key:
+            conditions.append(CarPayloadValue.region == region_key)
+        if country_key:
+            conditions.append(CarPayloadValue.country == country_key)
+        brand_key = payload_catalog_brand(brand) if brand else ""
+        if brand_key:
+            conditions.append(CarPayloadValue.brand == brand_key)
+        total_expr = func.sum(CarPayloadValue.total)
+        stmt = (
+            select(CarPayloadValue.payload_key, CarPayloadValue.value, total_expr.label("count"))
+            .where(and_(*conditions))
+            .group_by(CarPayloadValue.payload_key, CarPayloadValue.value)
+            .having(total_expr > 0)
+        )
+        try:
+            rows = self.db.execute(stmt).all()
+        except (ProgrammingError, OperationalError):
+            self.db.rollback()
+            logger.warning("payload_values_catalog_missing")
+            return None
+        if not rows and not self.is_built():
+            return None
+        out: Dict[str, List[Dict[str, Any]]] = {k: [] for k in key_list}
+        for key, value, count in rows:
+            out.setdefault(key, []).append({"value": value, "count": int(count or 0)})
+        for items in out.values():
+            items.sort(key=lambda item: (-item["count"], item["value"]))
+        return out
+
+    def values(
+        self,
+        keys: Iterable[str],
+        *,
+        limit: Optional[int] = None,
+        region: Optional[str] = None,
+        country: Optional[str] = None,
+        brand: Optional[str] = None,
+    ) -> Optional[Dict[str, List[str]]]:
+        counts = self.value_counts(keys, region=region, country=country, brand=brand)
+        if counts is None:
+            return None
+        out: Dict[str, List[str]] = {}
+        for key, items in counts.items():
+            top = items[:limit] if limit else items
+            out[key] = sorted(item["value"] for item in top)
+        return out
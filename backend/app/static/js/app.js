@@ -1642,12 +1642,19 @@
     })
   }
 
-  function renderCatalogMeta(page, pageSize, total) {
+  function renderCatalogMeta(page, pageSize, total, approximate = false) {
     const pageInfo = qs('#pageInfo')
     const resultCount = qs('#resultCount')
     const pageNumbers = qs('#pageNumbers')
     const safePageSize = Math.max(1, Number(pageSize) || 12)
     const safePage = Math.max(1, Number(page) || 1)
+    if (total === null || total === undefined) {
+      // Split mode: the total is still being counted (see pollCatalogAggregates).
+      if (pageInfo) pageInfo.textContent = `Страница ${safePage}`
+      if (resultCount) resultCount.textContent = 'Считаем количество…'
+      if (pageNumbers) pageNumbers.innerHTML = ''
+      return
+    }
     const safeTotal = Math.max(0, Number(total) || 0)
     const totalPages = Math.max(1, Math.ceil(safeTotal / safePageSize))
 
@@ -1661,7 +1668,9 @@
       } else {
         const from = (safePage - 1) * safePageSize + 1
         const to = Math.min(safeTotal, safePage * safePageSize)
-        resultCount.textContent = `Показано ${from}-${to} из ${safeTotal}`
+        // Broad filters may come back with an estimated total (API flag `approximate`).
+        const totalLabel = approximate ? `≈ ${safeTotal.toLocaleString('ru-RU')}` : String(safeTotal)
+        resultCount.textContent = `Показано ${from}-${to} из ${totalLabel}`
       }
     }
 
@@ -1694,6 +1703,28 @@
     if (totalPages > 1) addBtn(totalPages)
   }
 
+  async function pollCatalogAggregates(token, reqId, page, pageSize) {
+    for (let attempt = 0; attempt < 40; attempt += 1) {
+      await new Promise((resolve) => setTimeout(resolve, attempt < 5 ? 200 : 500))
+      if (reqId !== catalogReqId) return
+      let state = null
+      try {
+        const res = await fetch(`/api/cars_aggregates?token=${encodeURIComponent(token)}`)
+        if (!res.ok) return
+        state = await res.json()
+      } catch (e) {
+        return
+      }
+      if (reqId !== catalogReqId) return
+      if (state?.status === 'ready') {
+        window.__total = state.total
+        renderCatalogMeta(page, pageSize, state.total, Boolean(state.approximate))
+        return
+      }
+      if (state?.status !== 'pending') return
+    }
+  }
+
   async function loadCars(page = 1, options = {}) {
     const { scrollToTop = false } = options || {}
     const spinner = qs('#spinner')
@@ -1718,7 +1749,9 @@
       const reqId = ++catalogReqId
       catalogController?.abort()
       catalogController = new AbortController()
-      const res = await fetch(`${window.CATALOG_API}?${params.toString()}`, { signal: catalogController.signal })
+      const apiParams = new URLSearchParams(params)
+      apiParams.set('split', '1')
+      const res = await fetch(`${window.CATALOG_API}?${apiParams.toString()}`, { signal: catalogController.signal })
       if (reqId !== catalogReqId) return
       if (!res.ok) {
         throw new Error(`API ${res.status}`)
@@ -1726,7 +1759,10 @@
       const data = await res.json()
       if (reqId !== catalogReqId) return
       renderActiveFilters(params)
-      renderCatalogMeta(data.page, data.page_size, data.total)
+      renderCatalogMeta(data.page, data.page_size, data.total, Boolean(data.approximate))
+      if (data.count_pending && data.aggregates_token) {
+        pollCatalogAggregates(data.aggregates_token, reqId, data.page, data.page_size)
+      }
 
       if (!reuseSSR) {
         cards.dataset.ssr = '0'
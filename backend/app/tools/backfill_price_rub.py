@@ -14,7 +14,8 @@ def backfill_price_rub(only_missing: bool = True, batch: int = 5000, dry_run: bo
     db = SessionLocal()
     updated = 0
     try:
-        rates = CarsService(db).get_fx_rates() or {}
+        service = CarsService(db)
+        rates = service.get_fx_rates() or {}
         stmt = select(Car).where(Car.price.is_not(None))
         if only_missing:
             stmt = stmt.where(Car.price_rub_cached.is_(None))
@@ -26,6 +27,7 @@ def backfill_price_rub(only_missing: bool = True, batch: int = 5000, dry_run: bo
                 continue
             if not dry_run:
                 car.price_rub_cached = round(rub, 2)
+                service.sync_display_price_columns(car, rates)
             updated += 1
             touched += 1
             if touched >= batch:
@@ -8,6 +8,7 @@ from typing import Optional
 
 from sqlalchemy import func, select
 
+from ..config import settings
 from ..db import SessionLocal
 from ..models import Car, ParserRun, ParserRunSource
 from ..parsing.config import load_sites_config
@@ -15,6 +16,7 @@ from ..parsing.emavto_klg import EmAvtoKlgParser
 from ..schema_bootstrap import ensure_runtime_schema
 from ..services.parsing_data_service import ParsingDataService
 from ..utils.feed_deactivation import should_deactivate_feed
+from ..utils.redis_cache import bump_slice_versions, region_for_country
 
 
 def needs_detail_refresh(car: Car) -> bool:
@@ -49,6 +51,7 @@ def run_chunk(
         profile["mode"] = profile.get("mode", "full")
     if mode == "incremental":
         profile["skip_details"] = True
+    parser.not_modified_ids = []
     items = parser.fetch_items(profile)
     missing = len(parser.missing_tasks or [])
     initial_missing = max(0, getattr(parser, "last_tasks_total", 0) - getattr(parser, "last_details_done", 0))
@@ -91,14 +94,29 @@ def run_chunk(
 
         detail_items = []
         if tasks_to_detail:
+            # Revisited listings are fetched conditionally; a 304 is handled
+            # like an unchanged list row. Cars that still need their detail
+            # fields re-parsed always get a full fetch.
+            parser.detail_validators = {}
+            if settings.PARSER_CONDITIONAL_DETAILS:
+                parser.detail_validators = ds.detail_validators(
+                    source,
+                    [
+                        t["external_id"]
+                        for t in tasks_to_detail
+                        if t["external_id"] in existing and not needs_detail_refresh(existing[t["external_id"]])
+                    ],
+                )
             detail_items = parser.fetch_missing_details(
                 tasks_to_detail, max_runtime_sec=max_runtime_sec // 2
             )
+        not_modified = set(parser.not_modified_ids)
+        unchanged_ids.extend(sorted(not_modified))
         detail_by_id = {c.external_id: c for c in detail_items}
         fallback_items = []
         for task in tasks_to_detail:
             ext_id = task.get("external_id")
-            if not ext_id or ext_id in detail_by_id:
+            if not ext_id or ext_id in detail_by_id or ext_id in not_modified:
                 continue
             fallback_items.append(
                 {
@@ -360,6 +378,8 @@ def main() -> None:
         else:
             run.status = "partial"
         db.commit()
+        if inserted_total or updated_total or deactivated_total:
+            bump_slice_versions(source=source.key, region=region_for_country(cfg.country))
     except KeyboardInterrupt:
         print("[runner] interrupted, progress saved up to last completed chunk")
         db.rollback()
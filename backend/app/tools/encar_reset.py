@@ -5,9 +5,22 @@ from typing import Optional
 from sqlalchemy import select, delete, update
 from ..db import SessionLocal
 from ..models import Car, CarImage, Source
+from ..services.payload_values_catalog import PayloadValuesCatalog
+
+
+def _drop_from_payload_catalog(db, source_id: int) -> None:
+    # Available rows are counted in car_payload_values; take them out in
+    # the same transaction as the update/delete below.
+    source = db.get(Source, source_id)
+    catalog = PayloadValuesCatalog(db)
+    catalog.add_cars_where(
+        Car.source_id == source_id, Car.is_available.is_(True), source_key=source.key if source else None, sign=-1
+    )
+    catalog.apply()
 
 
 def soft_disable(db, source_id: int) -> int:
+    _drop_from_payload_catalog(db, source_id)
     res = db.execute(
         update(Car).where(Car.source_id ==
                           source_id).values(is_available=False)
@@ -17,6 +30,7 @@ def soft_disable(db, source_id: int) -> int:
 
 
 def hard_delete(db, source_id: int) -> int:
+    _drop_from_payload_catalog(db, source_id)
     # delete images first (foreign key to cars)
     db.execute(
         delete(CarImage).where(CarImage.car_id.in_(
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from typing import Any, Dict
+
+from ..db import SessionLocal
+from ..parsing.config import load_sites_config
+from ..parsing.html_cache import HtmlCache
+from ..services.parser_runner import PARSER_CLASSES, ParserRunner
+from ..services.parsing_data_service import ParsingDataService
+from ..utils.redis_cache import bump_slice_versions, region_for_country
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Re-run a parser over cached pages (PARSER_HTML_CACHE_DIR) without network access"
+    )
+    parser.add_argument("--source", choices=sorted(PARSER_CLASSES), help="Parser to replay")
+    parser.add_argument("--days", type=float, default=3.0, help="Only use pages fetched within N days")
+    parser.add_argument("--max-pages", type=int, default=0, help="List pages to walk (0 = parser default)")
+    parser.add_argument("--max-items", type=int, default=0)
+    parser.add_argument("--skip-details", action="store_true")
+    parser.add_argument("--insert", action="store_true", help="Upsert parsed items into DB")
+    parser.add_argument("--stats", action="store_true", help="Print cache contents and exit")
+    parser.add_argument("--prune", action="store_true", help="Apply TTL and size cap, then exit")
+    args = parser.parse_args()
+
+    cache = HtmlCache.from_settings(replay=True, max_age_sec=max(0.0, args.days) * 86400)
+    if cache is None:
+        print("PARSER_HTML_CACHE_DIR is not set — nothing to replay.")
+        return
+    if args.prune:
+        cache.replay = False
+        print(json.dumps({"pruned": cache.prune(), **cache.summary()}, ensure_ascii=False))
+        return
+    if args.stats or not args.source:
+        print(json.dumps(cache.summary(), ensure_ascii=False, indent=2))
+        return
+
+    cfg = load_sites_config().get(args.source)
+    p = PARSER_CLASSES[args.source](cfg)
+    p.enable_replay(cache)
+    profile: Dict[str, Any] = {"mode": "full", "resume_page_full": 1, "skip_details": args.skip_details}
+    if args.max_pages:
+        profile["max_pages"] = args.max_pages
+    if args.max_items:
+        profile["max_items"] = args.max_items
+
+    t0 = time.perf_counter()
+    items = p.fetch_items(profile)
+    report: Dict[str, Any] = {
+        "source": args.source,
+        "days": args.days,
+        "parsed": len(items),
+        "cache": dict(cache.stats),
+        "elapsed_sec": round(time.perf_counter() - t0, 2),
+    }
+    if getattr(p, "last_stop_reason", None):
+        report["stop_reason"] = p.last_stop_reason
+    if items:
+        filled = sum(1 for x in items if x.price is not None and x.brand and x.model)
+        report["filled"] = filled
+
+    if args.insert and items:
+        db = SessionLocal()
+        try:
+            service = ParsingDataService(db)
+            source = service.ensure_source(
+                key=cfg.key,
+                name=cfg.name,
+                country=cfg.country,
+                base_url=cfg.base_search_url,
+            )
+            inserted, updated, seen = service.upsert_parsed_items(source, [c.as_dict() for c in items])
+            report.update({"inserted": inserted, "updated": updated, "seen": seen})
+            # Same post-steps as a live run, minus deactivate_missing: a replay
+            # window is not a full snapshot of the source.
+            if cfg.key == "che168":
+                ParserRunner()._postprocess_che168_import(db, source, [c.external_id for c in items])
+            if inserted or updated:
+                bump_slice_versions(source=cfg.key, region=region_for_country(cfg.country))
+        finally:
+            db.close()
+    print(json.dumps(report, ensure_ascii=False), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,10 @@
 from __future__ import annotations
 
 import argparse
+import hashlib
 import json
 import time
-from typing import List
+from typing import Callable, Dict, List, Optional
 from sqlalchemy import select
 from sqlalchemy.exc import OperationalError
 from datetime import datetime
@@ -12,7 +13,7 @@ import itertools
 from ..db import SessionLocal
 from ..parsing.config import load_sites_config
 from ..parsing.mobile_de_feed import MobileDeFeedParser
-from ..importing.mobilede_csv import iter_mobilede_csv_rows
+from ..importing.mobilede_csv import iter_mobilede_csv_rows_with_offsets
 from ..services.parsing_data_service import ParsingDataService
 from ..models import Source, ParserRun, ParserRunSource
 from ..utils.feed_deactivation import should_deactivate_feed
@@ -36,6 +37,84 @@ def _latest_previous_seen(db, source_id: int, current_run_id: int) -> int | None
     return int(row[0] or 0) or None
 
 
+CHECKPOINT_PREFIX = "mobilede_csv_import:"
+_FINGERPRINT_SAMPLE = 4 * 1024 * 1024
+
+
+def feed_fingerprint(file_path: str) -> str:
+    """Cheap identity of a feed file: its size plus sha1 of the first and last 4 MiB."""
+    size = os.path.getsize(file_path)
+    digest = hashlib.sha1(str(size).encode("ascii"))
+    with open(file_path, "rb") as f:
+        digest.update(f.read(_FINGERPRINT_SAMPLE))
+        if size > _FINGERPRINT_SAMPLE:
+            f.seek(max(_FINGERPRINT_SAMPLE, size - _FINGERPRINT_SAMPLE))
+            digest.update(f.read(_FINGERPRINT_SAMPLE))
+    return digest.hexdigest()[:20]
+
+
+def load_checkpoint(service: ParsingDataService, key: str) -> Optional[Dict[str, int]]:
+    raw = service.get_progress(key)
+    if not raw:
+        return None
+    try:
+        state = json.loads(raw)
+        return {k: int(state[k]) for k in ("run_id", "offset", "rows", "seen", "inserted", "updated")}
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+def import_rows(
+    service: ParsingDataService,
+    feed_parser: MobileDeFeedParser,
+    file_path: str,
+    state: Dict[str, int],
+    apply_batch: Callable[[List[dict]], tuple[int, int, int]],
+    *,
+    checkpoint_key: Optional[str] = None,
+    limit: Optional[int] = None,
+    batch_size: int = 500,
+) -> Dict[str, int]:
+    """Upsert the feed from ``state["offset"]`` on, accumulating into ``state``.
+
+    After every committed batch ``state`` (byte offset and row count past the
+    batch, plus the running totals) is saved under ``checkpoint_key``, so a
+    rerun on the same file continues where this one died.
+    """
+    cursor = {"offset": state["offset"], "rows": state["rows"]}
+
+    def rows():
+        for end, row in iter_mobilede_csv_rows_with_offsets(file_path, cursor["offset"]):
+            cursor["offset"] = end
+            cursor["rows"] += 1
+            yield row
+
+    def flush(batch: List[dict]) -> None:
+        ins, upd, seen = apply_batch(batch)
+        state["inserted"] += ins
+        state["updated"] += upd
+        state["seen"] += seen
+        # The feed parser yields a row's item before reading the next row,
+        # so the cursor is exactly past the last row in this batch.
+        state["offset"] = cursor["offset"]
+        state["rows"] = cursor["rows"]
+        if checkpoint_key:
+            service.set_progress(checkpoint_key, json.dumps(state, separators=(",", ":")))
+        batch.clear()
+
+    row_iter = feed_parser.iter_parsed_from_csv(rows())
+    if limit:
+        row_iter = itertools.islice(row_iter, limit)
+    batch: List[dict] = []
+    for parsed in row_iter:
+        batch.append(parsed.as_dict())
+        if len(batch) >= batch_size:
+            flush(batch)
+    if batch:
+        flush(batch)
+    return state
+
+
 def main() -> None:
     ap = argparse.ArgumentParser(
         description="Import mobile.de CSV feed into DB")
@@ -80,6 +159,11 @@ def main() -> None:
         help="Path to write JSON stats (processed/inserted/updated/deactivated/skipped/no_photos)",
         default=None,
     )
+    ap.add_argument(
+        "--no-resume",
+        action="store_true",
+        help="Ignore the checkpoint of an interrupted import of this file and start from row zero",
+    )
     args = ap.parse_args()
 
     if not os.path.isfile(args.file):
@@ -96,16 +180,28 @@ def main() -> None:
         source = service.ensure_source(
             key=cfg.key, name="mobile.de CSV feed", country=cfg.country, base_url="csv://mobile_de"
         )
-        # Start run
-        run = ParserRun(started_at=datetime.utcnow(),
-                        trigger=args.trigger, status="partial")
-        db.add(run)
-        db.commit()
-        db.refresh(run)
+        # Checkpoints are skipped for --limit test loads.
+        checkpoint_key = None if args.limit else CHECKPOINT_PREFIX + feed_fingerprint(args.file)
+        state = load_checkpoint(service, checkpoint_key) if checkpoint_key and not args.no_resume else None
+        run = db.get(ParserRun, state["run_id"]) if state else None
+        if run is not None and run.status == "partial":
+            # Keep the interrupted run (and its started_at, which the
+            # last_seen_at deactivation relies on) and its running totals.
+            print(
+                f"[mobilede_import] resuming run={run.id} from row={state['rows']} "
+                f"offset={state['offset']} seen={state['seen']}",
+                flush=True,
+            )
+        else:
+            run = ParserRun(started_at=datetime.utcnow(),
+                            trigger=args.trigger, status="partial")
+            db.add(run)
+            db.commit()
+            db.refresh(run)
+            state = {"run_id": run.id, "offset": 0, "rows": 0, "seen": 0, "inserted": 0, "updated": 0}
 
-        inserted_total = updated_total = seen_total = skipped_total = 0
-        batch: List[dict] = []
-        BATCH_SIZE = 500
+        resumed_from_row = state["rows"]
+        skipped_total = 0
         MAX_BATCH_RETRIES = 5
 
         def apply_batch(items: List[dict]) -> tuple[int, int, int]:
@@ -125,24 +221,16 @@ def main() -> None:
                     )
                     time.sleep(delay)
 
-        row_iter = feed_parser.iter_parsed_from_csv(
-            iter_mobilede_csv_rows(args.file))
-        if args.limit:
-            row_iter = itertools.islice(row_iter, args.limit)
-
-        for parsed in row_iter:
-            batch.append(parsed.as_dict())
-            if len(batch) >= BATCH_SIZE:
-                ins, upd, seen = apply_batch(batch)
-                inserted_total += ins
-                updated_total += upd
-                seen_total += seen
-                batch.clear()
-        if batch:
-            ins, upd, seen = apply_batch(batch)
-            inserted_total += ins
-            updated_total += upd
-            seen_total += seen
+        import_rows(
+            service,
+            feed_parser,
+            args.file,
+            state,
+            apply_batch,
+            checkpoint_key=checkpoint_key,
+            limit=args.limit,
+        )
+        inserted_total, updated_total, seen_total = state["inserted"], state["updated"], state["seen"]
 
         deactivated = 0
         deactivate_mode = "skip" if args.skip_deactivate or os.getenv("MOBILEDE_SKIP_DEACTIVATE") == "1" else args.deactivate_mode
@@ -185,6 +273,9 @@ def main() -> None:
         run.updated = updated_total
         run.deactivated = deactivated
         db.commit()
+        if not args.limit:
+            # Done with this file; also drop checkpoints of older feeds that never finished.
+            service.clear_progress(CHECKPOINT_PREFIX, prefix=True)
 
         print(
             f"Import finished: seen={seen_total}, inserted={inserted_total}, updated={updated_total}, deactivated={deactivated}"
@@ -197,6 +288,7 @@ def main() -> None:
                 "updated": updated_total,
                 "deactivated": deactivated,
                 "skipped": skipped_total,
+                "resumed_from_row": resumed_from_row,
                 "deactivation_allowed": allow_deactivate,
                 "deactivate_mode": deactivate_mode,
                 "deactivate_previous_seen": previous_seen,
@@ -18,7 +18,7 @@ from backend.app.importing.mobilede_csv import iter_mobilede_csv_rows
 from backend.app.models import ParserRun, ParserRunSource, Source
 from backend.app.parsing.config import load_sites_config
 from backend.app.utils.feed_deactivation import should_deactivate_feed
-from backend.app.utils.redis_cache import redis_delete_by_pattern, bump_dataset_version
+from backend.app.utils.redis_cache import bump_slice_versions
 from backend.app.utils.telegram import (
     format_daily_report,
     resolve_telegram_chat_id,
@@ -333,12 +333,9 @@ def main() -> None:
         if os.getenv("RUN_EU_CALC_AFTER_DAILY", "1") == "1":
             since_min = int(os.getenv("EU_CALC_SINCE_MIN", "180")) if os.getenv("EU_CALC_SINCE_MIN") else 180
             recalc_eu_calc_cache(since_minutes=since_min, only_missing=True)
-        deleted = 0
-        deleted += redis_delete_by_pattern("cars_count:*")
-        deleted += redis_delete_by_pattern("cars_list:*")
-        deleted += redis_delete_by_pattern("filter_ctx_*")
-        new_ver = bump_dataset_version()
-        print(f"[mobilede_daily] redis invalidated keys={deleted} dataset_version={new_ver}")
+        # Only the mobile.de / EU slice changed: KR and CN caches stay warm.
+        new_ver = bump_slice_versions(source="mobile_de", region="EU")
+        print(f"[mobilede_daily] redis slice bumped source=mobile_de region=EU dataset_version={new_ver}")
         if os.getenv("RUN_DQC_AFTER_DAILY", "1") != "0":
             try:
                 # Import lazily so a syntax error in the QA script can never
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import argparse
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from ..db import SessionLocal
+from ..services.payload_values_catalog import PayloadValuesCatalog
+
+
+def _report(db: Session) -> None:
+    rows = db.execute(
+        text(
+            """
+            SELECT payload_key, region, COUNT(*) AS values_count, SUM(total) AS cars
+            FROM car_payload_values
+            WHERE total > 0
+            GROUP BY payload_key, region
+            ORDER BY payload_key, region
+            """
+        )
+    ).all()
+    print("car_payload_values by key/region:")
+    for key, region, values_count, cars in rows:
+        print(f"  {key} {region or '-'}: values={int(values_count or 0)} cars={int(cars or 0)}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Rebuild the advanced-filter value catalog (car_payload_values) from available cars.",
+    )
+    parser.add_argument("--report", action="store_true")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        count = PayloadValuesCatalog(db).rebuild(batch_size=max(100, int(args.batch_size)))
+        print(f"car_payload_values rows={count}")
+        if args.report:
+            _report(db)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+"""Record EXPLAIN plans of catalog count/list queries and diff them against a baseline.
+
+    python -m backend.app.tools.query_plan_guard --database-url postgresql+psycopg://.../bench \
+        --save-baseline logs/query_plans/baseline.json
+    python -m backend.app.tools.query_plan_guard --database-url ... --baseline logs/query_plans/baseline.json
+
+Statements come from ``CarsService.catalog_query_statements`` so they match what
+``list_cars`` runs. Flags seq scans over large relations, sorts/hashes that
+spill to disk, and (against a baseline) plan-shape changes and slowdowns.
+Exit code 1 means the guard found regressions.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import create_engine, func, select, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
+from ..models import Car
+
+
+DEFAULT_OUT_DIR = Path("logs/query_plans")
+
+# Seq scans below this many rows (estimated or actual) are not worth flagging.
+SEQ_SCAN_MIN_ROWS = 5000
+
+# (name, filters, sort, page). ``{brand}``/``{model}``/``{color}`` are replaced
+# by the most common values in the target DB so the combinations hit real rows.
+DEFAULT_COMBINATIONS: Tuple[Tuple[str, Dict[str, Any], Optional[str], int], ...] = (
+    ("eu_default", {"region": "EU"}, None, 1),
+    ("kr_default", {"region": "KR"}, None, 1),
+    ("eu_price_asc", {"region": "EU"}, "price_asc", 1),
+    ("eu_price_desc", {"region": "EU"}, "price_desc", 1),
+    ("eu_mileage_asc", {"region": "EU"}, "mileage_asc", 1),
+    ("eu_deep_page", {"region": "EU"}, None, 200),
+    ("country_de", {"region": "EU", "country": "DE"}, None, 1),
+    ("brand", {"region": "EU", "brand": "{brand}"}, None, 1),
+    ("brand_model", {"region": "EU", "brand": "{brand}", "model": "{model}"}, None, 1),
+    ("brand_model_price_asc", {"region": "EU", "brand": "{brand}", "model": "{model}"}, "price_asc", 1),
+    ("price_range", {"region": "EU", "price_min": 1_500_000, "price_max": 4_000_000}, None, 1),
+    ("year_mileage", {"region": "EU", "year_min": 2019, "mileage_max": 60_000}, None, 1),
+    ("reg_year", {"region": "EU", "reg_year_min": 2021, "reg_month_min": 1}, None, 1),
+    ("engine_body", {"region": "EU", "engine_type": "diesel", "body_type": "suv"}, None, 1),
+    ("transmission_drive", {"region": "EU", "transmission": "automatic", "drive_type": "awd"}, None, 1),
+    ("color", {"region": "EU", "color": "{color}"}, None, 1),
+    ("power_cc", {"region": "EU", "power_hp_min": 200, "engine_cc_max": 3000}, None, 1),
+    ("payload_emission", {"region": "EU", "emission_class": "euro6"}, None, 1),
+    ("payload_climatisation", {"region": "EU", "climatisation": "automatic_climatisation"}, None, 1),
+    ("interior_color", {"region": "EU", "interior_color": "black"}, None, 1),
+    ("search_q", {"region": "EU", "q": "{brand}"}, None, 1),
+    ("kr_brand", {"region": "KR", "brand": "{brand}"}, None, 1),
+)
+
+
+@dataclass
+class PlanRecord:
+    name: str
+    query: str
+    filters: Dict[str, Any]
+    shape: str
+    total_ms: Optional[float] = None
+    shared_hit: int = 0
+    shared_read: int = 0
+    seq_scans: List[str] = field(default_factory=list)
+    spills: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}.{self.query}"
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _node_label(node: Dict[str, Any]) -> str:
+    label = str(node.get("Node Type") or "?")
+    target = node.get("Index Name") or node.get("Relation Name")
+    return f"{label}({target})" if target else label
+
+
+def _plan_shape(node: Dict[str, Any]) -> str:
+    children = node.get("Plans") or []
+    label = _node_label(node)
+    if not children:
+        return label
+    return f"{label}[{','.join(_plan_shape(child) for child in children)}]"
+
+
+def _walk(node: Dict[str, Any]) -> Iterable[Dict[str, Any]]:
+    yield node
+    for child in node.get("Plans") or []:
+        yield from _walk(child)
+
+
+def analyze_pg_plan(plan_json: Any, *, seq_scan_min_rows: int = SEQ_SCAN_MIN_ROWS) -> Dict[str, Any]:
+    """Shape, timings and problem nodes of an ``EXPLAIN (FORMAT JSON)`` result."""
+    doc = plan_json[0] if isinstance(plan_json, list) else plan_json
+    root = doc.get("Plan") or {}
+    seq_scans: List[str] = []
+    spills: List[str] = []
+    for node in _walk(root):
+        node_type = node.get("Node Type")
+        if node_type == "Seq Scan":
+            rows = max(
+                float(node.get("Plan Rows") or 0),
+                float(node.get("Actual Rows") or 0) * float(node.get("Actual Loops") or 1),
+                float(node.get("Rows Removed by Filter") or 0),
+            )
+            if rows >= seq_scan_min_rows:
+                seq_scans.append(str(node.get("Relation Name") or "?"))
+        if node.get("Sort Space Type") == "Disk" or "external" in str(node.get("Sort Method") or ""):
+            spills.append(f"sort:{node.get('Sort Method')}:{node.get('Sort Space Used')}kB")
+        if int(node.get("Hash Batches") or 1) > 1:
+            spills.append(f"hash:batches={node.get('Hash Batches')}")
+    return {
+        "shape": _plan_shape(root),
+        "total_ms": doc.get("Execution Time"),
+        "shared_hit": int(root.get("Shared Hit Blocks") or 0),
+        "shared_read": int(root.get("Shared Read Blocks") or 0),
+        "seq_scans": seq_scans,
+        "spills": spills,
+    }
+
+
+def analyze_sqlite_plan(rows: Iterable[Any]) -> Dict[str, Any]:
+    """Rough equivalent for ``EXPLAIN QUERY PLAN`` on sqlite (scratch DBs, tests)."""
+    details = [str(row[-1]) for row in rows]
+    seq_scans = [d.split()[1] for d in details if d.startswith("SCAN ") and "USING" not in d and len(d.split()) > 1]
+    return {
+        "shape": " > ".join(details),
+        "total_ms": None,
+        "shared_hit": 0,
+        "shared_read": 0,
+        "seq_scans": seq_scans,
+        "spills": [],
+    }
+
+
+def _render_sql(db: Session, stmt: Any) -> str:
+    compiled = stmt.compile(
+        dialect=db.get_bind().dialect,
+        compile_kwargs={"literal_binds": True, "render_postcompile": True},
+    )
+    return str(compiled)
+
+
+def explain_statement(db: Session, stmt: Any, *, analyze: bool = True, timeout_ms: int = 60000) -> Dict[str, Any]:
+    sql = _render_sql(db, stmt)
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text(f"SET LOCAL statement_timeout = {int(timeout_ms)}"))
+        opts = "ANALYZE, BUFFERS, FORMAT JSON" if analyze else "FORMAT JSON"
+        raw = db.connection().exec_driver_sql(f"EXPLAIN ({opts}) {sql}").scalar_one()
+        return analyze_pg_plan(json.loads(raw) if isinstance(raw, str) else raw)
+    rows = db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}").all()
+    return analyze_sqlite_plan(rows)
+
+
+def sample_values(db: Session) -> Dict[str, str]:
+    """Most common brand/model/color, so placeholder filters select real rows."""
+    values = {"brand": "BMW", "model": "X5", "color": "black"}
+    top_brand = db.execute(
+        select(Car.brand).where(Car.brand.is_not(None)).group_by(Car.brand).order_by(func.count().desc()).limit(1)
+    ).scalar()
+    if top_brand:
+        values["brand"] = top_brand
+        top_model = db.execute(
+            select(Car.model)
+            .where(Car.brand == top_brand, Car.model.is_not(None))
+            .group_by(Car.model)
+            .order_by(func.count().desc())
+            .limit(1)
+        ).scalar()
+        if top_model:
+            values["model"] = top_model
+    top_color = db.execute(
+        select(Car.color).where(Car.color.is_not(None)).group_by(Car.color).order_by(func.count().desc()).limit(1)
+    ).scalar()
+    if top_color:
+        values["color"] = str(top_color).lower()
+    return values
+
+
+def _fill(filters: Dict[str, Any], values: Dict[str, str]) -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+    for key, val in filters.items():
+        out[key] = val.format(**values) if isinstance(val, str) and "{" in val else val
+    return out
+
+
+def collect_plans(
+    db: Session,
+    *,
+    combinations: Iterable[Tuple[str, Dict[str, Any], Optional[str], int]] = DEFAULT_COMBINATIONS,
+    only: Optional[List[str]] = None,
+    analyze: bool = True,
+    timeout_ms: int = 60000,
+) -> List[PlanRecord]:
+    from ..services.cars_service import CarsService
+
+    service = CarsService(db)
+    values = sample_values(db)
+    records: List[PlanRecord] = []
+    for name, raw_filters, sort, page in combinations:
+        if only and not any(name.startswith(prefix) for prefix in only):
+            continue
+        filters = _fill(raw_filters, values)
+        try:
+            stmts = service.catalog_query_statements(sort=sort, page=page, page_size=20, light=True, **filters)
+        except Exception as exc:
+            db.rollback()
+            records.append(PlanRecord(name=name, query="build", filters=filters, shape="", error=str(exc)[:300]))
+            continue
+        for query, stmt in stmts.items():
+            try:
+                info = explain_statement(db, stmt, analyze=analyze, timeout_ms=timeout_ms)
+                records.append(PlanRecord(name=name, query=query, filters=filters, **info))
+            except Exception as exc:
+                records.append(
+                    PlanRecord(name=name, query=query, filters=filters, shape="", error=str(exc).splitlines()[0][:300])
+                )
+            finally:
+                # EXPLAIN ANALYZE executes the query; never keep anything it touched.
+                db.rollback()
+    return records
+
+
+def build_report(records: Iterable[PlanRecord], *, dialect: str) -> Dict[str, Any]:
+    return {
+        "kind": "query_plans",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "dialect": dialect,
+        "plans": {rec.key: rec.as_dict() for rec in records},
+    }
+
+
+def find_issues(
+    report: Dict[str, Any],
+    baseline: Optional[Dict[str, Any]] = None,
+    *,
+    tolerance: float = 0.5,
+    min_delta_ms: float = 20.0,
+) -> List[Dict[str, Any]]:
+    """Problems in ``report``; with a baseline only what is new relative to it."""
+    issues: List[Dict[str, Any]] = []
+    base_plans = (baseline or {}).get("plans") or {}
+    for key, plan in (report.get("plans") or {}).items():
+        base = base_plans.get(key)
+        if plan.get("error"):
+            if base is None or not base.get("error"):
+                issues.append({"plan": key, "kind": "error", "detail": plan["error"]})
+            continue
+        base_seq = set((base or {}).get("seq_scans") or [])
+        for rel in plan.get("seq_scans") or []:
+            if rel not in base_seq:
+                issues.append({"plan": key, "kind": "seq_scan", "detail": rel})
+        base_spills = len((base or {}).get("spills") or [])
+        if len(plan.get("spills") or []) > base_spills:
+            issues.append({"plan": key, "kind": "spill", "detail": ", ".join(plan["spills"])})
+        if base is None or base.get("error"):
+            continue
+        if plan.get("shape") != base.get("shape"):
+            issues.append({"plan": key, "kind": "plan_changed", "detail": f"{base.get('shape')} -> {plan.get('shape')}"})
+        now_ms, base_ms = plan.get("total_ms"), base.get("total_ms")
+        if now_ms is not None and base_ms is not None:
+            if now_ms - base_ms > min_delta_ms and now_ms > base_ms * (1.0 + tolerance):
+                issues.append({"plan": key, "kind": "slower", "detail": f"{base_ms:.1f}ms -> {now_ms:.1f}ms"})
+    return issues
+
+
+def _engine(args: argparse.Namespace):
+    from ..config import settings
+
+    url = args.database_url or os.getenv("BENCH_DATABASE_URL")
+    if not url:
+        if not args.allow_app_db:
+            raise SystemExit("--database-url or BENCH_DATABASE_URL is required (or --allow-app-db)")
+        url = settings.sync_database_url
+    elif not args.allow_app_db:
+        app_url = make_url(settings.sync_database_url)
+        target = make_url(url)
+        if (target.host, target.port, target.database) == (app_url.host, app_url.port, app_url.database):
+            raise SystemExit("refusing to EXPLAIN ANALYZE against the application database; pass --allow-app-db")
+    return create_engine(url, future=True)
+
+
+def _write(report: Dict[str, Any], path: str | Path) -> Path:
+    out = Path(path)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, ensure_ascii=False, indent=2, sort_keys=True), encoding="utf-8")
+    return out
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="EXPLAIN catalog filter combinations and guard against plan regressions")
+    parser.add_argument("--database-url", default=None, help="seeded DB to explain against (or BENCH_DATABASE_URL)")
+    parser.add_argument("--allow-app-db", action="store_true")
+    parser.add_argument("--only", action="append", default=[], help="combination name prefix (repeatable)")
+    parser.add_argument("--no-analyze", action="store_true", help="plain EXPLAIN; nothing is executed")
+    parser.add_argument("--timeout-ms", type=int, default=60000)
+    parser.add_argument("--out", default=None, help="report path (default logs/query_plans/plans_<ts>.json)")
+    parser.add_argument("--baseline", default=None, help="compare against this report")
+    parser.add_argument("--save-baseline", default=None, help="also write the report to this path")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="relative slowdown that counts as a regression")
+    parser.add_argument("--strict", action="store_true", help="without --baseline, exit 1 on any seq scan/spill")
+    args = parser.parse_args(argv)
+
+    engine = _engine(args)
+    with Session(engine) as db:
+        records = collect_plans(db, only=args.only or None, analyze=not args.no_analyze, timeout_ms=args.timeout_ms)
+    report = build_report(records, dialect=engine.dialect.name)
+    out = _write(report, args.out or DEFAULT_OUT_DIR / f"plans_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    print(f"[plan_guard] plans={len(records)} report={out}")
+    if args.save_baseline:
+        _write(report, args.save_baseline)
+        print(f"[plan_guard] baseline={args.save_baseline}")
+
+    for rec in records:
+        ms = f"{rec.total_ms:.1f}ms" if rec.total_ms is not None else "-"
+        print(f"[plan_guard] {rec.key} {ms} {rec.error or rec.shape[:160]}")
+
+    baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8")) if args.baseline else None
+    issues = find_issues(report, baseline, tolerance=args.tolerance)
+    for issue in issues:
+        print(f"[plan_guard] {issue['kind'].upper()} {issue['plan']}: {issue['detail']}")
+    if not issues:
+        print("[plan_guard] no issues")
+    return 1 if issues and (baseline is not None or args.strict) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
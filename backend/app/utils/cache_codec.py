@@ -0,0 +1,119 @@
+"""Encoding of Redis cache values.
+
+Small values are stored as plain JSON, exactly as before. Values above
+``REDIS_CACHE_COMPRESS_MIN`` bytes are compressed and prefixed with a
+three-byte header ``\\x00<serializer><compressor>``. JSON text never starts
+with ``\\x00``, so entries written before the codec existed still decode.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Tuple, Union
+
+try:
+    import orjson
+except Exception:  # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    import zstandard
+except Exception:  # pragma: no cover - optional dependency
+    zstandard = None
+
+
+MAGIC = b"\x00"
+SERIALIZER_JSON = b"j"
+COMPRESSOR_NONE = b"n"
+COMPRESSOR_ZLIB = b"z"
+COMPRESSOR_ZSTD = b"s"
+
+
+class CacheCodecError(ValueError):
+    pass
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    return str(obj)
+
+
+def codec_mode() -> str:
+    """``auto`` (default) compresses large values; ``json`` keeps plain JSON only."""
+    mode = (os.getenv("REDIS_CACHE_CODEC", "auto") or "auto").strip().lower()
+    return mode if mode in {"auto", "json"} else "auto"
+
+
+def _compress_min() -> int:
+    try:
+        return max(0, int(os.getenv("REDIS_CACHE_COMPRESS_MIN", "16384")))
+    except ValueError:
+        return 16384
+
+
+def dumps_json(value: Any) -> bytes:
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, default=_default, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            # Integers beyond 64 bits and similar edge cases.
+            pass
+    return json.dumps(value, ensure_ascii=False, default=_default).encode("utf-8")
+
+
+def loads_json(raw: Union[bytes, str]) -> Any:
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _compress(body: bytes) -> Tuple[bytes, bytes]:
+    if zstandard is not None:
+        level = int(os.getenv("REDIS_CACHE_ZSTD_LEVEL", "3") or 3)
+        return COMPRESSOR_ZSTD, zstandard.ZstdCompressor(level=level).compress(body)
+    level = int(os.getenv("REDIS_CACHE_ZLIB_LEVEL", "1") or 1)
+    return COMPRESSOR_ZLIB, zlib.compress(body, level)
+
+
+def _decompress(compressor: bytes, payload: bytes) -> bytes:
+    if compressor == COMPRESSOR_NONE:
+        return payload
+    if compressor == COMPRESSOR_ZLIB:
+        return zlib.decompress(payload)
+    if compressor == COMPRESSOR_ZSTD:
+        if zstandard is None:
+            raise CacheCodecError("zstd value but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(payload)
+    raise CacheCodecError(f"unknown compressor {compressor!r}")
+
+
+def encode(value: Any) -> Tuple[bytes, int]:
+    """``(stored_bytes, json_size)`` for ``value``."""
+    body = dumps_json(value)
+    if codec_mode() == "json" or len(body) < _compress_min():
+        return body, len(body)
+    compressor, packed = _compress(body)
+    # Not worth a header and a decompress on every hit.
+    if len(packed) >= len(body) * 0.9:
+        return body, len(body)
+    return MAGIC + SERIALIZER_JSON + compressor + packed, len(body)
+
+
+def decode(raw: Union[bytes, str]) -> Any:
+    if isinstance(raw, str):
+        return loads_json(raw)
+    if raw[:1] != MAGIC:
+        return loads_json(raw)
+    if len(raw) < 3:
+        raise CacheCodecError("truncated header")
+    serializer, compressor = raw[1:2], raw[2:3]
+    if serializer != SERIALIZER_JSON:
+        raise CacheCodecError(f"unknown serializer {serializer!r}")
+    return loads_json(_decompress(compressor, raw[3:]))
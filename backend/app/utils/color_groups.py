@@ -6,6 +6,8 @@ import re
 import unicodedata
 import colorsys
 
+from .memo import memoize_normalizer
+
 
 @dataclass(frozen=True)
 class ColorGroup:
@@ -187,6 +189,7 @@ def _group_from_hex(color_hex: str) -> Optional[str]:
     return "pink"
 
 
+@memoize_normalizer
 def normalize_color_group(raw: Optional[str], color_hex: Optional[str] = None) -> str:
     if color_hex:
         group = _group_from_hex(color_hex)
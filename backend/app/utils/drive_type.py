@@ -35,6 +35,8 @@ from __future__ import annotations
 import re
 from typing import Optional
 
+from .memo import memoize_normalizer
+
 
 CANONICAL_DRIVE_TYPES: frozenset[str] = frozenset({"fwd", "rwd", "awd"})
 
@@ -84,6 +86,7 @@ _FWD_BADGES: tuple[re.Pattern[str], ...] = tuple(
 )
 
 
+@memoize_normalizer
 def canonicalize_drive_type(value: Optional[str]) -> Optional[str]:
     """Fold an arbitrary parser output into the canonical lowercase set.
 
@@ -24,6 +24,8 @@ from __future__ import annotations
 import re
 from typing import Optional
 
+from .memo import memoize_normalizer
+
 
 CANONICAL_ENGINE_TYPES: frozenset[str] = frozenset(
     {
@@ -53,6 +55,7 @@ _DISCLAIMER_FRAGMENTS: tuple[str, ...] = (
 )
 
 
+@memoize_normalizer
 def canonicalize_engine_type(value: Optional[str]) -> Optional[str]:
     """Return one of :data:`CANONICAL_ENGINE_TYPES` or ``None``.
 
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import functools
+import os
+from typing import Any, Callable, Dict, Iterator, Tuple, TypeVar
+
+from .request_metrics import registry
+
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# Free-text values (descriptions, disclaimers) are unique per row: caching
+# them would only evict the short taxonomy values that do repeat.
+_MAX_KEY_LEN = 256
+_SIMPLE_TYPES = (str, int, float, bool, type(None))
+
+_memoized: Dict[str, Callable[..., Any]] = {}
+
+
+def _maxsize() -> int:
+    try:
+        return max(0, int(os.getenv("NORMALIZE_MEMO_MAXSIZE", "8192")))
+    except ValueError:
+        return 8192
+
+
+def _cacheable(args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> bool:
+    for value in (*args, *kwargs.values()):
+        if not isinstance(value, _SIMPLE_TYPES):
+            return False
+        if isinstance(value, str) and len(value) > _MAX_KEY_LEN:
+            return False
+    return True
+
+
+def memoize_normalizer(fn: F) -> F:
+    """Bounded LRU for pure value normalizers (taxonomy, colors, brands).
+
+    Calls with anything other than short scalars go straight to ``fn``.
+    ``NORMALIZE_MEMO_MAXSIZE=0`` disables the cache.
+    """
+    maxsize = _maxsize()
+    if maxsize == 0:
+        return fn
+    cached = functools.lru_cache(maxsize=maxsize)(fn)
+    bypassed = [0]
+
+    @functools.wraps(fn)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        if _cacheable(args, kwargs):
+            return cached(*args, **kwargs)
+        bypassed[0] += 1
+        return fn(*args, **kwargs)
+
+    def cache_stats() -> Dict[str, int]:
+        info = cached.cache_info()
+        return {
+            "hits": info.hits,
+            "misses": info.misses,
+            "bypassed": bypassed[0],
+            "size": info.currsize,
+            "maxsize": info.maxsize or 0,
+        }
+
+    def cache_clear() -> None:
+        cached.cache_clear()
+        bypassed[0] = 0
+
+    wrapper.cache_stats = cache_stats  # type: ignore[attr-defined]
+    wrapper.cache_clear = cache_clear  # type: ignore[attr-defined]
+    _memoized[f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__qualname__}"] = wrapper
+    return wrapper  # type: ignore[return-value]
+
+
+def memo_stats() -> Dict[str, Dict[str, int]]:
+    return {name: fn.cache_stats() for name, fn in sorted(_memoized.items())}  # type: ignore[attr-defined]
+
+
+def _collect() -> Iterator[Tuple[str, Dict[str, str], float]]:
+    for name, stats in memo_stats().items():
+        for field in ("hits", "misses", "bypassed"):
+            yield "app_normalize_memo_calls_total", {"function": name, "result": field}, stats[field]
+        yield "app_normalize_memo_entries", {"function": name}, stats["size"]
+
+
+registry.add_collector(_collect)
@@ -1,6 +1,11 @@
 import math
 import os
-from typing import Any, Optional
+from typing import Any, Optional, Sequence
+
+try:
+    import numpy as np
+except Exception:  # pragma: no cover - optional dependency in local tooling
+    np = None
 
 PRICE_NOTE_WITHOUT_UTIL = "без утильсбора РФ"
 PRICE_NOTE_EUROPE = "Цена в Европе"
@@ -234,3 +239,171 @@ def price_without_util_note(
     if not reg and c and c != "RU" and not c.startswith("KR"):
         return PRICE_NOTE_EUROPE
     return None
+
+
+def public_display_price_fields(
+    total_price_rub_cached: Optional[float],
+    price_rub_cached: Optional[float],
+    *,
+    calc_breakdown: Optional[list] = None,
+    raw_price: Optional[float] = None,
+    currency: Optional[str] = None,
+    country: Optional[str] = None,
+    fx_eur: Optional[float] = None,
+    fx_usd: Optional[float] = None,
+    fx_cny: Optional[float] = None,
+) -> tuple[Optional[float], int]:
+    """Return ``(display_price_rub, display_price_group)`` as persisted on ``cars``.
+
+    Same rules as the catalog sort; the region is derived from the row's
+    country because the stored value must not depend on the request.
+    """
+    display = resolve_public_display_price_rub(
+        total_price_rub_cached,
+        price_rub_cached,
+        calc_breakdown=calc_breakdown,
+        raw_price=raw_price,
+        currency=currency,
+        fx_eur=fx_eur,
+        fx_usd=fx_usd,
+        fx_cny=fx_cny,
+    )
+    note = price_without_util_note(
+        display_price=display,
+        total_price_rub_cached=total_price_rub_cached,
+        calc_breakdown=calc_breakdown,
+        country=country,
+    )
+    return display, public_display_price_group(display, calc_breakdown=calc_breakdown, price_note=note)
+
+
+def _float_array(values: Sequence[Any]) -> "np.ndarray":
+    out = np.full(len(values), np.nan, dtype=float)
+    for idx, raw in enumerate(values):
+        if raw is None:
+            continue
+        try:
+            out[idx] = float(raw)
+        except (TypeError, ValueError):
+            continue
+    return out
+
+
+def annotate_display_prices_vectorized(
+    items: list[dict],
+    *,
+    sort: Optional[str],
+    region: Optional[str] = None,
+    fx_eur: Optional[float] = None,
+    fx_usd: Optional[float] = None,
+    fx_cny: Optional[float] = None,
+) -> list[dict]:
+    """Vectorized ``resolve_public_display_price_rub`` + ``price_without_util_note`` + sort.
+
+    Fills ``display_price_rub``/``price_note`` on every light row and returns
+    the rows in ``sort_items_by_display_price`` order, computing prices,
+    groups and the sort permutation in one NumPy pass instead of per-row
+    Python calls. Falls back to the scalar helpers when NumPy is missing.
+    """
+    if not items:
+        return items
+    if np is None:
+        for row in items:
+            row["display_price_rub"] = resolve_public_display_price_rub(
+                row.get("total_price_rub_cached"),
+                row.get("price_rub_cached"),
+                calc_breakdown=row.get("calc_breakdown_json"),
+                raw_price=row.get("price"),
+                currency=row.get("currency"),
+                fx_eur=fx_eur,
+                fx_usd=fx_usd,
+                fx_cny=fx_cny,
+            )
+            row["price_note"] = price_without_util_note(
+                display_price=row.get("display_price_rub"),
+                total_price_rub_cached=row.get("total_price_rub_cached"),
+                calc_breakdown=row.get("calc_breakdown_json"),
+                region=region,
+                country=row.get("country"),
+            )
+        return sort_items_by_display_price(items, sort=sort)
+
+    step = float(get_round_step_rub())
+    total = _float_array([row.get("total_price_rub_cached") for row in items])
+    price_rub = _float_array([row.get("price_rub_cached") for row in items])
+    raw_price = _float_array([row.get("price") for row in items])
+    ids = _float_array([row.get("id") or 0 for row in items])
+    ids[np.isnan(ids)] = 0
+    currency = np.array([str(row.get("currency") or "").strip().upper() for row in items], dtype=object)
+    country = np.array([str(row.get("country") or "").upper() for row in items], dtype=object)
+    has_wu = np.fromiter(
+        (has_without_util_marker(row.get("calc_breakdown_json")) for row in items),
+        dtype=bool,
+        count=len(items),
+    )
+    allow = has_wu | public_price_fallback_enabled()
+    has_total = ~np.isnan(total)
+
+    with np.errstate(invalid="ignore"):
+        # display_price_rub(): total wins whenever present, even if <= 0.
+        base = np.where(has_total, total, np.where(allow, price_rub, np.nan))
+        base = np.where(base > 0, base, np.nan)
+        # raw_price_to_rub() fallback for rows the cached columns left empty.
+        rate = np.full(len(items), np.nan, dtype=float)
+        for code, fx in (("EUR", fx_eur), ("USD", fx_usd), ("CNY", fx_cny)):
+            if fx and float(fx) > 0:
+                rate[currency == code] = float(fx)
+        rate[(currency == "RUB") | (currency == "₽")] = 1.0
+        raw_rub = np.where(raw_price > 0, raw_price * rate, np.nan)
+        raw_rub = np.where(raw_rub > 0, raw_rub, np.nan)
+        value = np.where(np.isnan(base) & allow, raw_rub, base)
+        display = np.ceil(value / step) * step
+    has_display = ~np.isnan(display)
+
+    reg = str(region or "").upper()
+    is_kr = np.array([c.startswith("KR") for c in country], dtype=bool) | (reg == "KR")
+    is_cn = country == "CN"
+    europe_default = (
+        np.array([bool(c) and c != "RU" and not c.startswith("KR") for c in country], dtype=bool)
+        if not reg
+        else np.zeros(len(items), dtype=bool)
+    )
+    notes = np.select(
+        [
+            ~has_display,
+            is_kr & (has_wu | ~has_total),
+            is_kr,
+            has_wu & is_cn,
+            has_wu,
+            has_total,
+            is_cn,
+            np.full(len(items), reg == "EU"),
+            europe_default,
+        ],
+        [
+            None,
+            PRICE_NOTE_WITHOUT_UTIL,
+            PRICE_NOTE_MOSCOW,
+            PRICE_NOTE_CHINA,
+            PRICE_NOTE_EUROPE,
+            PRICE_NOTE_MOSCOW,
+            PRICE_NOTE_CHINA,
+            PRICE_NOTE_EUROPE,
+            PRICE_NOTE_EUROPE,
+        ],
+        default=None,
+    )
+    second_tier = np.isin(notes, [PRICE_NOTE_EUROPE, PRICE_NOTE_CHINA, PRICE_NOTE_WITHOUT_UTIL]) | has_wu
+    groups = np.where(~has_display, 2, np.where(second_tier, 1, 0))
+
+    for idx, row in enumerate(items):
+        row["display_price_rub"] = float(display[idx]) if has_display[idx] else None
+        row["price_note"] = notes[idx]
+
+    if sort not in {"price_asc", "price_desc"}:
+        return items
+    sort_value = np.where(has_display, display, 0.0)
+    if sort == "price_desc":
+        sort_value = -sort_value
+    order = np.lexsort((ids, sort_value, groups))
+    return [items[idx] for idx in order]
@@ -1,8 +1,18 @@
 from __future__ import annotations
 
+import asyncio
+import logging
+import random
 import threading
 import time
-from typing import Optional
+import weakref
+from typing import Any, Dict, Iterator, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+from .request_metrics import registry
+
+
+logger = logging.getLogger(__name__)
 
 
 class TokenBucket:
@@ -33,4 +43,245 @@ class TokenBucket:
             time.sleep(min(needed, 1.0))
 
 
-__all__ = ["TokenBucket"]
+# --- adaptive (AIMD) rate control ---
+
+_REDIS_PREFIX = "parser_rate:"
+_REDIS_TTL_SEC = 6 * 3600
+
+# Reserve the next send slot: slots are spaced (jitter factor)/rate apart and
+# never start before a Retry-After block ends. ARGV = now, default rate, ttl,
+# jitter factor. Numbers travel as strings because Redis truncates Lua
+# numbers to integers in replies.
+_RESERVE_LUA = """
+local state = redis.call('HMGET', KEYS[1], 'rate', 'next_at', 'blocked_until')
+local now = tonumber(ARGV[1])
+local rate = tonumber(state[1]) or tonumber(ARGV[2])
+local slot = math.max(now, tonumber(state[2]) or 0, tonumber(state[3]) or 0)
+redis.call('HSET', KEYS[1], 'rate', tostring(rate), 'next_at', tostring(slot + tonumber(ARGV[4]) / rate))
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[3]))
+return {tostring(slot), tostring(rate)}
+"""
+
+# One AIMD step: ARGV = now, verdict, step, factor, min, max, default rate,
+# blocked_until, min seconds between decreases, ttl.
+_UPDATE_LUA = """
+local state = redis.call('HMGET', KEYS[1], 'rate', 'last_decrease', 'blocked_until')
+local now = tonumber(ARGV[1])
+local verdict = ARGV[2]
+local rate = tonumber(state[1]) or tonumber(ARGV[7])
+if verdict == 'up' then
+  rate = math.min(tonumber(ARGV[6]), rate + tonumber(ARGV[3]) / rate)
+elseif verdict == 'down' and now - (tonumber(state[2]) or 0) >= tonumber(ARGV[9]) then
+  rate = math.max(tonumber(ARGV[5]), rate * tonumber(ARGV[4]))
+  redis.call('HSET', KEYS[1], 'last_decrease', tostring(now))
+end
+redis.call('HSET', KEYS[1], 'rate', tostring(rate))
+local blocked = tonumber(ARGV[8])
+if blocked > (tonumber(state[3]) or 0) then
+  redis.call('HSET', KEYS[1], 'blocked_until', tostring(blocked))
+end
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[10]))
+return tostring(rate)
+"""
+
+
+def host_key(url: str, kind: str = "") -> str:
+    """``https://www.che168.com/x`` -> ``www.che168.com`` (plus ``:kind``)."""
+    host = (urlsplit(url).hostname or url or "unknown").lower()
+    return f"{host}:{kind}" if kind else host
+
+
+class AdaptiveRateController:
+    """Request pacing for one upstream that adapts AIMD-style.
+
+    Every healthy, fast response raises the rate by ``increase_rps / rate``,
+    i.e. by about ``increase_rps`` per second of traffic. A 403, a 429, a 5xx
+    or a transport error multiplies it by ``decrease_factor``, at most once
+    per ``decrease_interval_sec`` so a burst of failures counts as one signal.
+    ``Retry-After`` also blocks all sends until it expires. Slow successes
+    hold the rate. ``jitter`` spreads each gap uniformly over
+    ``(1 ± jitter) / rate`` without changing the mean rate.
+
+    With Redis available the rate, the send schedule and the block are
+    shared by every process using the same ``key``, so parallel crawler
+    processes split one budget. Without Redis the state is process-local.
+    ``acquire`` is for threads, ``acquire_async`` for asyncio code.
+    """
+
+    def __init__(
+        self,
+        key: str,
+        *,
+        initial_rps: float,
+        min_rps: Optional[float] = None,
+        max_rps: Optional[float] = None,
+        increase_rps: Optional[float] = None,
+        decrease_factor: float = 0.5,
+        decrease_interval_sec: float = 2.0,
+        latency_target_sec: float = 3.0,
+        jitter: float = 0.0,
+        redis_client: Any = None,
+        use_redis: bool = True,
+    ) -> None:
+        self.key = key
+        self.initial_rps = max(float(initial_rps), 0.01)
+        self.min_rps = max(float(min_rps if min_rps is not None else self.initial_rps / 4), 0.01)
+        self.max_rps = max(float(max_rps if max_rps is not None else self.initial_rps * 4), self.min_rps)
+        self.initial_rps = min(max(self.initial_rps, self.min_rps), self.max_rps)
+        self.increase_rps = float(increase_rps if increase_rps is not None else max(self.initial_rps / 10, 0.05))
+        self.decrease_factor = min(max(float(decrease_factor), 0.05), 0.95)
+        self.decrease_interval_sec = max(float(decrease_interval_sec), 0.0)
+        self.latency_target_sec = float(latency_target_sec)
+        self.jitter = min(max(float(jitter), 0.0), 1.0)
+        self._lock = threading.Lock()
+        self._rate = self.initial_rps
+        self._next_at = 0.0
+        self._blocked_until = 0.0
+        self._last_decrease = 0.0
+        self._redis = redis_client
+        self._use_redis = use_redis
+        self._reserve_script: Any = None
+        self._update_script: Any = None
+        self.stats: Dict[str, int] = {"requests": 0, "up": 0, "down": 0, "hold": 0}
+        _controllers.add(self)
+
+    # --- shared state ---
+    def _redis_client(self) -> Any:
+        if not self._use_redis:
+            return None
+        if self._redis is None:
+            from .redis_cache import get_redis
+
+            self._redis = get_redis()
+            if self._redis is None:
+                return None
+        if self._reserve_script is None:
+            self._reserve_script = self._redis.register_script(_RESERVE_LUA)
+            self._update_script = self._redis.register_script(_UPDATE_LUA)
+        return self._redis
+
+    def _redis_failed(self, exc: Exception) -> None:
+        logger.warning("rate controller %s: redis unavailable, using local state: %s", self.key, exc)
+        self._use_redis = False
+
+    @property
+    def rate(self) -> float:
+        return self._rate
+
+    def _reserve(self, now: float) -> float:
+        """Claim the next send slot; returns the wall-clock time to send at."""
+        spacing = random.uniform(1.0 - self.jitter, 1.0 + self.jitter) if self.jitter else 1.0
+        if self._redis_client() is not None:
+            try:
+                slot, rate = self._reserve_script(
+                    keys=[_REDIS_PREFIX + self.key],
+                    args=[repr(now), repr(self.initial_rps), _REDIS_TTL_SEC, repr(spacing)],
+                )
+                self._rate = float(rate)
+                return float(slot)
+            except Exception as exc:  # noqa: BLE001
+                self._redis_failed(exc)
+        with self._lock:
+            slot = max(now, self._next_at, self._blocked_until)
+            self._next_at = slot + spacing / self._rate
+            return slot
+
+    def acquire(self) -> None:
+        self.stats["requests"] += 1
+        wait = self._reserve(time.time()) - time.time()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self) -> None:
+        self.stats["requests"] += 1
+        wait = self._reserve(time.time()) - time.time()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    # --- feedback ---
+    def verdict(self, status: Optional[int], latency_sec: float) -> str:
+        # 403 is how several sites answer a crawler that is going too fast.
+        if status is None or status in (403, 429) or status >= 500:
+            return "down"
+        if status < 400 and latency_sec <= self.latency_target_sec:
+            return "up"
+        return "hold"
+
+    def record(self, status: Optional[int], latency_sec: float = 0.0, retry_after: Optional[float] = None) -> float:
+        """Feed back one response (``status=None`` for a transport error)."""
+        verdict = self.verdict(status, latency_sec)
+        self.stats[verdict] += 1
+        now = time.time()
+        blocked_until = now + retry_after if retry_after and retry_after > 0 else 0.0
+        if self._redis_client() is not None:
+            try:
+                rate = self._update_script(
+                    keys=[_REDIS_PREFIX + self.key],
+                    args=[
+                        repr(now), verdict, repr(self.increase_rps), repr(self.decrease_factor),
+                        repr(self.min_rps), repr(self.max_rps), repr(self.initial_rps),
+                        repr(blocked_until), repr(self.decrease_interval_sec), _REDIS_TTL_SEC,
+                    ],
+                )
+                self._rate = float(rate)
+                return self._rate
+            except Exception as exc:  # noqa: BLE001
+                self._redis_failed(exc)
+        with self._lock:
+            if verdict == "up":
+                self._rate = min(self.max_rps, self._rate + self.increase_rps / self._rate)
+            elif verdict == "down" and now - self._last_decrease >= self.decrease_interval_sec:
+                self._rate = max(self.min_rps, self._rate * self.decrease_factor)
+                self._last_decrease = now
+            self._blocked_until = max(self._blocked_until, blocked_until)
+            return self._rate
+
+    def record_response(self, resp: Any, latency_sec: float) -> float:
+        return self.record(getattr(resp, "status_code", None), latency_sec, parse_retry_after(resp))
+
+
+def parse_retry_after(resp: Any) -> Optional[float]:
+    headers = getattr(resp, "headers", None) or {}
+    raw = headers.get("Retry-After") if hasattr(headers, "get") else None
+    if not raw:
+        return None
+    try:
+        return max(0.0, float(raw))
+    except ValueError:
+        pass
+    from email.utils import parsedate_to_datetime
+
+    try:
+        return max(0.0, parsedate_to_datetime(raw).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+RateLimiter = Union[TokenBucket, AdaptiveRateController]
+
+_controllers: "weakref.WeakSet[AdaptiveRateController]" = weakref.WeakSet()
+
+
+def _collect() -> Iterator[Tuple[str, Dict[str, str], float]]:
+    """Current rate per key: this process's controllers, plus every key other
+    processes (the crawlers) keep in Redis, so the web ``/metrics`` shows them."""
+    rates: Dict[str, float] = {c.key: c.rate for c in list(_controllers)}
+    try:
+        from .redis_cache import get_redis
+
+        client = get_redis()
+        if client is not None:
+            for redis_key in client.scan_iter(match=_REDIS_PREFIX + "*", count=100):
+                value = client.hget(redis_key, "rate")
+                if value is not None:
+                    rates[str(redis_key)[len(_REDIS_PREFIX):]] = float(value)
+    except Exception:  # noqa: BLE001
+        pass
+    for key, rate in sorted(rates.items()):
+        yield "parser_rate_limit_rps", {"key": key}, rate
+
+
+registry.add_collector(_collect)
+
+
+__all__ = ["AdaptiveRateController", "RateLimiter", "TokenBucket", "host_key", "parse_retry_after"]
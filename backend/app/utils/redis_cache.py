@@ -3,24 +3,27 @@ import logging
 import os
 import time
 import uuid
-from typing import Any, Optional, Dict, Tuple
-from decimal import Decimal
-from datetime import date, datetime
+from typing import Any, Callable, Optional, Dict, List, Tuple
 
 try:
     import redis
 except Exception:  # pragma: no cover - optional dependency in local tooling
     redis = None
 
+from .cache_codec import decode as decode_cache_value, encode as encode_cache_value
 from .filter_values import normalize_csv_values
+from .request_metrics import record_cache_value, record_redis
 
 
 logger = logging.getLogger(__name__)
 _redis_client: Optional[Any] = None
+_redis_binary_client: Optional[Any] = None
 _redis_disabled_until: float = 0.0
 _redis_write_disabled_until: float = 0.0
 _redis_write_disabled_reason: Optional[str] = None
 _dataset_version_cache: Optional[Tuple[str, float]] = None
+_slice_versions_cache: Optional[Tuple[Dict[str, str], float]] = None
+_dataset_version_listeners: List[Callable[[str], None]] = []
 
 
 def _now() -> float:
@@ -40,34 +43,46 @@ def _mark_redis_write_disabled(reason: str, seconds: int = 300) -> None:
     logger.warning("redis write disabled for %ss: %s", seconds, reason)
 
 
-def get_redis() -> Optional[Any]:
-    global _redis_client, _redis_disabled_until
-    if _redis_disabled_until and _redis_disabled_until > _now():
+def _connect(decode_responses: bool) -> Optional[Any]:
+    url = os.getenv("REDIS_URL")
+    if redis is None or not url:
         return None
-    if redis is None:
+    try:
+        client = redis.from_url(
+            url,
+            decode_responses=decode_responses,
+            socket_connect_timeout=0.2,
+            socket_timeout=0.5,
+            retry_on_timeout=False,
+            health_check_interval=30,
+        )
+        client.ping()
+        return client
+    except Exception as exc:
+        logger.warning("redis unavailable: %s", exc)
+        _mark_redis_disabled(str(exc))
         return None
-    url = os.getenv("REDIS_URL")
-    if not url:
+
+
+def get_redis() -> Optional[Any]:
+    global _redis_client
+    if _redis_disabled_until and _redis_disabled_until > _now():
         return None
     if _redis_client is None:
-        try:
-            _redis_client = redis.from_url(
-                url,
-                decode_responses=True,
-                socket_connect_timeout=0.2,
-                socket_timeout=0.5,
-                retry_on_timeout=False,
-                health_check_interval=30,
-            )
-            _redis_client.ping()
-        except Exception as exc:
-            logger.warning("redis unavailable: %s", exc)
-            _mark_redis_disabled(str(exc))
-            _redis_client = None
-            return None
+        _redis_client = _connect(decode_responses=True)
     return _redis_client
 
 
+def get_redis_binary() -> Optional[Any]:
+    """Client returning raw bytes; cache values may be compressed (see ``cache_codec``)."""
+    global _redis_binary_client
+    if _redis_disabled_until and _redis_disabled_until > _now():
+        return None
+    if _redis_binary_client is None:
+        _redis_binary_client = _connect(decode_responses=False)
+    return _redis_binary_client
+
+
 def _dataset_version() -> str:
     global _dataset_version_cache
     env_ver = os.getenv("DATASET_VERSION")
@@ -85,11 +100,30 @@ def _dataset_version() -> str:
                 ver = str(val)
         except Exception:
             ver = "0"
+    previous = _dataset_version_cache[0] if _dataset_version_cache else None
     _dataset_version_cache = (ver, now)
+    # Bumps from other processes (import scripts, cron) are noticed here.
+    if previous is not None and ver not in {previous, "0"}:
+        _notify_dataset_version(ver)
     return ver
 
 
+def on_dataset_version_change(listener: Callable[[str], None]) -> None:
+    """Call ``listener(new_version)`` after a bump, local or seen from Redis."""
+    if listener not in _dataset_version_listeners:
+        _dataset_version_listeners.append(listener)
+
+
+def _notify_dataset_version(ver: str) -> None:
+    for listener in list(_dataset_version_listeners):
+        try:
+            listener(ver)
+        except Exception:
+            logger.exception("dataset_version listener failed")
+
+
 def bump_dataset_version() -> str:
+    global _dataset_version_cache
     ver = str(int(_now()))
     r = get_redis()
     if r is not None:
@@ -97,9 +131,131 @@ def bump_dataset_version() -> str:
             r.set("dataset_version", ver)
         except Exception:
             pass
+    _dataset_version_cache = (ver, _now())
+    _notify_dataset_version(ver)
     return ver
 
 
+# Per-slice versions live in one hash next to the global ``dataset_version``.
+# Fields: ``all`` (any slice changed), ``region:<R>`` (anything in R changed),
+# ``region_all:<R>`` (R changed without a country breakdown),
+# ``country:<C>`` and ``source:<key>``. Values are millisecond timestamps so a
+# hash lost to eviction never reuses an old value.
+SLICE_VERSIONS_KEY = "dataset_version:slices"
+_NON_EU_REGION_COUNTRIES = {"KR": "KR", "CN": "CN"}
+
+
+def region_for_country(country: Optional[str]) -> Optional[str]:
+    code = str(country or "").strip().upper()
+    if not code:
+        return None
+    if code == "EU":
+        return "EU"
+    return _NON_EU_REGION_COUNTRIES.get(code[:2], "EU")
+
+
+def _slice_versions() -> Dict[str, str]:
+    global _slice_versions_cache
+    now = _now()
+    if _slice_versions_cache and now - _slice_versions_cache[1] < 10:
+        return _slice_versions_cache[0]
+    versions: Dict[str, str] = {}
+    r = get_redis()
+    if r is not None:
+        try:
+            versions = {str(k): str(v) for k, v in (r.hgetall(SLICE_VERSIONS_KEY) or {}).items()}
+        except Exception:
+            versions = _slice_versions_cache[0] if _slice_versions_cache else {}
+    previous = _slice_versions_cache[0] if _slice_versions_cache else None
+    _slice_versions_cache = (versions, now)
+    if previous is not None and versions and versions.get("all") != previous.get("all"):
+        _notify_dataset_version(f"{_dataset_version()}-{versions.get('all')}")
+    return versions
+
+
+def dataset_version_tag(
+    region: Optional[str] = None,
+    country: Optional[str] = None,
+    source: Optional[str] = None,
+) -> str:
+    """Version suffix for a cache key scoped to ``region``/``country``/``source``.
+
+    The global ``dataset_version`` is always part of it, so admin actions and
+    the backfill scripts still flush everything; an import that bumped only
+    its own slice leaves keys of other slices untouched.
+    """
+    ver = _dataset_version()
+    if os.getenv("DATASET_VERSION"):
+        return ver
+    slices = _slice_versions()
+    if not slices:
+        return ver
+    region = str(region or "").strip().upper() or None
+    country = str(country or "").strip().upper() or None
+    if country in {"EU", "KR"}:
+        region, country = country, None
+    sources = [item.strip() for item in str(source or "").split(",") if item.strip()]
+    if sources:
+        parts = [f"s{slices.get(f'source:{item}', '0')}" for item in sorted(sources)]
+    elif country:
+        region = region or region_for_country(country)
+        parts = [f"ra{slices.get(f'region_all:{region}', '0')}", f"c{slices.get(f'country:{country}', '0')}"]
+    elif region:
+        parts = [f"r{slices.get(f'region:{region}', '0')}"]
+    else:
+        parts = [f"a{slices.get('all', '0')}"]
+    return "-".join([ver, *parts])
+
+
+def _params_version_tag(params: Optional[Dict[str, Any]]) -> str:
+    params = params or {}
+    return dataset_version_tag(
+        params.get("region"),
+        params.get("country") or params.get("eu_country"),
+        params.get("source"),
+    )
+
+
+def bump_slice_versions(
+    *,
+    source: Optional[str] = None,
+    region: Optional[str] = None,
+    countries: Optional[List[str]] = None,
+) -> str:
+    """Invalidate only the cache keys that can contain rows of this slice.
+
+    Importers call this instead of ``bump_dataset_version`` with their own
+    source key and region; ``countries`` narrows a region further when the
+    importer knows which countries it touched.
+    """
+    global _slice_versions_cache
+    stamp = str(int(_now() * 1000))
+    fields: Dict[str, str] = {"all": stamp}
+    if source:
+        fields[f"source:{source}"] = stamp
+    codes = sorted({str(c).strip().upper() for c in countries or [] if str(c or "").strip()})
+    regions = {str(region).strip().upper()} if region else {region_for_country(c) for c in codes}
+    for reg in regions:
+        if not reg:
+            continue
+        fields[f"region:{reg}"] = stamp
+        if not codes:
+            fields[f"region_all:{reg}"] = stamp
+    for code in codes:
+        fields[f"country:{code}"] = stamp
+    r = get_redis()
+    if r is not None:
+        try:
+            r.hset(SLICE_VERSIONS_KEY, mapping=fields)
+        except Exception as exc:
+            logger.warning("slice version bump failed: %s", exc)
+    current = dict(_slice_versions_cache[0]) if _slice_versions_cache else {}
+    current.update(fields)
+    _slice_versions_cache = (current, _now())
+    _notify_dataset_version(f"{_dataset_version()}-{stamp}")
+    return stamp
+
+
 def build_filter_ctx_key(params: Optional[Dict[str, Any]], include_payload: bool) -> str:
     if not params:
         key = ("home", include_payload)
@@ -117,7 +273,7 @@ def build_filter_ctx_key(params: Optional[Dict[str, Any]], include_payload: bool
             str(params.get("reg_year") or ""),
             include_payload,
         )
-    return f"filter_ctx:{key}:v{_dataset_version()}"
+    return f"filter_ctx:{key}:v{_params_version_tag(params)}"
 
 
 def build_total_cars_key(params: Optional[Dict[str, Any]] = None) -> str:
@@ -134,10 +290,10 @@ def build_total_cars_key(params: Optional[Dict[str, Any]] = None) -> str:
 
 def build_cars_count_key(params: Optional[Dict[str, Any]] = None) -> str:
     if not params:
-        return f"cars_count:all:v{_dataset_version()}"
+        return f"cars_count:all:v{dataset_version_tag()}"
     cleaned = normalize_count_params(params)
     items = tuple(sorted((str(k), str(v)) for k, v in cleaned.items()))
-    return f"cars_count:{items}:v{_dataset_version()}"
+    return f"cars_count:{items}:v{_params_version_tag(cleaned)}"
 
 
 def build_cars_count_simple_key(
@@ -151,7 +307,7 @@ def build_cars_count_simple_key(
         c=country or "all",
         b=brand or "all",
         p=hide_no_local_photo or "0",
-        v=_dataset_version(),
+        v=dataset_version_tag(region, country),
     )
 
 
@@ -172,7 +328,7 @@ def build_cars_list_key(
         page=page,
         size=page_size,
         p=hide_no_local_photo or "0",
-        v=_dataset_version(),
+        v=dataset_version_tag(region, country),
     )
 
 
@@ -184,42 +340,42 @@ def build_cars_list_full_key(
 ) -> str:
     cleaned = normalize_count_params(params or {})
     items = tuple(sorted((str(k), str(v)) for k, v in cleaned.items()))
-    return f"cars_list_full:{items}:sort={sort or 'none'}:page={page}:size={page_size}:v{_dataset_version()}"
+    return f"cars_list_full:{items}:sort={sort or 'none'}:page={page}:size={page_size}:v{_params_version_tag(cleaned)}"
 
 
 def build_filter_payload_key(params: Optional[Dict[str, Any]] = None) -> str:
     if not params:
-        return f"filter_payload:all:v{_dataset_version()}"
+        return f"filter_payload:all:v{dataset_version_tag()}"
     cleaned = normalize_count_params(params)
     items = tuple(sorted((str(k), str(v)) for k, v in cleaned.items()))
-    return f"filter_payload:{items}:v{_dataset_version()}"
+    return f"filter_payload:{items}:v{_params_version_tag(cleaned)}"
 
 
 def build_filter_ctx_base_key(params: Optional[Dict[str, Any]] = None) -> str:
     if not params:
-        return f"filter_ctx_base:all:v{_dataset_version()}"
+        return f"filter_ctx_base:all:v{dataset_version_tag()}"
     key = (
         str(params.get("region") or ""),
         str(params.get("country") or ""),
     )
-    return f"filter_ctx_base:{key}:v{_dataset_version()}"
+    return f"filter_ctx_base:{key}:v{_params_version_tag(params)}"
 
 
 def build_filter_ctx_brand_key(params: Optional[Dict[str, Any]] = None) -> str:
     if not params:
-        return f"filter_ctx_brand:all:v{_dataset_version()}"
+        return f"filter_ctx_brand:all:v{dataset_version_tag()}"
     key = (
         str(params.get("region") or ""),
         str(params.get("country") or ""),
         str(params.get("kr_type") or ""),
         str(params.get("brand") or ""),
     )
-    return f"filter_ctx_brand:{key}:v{_dataset_version()}"
+    return f"filter_ctx_brand:{key}:v{_params_version_tag(params)}"
 
 
 def build_filter_ctx_model_key(params: Optional[Dict[str, Any]] = None) -> str:
     if not params:
-        return f"filter_ctx_model:all:v{_dataset_version()}"
+        return f"filter_ctx_model:all:v{dataset_version_tag()}"
     key = (
         str(params.get("region") or ""),
         str(params.get("country") or ""),
@@ -227,7 +383,7 @@ def build_filter_ctx_model_key(params: Optional[Dict[str, Any]] = None) -> str:
         str(params.get("brand") or ""),
         str(params.get("model") or ""),
     )
-    return f"filter_ctx_model:{key}:v{_dataset_version()}"
+    return f"filter_ctx_model:{key}:v{_params_version_tag(params)}"
 
 
 def normalize_filter_params(params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
@@ -361,15 +517,22 @@ def normalize_count_params(params: Optional[Dict[str, Any]] = None) -> Dict[str,
 
 
 def redis_get_json(key: str) -> Optional[Any]:
-    client = get_redis()
+    client = get_redis_binary()
     if client is None:
         return None
+    t0 = time.perf_counter()
     try:
         raw = client.get(key)
         if not raw:
+            record_redis("get", key, time.perf_counter() - t0, hit=False)
             return None
-        return json.loads(raw)
+        t1 = time.perf_counter()
+        value = decode_cache_value(raw)
+        record_redis("get", key, t1 - t0, hit=True)
+        record_cache_value("get", key, stored_bytes=len(raw), codec_sec=time.perf_counter() - t1)
+        return value
     except Exception as exc:
+        record_redis("get", key, time.perf_counter() - t0, hit=False)
         logger.warning("redis get failed: %s", exc)
         return None
 
@@ -381,19 +544,19 @@ def redis_set_json(key: str, value: Any, ttl_sec: int) -> bool:
             "redis write skipped (disabled): %s", _redis_write_disabled_reason or "unknown"
         )
         return False
-    client = get_redis()
+    client = get_redis_binary()
     if client is None:
         return False
+    t0 = time.perf_counter()
     try:
-        def _default(obj: Any):
-            if isinstance(obj, Decimal):
-                return float(obj)
-            if isinstance(obj, (datetime, date)):
-                return obj.isoformat()
-            return str(obj)
-        client.setex(key, ttl_sec, json.dumps(value, ensure_ascii=False, default=_default))
+        payload, raw_size = encode_cache_value(value)
+        t1 = time.perf_counter()
+        record_cache_value("set", key, stored_bytes=len(payload), codec_sec=t1 - t0, raw_bytes=raw_size)
+        client.setex(key, ttl_sec, payload)
+        record_redis("set", key, time.perf_counter() - t1)
         return True
     except Exception as exc:
+        record_redis("set", key, time.perf_counter() - t0)
         msg = str(exc)
         if "MISCONF" in msg or "No space left on device" in msg or "ENOSPC" in msg:
             _mark_redis_write_disabled(msg, seconds=300)
@@ -0,0 +1,402 @@
+from __future__ import annotations
+
+import ipaddress
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar, Token
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+logger = logging.getLogger("request_metrics")
+
+_SQL_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_SQL_NUMBER_RE = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_SQL_PARAM_RE = re.compile(r"%\([^)]+\)s|%s|\?|:\w+")
+_SQL_IN_LIST_RE = re.compile(r"\bIN\s*\((?:\s*\?\s*,)+\s*\?\s*\)", re.IGNORECASE)
+_SQL_SPACE_RE = re.compile(r"\s+")
+_NAMESPACE_RE = re.compile(r"[^a-z0-9_]+")
+_FINGERPRINT_MAX = 240
+
+# Histogram buckets (seconds) for request and query latency.
+_LATENCY_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Histogram buckets (bytes) for cache value sizes.
+_SIZE_BUCKETS: Tuple[float, ...] = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def metrics_enabled() -> bool:
+    return os.getenv("REQUEST_METRICS", "1") != "0"
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+# Read once: record_sql runs on every cursor execution.
+_sql_slow_ms = _env_float("SQL_SLOW_MS", 500.0)
+
+
+def _is_internal_address(value: Optional[str]) -> bool:
+    try:
+        addr = ipaddress.ip_address(str(value or "").strip())
+    except ValueError:
+        return False
+    return addr.is_loopback or addr.is_private
+
+
+def metrics_access_allowed(
+    *,
+    authorization: Optional[str],
+    client_host: Optional[str],
+    forwarded_for: Optional[str] = None,
+    real_ip: Optional[str] = None,
+) -> bool:
+    """Who may scrape ``/metrics``.
+
+    With METRICS_TOKEN set only its bearer gets in. Without it, only
+    internal callers do; nginx connects from a private address, so every
+    address it forwards (X-Forwarded-For/X-Real-IP) must be internal too.
+    """
+    token = os.getenv("METRICS_TOKEN")
+    if token:
+        return authorization == f"Bearer {token}"
+    if not _is_internal_address(client_host):
+        return False
+    forwarded = [hop for hop in [real_ip, *(forwarded_for or "").split(",")] if hop and hop.strip()]
+    return all(_is_internal_address(hop) for hop in forwarded)
+
+
+def fingerprint_sql(statement: str) -> str:
+    """Statement shape without literals, so the same query groups together."""
+    text = _SQL_STRING_RE.sub("?", statement or "")
+    text = _SQL_PARAM_RE.sub("?", text)
+    text = _SQL_NUMBER_RE.sub("?", text)
+    text = _SQL_SPACE_RE.sub(" ", text).strip()
+    text = _SQL_IN_LIST_RE.sub("IN (?)", text)
+    return text[:_FINGERPRINT_MAX]
+
+
+def redis_namespace(key: Any) -> str:
+    """``cars_list:EU:...:v123`` -> ``cars_list``."""
+    head = str(key or "").split(":", 1)[0].lower()
+    head = _NAMESPACE_RE.sub("_", head).strip("_")
+    return head[:40] or "unknown"
+
+
+class RequestMetrics:
+    """Per-request SQL/Redis accumulator (shared with worker threads of the request)."""
+
+    __slots__ = (
+        "started",
+        "sql_count",
+        "sql_ms",
+        "slowest_sql_ms",
+        "slowest_sql",
+        "sql_shapes",
+        "redis_count",
+        "redis_ms",
+        "cache",
+        "_lock",
+    )
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.sql_ms = 0.0
+        self.slowest_sql_ms = 0.0
+        self.slowest_sql: Optional[str] = None
+        self.sql_shapes: Counter = Counter()
+        self.redis_count = 0
+        self.redis_ms = 0.0
+        self.cache: Dict[str, List[int]] = {}
+        self._lock = threading.Lock()
+
+    def add_sql(self, fingerprint: str, elapsed_ms: float) -> None:
+        with self._lock:
+            self.sql_count += 1
+            self.sql_ms += elapsed_ms
+            self.sql_shapes[fingerprint] += 1
+            if elapsed_ms > self.slowest_sql_ms:
+                self.slowest_sql_ms = elapsed_ms
+                self.slowest_sql = fingerprint
+
+    def add_redis(self, namespace: str, elapsed_ms: float, hit: Optional[bool]) -> None:
+        with self._lock:
+            self.redis_count += 1
+            self.redis_ms += elapsed_ms
+            if hit is not None:
+                counts = self.cache.setdefault(namespace, [0, 0])
+                counts[0 if hit else 1] += 1
+
+    def repeated_sql(self) -> Tuple[Optional[str], int]:
+        """Most repeated statement shape: the usual N+1 signature."""
+        if not self.sql_shapes:
+            return None, 0
+        shape, count = self.sql_shapes.most_common(1)[0]
+        return shape, count
+
+    def as_dict(self) -> Dict[str, Any]:
+        shape, repeats = self.repeated_sql()
+        return {
+            "sql_count": self.sql_count,
+            "sql_ms": round(self.sql_ms, 2),
+            "slowest_sql_ms": round(self.slowest_sql_ms, 2),
+            "slowest_sql": self.slowest_sql,
+            "repeated_sql": shape if repeats > 1 else None,
+            "repeated_sql_count": repeats,
+            "redis_count": self.redis_count,
+            "redis_ms": round(self.redis_ms, 2),
+            "cache": {ns: {"hit": c[0], "miss": c[1]} for ns, c in sorted(self.cache.items())},
+        }
+
+
+_current: ContextVar[Optional[RequestMetrics]] = ContextVar("request_metrics", default=None)
+
+
+def begin_request() -> Tuple[RequestMetrics, Token]:
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def end_request(token: Token) -> None:
+    _current.reset(token)
+
+
+def current_metrics() -> Optional[RequestMetrics]:
+    return _current.get()
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets: Tuple[float, ...] = _LATENCY_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.total += value
+        self.count += 1
+        for idx, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[idx] += 1
+
+
+class MetricsRegistry:
+    """Process-local counters rendered in the Prometheus text format.
+
+    Each gunicorn worker keeps its own registry; scrape every worker or sum
+    in the query.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self.histograms: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], _Histogram] = {}
+        # Callables yielding ``(name, labels, value)`` at scrape time, for
+        # values that live elsewhere (e.g. memo cache stats).
+        self.collectors: List[Callable[[], Iterable[Tuple[str, Dict[str, str], float]]]] = []
+
+    def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0.0) + value
+
+    def observe(
+        self,
+        name: str,
+        value: float,
+        *,
+        buckets: Tuple[float, ...] = _LATENCY_BUCKETS,
+        **labels: str,
+    ) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = _Histogram(buckets)
+            hist.observe(value)
+
+    def add_collector(self, collector: Callable[[], Iterable[Tuple[str, Dict[str, str], float]]]) -> None:
+        with self._lock:
+            if collector not in self.collectors:
+                self.collectors.append(collector)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def render(self) -> str:
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(self.histograms.items(), key=lambda item: item[0])
+            lines: List[str] = []
+            seen_types: set[str] = set()
+            for (name, labels), value in counters:
+                if name not in seen_types:
+                    lines.append(f"# TYPE {name} counter")
+                    seen_types.add(name)
+                lines.append(f"{name}{_labels(labels)} {_num(value)}")
+            for (name, labels), hist in histograms:
+                if name not in seen_types:
+                    lines.append(f"# TYPE {name} histogram")
+                    seen_types.add(name)
+                for bound, count in zip(hist.buckets, hist.counts):
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', _num(bound)),))} {count}")
+                lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {hist.count}")
+                lines.append(f"{name}_sum{_labels(labels)} {_num(hist.total)}")
+                lines.append(f"{name}_count{_labels(labels)} {hist.count}")
+            collectors = list(self.collectors)
+        for collector in collectors:
+            try:
+                samples = sorted(collector(), key=lambda item: (item[0], sorted(item[1].items())))
+            except Exception:
+                logger.exception("metrics collector failed")
+                continue
+            for name, labels, value in samples:
+                if name not in seen_types:
+                    lines.append(f"# TYPE {name} {'counter' if name.endswith('_total') else 'gauge'}")
+                    seen_types.add(name)
+                lines.append(f"{name}{_labels(tuple(sorted(labels.items())))} {_num(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Iterable[Tuple[str, str]]) -> str:
+    parts = [f'{k}="{_escape(v)}"' for k, v in labels]
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(value: float) -> str:
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+registry = MetricsRegistry()
+
+
+def record_sql(statement: str, elapsed_sec: float) -> None:
+    fingerprint = fingerprint_sql(statement)
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.add_sql(fingerprint, elapsed_sec * 1000)
+    registry.observe("app_db_query_duration_seconds", elapsed_sec)
+    if elapsed_sec * 1000 >= _sql_slow_ms:
+        registry.inc("app_db_slow_queries_total")
+        logger.warning("slow_sql ms=%.1f sql=%s", elapsed_sec * 1000, fingerprint)
+
+
+def record_redis(op: str, key: Any, elapsed_sec: float, hit: Optional[bool] = None) -> None:
+    namespace = redis_namespace(key)
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.add_redis(namespace, elapsed_sec * 1000, hit)
+    registry.inc("app_redis_ops_total", op=op)
+    registry.inc("app_redis_op_seconds_total", elapsed_sec, op=op)
+    if hit is not None:
+        registry.inc("app_cache_requests_total", namespace=namespace, result="hit" if hit else "miss")
+
+
+def record_cache_value(
+    op: str,
+    key: Any,
+    *,
+    stored_bytes: int,
+    codec_sec: float,
+    raw_bytes: Optional[int] = None,
+) -> None:
+    """Size on the wire and encode/decode time of one cache value, per namespace."""
+    namespace = redis_namespace(key)
+    registry.observe("app_cache_value_bytes", stored_bytes, buckets=_SIZE_BUCKETS, namespace=namespace, op=op)
+    registry.inc("app_cache_codec_seconds_total", codec_sec, namespace=namespace, op=op)
+    if raw_bytes is not None:
+        registry.inc("app_cache_value_raw_bytes_total", raw_bytes, namespace=namespace)
+        registry.inc("app_cache_value_stored_bytes_total", stored_bytes, namespace=namespace)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):  # noqa: ANN001
+    conn.info.setdefault("request_metrics_t0", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):  # noqa: ANN001
+    stack = conn.info.get("request_metrics_t0")
+    if stack:
+        record_sql(statement, time.perf_counter() - stack.pop())
+
+
+def _handle_error(exception_context):  # noqa: ANN001
+    conn = exception_context.connection
+    stack = conn.info.get("request_metrics_t0") if conn is not None else None
+    if stack:
+        stack.pop()
+
+
+def install_sql_instrumentation(engine: Any) -> None:
+    """Time every cursor execution of ``engine`` (idempotent)."""
+    from sqlalchemy import event
+
+    global _sql_slow_ms
+    _sql_slow_ms = _env_float("SQL_SLOW_MS", 500.0)
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def server_timing_header(metrics: RequestMetrics, *, total_ms: float, render_ms: Optional[float] = None) -> str:
+    parts = [
+        f"app;dur={total_ms:.1f}",
+        f'db;dur={metrics.sql_ms:.1f};desc="{metrics.sql_count} queries"',
+        f'redis;dur={metrics.redis_ms:.1f};desc="{metrics.redis_count} ops"',
+    ]
+    if metrics.slowest_sql_ms:
+        parts.append(f"db_slowest;dur={metrics.slowest_sql_ms:.1f}")
+    if render_ms is not None:
+        parts.append(f"render;dur={render_ms:.1f}")
+    hits = sum(c[0] for c in metrics.cache.values())
+    misses = sum(c[1] for c in metrics.cache.values())
+    if hits or misses:
+        parts.append(f'cache;desc="hit={hits} miss={misses}"')
+    return ", ".join(parts)
+
+
+def finish_request(
+    metrics: RequestMetrics,
+    *,
+    route: str,
+    method: str,
+    status: int,
+    total_sec: float,
+    request_id: Optional[str] = None,
+) -> None:
+    """Feed the registry and emit a structured log line for slow or chatty requests."""
+    registry.inc("app_http_requests_total", route=route, method=method, status=str(status))
+    registry.observe("app_http_request_duration_seconds", total_sec, route=route)
+    registry.inc("app_http_db_queries_total", metrics.sql_count, route=route)
+    _, repeats = metrics.repeated_sql()
+    slow = total_sec * 1000 >= _env_float("REQUEST_METRICS_SLOW_MS", 1000.0)
+    chatty = repeats >= int(_env_float("REQUEST_METRICS_NPLUS1", 20))
+    if chatty:
+        registry.inc("app_http_nplus1_requests_total", route=route)
+    if slow or chatty or os.getenv("REQUEST_METRICS_LOG", "0") == "1":
+        payload = {
+            "id": request_id,
+            "route": route,
+            "method": method,
+            "status": status,
+            "total_ms": round(total_sec * 1000, 1),
+            **metrics.as_dict(),
+        }
+        logger.info("request_metrics %s", json.dumps(payload, ensure_ascii=False, sort_keys=True))
@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import contextvars
+import logging
+import os
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from markupsafe import Markup
+
+try:
+    from jinja2 import pass_context
+except Exception:  # pragma: no cover - jinja2 < 3
+    from jinja2 import contextfunction as pass_context  # type: ignore
+
+
+logger = logging.getLogger(__name__)
+
+# Emitted by ``{{ stream_flush() }}`` in streaming mode only; the response
+# writer strips it and pushes everything rendered so far to the client.
+STREAM_FLUSH_MARKER = "<!--stream:flush-->"
+STREAM_CONTEXT_FLAG = "_html_streaming"
+
+_MAX_BUFFER_BYTES = 32 * 1024
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def html_streaming_enabled() -> bool:
+    return os.getenv("HTML_STREAMING", "0") == "1"
+
+
+def _block_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        try:
+            workers = int(os.getenv("HTML_STREAMING_WORKERS", "8"))
+        except ValueError:
+            workers = 8
+        _executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="ssr-block")
+    return _executor
+
+
+def submit_block(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+    # Run in a copy of the caller's context so per-request metrics see the block's queries.
+    ctx = contextvars.copy_context()
+    return _block_executor().submit(ctx.run, fn, *args, **kwargs)
+
+
+class Deferred:
+    """Template value backed by a future; blocks only when the template reads it.
+
+    A failing block renders as ``default`` instead of breaking a response
+    whose head has already been sent.
+    """
+
+    __slots__ = ("_future", "_default", "_pick", "_name", "_value", "_resolved")
+
+    def __init__(
+        self,
+        future: Future,
+        *,
+        default: Any = None,
+        pick: Optional[Callable[[Any], Any]] = None,
+        name: str = "block",
+    ) -> None:
+        self._future = future
+        self._default = default
+        self._pick = pick
+        self._name = name
+        self._value: Any = None
+        self._resolved = False
+
+    def resolve(self) -> Any:
+        if not self._resolved:
+            try:
+                value = self._future.result()
+                self._value = self._pick(value) if self._pick else value
+            except Exception:
+                logger.exception("ssr_block_failed name=%s", self._name)
+                self._value = self._default
+            self._resolved = True
+        return self._value
+
+    def __iter__(self):
+        return iter(self.resolve() or ())
+
+    def __len__(self) -> int:
+        return len(self.resolve() or ())
+
+    def __bool__(self) -> bool:
+        return bool(self.resolve())
+
+    def __getitem__(self, key: Any) -> Any:
+        return self.resolve()[key]
+
+    def __contains__(self, item: Any) -> bool:
+        return item in (self.resolve() or ())
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.resolve(), name)
+
+    def __str__(self) -> str:
+        return str(self.resolve())
+
+    def __html__(self) -> str:
+        return str(Markup.escape(self.resolve()))
+
+    def __int__(self) -> int:
+        return int(self.resolve())
+
+    def __eq__(self, other: Any) -> bool:
+        return self.resolve() == other
+
+    __hash__ = None  # type: ignore[assignment]
+
+
+def resolve_deferred(value: Any) -> Any:
+    return value.resolve() if isinstance(value, Deferred) else value
+
+
+def is_deferred(value: Any) -> bool:
+    """Jinja test: ``{% if x is deferred %}`` renders a placeholder instead of blocking."""
+    return isinstance(value, Deferred)
+
+
+@pass_context
+def stream_flush(context: Any) -> Markup:
+    if context.get(STREAM_CONTEXT_FLAG):
+        return Markup(STREAM_FLUSH_MARKER)
+    return Markup("")
+
+
+def install_streaming_globals(env: Any) -> None:
+    env.globals.setdefault("stream_flush", stream_flush)
+    env.tests.setdefault("deferred", is_deferred)
+
+
+def _iter_html(template: Any, context: Dict[str, Any]) -> Iterator[str]:
+    """Group Jinja's many small chunks into flush-point/size bounded pieces."""
+    buffer: list[str] = []
+    size = 0
+    for chunk in template.generate(context):
+        if STREAM_FLUSH_MARKER in chunk:
+            parts = chunk.split(STREAM_FLUSH_MARKER)
+            for part in parts[:-1]:
+                buffer.append(part)
+                yield "".join(buffer)
+                buffer, size = [], 0
+            chunk = parts[-1]
+            if not chunk:
+                continue
+        buffer.append(chunk)
+        size += len(chunk)
+        if size >= _MAX_BUFFER_BYTES:
+            yield "".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def _encode(pieces: Iterator[str], gzip_enabled: bool) -> Iterator[bytes]:
+    if not gzip_enabled:
+        for piece in pieces:
+            if piece:
+                yield piece.encode("utf-8")
+        return
+    # Compress here with a sync flush per piece: GZipMiddleware buffers
+    # streamed bodies inside zlib and would hold the head back.
+    compressor = zlib.compressobj(5, zlib.DEFLATED, 31)
+    for piece in pieces:
+        data = compressor.compress(piece.encode("utf-8")) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush(zlib.Z_FINISH)
+
+
+def stream_template_response(
+    request: Request,
+    templates: Any,
+    name: str,
+    context: Dict[str, Any],
+    *,
+    status_code: int = 200,
+    headers: Optional[Dict[str, str]] = None,
+) -> StreamingResponse:
+    """Render ``name`` with ``Template.generate()`` and stream it.
+
+    Values wrapped in :class:`Deferred` keep rendering concurrently; the
+    head goes out at the first ``{{ stream_flush() }}`` regardless.
+    """
+    install_streaming_globals(templates.env)
+    template = templates.get_template(name)
+    ctx = {"request": request, **context, STREAM_CONTEXT_FLAG: True}
+    gzip_enabled = "gzip" in (request.headers.get("accept-encoding") or "").lower()
+    out_headers = dict(headers or {})
+    out_headers.setdefault("X-Accel-Buffering", "no")
+    if gzip_enabled:
+        out_headers["Content-Encoding"] = "gzip"
+        out_headers["Vary"] = "Accept-Encoding"
+    return StreamingResponse(
+        _encode(_iter_html(template, ctx), gzip_enabled),
+        status_code=status_code,
+        media_type="text/html; charset=utf-8",
+        headers=out_headers,
+    )
@@ -7,6 +7,7 @@ from pathlib import Path
 from typing import Dict, Optional, Set, Tuple, List, Any
 
 from .localization import display_body, display_color
+from .memo import memoize_normalizer
 
 def _load_taxonomy() -> Tuple[Dict[str, Dict[str, str]], Dict[str, Dict[str, Set[str]]]]:
     base = Path(__file__).resolve().parents[1] / "resources"
@@ -42,6 +43,33 @@ def _load_taxonomy() -> Tuple[Dict[str, Dict[str, str]], Dict[str, Dict[str, Set
 _TAX, _ALIASES = _load_taxonomy()
 
 
+def _build_alias_scan(aliases: Dict[str, Dict[str, Set[str]]]) -> Dict[str, Tuple[Tuple[str, str], ...]]:
+    """``(alias, canonical)`` pairs in taxonomy order, for first-match substring scans."""
+    return {
+        category: tuple(
+            (raw, canonical) for canonical, items in bucket.items() for raw in sorted(items) if raw
+        )
+        for category, bucket in aliases.items()
+    }
+
+
+def _build_exact_index(bucket: Dict[str, Set[str]]) -> Dict[str, Tuple[int, str]]:
+    """Exact alias -> ``(taxonomy rank, canonical)``; the lowest rank wins on ties."""
+    index: Dict[str, Tuple[int, str]] = {}
+    for rank, (canonical, items) in enumerate(bucket.items()):
+        variants = {str(item).strip().lower() for item in items if item and str(item).strip()}
+        variants.add(canonical.strip().lower())
+        variants.add(canonical.replace("_", " ").strip().lower())
+        for variant in variants:
+            index.setdefault(variant, (rank, canonical))
+    return index
+
+
+# Built once at import; the per-call loops used to rebuild these sets.
+_ALIAS_SCAN = _build_alias_scan(_ALIASES)
+_BODY_TYPE_INDEX = _build_exact_index(_ALIASES.get("body_type", {}))
+
+
 def ru_label(category: str, value: Optional[str]) -> Optional[str]:
     if not value:
         return None
@@ -52,6 +80,7 @@ def ru_body(body: Optional[str]) -> Optional[str]:
     return ru_label("body_type", body)
 
 
+@memoize_normalizer
 def normalize_body_type(value: Optional[str]) -> Optional[str]:
     if not value:
         return None
@@ -62,17 +91,10 @@ def normalize_body_type(value: Optional[str]) -> Optional[str]:
         raw,
         re.sub(r"\s+", " ", raw.replace("-", " ").replace("_", " ")).strip(),
     }
+    matches = [_BODY_TYPE_INDEX[v] for v in variants if v in _BODY_TYPE_INDEX]
+    if matches:
+        return min(matches)[1]
     aliases = _ALIASES.get("body_type", {})
-    for canonical, items in aliases.items():
-        normalized_items = {
-            item.strip().lower()
-            for item in items
-            if item and str(item).strip()
-        }
-        normalized_items.add(canonical.strip().lower())
-        normalized_items.add(canonical.replace("_", " ").strip().lower())
-        if variants & normalized_items:
-            return canonical
     label = ru_body(raw) or display_body(raw)
     if not label:
         return None
@@ -113,6 +135,7 @@ def build_body_type_options(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     return list(buckets.values())
 
 
+@memoize_normalizer
 def ru_color(color: Optional[str]) -> Optional[str]:
     return ru_label("color", color)
 
@@ -221,6 +244,7 @@ _COLOR_MODIFIERS = {
 }
 
 
+@memoize_normalizer
 def color_hex(value: Optional[str]) -> Optional[str]:
     if not value:
         return None
@@ -236,13 +260,13 @@ def _normalize_alias(category: str, val: Optional[str]) -> Optional[str]:
     if not val:
         return None
     key = val.strip().lower()
-    for canonical, items in _ALIASES.get(category, {}).items():
-        for raw in items:
-            if raw and raw in key:
-                return canonical
+    for raw, canonical in _ALIAS_SCAN.get(category, ()):
+        if raw in key:
+            return canonical
     return key
 
 
+@memoize_normalizer
 def normalize_color(val: Optional[str]) -> Optional[str]:
     if not val:
         return None
@@ -572,6 +596,7 @@ def build_interior_options(values: List[Any], kind: str) -> List[Dict[str, str]]
     return items
 
 
+@memoize_normalizer
 def normalize_fuel(val: Optional[str]) -> Optional[str]:
     if not val:
         return None
@@ -869,6 +894,7 @@ _FREE_TEXT_REPLACEMENTS = (
 )
 
 
+@memoize_normalizer
 def translate_payload_value(field: Optional[str], value: Optional[str]) -> Optional[str]:
     if value is None:
         return None
@@ -1,14 +1,21 @@
+import logging
 import os
+import queue
 import re
+import threading
 import time
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Dict, FrozenSet, List, Optional, Sequence, Tuple
 
 import requests
+from cachetools import TTLCache
 
 from .redis_cache import get_redis
 
 
+logger = logging.getLogger(__name__)
+
+
 _RULE_CANDIDATES = ("mo-1024.jpg", "mo-640.jpg", "mo-360.jpg", "mo-240.jpg")
 _RULE_RE = re.compile(r"(rule=)mo-\d+(?:\.jpg)?", re.IGNORECASE)
 _UUID_RE = re.compile(
@@ -36,6 +43,74 @@ def local_media_exists(url: Optional[str]) -> bool:
         return False
 
 
+def _local_index_ttl() -> int:
+    try:
+        return max(1, int(os.getenv("THUMB_LOCAL_INDEX_TTL_SEC", "300")))
+    except ValueError:
+        return 300
+
+
+def _scandir_names(directory: Path) -> FrozenSet[str]:
+    try:
+        with os.scandir(directory) as entries:
+            return frozenset(entry.name for entry in entries)
+    except OSError:
+        return frozenset()
+
+
+class LocalMediaIndex:
+    """Directory listings of the media root, cached for ``THUMB_LOCAL_INDEX_TTL_SEC``.
+
+    Mirrored thumbnails are bucketed into ~1000 directories, so one
+    ``scandir`` (or one manifest query, see ``services.media_manifest``)
+    answers every card of that bucket until the TTL runs out.
+    A file mirrored in the meantime shows up after the TTL; until then the
+    remote URL is used, same as before the mirror ran.
+    """
+
+    def __init__(self, maxsize: int = 4096) -> None:
+        self._lock = threading.Lock()
+        self._dirs: TTLCache = TTLCache(maxsize=maxsize, ttl=_local_index_ttl())
+        self._lister: Callable[[Path], FrozenSet[str]] = _scandir_names
+
+    def set_lister(self, lister: Callable[[Path], FrozenSet[str]]) -> None:
+        """Swap the directory source (e.g. the media manifest table)."""
+        self._lister = lister
+        self.clear()
+
+    def _listing(self, directory: Path) -> FrozenSet[str]:
+        key = str(directory)
+        with self._lock:
+            names = self._dirs.get(key)
+        if names is not None:
+            return names
+        try:
+            names = self._lister(directory)
+        except Exception:
+            logger.exception("local_media_index_list_failed dir=%s", directory)
+            names = _scandir_names(directory)
+        with self._lock:
+            self._dirs[key] = names
+        return names
+
+    def exists(self, url: Optional[str]) -> bool:
+        raw = str(url or "").strip()
+        if not raw.startswith("/media/"):
+            return False
+        rel = raw.removeprefix("/media/").lstrip("/")
+        if not rel or ".." in rel.split("/"):
+            return False
+        path = _media_root() / rel
+        return path.name in self._listing(path.parent)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._dirs.clear()
+
+
+local_media_index = LocalMediaIndex()
+
+
 def _now() -> float:
     return time.time()
 
@@ -105,14 +180,20 @@ def _probe_url(url: str, timeout: tuple[float, float]) -> bool:
     return False
 
 
+def _rule_cache_key(normalized: str) -> Optional[str]:
+    if "img.classistatic.de" not in normalized or "rule=mo-" not in normalized:
+        return None
+    key_id = _extract_uuid(normalized)
+    return f"img_rule:{key_id}" if key_id else None
+
+
 def pick_classistatic_thumb(url: Optional[str], *, ttl_days: int = 14) -> Optional[str]:
     normalized = normalize_classistatic_url(url)
     if not normalized:
         return None
     if "img.classistatic.de" not in normalized or "rule=mo-" not in normalized:
         return normalized
-    key_id = _extract_uuid(normalized)
-    cache_key = f"img_rule:{key_id}" if key_id else None
+    cache_key = _rule_cache_key(normalized)
     client = get_redis()
     if client and cache_key:
         cached = client.get(cache_key)
@@ -122,6 +203,16 @@ def pick_classistatic_thumb(url: Optional[str], *, ttl_days: int = 14) -> Option
             return _apply_rule(normalized, cached)
     if not _remote_probe_enabled():
         return normalized
+    return _probe_and_store_rule(normalized, client, cache_key, ttl_days=ttl_days)
+
+
+def _probe_and_store_rule(
+    normalized: str,
+    client,
+    cache_key: Optional[str],
+    *,
+    ttl_days: int = 14,
+) -> Optional[str]:
     timeout = (0.25, 0.6)
     for rule in _RULE_CANDIDATES:
         candidate = _apply_rule(normalized, rule)
@@ -135,20 +226,50 @@ def pick_classistatic_thumb(url: Optional[str], *, ttl_days: int = 14) -> Option
     return None
 
 
-def resolve_thumbnail_url(
-    remote_url: Optional[str],
-    local_path: Optional[str] = None,
-) -> Optional[str]:
-    strict_local_only = os.getenv("THUMB_STRICT_LOCAL_ONLY", "0") == "1"
-    local = (local_path or "").strip()
-    if local_media_exists(local):
-        return local
-    if strict_local_only:
-        return None
-    normalized = normalize_classistatic_url(remote_url)
-    if normalized:
-        picked = pick_classistatic_thumb(normalized)
-        return picked or normalized
+class _ProbeWorker:
+    """Probes unknown classistatic rules off the request path, one URL at a time."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[Tuple[str, str]]" = queue.Queue(
+            maxsize=max(1, int(os.getenv("THUMB_PROBE_QUEUE_MAX", "1000") or 1000))
+        )
+        self._pending: set[str] = set()
+        self._thread: Optional[threading.Thread] = None
+
+    def enqueue(self, normalized: str, cache_key: str) -> bool:
+        with self._lock:
+            if cache_key in self._pending:
+                return False
+            try:
+                self._queue.put_nowait((normalized, cache_key))
+            except queue.Full:
+                return False
+            self._pending.add(cache_key)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="thumb-probe", daemon=True)
+                self._thread.start()
+        return True
+
+    def _run(self) -> None:
+        while True:
+            normalized, cache_key = self._queue.get()
+            try:
+                client = get_redis()
+                if client is None or not client.exists(cache_key):
+                    _probe_and_store_rule(normalized, client, cache_key)
+            except Exception:
+                logger.exception("thumb_probe_failed key=%s", cache_key)
+            finally:
+                with self._lock:
+                    self._pending.discard(cache_key)
+                self._queue.task_done()
+
+
+_probe_worker = _ProbeWorker()
+
+
+def _fallback_remote(remote_url: Optional[str]) -> Optional[str]:
     remote = (remote_url or "").strip()
     if remote.startswith("//"):
         return f"https:{remote}"
@@ -157,3 +278,60 @@ def resolve_thumbnail_url(
     if remote:
         return remote
     return None
+
+
+def resolve_thumbnail_urls(
+    candidates: Sequence[Tuple[Optional[str], Optional[str]]],
+) -> List[Optional[str]]:
+    """Resolve ``(remote_url, local_path)`` pairs for a whole page at once.
+
+    Local files are checked against ``local_media_index``, known classistatic
+    rules come from a single ``MGET`` and unknown ones are handed to the
+    background probe worker (with ``THUMB_PROBE_REMOTE=1``) instead of being
+    probed inline; the card keeps the unprobed URL until the rule is known.
+    """
+    strict_local_only = os.getenv("THUMB_STRICT_LOCAL_ONLY", "0") == "1"
+    results: List[Optional[str]] = [None] * len(candidates)
+    lookups: Dict[int, Tuple[str, str]] = {}
+    for idx, (remote_url, local_path) in enumerate(candidates):
+        local = (local_path or "").strip()
+        if local_media_index.exists(local):
+            results[idx] = local
+            continue
+        if strict_local_only:
+            continue
+        normalized = normalize_classistatic_url(remote_url)
+        if not normalized:
+            results[idx] = _fallback_remote(remote_url)
+            continue
+        results[idx] = normalized
+        cache_key = _rule_cache_key(normalized)
+        if cache_key:
+            lookups[idx] = (normalized, cache_key)
+    if not lookups:
+        return results
+    client = get_redis()
+    if client is None:
+        return results
+    keys = sorted({cache_key for _, cache_key in lookups.values()})
+    try:
+        rules = dict(zip(keys, client.mget(keys)))
+    except Exception as exc:
+        logger.warning("thumb rule mget failed: %s", exc)
+        return results
+    probe = _remote_probe_enabled()
+    for idx, (normalized, cache_key) in lookups.items():
+        rule = rules.get(cache_key)
+        if rule and rule != "none":
+            results[idx] = _apply_rule(normalized, rule)
+        elif not rule and probe:
+            _probe_worker.enqueue(normalized, cache_key)
+    return results
+
+
+def resolve_thumbnail_url(
+    remote_url: Optional[str],
+    local_path: Optional[str] = None,
+) -> Optional[str]:
+    return resolve_thumbnail_urls([(remote_url, local_path)])[0]
+
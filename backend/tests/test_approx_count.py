@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from backend.app.models.source import Base
+from backend.app.services import approx_count as approx_mod
+from backend.app.services import cars_service as cars_service_mod
+from backend.app.services.approx_count import ApproxCount, approximate_count
+from backend.app.services.cars_service import CarsService
+
+
+@pytest.fixture()
+def db(monkeypatch):
+    monkeypatch.setenv("CATALOG_REDIS_COUNT_CACHE", "0")
+    monkeypatch.setattr(CarsService, "_count_cache", {})
+    monkeypatch.setattr(CarsService, "_approx_count_cache", {})
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+
+def test_approximate_count_is_off_by_default_and_postgres_only(db, monkeypatch):
+    monkeypatch.delenv("CATALOG_APPROX_COUNT", raising=False)
+    assert approx_mod.approx_count_mode() == "off"
+    assert approximate_count(db, None) is None
+    assert approximate_count(db, None, mode="sample") is None
+
+
+def test_list_cars_reports_estimate_without_polluting_exact_cache(db, monkeypatch):
+    estimate = ApproxCount(value=1_234_000, low=1_200_000, high=1_268_000, method="sample")
+    monkeypatch.setattr(cars_service_mod, "approximate_count", lambda *_a, **_kw: estimate)
+    service = CarsService(db)
+
+    _, total = service.list_cars(region="EU", count_only=True, use_fast_count=False, allow_approximate_count=True)
+    assert (total, service.last_count_approximate) == (1_234_000, True)
+    assert CarsService._count_cache == {}
+
+    _, total = service.list_cars(region="EU", count_only=True, use_fast_count=False)
+    assert (total, service.last_count_approximate) == (0, False)
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from collections import Counter
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from backend.app.benchmarks.baseline import compare_reports
+from backend.app.benchmarks.synthetic import SyntheticCarFactory, generate_cars
+from backend.app.models import Car
+from backend.app.models.source import Base
+
+
+def test_synthetic_factory_is_deterministic_and_skewed():
+    ids = {"mobile_de": 1, "emavto_klg": 2}
+    factory_a, factory_b = SyntheticCarFactory(7), SyntheticCarFactory(7)
+    first = [factory_a.make(i, ids) for i in range(50)]
+    again = [factory_b.make(i, ids) for i in range(50)]
+    assert first == again
+
+    factory = SyntheticCarFactory(7)
+    rows = list(factory.iter_rows(3000, ids))
+    countries = Counter(row["country"] for row in rows)
+    assert countries.most_common(1)[0][0] == "DE"
+    assert 0.08 < countries["KR"] / len(rows) < 0.22
+    assert all(row["engine_cc"] is None for row in rows if row["engine_type"] == "Electric")
+    assert all(isinstance(row["source_payload"]["features"], list) for row in rows)
+
+
+def test_generate_cars_appends_with_unique_external_ids():
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    assert generate_cars(engine, 120, batch_size=50, progress=False) == 120
+    assert generate_cars(engine, 30, progress=False) == 30
+    with Session(engine) as db:
+        total, distinct = db.execute(select(func.count(Car.id), func.count(func.distinct(Car.external_id)))).one()
+    assert total == distinct == 150
+
+
+def test_compare_reports_needs_relative_and_absolute_slowdown():
+    baseline = {"results": {"a": {"p50_ms": 10.0, "p95_ms": 20.0}, "b": {"p50_ms": 0.5, "p95_ms": 0.8}}}
+    current = {"results": {"a": {"p50_ms": 13.0, "p95_ms": 21.0}, "b": {"p50_ms": 1.0, "p95_ms": 1.5}, "new": {"p50_ms": 5}}}
+    regressions = compare_reports(current, baseline, tolerance=0.15, min_delta_ms=2.0)
+    assert [(item["name"], item["metric"]) for item in regressions] == [("a", "p50_ms")]
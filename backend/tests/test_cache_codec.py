@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import json
+from datetime import datetime
+from decimal import Decimal
+
+from backend.app.utils import cache_codec, redis_cache
+from backend.app.utils import request_metrics as rm
+
+
+def _large_payload():
+    return {"items": [{"id": i, "brand": "BMW", "model": "X5", "price": Decimal("41990.50")} for i in range(2000)]}
+
+
+def test_small_values_stay_plain_json():
+    payload, size = cache_codec.encode({"total": 12, "ts": datetime(2024, 5, 1, 12, 0)})
+    assert payload[:1] == b"{"
+    assert json.loads(payload) == {"total": 12, "ts": "2024-05-01T12:00:00"}
+    assert size == len(payload)
+
+
+def test_large_values_are_compressed_and_round_trip(monkeypatch):
+    monkeypatch.setenv("REDIS_CACHE_COMPRESS_MIN", "1024")
+    payload, size = cache_codec.encode(_large_payload())
+    assert payload[:2] == cache_codec.MAGIC + cache_codec.SERIALIZER_JSON
+    assert len(payload) < size / 5
+    decoded = cache_codec.decode(payload)
+    assert decoded["items"][1999] == {"id": 1999, "brand": "BMW", "model": "X5", "price": 41990.5}
+
+    monkeypatch.setenv("REDIS_CACHE_CODEC", "json")
+    plain, _ = cache_codec.encode(_large_payload())
+    assert plain[:1] == b"{"
+
+
+def test_legacy_entries_still_decode():
+    legacy = json.dumps({"brands": ["Kia", "Škoda"]}, ensure_ascii=False)
+    assert cache_codec.decode(legacy) == {"brands": ["Kia", "Škoda"]}
+    assert cache_codec.decode(legacy.encode("utf-8")) == {"brands": ["Kia", "Škoda"]}
+
+
+def test_redis_helpers_use_codec_and_record_sizes(monkeypatch):
+    store = {}
+
+    class _BinaryRedis:
+        def get(self, key):
+            return store.get(key)
+
+        def setex(self, key, ttl, value):
+            assert isinstance(value, bytes)
+            store[key] = value
+
+    monkeypatch.setenv("REDIS_CACHE_COMPRESS_MIN", "1024")
+    monkeypatch.setattr(redis_cache, "get_redis_binary", lambda: _BinaryRedis())
+    rm.registry.reset()
+    try:
+        assert redis_cache.redis_set_json("cars_list_full:x", _large_payload(), ttl_sec=60)
+        assert store["cars_list_full:x"][:1] == cache_codec.MAGIC
+        assert redis_cache.redis_get_json("cars_list_full:x")["items"][0]["price"] == 41990.5
+        body = rm.registry.render()
+        assert 'app_cache_value_bytes_count{namespace="cars_list_full",op="get"} 1' in body
+        assert 'app_cache_value_raw_bytes_total{namespace="cars_list_full"}' in body
+    finally:
+        rm.registry.reset()
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+from typing import Any, Dict
+
+import pytest
+
+from backend.app.services import cache_prewarmer as pw
+
+
+class _FakeRedis:
+    """Just the sorted-set subset the prewarmer uses."""
+
+    def __init__(self) -> None:
+        self.zsets: Dict[str, Dict[str, float]] = {}
+        self.strings: Dict[str, Any] = {}
+
+    def pipeline(self, transaction: bool = False):
+        return _FakePipeline(self)
+
+    def zincrby(self, key, amount, member):
+        zset = self.zsets.setdefault(key, {})
+        zset[member] = zset.get(member, 0.0) + amount
+        return zset[member]
+
+    def zscore(self, key, member):
+        return self.zsets.get(key, {}).get(member)
+
+    def zrevrange(self, key, start, end, withscores=False):
+        rows = sorted(self.zsets.get(key, {}).items(), key=lambda kv: -kv[1])[start : end + 1]
+        return rows if withscores else [m for m, _ in rows]
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.strings:
+            return None
+        self.strings[key] = value
+        return True
+
+    def eval(self, script, numkeys, key, token):
+        # redis_unlock: compare-and-delete.
+        if self.strings.get(key) == token:
+            del self.strings[key]
+            return 1
+        return 0
+
+    def zunionstore(self, dest, weights):
+        (src, factor), = weights.items()
+        self.zsets[dest] = {m: s * factor for m, s in self.zsets.get(src, {}).items()}
+
+    def zremrangebyscore(self, key, lo, hi):
+        zset = self.zsets.get(key, {})
+        for member in [m for m, s in zset.items() if s <= hi]:
+            del zset[member]
+
+    def zremrangebyrank(self, key, start, end):
+        return 0
+
+
+class _FakePipeline:
+    def __init__(self, client: _FakeRedis) -> None:
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+    def execute(self):
+        return [getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+@pytest.fixture()
+def fake_redis(monkeypatch):
+    import backend.app.utils.redis_cache as redis_cache
+
+    client = _FakeRedis()
+    monkeypatch.setattr(pw, "get_redis", lambda: client)
+    monkeypatch.setattr(redis_cache, "get_redis", lambda: client)
+    monkeypatch.setattr(pw, "_recorder", pw.TrafficRecorder(flush_sec=3600, flush_size=10_000))
+    monkeypatch.delenv("PREWARM_ADAPTIVE", raising=False)
+    return client
+
+
+def test_equivalent_requests_share_one_member():
+    a = pw.traffic_member("filter_ctx_brand", {"region": "eu", "brand": "BMW", "color": None})
+    b = pw.traffic_member("filter_ctx_brand", {"region": " EU ", "brand": "BMW"})
+    assert a == b
+
+
+def test_recorder_builds_decaying_top_k(fake_redis):
+    fake_redis.set(pw._DECAY_LOCK_KEY, "1")
+    for _ in range(3):
+        pw.record_cache_access("filter_ctx_brand", {"region": "EU", "brand": "BMW"}, hit=False)
+    pw.record_cache_access("filter_ctx_brand", {"region": "EU", "brand": "Audi"}, hit=True)
+    pw._recorder.flush()
+
+    top = pw.top_requests(10)
+    assert [(kind, params["brand"], score, miss) for kind, params, score, miss in top] == [
+        ("filter_ctx_brand", "BMW", 3.0, 3.0),
+        ("filter_ctx_brand", "Audi", 1.0, 0.0),
+    ]
+
+    del fake_redis.strings[pw._DECAY_LOCK_KEY]
+    pw._recorder._maybe_decay(fake_redis)
+    pw._recorder._maybe_decay(fake_redis)  # second call within the interval is a no-op
+    assert fake_redis.zsets[pw.TRAFFIC_KEY] == {
+        pw.traffic_member("filter_ctx_brand", {"region": "EU", "brand": "BMW"}): 1.5,
+        pw.traffic_member("filter_ctx_brand", {"region": "EU", "brand": "Audi"}): 0.5,
+    }
+
+
+def test_prewarm_top_warms_hot_entries_without_counting_them(fake_redis, monkeypatch):
+    pw.record_cache_access("filter_ctx_base", {"region": "EU"}, hit=False)
+    pw.record_cache_access("cars_count", {"region": "EU", "brand": "BMW"}, hit=False)
+    pw._recorder.flush()
+    warmed = []
+
+    def fake_warm(kind, params, db):
+        warmed.append((kind, params))
+        pw.record_cache_access(kind, params, hit=False)
+
+    monkeypatch.setattr(pw, "_warm_one", fake_warm)
+
+    class _Session:
+        def close(self):
+            pass
+
+        def rollback(self):
+            pass
+
+    stats = pw.prewarm_top(limit=5, workers=2, session_factory=_Session, max_sec=0)
+    assert stats == {"warmed": 2, "failed": 0, "skipped": 0}
+    assert sorted(kind for kind, _ in warmed) == ["cars_count", "filter_ctx_base"]
+    assert sum(pw._recorder._requests.values()) == 0
+
+
+def test_version_prewarm_runs_once_across_workers(fake_redis, monkeypatch):
+    import threading
+
+    release = threading.Event()
+    runs = []
+
+    def fake_prewarm_top():
+        runs.append(threading.current_thread().name)
+        release.wait(5)
+        return {"warmed": 0, "failed": 0, "skipped": 0}
+
+    monkeypatch.setattr(pw, "prewarm_top", fake_prewarm_top)
+    monkeypatch.setattr(pw, "_background_thread", None)
+    assert pw.schedule_prewarm_for_version("100-1")
+    first = pw._background_thread
+    # Another web worker sees the same slice bump.
+    monkeypatch.setattr(pw, "_background_thread", None)
+    assert not pw.schedule_prewarm_for_version("100-1")
+
+    # A newer bump waits for the running prewarm instead of overlapping it.
+    monkeypatch.setenv("PREWARM_MAX_SEC", "5")
+    assert pw.schedule_prewarm_for_version("100-2")
+    second = pw._background_thread
+    for _ in range(50):
+        if runs:
+            break
+        release.wait(0.01)
+    assert len(runs) == 1 and pw._ACTIVE_LOCK_KEY in fake_redis.strings
+    release.set()
+    first.join(5)
+    second.join(5)
+    assert len(runs) == 2
+    assert pw._ACTIVE_LOCK_KEY not in fake_redis.strings
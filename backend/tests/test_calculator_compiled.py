@@ -0,0 +1,94 @@
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from backend.app.models.source import Base
+from backend.app.services.calculator_compiled import CompiledCalculatorConfig, CompiledRangeTable
+from backend.app.services.calculator_config_loader import load_runtime_payload
+from backend.app.services.calculator_config_service import (
+    CalculatorConfigService,
+    invalidate_compiled_calculator_config,
+)
+from backend.app.services.calculator_runtime import EstimateRequest, calculate
+from backend.app.services.customs_config import calc_util_fee_rub, get_customs_config
+from backend.app.utils.range_lookup import lookup_range
+
+
+CONFIG_PATH = Path(__file__).resolve().parents[2] / "backend" / "app" / "config" / "calculator.yml"
+
+
+def _req(**overrides):
+    base = dict(
+        scenario=None,
+        price_net_eur=20000,
+        eur_rate=95.0,
+        engine_cc=1995,
+        power_hp=190,
+        power_kw=None,
+        is_electric=False,
+        reg_year=2021,
+        reg_month=1,
+    )
+    base.update(overrides)
+    return EstimateRequest(**base)
+
+
+def test_range_table_matches_linear_scan_including_gaps():
+    rows = load_runtime_payload(CONFIG_PATH)["scenarios"]["electric"]["excise_by_kw"]
+    table = CompiledRangeTable.from_mappings(rows, "from_kw", "to_kw", "rub_per_kw")
+    for step in range(0, 6000):
+        value = step / 10
+        assert table.lookup(value) == lookup_range(value, rows, "from_kw", "to_kw", "rub_per_kw")
+
+
+def test_compiled_util_and_results_match_runtime():
+    payload = load_runtime_payload(CONFIG_PATH)
+    compiled = CompiledCalculatorConfig(payload, version=1)
+    customs = get_customs_config()
+    for cc in (0, 999, 1995, 2000, 2001, 3499, 5000, 12000):
+        for kw in (None, 50.0, 110.3, 300.0, 900.0):
+            for hp in (None, 70, 150, 400):
+                if kw is None and hp is None:
+                    continue
+                for bucket in ("under_3", "3_5", "electric"):
+                    assert compiled.customs.util_fee_rub(cc, kw, hp, age_bucket=bucket) == calc_util_fee_rub(
+                        engine_cc=cc, kw=kw, hp=hp, cfg=customs, age_bucket=bucket
+                    )
+    for req in (
+        _req(),
+        _req(reg_year=2016, engine_cc=2993, power_hp=286),
+        _req(engine_cc=None, power_hp=None, power_kw=150.0, is_electric=True),
+    ):
+        assert compiled.calculate(req) == calculate(payload, req)
+
+
+def test_memoized_result_is_copied():
+    compiled = CompiledCalculatorConfig(load_runtime_payload(CONFIG_PATH), version=1)
+    first = compiled.calculate(_req())
+    first["breakdown"][0]["amount"] = -1
+    first["extra"] = True
+    second = compiled.calculate(_req())
+    assert second["breakdown"][0]["amount"] != -1
+    assert "extra" not in second
+
+
+def test_current_compiled_is_reused_until_a_new_version_is_stored():
+    invalidate_compiled_calculator_config()
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        svc = CalculatorConfigService(db)
+        first = svc.current_compiled(yaml_paths=(CONFIG_PATH,), xlsx_paths=())
+        assert first is not None
+        assert svc.current_compiled(yaml_paths=(CONFIG_PATH,), xlsx_paths=()) is first
+
+        payload = dict(first.payload)
+        payload["meta"] = {**payload["meta"], "version": "uploaded"}
+        svc.create(payload=payload, source="upload_xlsx")
+        # An upload invalidates; the YAML then wins again, as before.
+        second = svc.current_compiled(yaml_paths=(CONFIG_PATH,), xlsx_paths=())
+        assert second is not first
+        assert second.version == 3
+    invalidate_compiled_calculator_config()
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.orm import Session
+
+from backend.app.models import Car, CarImage
+from backend.app.models.source import Base, Source
+from backend.app.services.car_loader import CarBatchLoader, load_cars_by_ids
+
+
+def _seed(db: Session) -> None:
+    db.add(Source(id=1, key="mobile_de", name="mobile.de", base_url="csv://mobile_de", country="DE"))
+    for idx in range(1, 4):
+        db.add(
+            Car(
+                id=idx,
+                source_id=1,
+                external_id=str(idx),
+                country="DE",
+                brand="BMW",
+                model="X5",
+                description="long text",
+                source_payload={"num_seats": "5"},
+                is_available=True,
+                images=[CarImage(url=f"https://img.test/{idx}/{pos}.jpg", position=pos) for pos in range(2)],
+            )
+        )
+    db.commit()
+
+
+def _count_selects(engine, fn):
+    statements: list[str] = []
+
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _before)
+    try:
+        result = fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", _before)
+    return result, statements
+
+
+def test_loader_keeps_id_order_and_defers_card_columns():
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        _seed(db)
+        db.expunge_all()
+
+        cars = load_cars_by_ids(db, [3, "1", 99, 3, 2], profile="card")
+        assert [car.id for car in cars] == [3, 1, 2]
+        unloaded = inspect(cars[0]).unloaded
+        assert "source_payload" in unloaded
+        assert "description" in unloaded
+        assert "calc_breakdown_json" not in unloaded
+
+
+def test_detail_profile_prefetches_images_and_reuses_request_cache():
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        _seed(db)
+        db.expunge_all()
+        loader = CarBatchLoader(db)
+
+        cars, statements = _count_selects(
+            engine,
+            lambda: [len(car.images) for car in loader.load([2, 1, 3], profile="detail")],
+        )
+        assert cars == [2, 2, 2]
+        assert len(statements) == 2
+
+        again, statements = _count_selects(engine, lambda: loader.load([1, 2], profile="card"))
+        assert [car.id for car in again] == [1, 2]
+        assert statements == []
+
+        with pytest.raises(ValueError):
+            loader.load([1], profile="full")
+
+
+def test_card_profile_loads_images_in_one_query():
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        _seed(db)
+        db.expunge_all()
+
+        counts, statements = _count_selects(
+            engine,
+            lambda: [len(car.images) for car in load_cars_by_ids(db, [1, 2, 3], profile="card")],
+        )
+        assert counts == [2, 2, 2]
+        assert len(statements) == 2
+
+
+def test_identity_cache_is_bounded_and_dropped_on_commit(monkeypatch):
+    import backend.app.services.car_loader as car_loader
+
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        _seed(db)
+        loader = CarBatchLoader(db)
+        loader.load([1, 2])
+        assert set(db.info[car_loader._IDENTITY_CACHE_KEY]) == {1, 2}
+        db.commit()
+        assert car_loader._IDENTITY_CACHE_KEY not in db.info
+
+        monkeypatch.setattr(car_loader, "_IDENTITY_CACHE_MAX", 2)
+        loader.load([1, 2])
+        assert [car.id for car in loader.load([3, 1])] == [3, 1]
+        assert set(db.info[car_loader._IDENTITY_CACHE_KEY]) == {3}
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import httpx
+import pytest
+
+pytest.importorskip("pydantic")
+
+from backend.app.parsing.config import PaginationConfig, SiteConfig
+from backend.app.parsing.emavto_klg import EmAvtoKlgParser
+from backend.app.utils.rate_limiter import TokenBucket
+
+
+DETAIL_URL = "https://example.com/car/kr-1"
+
+
+def _parser() -> EmAvtoKlgParser:
+    cfg = SiteConfig(
+        key="emavto_klg",
+        name="EmAvto",
+        country="KR",
+        type="html",
+        base_search_url="https://example.com",
+        pagination=PaginationConfig(),
+        defaults={"detail_rps": 100},
+    )
+    parser = EmAvtoKlgParser(cfg)
+    parser.html_cache = None
+    return parser
+
+
+def _task() -> dict:
+    return {
+        "external_id": "kr-1",
+        "source_url": DETAIL_URL,
+        "brand": "Kia",
+        "model": "Carnival",
+        "year": 2022,
+        "mileage": 10000,
+        "price": 36052,
+        "engine_type": "petrol",
+        "thumbnail_url": None,
+        "kr_market_type": "domestic",
+    }
+
+
+def test_detail_fetch_sends_validators_and_short_circuits_on_304():
+    seen_headers = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen_headers.append(dict(request.headers))
+        if request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(
+            200,
+            text="<html><body><dl><dt>Кузов</dt><dd>Минивэн</dd></dl></body></html>",
+            headers={"ETag": '"v1"', "Last-Modified": "Mon, 19 Oct 2026 08:00:00 GMT"},
+        )
+
+    parser = _parser()
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    bucket = TokenBucket(rate_per_sec=100)
+
+    first = parser._fetch_detail(DETAIL_URL, bucket, client=client)
+    car = parser._car_from_detail(_task(), first, phase="detail")
+    assert car is not None
+    assert (car.detail_etag, car.detail_last_modified) == ('"v1"', "Mon, 19 Oct 2026 08:00:00 GMT")
+    assert "if-none-match" not in seen_headers[0]
+
+    parser.detail_validators = {DETAIL_URL: (car.detail_etag, car.detail_last_modified)}
+    second = parser._fetch_detail(DETAIL_URL, bucket, client=client)
+    assert parser._car_from_detail(_task(), second, phase="detail") is None
+    assert seen_headers[1]["if-modified-since"] == "Mon, 19 Oct 2026 08:00:00 GMT"
+    assert parser.not_modified_ids == ["kr-1"]
+    assert parser.metrics["detail_not_modified"] == 1
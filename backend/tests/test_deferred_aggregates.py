@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import time
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from backend.app.models.source import Base
+from backend.app.services import deferred_aggregates as agg
+from backend.app.services.cars_service import CarsService
+
+
+@pytest.fixture()
+def session_factory(monkeypatch):
+    monkeypatch.setattr(agg, "_local_state", {})
+    monkeypatch.setattr(agg, "redis_get_json", lambda key: None)
+    monkeypatch.setattr(agg, "redis_set_json", lambda key, value, ttl_sec: True)
+    monkeypatch.setenv("CATALOG_REDIS_COUNT_CACHE", "0")
+    monkeypatch.setattr(CarsService, "_count_cache", {})
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine, future=True)
+
+
+def _wait_ready(token: str) -> dict:
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        state = agg.get_state(token)
+        if state and state.get("status") != "pending":
+            return state
+        time.sleep(0.01)
+    raise AssertionError("job did not finish")
+
+
+def test_list_cars_defers_uncached_total(session_factory):
+    with session_factory() as db:
+        service = CarsService(db)
+        items, total = service.list_cars(region="EU", light=True, use_fast_count=False, defer_count=True)
+        assert (items, total, service.last_count_deferred) == ([], None, True)
+        _, total = service.list_cars(region="EU", count_only=True, use_fast_count=False, defer_count=True)
+        assert (total, service.last_count_deferred) == (0, False)
+
+
+def test_submit_runs_once_and_publishes_result(session_factory):
+    calls = []
+
+    def job(db: Session) -> dict:
+        calls.append(db)
+        time.sleep(0.05)
+        return {"total": 7, "approximate": False}
+
+    token = agg.job_token("cars", {"region": "EU"})
+    assert agg.submit(token, job, session_factory=session_factory)["status"] == "pending"
+    assert agg.submit(token, job, session_factory=session_factory)["status"] == "pending"
+    assert _wait_ready(token) == {"status": "ready", "total": 7, "approximate": False}
+    assert agg.submit(token, job, session_factory=session_factory)["total"] == 7
+    assert len(calls) == 1
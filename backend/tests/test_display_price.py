@@ -5,7 +5,7 @@ from sqlalchemy import create_engine, select
 from sqlalchemy.dialects import postgresql
 from sqlalchemy.orm import Session
 
-import backend.app.services.cars_service as cars_service_mod
+import backend.app.services.fx_rates_service as fx_rates_service_mod
 from backend.app.models.source import Base, Source
 from backend.app.models.car import Car
 from backend.app.services.calculator_config_service import CalculatorConfigService
@@ -39,8 +39,11 @@ def test_get_fx_rates_uses_plus_four_default_when_fetch_fails(monkeypatch):
         def _boom(*args, **kwargs):
             raise RuntimeError("offline")
 
-        monkeypatch.setattr(cars_service_mod.requests, "get", _boom)
+        # Request code never fetches; without stored rates it uses env + markup.
+        monkeypatch.setattr(fx_rates_service_mod.requests, "get", _boom)
+        fx_rates_service_mod.reset_fx_snapshot()
         rates = svc.get_fx_rates(allow_fetch=True) or {}
+        fx_rates_service_mod.reset_fx_snapshot()
         assert rates["EUR"] == 99.0
         assert rates["USD"] == 89.0
         assert rates["CNY"] == 16.0
@@ -774,3 +777,149 @@ def test_fuel_source_expr_promotes_hint_based_evs_to_electric_bucket():
     assert "'electric'" in sql
     assert "regexp_replace" in sql
     assert "source_url" in sql
+
+
+def test_vectorized_display_prices_match_scalar_helpers(monkeypatch):
+    from backend.app.utils.price_utils import (
+        annotate_display_prices_vectorized,
+        price_without_util_note,
+        resolve_public_display_price_rub,
+        sort_items_by_display_price,
+    )
+
+    monkeypatch.delenv("PUBLIC_PRICE_ALLOW_SOURCE_FALLBACK", raising=False)
+    rows = [
+        {"id": 1, "total_price_rub_cached": 2_500_000.0, "price_rub_cached": 2_000_000.0, "country": "DE"},
+        {"id": 2, "total_price_rub_cached": None, "price_rub_cached": 900_000.0, "country": "DE"},
+        {
+            "id": 3,
+            "total_price_rub_cached": 1_000_000.0,
+            "price_rub_cached": 1_000_000.0,
+            "calc_breakdown_json": [{"title": "__without_util_fee"}],
+            "country": "KR",
+        },
+        {
+            "id": 4,
+            "total_price_rub_cached": None,
+            "price_rub_cached": None,
+            "price": 10_000,
+            "currency": "EUR",
+            "calc_breakdown_json": [{"title": "__without_util_fee"}],
+            "country": "CN",
+        },
+        {"id": 5, "total_price_rub_cached": 0, "price_rub_cached": 500_000.0, "country": "DE"},
+        {"id": 6, "total_price_rub_cached": 1_200_001.0, "price_rub_cached": None, "country": "KR"},
+    ]
+    for sort in ("price_asc", "price_desc"):
+        expected = [dict(row) for row in rows]
+        for row in expected:
+            row["display_price_rub"] = resolve_public_display_price_rub(
+                row.get("total_price_rub_cached"),
+                row.get("price_rub_cached"),
+                calc_breakdown=row.get("calc_breakdown_json"),
+                raw_price=row.get("price"),
+                currency=row.get("currency"),
+                fx_eur=100.0,
+                fx_usd=90.0,
+            )
+            row["price_note"] = price_without_util_note(
+                display_price=row.get("display_price_rub"),
+                total_price_rub_cached=row.get("total_price_rub_cached"),
+                calc_breakdown=row.get("calc_breakdown_json"),
+                region="EU",
+                country=row.get("country"),
+            )
+        sort_items_by_display_price(expected, sort=sort)
+
+        actual = annotate_display_prices_vectorized(
+            [dict(row) for row in rows],
+            sort=sort,
+            region="EU",
+            fx_eur=100.0,
+            fx_usd=90.0,
+        )
+        assert [row["id"] for row in actual] == [row["id"] for row in expected]
+        assert [(row["display_price_rub"], row["price_note"]) for row in actual] == [
+            (row["display_price_rub"], row["price_note"]) for row in expected
+        ]
+
+
+def test_stored_display_price_columns_drive_price_sort(monkeypatch):
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(Source(id=1, key="mobile_de", name="Mobile.de", base_url="https://m.de", country="DE"))
+        prices = {1: (100.0, 50.0), 2: (None, 80.0), 3: (70.0, None), 4: (None, None), 5: (70.0, 60.0)}
+        for car_id, (total, price_rub) in prices.items():
+            db.add(
+                Car(
+                    id=car_id,
+                    source_id=1,
+                    external_id=str(car_id),
+                    country="DE",
+                    is_available=True,
+                    total_price_rub_cached=total,
+                    price_rub_cached=price_rub,
+                )
+            )
+        db.commit()
+        svc = CarsService(db)
+        monkeypatch.setattr(svc, "get_fx_rates", lambda allow_fetch=True: {"EUR": 100.0, "RUB": 1.0})
+        for car in db.query(Car).all():
+            svc.sync_display_price_columns(car)
+        db.commit()
+        assert db.get(Car, 2).display_price_group == 2
+        assert float(db.get(Car, 1).display_price_rub) == 10_000.0
+
+        monkeypatch.setenv("CATALOG_DISPLAY_PRICE_COLUMN", "1")
+        monkeypatch.setattr(svc, "_should_catalog_inline_price_refresh", lambda **kwargs: False)
+        assert not svc._should_use_light_price_window_sort(sort="price_asc", light=True, page=1, page_size=10)
+        items, _ = svc.list_cars(sort="price_asc", page=1, page_size=10, light=True, use_fast_count=False)
+        assert [item["id"] for item in items] == [1, 3, 5, 2, 4]
+        assert items[0]["display_price_rub"] == 10_000.0
+
+
+def test_price_rub_backfill_refreshes_stored_display_columns(monkeypatch):
+    from sqlalchemy.orm import sessionmaker
+
+    from backend.app.tools import backfill_price_rub as backfill
+    from backend.app.utils.price_utils import public_display_price_fields
+
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(Source(id=1, key="mobile_de", name="Mobile.de", base_url="https://m.de", country="DE"))
+        db.add(
+            Car(
+                id=1,
+                source_id=1,
+                external_id="1",
+                country="DE",
+                price=1000,
+                currency="EUR",
+                is_available=True,
+                total_price_rub_cached=150_000.0,
+                display_price_rub=1.0,
+                display_price_group=9,
+            )
+        )
+        db.commit()
+    monkeypatch.setattr(backfill, "SessionLocal", sessionmaker(bind=engine))
+    monkeypatch.setattr(CarsService, "get_fx_rates", lambda self, allow_fetch=True: {"EUR": 100.0, "RUB": 1.0})
+
+    assert backfill.backfill_price_rub() == 1
+    with Session(engine) as db:
+        car = db.get(Car, 1)
+        expected = public_display_price_fields(
+            car.total_price_rub_cached,
+            car.price_rub_cached,
+            calc_breakdown=car.calc_breakdown_json,
+            raw_price=car.price,
+            currency=car.currency,
+            country=car.country,
+            fx_eur=100.0,
+            fx_usd=0.0,
+            fx_cny=0.0,
+        )
+        assert float(car.price_rub_cached) == 100_000.0
+        assert (float(car.display_price_rub), car.display_price_group) == (float(expected[0]), expected[1])
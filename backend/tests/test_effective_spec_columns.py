@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import and_, create_engine, select
+from sqlalchemy.orm import Session
+
+from backend.app.models.source import Base, Source
+from backend.app.models.car import Car
+from backend.app.services.cars_service import CarsService
+
+
+def _car(external_id: str, **fields) -> Car:
+    base = {
+        "source_id": 1,
+        "external_id": external_id,
+        "country": "DE",
+        "brand": "BMW",
+        "model": "X5",
+        "is_available": True,
+    }
+    base.update(fields)
+    return Car(**base)
+
+
+def test_effective_columns_prefer_raw_then_inferred_values():
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(Source(id=1, key="mobile_de", name="mobile.de", base_url="csv://mobile_de", country="DE"))
+        db.add_all(
+            [
+                _car("raw", engine_cc=2998, power_hp=340, power_kw=250, inferred_power_hp=300, year=2020, registration_year=2021),
+                _car("inferred", inferred_engine_cc=1998, inferred_power_hp=190, inferred_power_kw=140, year=2019),
+                _car("unknown", year=None),
+            ]
+        )
+        db.commit()
+
+        rows = {
+            row.external_id: row
+            for row in db.execute(
+                select(
+                    Car.external_id,
+                    Car.effective_engine_cc,
+                    Car.effective_power_hp,
+                    Car.effective_power_kw,
+                    Car.effective_reg_year,
+                )
+            )
+        }
+        assert (rows["raw"].effective_engine_cc, float(rows["raw"].effective_power_hp)) == (2998, 340.0)
+        assert float(rows["raw"].effective_power_kw) == 250.0
+        assert rows["raw"].effective_reg_year == 2021
+        assert (rows["inferred"].effective_engine_cc, float(rows["inferred"].effective_power_hp)) == (1998, 190.0)
+        assert rows["inferred"].effective_reg_year == 2019
+        assert rows["unknown"].effective_power_hp is None
+        assert rows["unknown"].effective_reg_year is None
+
+        conditions, _ = CarsService(db)._build_list_conditions(power_hp_min=180, engine_cc_max=2500)
+        matched = db.execute(select(Car.external_id).where(and_(*conditions))).scalars().all()
+        assert matched == ["inferred"]
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("pydantic")
+
+from backend.app.parsing.config import PaginationConfig, SiteConfig
+from backend.app.parsing.emavto_klg import EmAvtoKlgParser
+
+
+def _parser() -> EmAvtoKlgParser:
+    cfg = SiteConfig(
+        key="emavto_klg",
+        name="EmAvto",
+        country="KR",
+        type="html",
+        base_search_url="https://example.com",
+        pagination=PaginationConfig(),
+        defaults={"list_rps": 100, "detail_rps": 100},
+        selectors={
+            "item": "div.car-card",
+            "title": "a.car-title",
+            "details": "p.car-details",
+            "price": "p.car-price",
+            "link": "a.car-title",
+            "image": "img",
+        },
+    )
+    return EmAvtoKlgParser(cfg)
+
+
+def _page(scope: str, prefix: str, page: int, count: int) -> str:
+    cards = "".join(
+        f"""
+        <div class="car-card">
+          <a class="car-title" href="/car/{prefix}-{page}-{i}">Kia Carnival</a>
+          <p class="car-details">2022 · 10000 км · Бензин</p>
+          <p class="car-price">36052 $</p>
+        </div>"""
+        for i in range(count)
+    )
+    return f'<html><body><div id="{scope}">{cards}</div></body></html>'
+
+
+class _Resp:
+    def __init__(self, text: str):
+        self.status_code = 200
+        self.text = text
+        self.url = "https://example.com"
+        self.headers = {}
+
+
+def _install(parser, *, domestic_pages: int, import_pages: int, domestic_delay: float, events: list):
+    lock = threading.Lock()
+
+    def request(url, params, bucket, is_detail, client=None, deadline=None):
+        if "koreaPage" in params:
+            page = int(params["koreaPage"])
+            time.sleep(domestic_delay)
+            html = _page("korea-cars", "dom", page, 2 if page <= domestic_pages else 0)
+            stream = "domestic"
+        else:
+            page = int(params["importPage"])
+            html = _page("import-cars", "imp", page, 2 if page <= import_pages else 0)
+            stream = "import"
+        with lock:
+            events.append(("list", stream, page, time.monotonic()))
+        return _Resp(html)
+
+    def fetch_detail(url, bucket, client=None, deadline=None):
+        with lock:
+            events.append(("detail", url, None, time.monotonic()))
+        return {"body_type": "minivan"}
+
+    parser._request_with_backoff = request  # type: ignore[assignment]
+    parser._fetch_detail = fetch_detail  # type: ignore[assignment]
+
+
+def test_streams_run_concurrently_and_details_start_before_listing_ends():
+    parser = _parser()
+    events: list = []
+    _install(parser, domestic_pages=3, import_pages=3, domestic_delay=0.1, events=events)
+
+    cars = parser.fetch_items({"mode": "full", "resume_page_full": 1, "max_pages": 10, "max_runtime_sec": 30})
+
+    assert len(cars) == 12
+    assert parser.last_stop_reason == "empty" and parser.last_reached_end
+    assert parser.missing_tasks == []
+    list_events = [e for e in events if e[0] == "list"]
+    last_import = max(e[3] for e in list_events if e[1] == "import")
+    last_domestic = max(e[3] for e in list_events if e[1] == "domestic")
+    # The fast stream is not paced by the slow one.
+    assert last_import < last_domestic
+    first_detail = min(e[3] for e in events if e[0] == "detail")
+    assert first_detail < last_domestic
+    assert parser.progress["last_page_full"] == 3
+
+
+def test_max_items_caps_tasks_across_streams():
+    parser = _parser()
+    events: list = []
+    _install(parser, domestic_pages=50, import_pages=50, domestic_delay=0.0, events=events)
+
+    cars = parser.fetch_items(
+        {"mode": "full", "resume_page_full": 1, "max_pages": 50, "max_items": 5, "max_runtime_sec": 30}
+    )
+
+    assert len(cars) == 5
+    assert parser.last_tasks_total == 5
+    assert parser.last_stop_reason == "max_items"
+
+
+def test_resume_page_ignores_streams_that_reached_the_end():
+    parser = _parser()
+    events: list = []
+    _install(parser, domestic_pages=50, import_pages=2, domestic_delay=0.0, events=events)
+
+    parser.fetch_items(
+        {"mode": "full", "resume_page_full": 1, "max_pages": 4, "skip_details": True, "max_runtime_sec": 30}
+    )
+
+    # import ran out at page 3, domestic finished its 4-page budget.
+    assert parser.last_stop_reason == "page_limit"
+    assert parser.progress["last_page_full"] == 4
+    assert parser.last_pages_processed == 4
+
+
+def test_metric_counters_are_exact_across_threads():
+    parser = _parser()
+
+    def work() -> None:
+        for i in range(2000):
+            parser._car_from_detail({"external_id": f"x{i}"}, {"not_modified": True}, phase="detail")
+            parser._count("skipped_leasing")
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert parser.metrics["detail_not_modified"] == 16000
+    assert parser.metrics["skipped_leasing"] == 16000
+    assert len(parser.not_modified_ids) == 16000
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from backend.app.models import Car, FxRate
+from backend.app.models.source import Base, Source
+from backend.app.scripts.update_fx_prices import run_fx_price_update
+from backend.app.services import fx_rates_service as fx
+from backend.app.services.fx_rates_service import (
+    FxRatesService,
+    current_fx_rates,
+    current_fx_snapshot,
+    on_fx_signature_change,
+    reset_fx_snapshot,
+)
+
+
+@pytest.fixture(autouse=True)
+def _fresh_snapshot(monkeypatch):
+    monkeypatch.setenv("FX_ADD_RUB", "4")
+    monkeypatch.setenv("EURO_RATE", "90")
+    monkeypatch.setenv("USD_RATE", "80")
+    monkeypatch.setenv("CNY_RATE", "11")
+    monkeypatch.setattr(fx, "_listeners", [])
+    reset_fx_snapshot()
+    yield
+    reset_fx_snapshot()
+
+
+def _session() -> Session:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    return Session(engine)
+
+
+def test_snapshot_falls_back_to_env_without_stored_rates():
+    with _session() as db:
+        snap = current_fx_snapshot(db)
+        assert snap.source == "env"
+        assert current_fx_rates(db) == {"EUR": 94.0, "USD": 84.0, "CNY": 15.0, "RUB": 1.0}
+
+
+def test_store_inserts_only_changed_rates_and_emits_signature_change():
+    events = []
+    on_fx_signature_change(events.append)
+    with _session() as db:
+        service = FxRatesService(db)
+        first = service.store({"EUR": 100.0, "USD": 90.0, "CNY": 12.5})
+        assert first.stored == 3
+        assert first.signature_changed
+        assert current_fx_rates()["EUR"] == pytest.approx(104.0)
+
+        same = service.store({"EUR": 100.0, "USD": 90.0, "CNY": 12.5})
+        assert same.stored == 0
+        assert not same.signature_changed
+
+        cny_only = service.store({"EUR": 100.0, "USD": 90.0, "CNY": 13.0})
+        assert cny_only.stored == 1
+        # CNY is not part of the breakdown signature.
+        assert not cny_only.signature_changed
+
+        rows = db.execute(select(FxRate.currency)).scalars().all()
+        assert sorted(rows) == ["CNY", "CNY", "EUR", "USD"]
+        assert [row.rate for row in service.history("cny")][0] == pytest.approx(13.0)
+
+    assert len(events) == 1
+    assert events[0].new_signature == "eur:104.0000|usd:94.0000"
+
+
+def test_fx_dependent_update_skips_rows_the_move_cannot_touch():
+    rates = {"EUR": 104.0, "USD": 94.0, "CNY": 15.0, "RUB": 1.0}
+    current = [{"title": "__fx_signature", "amount_rub": 0, "version": "eur:104.0000|usd:94.0000"}]
+    stale = [
+        {"title": "price", "currency": "EUR", "value": 1000},
+        {"title": "__fx_signature", "amount_rub": 0, "version": "eur:100.0000|usd:90.0000"},
+    ]
+    with _session() as db:
+        db.add(Source(id=1, key="mobile_de", name="mobile.de", base_url="https://m.de", country="DE"))
+        db.add_all(
+            [
+                Car(id=1, source_id=1, external_id="eur-stale", country="DE", price=1000, currency="EUR",
+                    calc_breakdown_json=stale),
+                Car(id=2, source_id=1, external_id="eur-current", country="DE", price=1000, currency="EUR",
+                    calc_breakdown_json=current),
+                Car(id=3, source_id=1, external_id="cny", country="CN", price=1000, currency="CNY",
+                    calc_breakdown_json=current),
+                Car(id=4, source_id=1, external_id="rub", country="KR", price=1000, currency="RUB"),
+            ]
+        )
+        db.commit()
+
+        checked, updated = run_fx_price_update(db, rates, fx_dependent_only=True, changed_currencies=("CNY",))
+        assert (checked, updated) == (2, 2)
+        assert float(db.get(Car, 3).price_rub_cached) == pytest.approx(15000.0)
+        assert db.get(Car, 2).price_rub_cached is None
+        assert db.get(Car, 1).calc_breakdown_json[-1]["version"] == "eur:104.0000|usd:94.0000"
+
+        # Once re-priced, the stale row carries the new signature and drops out.
+        assert run_fx_price_update(db, rates, fx_dependent_only=True, changed_currencies=())[0] == 0
+
+
+def test_signature_change_reprices_cars_and_bumps_dataset(monkeypatch):
+    import backend.app.utils.redis_cache as redis_cache
+
+    bumps = []
+    monkeypatch.setattr(redis_cache, "get_redis", lambda: None)
+    monkeypatch.setattr(redis_cache, "bump_dataset_version", lambda: bumps.append(1))
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(Source(id=1, key="mobile_de", name="mobile.de", base_url="https://m.de", country="DE"))
+        db.add(Car(id=1, source_id=1, external_id="1", country="DE", price=100, currency="EUR"))
+        db.commit()
+        result = FxRatesService(db).store({"EUR": 100.0, "USD": 90.0, "CNY": 12.5})
+
+    fx._run_price_refresh(lambda: Session(engine), result)
+    with Session(engine) as db:
+        assert float(db.get(Car, 1).price_rub_cached) == pytest.approx(10400.0)
+    assert bumps == [1]
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import time
+
+import httpx
+import pytest
+
+pytest.importorskip("pydantic")
+
+from backend.app.parsing.base import BaseParser
+from backend.app.parsing.config import PaginationConfig, SiteConfig
+from backend.app.parsing.html_cache import HtmlCache, request_key
+from backend.app.utils.rate_limiter import AdaptiveRateController
+
+
+def _parser(cache: HtmlCache, handler) -> BaseParser:
+    cfg = SiteConfig(
+        key="che168",
+        name="che168",
+        country="CN",
+        type="html",
+        base_search_url="https://example.com/list",
+        pagination=PaginationConfig(),
+    )
+    parser = BaseParser(cfg)
+    parser.client = httpx.Client(transport=httpx.MockTransport(handler))
+    parser.html_cache = cache
+    parser._page_rate = AdaptiveRateController("example.com:page", initial_rps=1000, use_redis=False)
+    return parser
+
+
+def test_live_requests_are_stored_and_replayed_without_network(tmp_path):
+    calls = []
+
+    def live(request: httpx.Request) -> httpx.Response:
+        calls.append(str(request.url))
+        if request.url.path == "/img.jpg":
+            return httpx.Response(200, content=b"\xff\xd8", headers={"content-type": "image/jpeg"})
+        page = request.url.params.get("page", "0")
+        return httpx.Response(200, text=f"<html>page {page}</html>", headers={"content-type": "text/html; charset=gbk"})
+
+    cache = HtmlCache(tmp_path)
+    live_parser = _parser(cache, live)
+    live_parser._http_get("https://example.com/list", params={"page": 2, "b": "x"})
+    live_parser._http_get("https://example.com/list?b=x", params={"page": "2"})
+    live_parser._http_get("https://example.com/img.jpg")
+    assert cache.stats["stored"] == 2
+    assert cache.summary()["blobs"] == 1
+
+    def offline(request: httpx.Request) -> httpx.Response:
+        raise AssertionError("replay must not hit the network")
+
+    replay = _parser(HtmlCache(tmp_path), offline)
+    replay.enable_replay(HtmlCache(tmp_path, max_age_sec=3600))
+    hit = replay._http_get("https://example.com/list", params={"b": "x", "page": "2"})
+    assert hit.status_code == 200 and hit.text == "<html>page 2</html>"
+    assert hit.headers["content-type"].endswith("gbk")
+    miss = replay._http_get("https://example.com/list", params={"page": 3})
+    assert miss.status_code == 404
+    assert replay.html_cache.stats == {"stored": 0, "hits": 1, "misses": 1, "pruned": 0}
+    assert len(calls) == 3
+
+
+def test_replay_window_and_latest_version(tmp_path):
+    cache = HtmlCache(tmp_path)
+    cache.store("che168", "https://example.com/car/1", None, b"old")
+    cache._db().execute("UPDATE pages SET fetched_at = ?", (time.time() - 5 * 86400,))
+    cache._db().commit()
+    assert HtmlCache(tmp_path, max_age_sec=86400).lookup("https://example.com/car/1") is None
+
+    cache.store("che168", "https://example.com/car/1", None, b"new")
+    page = HtmlCache(tmp_path, max_age_sec=86400).lookup("https://example.com/car/1")
+    assert page is not None and page.body == b"new"
+    assert [p.body for p in cache.iter_pages("che168")] == [b"old", b"new"]
+
+
+def test_prune_applies_ttl_and_size_cap(tmp_path):
+    cache = HtmlCache(tmp_path, ttl_sec=86400, max_bytes=0)
+    for i in range(4):
+        cache.store("emavto_klg", f"https://example.com/car/{i}", None, bytes(range(256)) * (i + 1))
+    db = cache._db()
+    db.execute("UPDATE pages SET fetched_at = ? WHERE req_key = ?",
+               (time.time() - 2 * 86400, request_key("https://example.com/car/0")))
+    db.commit()
+    assert cache.prune() == 1
+    assert not list(tmp_path.glob("blobs/*/*.tmp"))
+
+    sizes = [size for (size,) in db.execute("SELECT stored_bytes FROM blobs").fetchall()]
+    cache.max_bytes = sum(sizes) - 1
+    assert cache.prune() >= 1
+    assert cache.lookup("https://example.com/car/1") is None
+    assert cache.lookup("https://example.com/car/3") is not None
+    assert len(list(tmp_path.glob("blobs/*/*.z"))) == cache.summary()["blobs"]
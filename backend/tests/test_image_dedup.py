@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("PIL")
+
+from PIL import Image, ImageDraw
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from backend.app.models import Car, CarImage, Source
+from backend.app.models.source import Base
+from backend.app.services import image_dedup as dd
+from backend.app.services import media_manifest as mm
+
+
+def _picture(seed: int, size=(160, 120)) -> Image.Image:
+    img = Image.new("RGB", size, (240, 240, 240))
+    draw = ImageDraw.Draw(img)
+    for i in range(6):
+        x = (seed * 37 + i * 23) % size[0]
+        draw.rectangle([x, i * 18, x + 30, i * 18 + 14], fill=((seed * 50) % 255, 30 * i, 90))
+    return img
+
+
+@pytest.fixture()
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(mm, "media_root", lambda: tmp_path)
+    monkeypatch.setattr(dd, "media_root", lambda: tmp_path)
+    monkeypatch.setattr(mm, "_table_exists_cache", {})
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(Source(id=1, key="mobile_de", name="mobile.de", base_url="https://m", country="DE"))
+        session.add_all([Car(id=i, source_id=1, external_id=str(i), country="DE") for i in (1, 2, 3)])
+        session.commit()
+        yield session
+
+
+def _save(root, rel, img, quality=80):
+    path = root / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    img.save(path, format="WEBP", quality=quality)
+    return "/media/" + rel
+
+
+def test_dhash_survives_reencoding_and_resize():
+    a = _picture(1)
+    assert dd.dhash_image(a) == dd.dhash_image(a.resize((320, 240)))
+    assert dd.hamming(dd.dhash_image(a), dd.dhash_image(_picture(2))) > 8
+
+
+def test_hash_and_collapse_duplicate_files(db, tmp_path):
+    same = _picture(1)
+    url1 = _save(tmp_path, "машины/gallery_mirror/001/1_10_aaaaaaaaaaaa.webp", same)
+    url2 = _save(tmp_path, "машины/gallery_mirror/002/2_20_bbbbbbbbbbbb.webp", same, quality=60)
+    url3 = _save(tmp_path, "машины/gallery_mirror/003/3_30_cccccccccccc.webp", _picture(5))
+    db.add_all(
+        [
+            CarImage(id=10, car_id=1, url=url1),
+            CarImage(id=11, car_id=1, url=url1),
+            CarImage(id=20, car_id=2, url=url2),
+            CarImage(id=30, car_id=3, url=url3),
+        ]
+    )
+    db.get(Car, 2).thumbnail_local_path = url2
+    db.commit()
+    assert dd.count_unique_images(db) == 3
+
+    assert dd.hash_pending(db, batch=2) == 4
+    stats = dd.collapse_duplicates(db)
+    assert stats["merged_urls"] == 1 and stats["rows_rewritten"] == 1 and stats["thumbs_rewritten"] == 1
+
+    db.expire_all()
+    assert db.get(CarImage, 20).url == url1
+    assert db.get(Car, 2).thumbnail_local_path == url1
+    assert db.get(CarImage, 30).url == url3
+    # The orphaned copy is left for prune_unused_local_media.
+    assert (tmp_path / "машины/gallery_mirror/002/2_20_bbbbbbbbbbbb.webp").exists()
+
+    unique = db.execute(dd.unique_images_query()).scalars().all()
+    assert [im.id for im in unique] == [10, 30]
+    assert [im.id for im in dd.unique_images(db.get(Car, 1).images)] == [10]
+
+
+def test_collapse_rejects_hash_collisions(db, tmp_path):
+    url1 = _save(tmp_path, "машины/gallery_mirror/001/1_10_aaaaaaaaaaaa.webp", _picture(1))
+    url2 = _save(tmp_path, "машины/gallery_mirror/002/2_20_bbbbbbbbbbbb.webp", _picture(1, size=(160, 60)))
+    db.add_all([CarImage(id=10, car_id=1, url=url1, phash="f" * 16), CarImage(id=20, car_id=2, url=url2, phash="f" * 16)])
+    db.commit()
+
+    stats = dd.collapse_duplicates(db)
+    assert stats["rejected"] == 1 and stats["merged_urls"] == 0
+    assert db.execute(select(CarImage.url).where(CarImage.id == 20)).scalar_one() == url2
+    # The unconfirmed hash match does not hide either photo on a detail page.
+    both = [db.get(CarImage, 10), db.get(CarImage, 20)]
+    assert dd.unique_images(both) == both
+
+
+def test_unique_images_folds_mirrors_of_the_same_source_url():
+    rows = [
+        CarImage(id=1, car_id=1, url="/media/машины/gallery_mirror/001/1_1_aaaaaaaaaaaa.webp"),
+        CarImage(id=2, car_id=1, url="/media/машины/mirror/001/1_aaaaaaaaaaaa.webp"),
+        CarImage(id=3, car_id=1, url="https://img.example/a.jpg"),
+        CarImage(id=4, car_id=1, url="https://img.example/a.jpg"),
+    ]
+    assert [im.id for im in dd.unique_images(rows)] == [1, 3]
+
+
+def test_blob_index_finds_mirrored_source_urls(db, tmp_path):
+    src = "https://img.classistatic.de/api/v1/mo-prod/images/ab/x?rule=mo-640.jpg"
+    rel = f"машины/gallery_mirror/001/1_10_{dd.url_digest(src)}.webp"
+    _save(tmp_path, rel, _picture(1))
+    mm.scan(db)
+
+    index = dd.BlobIndex.build(db)
+    assert index.lookup(src, "webp") == "/media/" + rel
+    assert index.lookup(src, "jpg") is None
+    assert dd.BlobIndex.build(None, root=tmp_path).lookup(src, "webp") == "/media/" + rel
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import asyncio
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("httpx")
+pytest.importorskip("PIL")
+
+import httpx
+from PIL import Image
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from backend.app.models.source import Base
+from backend.app.services.image_mirror import AsyncImageMirror, MirrorJob, MirrorOptions, MirrorProgress
+
+
+def _jpeg(width=64, height=32) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 10, 10)).save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+def _run(mirror, transport, jobs):
+    async def go():
+        async with httpx.AsyncClient(transport=transport) as client:
+            mirror._client = client
+            results = []
+            await mirror.run(jobs, on_result=results.append)
+            return results
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        mirror._executor = pool
+        return asyncio.run(go())
+
+
+def _target(tmp_path):
+    return lambda job, url: (tmp_path / f"{job.car_id}_{job.image_id}_{url[-5:]}.webp", f"/media/{job.image_id}.webp")
+
+
+def test_retries_then_falls_back_to_next_variant(tmp_path):
+    body = _jpeg(width=200)
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(str(request.url))
+        if request.url.path == "/big":
+            return httpx.Response(404)
+        if len([c for c in calls if c.endswith("/small")]) == 1:
+            return httpx.Response(503, headers={"Retry-After": "0"})
+        return httpx.Response(200, content=body)
+
+    mirror = AsyncImageMirror(_target(tmp_path), MirrorOptions(max_width=100, backoff_sec=0))
+    jobs = [MirrorJob(1, 10, ("https://img.test/big", "https://img.test/small"))]
+    (res,) = _run(mirror, httpx.MockTransport(handler), jobs)
+
+    assert res["ok"] and res["candidate"] == 1 and res["source"] == "download"
+    written = tmp_path / "10_1_small.webp"
+    assert Image.open(written).width == 100
+    assert not list(tmp_path.glob("*.tmp.*"))
+    snap = mirror.stats.snapshot()
+    assert snap["downloaded"] == 1 and snap["retries"] == 1 and snap["failures_by_code"] == {}
+
+    # Second run finds the file on disk and never hits the network.
+    calls.clear()
+    mirror = AsyncImageMirror(_target(tmp_path), MirrorOptions(backoff_sec=0))
+    jobs = [MirrorJob(1, 10, ("https://img.test/small",))]
+    (res,) = _run(mirror, httpx.MockTransport(handler), jobs)
+    assert res["source"] == "cache_hit" and calls == []
+
+
+def test_per_host_limit_and_failure_codes(tmp_path):
+    in_flight = {"now": 0, "max": 0}
+    body = _jpeg()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        in_flight["now"] += 1
+        in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        await asyncio.sleep(0.01)
+        in_flight["now"] -= 1
+        if request.url.path.endswith("/missing"):
+            return httpx.Response(404)
+        return httpx.Response(200, content=body)
+
+    mirror = AsyncImageMirror(_target(tmp_path), MirrorOptions(concurrency=8, per_host=2, retries=0))
+    jobs = [MirrorJob(i, 1, (f"https://a.test/{i}/ok",)) for i in range(6)]
+    jobs.append(MirrorJob(99, 2, ("https://a.test/missing",)))
+    results = _run(mirror, httpx.MockTransport(handler), jobs)
+
+    assert in_flight["max"] == 2
+    assert sum(1 for r in results if r["ok"]) == 6
+    assert mirror.stats.snapshot()["failures_by_code"] == {"http_404": 1}
+
+
+def test_progress_checkpoints_complete_cars_only():
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        progress = MirrorProgress("scope1", flush_every=1)
+        progress.expect(10, 2)
+        progress.expect(20, 1)
+        progress.record(10, 100, 0)
+        assert not progress.should_flush()
+        progress.record(10, 101, None)
+        progress.record(20, 200, 2)
+        assert progress.flush(db) == 2
+
+        assert MirrorProgress("scope1").load(db) == {10: {100: 0}, 20: {200: 2}}
+        assert MirrorProgress("other").load(db) == {}
+        assert progress.clear(db) == 2
+        assert progress.load(db) == {}
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from backend.app.models.source import Base
+from backend.app.services import media_manifest as mm
+from backend.app.utils import thumbs
+from backend.app.utils.thumbs import LocalMediaIndex
+
+
+@pytest.fixture()
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(mm, "media_root", lambda: tmp_path)
+    monkeypatch.setattr(mm, "_table_exists_cache", {})
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+
+def _write(root, rel, data=b"x"):
+    path = root / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return path
+
+
+def test_scan_tracks_new_and_removed_files(db, tmp_path):
+    _write(tmp_path, "машины/mirror/001/1001_a.webp")
+    old = _write(tmp_path, "машины/mirror/002/1002_b.webp", b"xyz")
+    _write(tmp_path, "машины/mirror/002/1002_c.tmp.webp")
+
+    stats = mm.scan(db)
+    assert stats["upserted"] == 2
+    assert mm.existing_paths(db, ["машины/mirror/002/1002_b.webp", "машины/nope.webp"]) == {
+        "машины/mirror/002/1002_b.webp"
+    }
+    assert dict(mm.iter_manifest(db, "машины/mirror/002")) == {"машины/mirror/002/1002_b.webp": 3}
+
+    old.unlink()
+    _write(tmp_path, "машины/mirror/003/1003_d.webp")
+    stats = mm.scan(db)
+    assert stats["removed"] == 1 and stats["upserted"] == 1
+    assert mm.dir_listing(db, "машины/mirror/003") == frozenset({"1003_d.webp"})
+    # Unchanged files are not rewritten.
+    assert mm.scan(db, full=True)["upserted"] == 0
+
+
+def test_record_and_forget_from_mirror_scripts(db, tmp_path):
+    _write(tmp_path, "машины/gallery_mirror/5/img.webp")
+    assert mm.record_files(db, [mm.to_rel("/media/машины/gallery_mirror/5/img.webp"), "машины/gone.webp"]) == 1
+    assert mm.to_rel("/media/../etc/passwd") is None
+    assert mm.forget_files(db, ["машины/gallery_mirror/5/img.webp"]) == 1
+    assert mm.existing_paths(db, ["машины/gallery_mirror/5/img.webp"]) == set()
+
+
+def test_request_index_can_read_from_manifest(db, tmp_path, monkeypatch):
+    _write(tmp_path, "машины/mirror/001/1001_a.webp")
+    mm.scan(db)
+    index = LocalMediaIndex()
+    index.set_lister(lambda directory: mm.dir_listing(db, directory.relative_to(tmp_path).as_posix()))
+    monkeypatch.setattr(thumbs, "_media_root", lambda: tmp_path)
+
+    (tmp_path / "машины/mirror/001/1001_a.webp").unlink()
+    # The manifest, not the disk, answers until the next scan.
+    assert index.exists("/media/машины/mirror/001/1001_a.webp") is True
+    assert index.exists("/media/машины/mirror/001/other.webp") is False
+
+
+def test_incremental_scan_skips_unchanged_directories(db, tmp_path, monkeypatch):
+    _write(tmp_path, "машины/mirror/001/1001_a.webp")
+    _write(tmp_path, "машины/mirror/002/1002_b.webp")
+    mm.scan(db)
+
+    listed = []
+    real_scandir = mm.os.scandir
+    monkeypatch.setattr(mm.os, "scandir", lambda path: listed.append(path) or real_scandir(path))
+    monkeypatch.setattr(mm, "_SCAN_SLACK_SEC", -60.0)  # every directory is older than the last scan
+    stats = mm.scan(db)
+    assert listed == [] and stats["listed"] == 0 and stats["dirs"] == 5
+
+    # A removed subtree is dropped once its parent is listed again.
+    for path in (tmp_path / "машины/mirror/002").iterdir():
+        path.unlink()
+    (tmp_path / "машины/mirror/002").rmdir()
+    monkeypatch.setattr(mm, "_SCAN_SLACK_SEC", 5.0)
+    assert mm.scan(db)["removed"] == 1
+    assert mm.existing_paths(db, ["машины/mirror/002/1002_b.webp"]) == set()
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from backend.app.importing.mobilede_csv import iter_mobilede_csv_rows, iter_mobilede_csv_rows_with_offsets
+from backend.app.models.source import Base
+from backend.app.parsing.config import PaginationConfig, SiteConfig
+from backend.app.parsing.mobile_de_feed import MobileDeFeedParser
+from backend.app.services.parsing_data_service import ParsingDataService
+from backend.app.tools import mobilede_csv_import as imp
+
+
+def _feed(tmp_path, count: int):
+    lines = ["inner_id|mark|model|title|url|description"]
+    for i in range(1, count + 1):
+        desc = '"two\nlines"' if i % 3 == 0 else "plain"
+        lines.append(f"{i}|BMW|X{i % 7}|BMW X|https://suchen.mobile.de/{i}|{desc}")
+    path = tmp_path / "feed.csv"
+    path.write_bytes(("\r\n".join(lines) + "\r\n").encode("utf-8"))
+    return str(path)
+
+
+def _parser() -> MobileDeFeedParser:
+    cfg = SiteConfig(
+        key="mobile_de",
+        name="mobile.de",
+        country="DE",
+        type="json",
+        base_search_url="https://example.com",
+        pagination=PaginationConfig(),
+    )
+    return MobileDeFeedParser(cfg)
+
+
+@pytest.fixture()
+def service():
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        yield ParsingDataService(db)
+
+
+def test_offsets_resume_at_the_next_record(tmp_path):
+    path = _feed(tmp_path, 7)
+    rows = list(iter_mobilede_csv_rows_with_offsets(path))
+    assert [r.inner_id for _, r in rows] == [r.inner_id for r in iter_mobilede_csv_rows(path)]
+    assert rows[2][1].description == "two\nlines"
+    resumed = list(iter_mobilede_csv_rows_with_offsets(path, rows[2][0]))
+    assert [r.inner_id for _, r in resumed] == ["4", "5", "6", "7"]
+
+
+def test_import_resumes_from_last_committed_batch(tmp_path, service):
+    path = _feed(tmp_path, 23)
+    key = imp.CHECKPOINT_PREFIX + imp.feed_fingerprint(path)
+    applied: list = []
+
+    def dying_apply(batch):
+        if len(applied) == 2:
+            raise RuntimeError("killed")
+        applied.append([item["external_id"] for item in batch])
+        return 1, len(batch) - 1, len(batch)
+
+    state = {"run_id": 7, "offset": 0, "rows": 0, "seen": 0, "inserted": 0, "updated": 0}
+    with pytest.raises(RuntimeError):
+        imp.import_rows(service, _parser(), path, state, dying_apply, checkpoint_key=key, batch_size=5)
+
+    saved = imp.load_checkpoint(service, key)
+    assert saved == {"run_id": 7, "offset": saved["offset"], "rows": 10, "seen": 10, "inserted": 2, "updated": 8}
+
+    def apply(batch):
+        applied.append([item["external_id"] for item in batch])
+        return 0, len(batch), len(batch)
+
+    final = imp.import_rows(service, _parser(), path, saved, apply, checkpoint_key=key, batch_size=5)
+    ids = [eid for batch in applied for eid in batch]
+    assert ids == [str(i) for i in range(1, 24)]
+    assert final["seen"] == 23 and final["rows"] == 23 and final["updated"] == 21
+    assert imp.load_checkpoint(service, key)["seen"] == 23
+
+    assert service.clear_progress(imp.CHECKPOINT_PREFIX, prefix=True) == 1
+    assert imp.load_checkpoint(service, key) is None
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from backend.app.services.cars_service import normalize_brand
+from backend.app.utils import memo
+from backend.app.utils import request_metrics as rm
+from backend.app.utils.color_groups import normalize_color_group
+from backend.app.utils.taxonomy import _ALIASES, normalize_body_type, normalize_color, normalize_fuel
+
+
+def test_memoized_normalizers_count_hits():
+    normalize_fuel.cache_clear()
+    for _ in range(5):
+        assert normalize_fuel("Diesel") == "diesel"
+    stats = normalize_fuel.cache_stats()
+    assert stats["misses"] == 1 and stats["hits"] == 4
+
+    long_text = "petrol " * 100
+    assert normalize_fuel(long_text) == "petrol"
+    assert normalize_fuel.cache_stats()["bypassed"] == 1
+
+    assert normalize_color_group("Schwarz Metallic") == normalize_color_group("Schwarz Metallic")
+    assert normalize_brand("alfa") == "Alfa Romeo"
+    assert "taxonomy.normalize_fuel" in memo.memo_stats()
+    assert 'app_normalize_memo_calls_total{function="taxonomy.normalize_fuel",result="hits"}' in rm.registry.render()
+
+
+def test_precomputed_body_index_matches_taxonomy_order():
+    for canonical, items in _ALIASES.get("body_type", {}).items():
+        for alias in items:
+            result = normalize_body_type(alias)
+            # An alias shared by several canonicals resolves to the first one.
+            first = next(c for c, its in _ALIASES["body_type"].items() if alias in its or alias == c)
+            assert result == first
+    assert normalize_color("Mythos Black Metallic") == "black"
@@ -227,3 +227,54 @@ def test_upsert_parsed_items_keeps_emavto_leasing_rows_inactive(monkeypatch):
         assert car.source_payload["emavto_is_leasing"] is True
         assert car.source_payload["emavto_skip_reason"] == "leasing"
         assert car.source_payload["foo"] == "bar"
+
+
+def test_detail_validators_survive_list_only_upserts_and_touch_seen(monkeypatch):
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        source = Source(id=1, key="che168", name="che168", base_url="https://www.che168.com", country="CN")
+        db.add(source)
+        db.commit()
+
+        monkeypatch.setattr(
+            cars_service_mod.CarsService,
+            "get_fx_rates",
+            lambda self, allow_fetch=True: {"CNY": 12.0, "RUB": 1.0},
+        )
+
+        service = ParsingDataService(db)
+        payload = {
+            "external_id": "cn-1",
+            "country": "CN",
+            "brand": "BYD",
+            "model": "Han",
+            "price": 150000,
+            "currency": "CNY",
+            "source_url": "https://www.che168.com/dealer/1/cn-1.html",
+            "registration_year": 2021,
+            "registration_month": 5,
+        }
+        service.upsert_parsed_items(source, [dict(payload, detail_etag='"v1"', detail_last_modified=None)])
+        # A later run that parsed only the list card (new price) keeps the validators.
+        service.upsert_parsed_items(source, [dict(payload, price=140000, detail_etag=None)])
+
+        car = db.query(Car).filter(Car.external_id == "cn-1").one()
+        assert float(car.price) == 140000
+        assert service.detail_validators(source) == {payload["source_url"]: ('"v1"', None)}
+        assert service.detail_validators(source, ["other"]) == {}
+
+        # Cars whose registration still needs a detail re-parse are fetched in full.
+        car.source_payload = {"registration_defaulted": True}
+        db.commit()
+        assert service.detail_validators(source) == {}
+        car.source_payload = None
+        car.registration_month = None
+        db.commit()
+        assert service.detail_validators(source) == {}
+
+        car.last_seen_at = None
+        db.commit()
+        assert service.touch_seen(source, ["cn-1", "missing"]) == 1
+        db.refresh(car)
+        assert car.last_seen_at is not None
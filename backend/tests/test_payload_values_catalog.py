@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from backend.app.models.source import Base, Source
+from backend.app.models.car import Car
+from backend.app.models.car_payload_value import CarPayloadValue
+from backend.app.services import cars_service as cars_service_mod
+from backend.app.services.cars_service import CarsService
+from backend.app.services.parsing_data_service import ParsingDataService
+from backend.app.services.payload_values_catalog import PayloadValuesCatalog
+
+
+def _item(external_id: str, brand: str, payload: dict) -> dict:
+    return {
+        "external_id": external_id,
+        "country": "DE",
+        "brand": brand,
+        "model": "X",
+        "price": 10000,
+        "currency": "EUR",
+        "source_url": f"https://example.test/cars/{external_id}",
+        "source_payload": payload,
+    }
+
+
+def _setup(monkeypatch, db: Session) -> Source:
+    source = Source(id=1, key="mobile_de", name="mobile.de", base_url="csv://mobile_de", country="DE")
+    db.add(source)
+    db.commit()
+    monkeypatch.setattr(
+        cars_service_mod.CarsService,
+        "get_fx_rates",
+        lambda self, allow_fetch=True: {"EUR": 100.0, "RUB": 1.0},
+    )
+    return source
+
+
+def test_upsert_maintains_payload_values_catalog(monkeypatch):
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        source = _setup(monkeypatch, db)
+        service = ParsingDataService(db)
+        service.upsert_parsed_items(
+            source,
+            [
+                _item("1", "BMW", {"num_seats": "5", "airbags": ["front", "side"]}),
+                _item("2", "Audi", {"num_seats": 7, "emission_class": "Euro6"}),
+            ],
+        )
+
+        catalog = PayloadValuesCatalog(db)
+        counts = catalog.value_counts(["num_seats", "airbags"], region="EU")
+        assert counts["num_seats"] == [{"value": "5", "count": 1}, {"value": "7", "count": 1}]
+        assert catalog.values(["airbags"], region="EU", brand="bmw") == {"airbags": ["front", "side"]}
+        assert catalog.values(["num_seats"], region="EU", brand="Audi") == {"num_seats": ["7"]}
+
+        # A changed payload moves the car from one value to another.
+        service.upsert_parsed_items(source, [_item("1", "BMW", {"num_seats": "4", "airbags": ["front"]})])
+        assert catalog.values(["num_seats", "airbags"], region="EU") == {
+            "num_seats": ["4", "7"],
+            "airbags": ["front"],
+        }
+
+        svc = CarsService(db)
+        assert svc.payload_values_bulk_filtered(["num_seats"], region="EU", country="DE") == {"num_seats": ["4", "7"]}
+
+
+def test_deactivation_removes_values_from_catalog(monkeypatch):
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        source = _setup(monkeypatch, db)
+        service = ParsingDataService(db)
+        service.upsert_parsed_items(
+            source,
+            [
+                _item("1", "BMW", {"num_seats": "5"}),
+                _item("2", "BMW", {"num_seats": "2"}),
+            ],
+        )
+        db.query(Car).filter(Car.external_id == "2").update(
+            {Car.last_seen_at: datetime.utcnow() - timedelta(days=2)}
+        )
+        db.commit()
+
+        assert service.deactivate_missing_by_last_seen(source, datetime.utcnow() - timedelta(days=1)) == 1
+        assert PayloadValuesCatalog(db).values(["num_seats"], region="EU") == {"num_seats": ["5"]}
+
+
+def test_other_availability_writers_keep_catalog_in_step(monkeypatch):
+    from backend.app.tools.encar_reset import soft_disable
+
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        source = _setup(monkeypatch, db)
+        svc = CarsService(db)
+        svc.upsert_cars(source, [_item("1", "BMW", {"num_seats": "5"}), _item("2", "BMW", {"num_seats": "2"})])
+        catalog = PayloadValuesCatalog(db)
+        assert catalog.values(["num_seats"], region="EU") == {"num_seats": ["2", "5"]}
+
+        assert svc.mark_unavailable_except(source, ["1"]) == 1
+        assert catalog.values(["num_seats"], region="EU") == {"num_seats": ["5"]}
+
+        assert soft_disable(db, source.id) == 2
+        assert catalog.values(["num_seats"], region="EU") == {"num_seats": []}
+        assert catalog.rebuild() == 0
+
+
+def test_rebuild_matches_incremental_state_and_empty_catalog_falls_back(monkeypatch):
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        source = _setup(monkeypatch, db)
+        ParsingDataService(db).upsert_parsed_items(
+            source,
+            [_item("1", "BMW", {"doors_count": "4/5"}), _item("2", "BMW", {"doors_count": "4/5"})],
+        )
+        catalog = PayloadValuesCatalog(db)
+        before = catalog.value_counts(["doors_count"])
+        assert catalog.rebuild() == 1
+        assert catalog.value_counts(["doors_count"]) == before == {"doors_count": [{"value": "4/5", "count": 2}]}
+
+        db.query(CarPayloadValue).delete()
+        db.commit()
+        assert catalog.values(["doors_count"]) is None
+        # The service falls back to scanning source_payload while the catalog is empty.
+        assert CarsService(db).payload_values_bulk(["doors_count"], region="EU") == {"doors_count": ["4/5"]}
+
+
+def test_rebuild_matches_incremental_counts_with_price_guard(monkeypatch):
+    monkeypatch.setenv("CATALOG_REQUIRE_PRICE", "1")
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        source = _setup(monkeypatch, db)
+        ParsingDataService(db).upsert_parsed_items(
+            source,
+            [_item("1", "BMW", {"num_seats": "5"}), _item("2", "Audi", {"num_seats": "7"})],
+        )
+        # An available car whose price has not been calculated yet.
+        car = db.query(Car).filter(Car.external_id == "2").one()
+        car.price_rub_cached = None
+        car.total_price_rub_cached = None
+        db.commit()
+
+        catalog = PayloadValuesCatalog(db)
+        incremental = catalog.value_counts(["num_seats"], region="EU")
+        catalog.rebuild()
+        assert catalog.value_counts(["num_seats"], region="EU") == incremental
+        assert incremental["num_seats"] == [{"value": "5", "count": 1}, {"value": "7", "count": 1}]
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from backend.app.models.source import Base
+from backend.app.tools import query_plan_guard as guard
+
+
+def _pg_plan(scan: str, *, rows: int = 100000, sort_disk: bool = False, ms: float = 40.0) -> list:
+    leaf = {"Node Type": scan, "Relation Name": "cars", "Plan Rows": rows}
+    if scan == "Index Scan":
+        leaf["Index Name"] = "idx_country_brand_model_avail"
+    sort = {"Node Type": "Sort", "Plans": [leaf]}
+    if sort_disk:
+        sort.update({"Sort Method": "external merge", "Sort Space Type": "Disk", "Sort Space Used": 2048})
+    return [{"Plan": {"Node Type": "Limit", "Plans": [sort], "Shared Hit Blocks": 10}, "Execution Time": ms}]
+
+
+def test_pg_plan_flags_seq_scans_and_sort_spills():
+    info = guard.analyze_pg_plan(_pg_plan("Seq Scan", sort_disk=True))
+    assert info["shape"] == "Limit[Sort[Seq Scan(cars)]]"
+    assert info["seq_scans"] == ["cars"]
+    assert info["spills"] == ["sort:external merge:2048kB"]
+    assert guard.analyze_pg_plan(_pg_plan("Seq Scan", rows=50))["seq_scans"] == []
+
+
+def test_find_issues_reports_only_changes_against_baseline():
+    def report(plan: list) -> dict:
+        rec = guard.PlanRecord(name="brand_model", query="list", filters={}, **guard.analyze_pg_plan(plan))
+        return guard.build_report([rec], dialect="postgresql")
+
+    good = report(_pg_plan("Index Scan"))
+    assert guard.find_issues(good, good) == []
+    kinds = {issue["kind"] for issue in guard.find_issues(report(_pg_plan("Seq Scan", ms=400.0)), good)}
+    assert kinds == {"seq_scan", "plan_changed", "slower"}
+
+
+def test_collect_plans_uses_catalog_statements():
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        records = guard.collect_plans(db, only=["eu_default", "eu_price_asc"])
+    assert [rec.key for rec in records] == [
+        "eu_default.count",
+        "eu_default.list",
+        "eu_price_asc.count",
+        "eu_price_asc.list",
+    ]
+    assert all(rec.error is None and rec.shape for rec in records)
@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Dict
+
+import httpx
+import pytest
+
+from backend.app.utils import rate_limiter as rl
+from backend.app.utils.rate_limiter import AdaptiveRateController, host_key, parse_retry_after
+from backend.app.utils.request_metrics import registry
+
+
+def _controller(**kwargs) -> AdaptiveRateController:
+    kwargs.setdefault("initial_rps", 2.0)
+    kwargs.setdefault("min_rps", 0.5)
+    kwargs.setdefault("max_rps", 4.0)
+    return AdaptiveRateController("example.com:test", use_redis=False, **kwargs)
+
+
+def test_aimd_raises_on_fast_success_and_backs_off_once_per_interval():
+    ctl = _controller(increase_rps=1.0, decrease_interval_sec=60)
+    for _ in range(6):
+        ctl.record(200, 0.1)
+    assert 4.0 >= ctl.rate > 3.5
+    for _ in range(200):
+        ctl.record(200, 0.1)
+    assert ctl.rate == 4.0
+
+    assert ctl.record(200, 10.0) == 4.0  # slow but healthy: hold
+    assert ctl.record(404, 0.1) == 4.0
+    assert ctl.record(403, 0.1) == 2.0
+    ctl._last_decrease = 0.0
+    assert ctl.record(429, 0.1) == 1.0
+    # A burst of failures within one interval is a single signal.
+    assert ctl.record(503, 0.1) == 1.0
+    assert ctl.record(None, 0.1) == 1.0
+    assert ctl.stats == {"requests": 0, "up": 206, "down": 4, "hold": 2}
+
+
+def test_rate_never_leaves_bounds():
+    ctl = _controller(decrease_interval_sec=0)
+    for _ in range(10):
+        ctl.record(500, 0.1)
+    assert ctl.rate == 0.5
+    assert _controller(initial_rps=100).initial_rps == 4.0
+
+
+def test_slots_are_spaced_and_retry_after_blocks_sends():
+    ctl = _controller(initial_rps=4.0)
+    now = time.time()
+    slots = [ctl._reserve(now) for _ in range(3)]
+    assert slots[0] == now
+    assert [round(b - a, 6) for a, b in zip(slots, slots[1:])] == [0.25, 0.25]
+
+    ctl.record(429, 0.1, retry_after=30)
+    assert ctl._reserve(time.time()) >= now + 29
+    assert ctl.rate == 2.0
+
+
+def test_acquire_async_paces_coroutines():
+    ctl = _controller(initial_rps=4.0, max_rps=50.0)
+
+    async def run() -> float:
+        t0 = time.monotonic()
+        await asyncio.gather(*(ctl.acquire_async() for _ in range(3)))
+        return time.monotonic() - t0
+
+    assert 0.4 <= asyncio.run(run()) < 1.5
+
+
+def test_helpers_and_metric():
+    assert host_key("https://www.che168.com/china/list/", "detail") == "www.che168.com:detail"
+    assert parse_retry_after(httpx.Response(429, headers={"Retry-After": "7"})) == 7.0
+    assert parse_retry_after(httpx.Response(429)) is None
+    ctl = _controller()
+    assert ctl.rate == 2.0
+    assert 'parser_rate_limit_rps{key="example.com:test"} 2' in registry.render()
+
+
+def test_jitter_spreads_gaps_around_the_mean_rate():
+    ctl = _controller(initial_rps=2.0, jitter=0.5)
+    now = time.time()
+    slots = [ctl._reserve(now) for _ in range(400)]
+    gaps = [b - a for a, b in zip(slots, slots[1:])]
+    assert 0.25 <= min(gaps) and max(gaps) <= 0.75
+    assert max(gaps) - min(gaps) > 0.3
+    assert sum(gaps) / len(gaps) == pytest.approx(0.5, abs=0.03)
+
+
+class _ScriptRedis:
+    """Hash store whose registered scripts run Python ports of the Lua.
+
+    The ports follow the ARGV layout documented next to _RESERVE_LUA and
+    _UPDATE_LUA and return strings, as Redis does for these scripts.
+    """
+
+    def __init__(self) -> None:
+        self.hashes: Dict[str, Dict[str, str]] = {}
+
+    def register_script(self, script: str):
+        port = {rl._RESERVE_LUA: self._reserve, rl._UPDATE_LUA: self._update}[script]
+        return lambda keys, args: port(keys[0], [str(a) for a in args])
+
+    def _num(self, key: str, field: str):
+        raw = self.hashes.get(key, {}).get(field)
+        return float(raw) if raw is not None else None
+
+    def _reserve(self, key, argv):
+        now, default_rate, _ttl, spacing = float(argv[0]), float(argv[1]), argv[2], float(argv[3])
+        rate = self._num(key, "rate") or default_rate
+        slot = max(now, self._num(key, "next_at") or 0, self._num(key, "blocked_until") or 0)
+        self.hashes.setdefault(key, {}).update({"rate": repr(rate), "next_at": repr(slot + spacing / rate)})
+        return [repr(slot), repr(rate)]
+
+    def _update(self, key, argv):
+        now, verdict = float(argv[0]), argv[1]
+        step, factor, lo, hi, default_rate = (float(x) for x in argv[2:7])
+        blocked, interval = float(argv[7]), float(argv[8])
+        state = self.hashes.setdefault(key, {})
+        rate = self._num(key, "rate") or default_rate
+        if verdict == "up":
+            rate = min(hi, rate + step / rate)
+        elif verdict == "down" and now - (self._num(key, "last_decrease") or 0) >= interval:
+            rate = max(lo, rate * factor)
+            state["last_decrease"] = repr(now)
+        state["rate"] = repr(rate)
+        if blocked > (self._num(key, "blocked_until") or 0):
+            state["blocked_until"] = repr(blocked)
+        return repr(rate)
+
+    def scan_iter(self, match: str, count: int = 100):
+        return iter(k for k in self.hashes if k.startswith(match.rstrip("*")))
+
+    def hget(self, key: str, field: str):
+        return self.hashes.get(key, {}).get(field)
+
+
+def _shared_pair(client) -> tuple:
+    kwargs = dict(initial_rps=4.0, min_rps=0.5, max_rps=8.0, decrease_interval_sec=60, redis_client=client)
+    return AdaptiveRateController("shared.example:detail", **kwargs), AdaptiveRateController(
+        "shared.example:detail", **kwargs
+    )
+
+
+def _assert_state_is_shared(client, monkeypatch) -> None:
+    a, b = _shared_pair(client)  # two crawler processes, one budget
+    now = time.time()
+    assert a._reserve(now) == now
+    assert b._reserve(now) == pytest.approx(now + 0.25)
+    assert a._reserve(now) == pytest.approx(now + 0.5)
+
+    assert b.record(429, 0.1) == 2.0
+    assert a.record(503, 0.1) == 2.0  # same decrease interval for both
+    a._reserve(time.time())
+    assert a.rate == 2.0
+    assert b.record(200, 0.1) == pytest.approx(2.2)
+
+    b.record(429, 0.1, retry_after=30)
+    assert a._reserve(time.time()) >= now + 29
+    assert a._use_redis and b._use_redis
+
+    monkeypatch.setattr("backend.app.utils.redis_cache.get_redis", lambda: client)
+    assert 'parser_rate_limit_rps{key="shared.example:detail"} 2.2' in registry.render()
+
+
+def test_redis_scripts_share_rate_schedule_and_block(monkeypatch):
+    _assert_state_is_shared(_ScriptRedis(), monkeypatch)
+
+
+def test_redis_lua_scripts_on_fakeredis(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    _assert_state_is_shared(fakeredis.FakeRedis(decode_responses=True), monkeypatch)
+
+
+def test_redis_errors_fall_back_to_local_state():
+    class _Down:
+        def register_script(self, script):
+            def run(keys, args):
+                raise ConnectionError("redis down")
+
+            return run
+
+    ctl = AdaptiveRateController("down.example:page", initial_rps=2.0, redis_client=_Down())
+    now = time.time()
+    assert ctl._reserve(now) == now
+    assert ctl._use_redis is False
+    assert ctl._reserve(now) == pytest.approx(now + 0.5)
+
+
+def test_page_limiter_keeps_the_old_mean_rate_as_ceiling(monkeypatch):
+    pytest.importorskip("pydantic")
+    from backend.app.config import settings
+    from backend.app.parsing.base import BaseParser
+    from backend.app.parsing.config import PaginationConfig, SiteConfig
+
+    monkeypatch.setattr(settings, "PARSER_ADAPTIVE_RATE", True)
+    monkeypatch.setattr(settings, "PARSER_MIN_DELAY_SECONDS", 1)
+    monkeypatch.setattr(settings, "PARSER_MAX_DELAY_SECONDS", 3)
+
+    def limiter(**defaults) -> AdaptiveRateController:
+        cfg = SiteConfig(
+            key="che168",
+            name="che168",
+            country="CN",
+            type="html",
+            base_search_url="https://example.com/list",
+            pagination=PaginationConfig(),
+            defaults=defaults,
+        )
+        return BaseParser(cfg)._page_limiter()
+
+    page = limiter()
+    assert page.initial_rps == page.max_rps == 0.5
+    assert page.jitter == 0.5
+    assert limiter(page_rps_max=2.0).max_rps == 2.0
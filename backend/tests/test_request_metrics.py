@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import create_engine, text
+
+from backend.app.utils import request_metrics as rm
+
+
+@pytest.fixture(autouse=True)
+def _clean_registry():
+    rm.registry.reset()
+    yield
+    rm.registry.reset()
+
+
+def test_fingerprint_groups_statements_by_shape():
+    a = rm.fingerprint_sql("SELECT * FROM cars WHERE id IN (1, 2, 3) AND brand = 'BMW'")
+    b = rm.fingerprint_sql("select * FROM cars\n WHERE id IN (?, ?) AND brand = 'Audi'")
+    assert a.lower() == b.lower()
+    assert "BMW" not in a
+    assert rm.redis_namespace("cars_list:EU:abc:v12") == "cars_list"
+    assert rm.redis_namespace("") == "unknown"
+
+
+def test_sql_and_redis_are_attributed_to_current_request():
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    rm.install_sql_instrumentation(engine)
+    rm.install_sql_instrumentation(engine)
+
+    metrics, token = rm.begin_request()
+    try:
+        with engine.connect() as conn:
+            for idx in range(3):
+                conn.execute(text("SELECT :v"), {"v": idx})
+        rm.record_redis("get", "filter_ctx_base:EU", 0.002, hit=True)
+        rm.record_redis("get", "filter_ctx_base:KR", 0.001, hit=False)
+    finally:
+        rm.end_request(token)
+
+    # Outside the request nothing is attributed to it.
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+    assert metrics.sql_count == 3
+    assert metrics.repeated_sql() == ("SELECT ?", 3)
+    assert metrics.redis_count == 2
+    assert metrics.cache == {"filter_ctx_base": [1, 1]}
+    header = rm.server_timing_header(metrics, total_ms=12.0, render_ms=3.0)
+    assert 'db;dur=' in header and 'desc="3 queries"' in header
+    assert 'cache;desc="hit=1 miss=1"' in header
+
+    rm.finish_request(metrics, route="/api/cars", method="GET", status=200, total_sec=0.012)
+    body = rm.registry.render()
+    assert 'app_http_requests_total{method="GET",route="/api/cars",status="200"} 1' in body
+    assert 'app_cache_requests_total{namespace="filter_ctx_base",result="hit"} 1' in body
+    assert 'app_http_request_duration_seconds_bucket{route="/api/cars",le="+Inf"} 1' in body
+
+
+def test_metrics_endpoint_is_internal_only_without_token(monkeypatch):
+    monkeypatch.delenv("METRICS_TOKEN", raising=False)
+    assert rm.metrics_access_allowed(authorization=None, client_host="127.0.0.1")
+    assert rm.metrics_access_allowed(authorization=None, client_host="10.0.0.5", forwarded_for="172.18.0.2")
+    assert not rm.metrics_access_allowed(authorization=None, client_host="93.184.216.34")
+    assert not rm.metrics_access_allowed(authorization=None, client_host=None)
+    # nginx connects from the docker network but forwards the public client.
+    assert not rm.metrics_access_allowed(authorization=None, client_host="172.18.0.3", real_ip="93.184.216.34")
+    assert not rm.metrics_access_allowed(
+        authorization=None, client_host="172.18.0.3", forwarded_for="10.0.0.1, 93.184.216.34"
+    )
+
+    monkeypatch.setenv("METRICS_TOKEN", "s3cret")
+    assert rm.metrics_access_allowed(authorization="Bearer s3cret", client_host="93.184.216.34")
+    assert not rm.metrics_access_allowed(authorization=None, client_host="127.0.0.1")
+
+
+def test_slow_sql_threshold_is_read_at_install(monkeypatch):
+    monkeypatch.setenv("SQL_SLOW_MS", "1")
+    rm.install_sql_instrumentation(create_engine("sqlite+pysqlite:///:memory:", future=True))
+    monkeypatch.setattr(rm.os, "getenv", lambda *args: pytest.fail("env read per query"))
+    rm.record_sql("SELECT 1", 0.002)
+    monkeypatch.undo()
+    rm.install_sql_instrumentation(create_engine("sqlite+pysqlite:///:memory:", future=True))
+    assert "app_db_slow_queries_total 1" in rm.registry.render()
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+from typing import Dict
+
+import pytest
+
+from backend.app.utils import redis_cache as rc
+
+
+class _HashRedis:
+    def __init__(self) -> None:
+        self.values: Dict[str, str] = {"dataset_version": "100"}
+        self.hashes: Dict[str, Dict[str, str]] = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value):
+        self.values[key] = value
+
+    def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update(mapping)
+
+
+@pytest.fixture()
+def fake_redis(monkeypatch):
+    client = _HashRedis()
+    clock = iter(range(1_000, 10_000, 100))
+    monkeypatch.setattr(rc, "get_redis", lambda: client)
+    monkeypatch.setattr(rc, "_now", lambda: float(next(clock)))
+    monkeypatch.setattr(rc, "_dataset_version_cache", None)
+    monkeypatch.setattr(rc, "_slice_versions_cache", None)
+    monkeypatch.setattr(rc, "_dataset_version_listeners", [])
+    monkeypatch.delenv("DATASET_VERSION", raising=False)
+    return client
+
+
+def _keys():
+    return {
+        "kr_count": rc.build_cars_count_key({"region": "KR", "brand": "Kia"}),
+        "eu_count": rc.build_cars_count_key({"region": "EU", "brand": "BMW"}),
+        "de_ctx": rc.build_filter_ctx_base_key({"region": "EU", "country": "DE"}),
+        "all_list": rc.build_cars_list_key(None, None, None, "price_asc", 1, 12),
+        "mobile_de_list": rc.build_cars_list_full_key({"source": "mobile_de"}, None, 1, 12),
+    }
+
+
+def test_kr_import_keeps_eu_keys(fake_redis):
+    rc.bump_slice_versions(source="seed")
+    before = _keys()
+
+    rc.bump_slice_versions(source="encar", region="KR")
+    after = _keys()
+
+    assert after["eu_count"] == before["eu_count"]
+    assert after["de_ctx"] == before["de_ctx"]
+    assert after["mobile_de_list"] == before["mobile_de_list"]
+    assert after["kr_count"] != before["kr_count"]
+    assert after["all_list"] != before["all_list"]
+
+
+def test_country_bump_and_global_bump(fake_redis):
+    rc.bump_slice_versions(source="seed")
+    before = _keys()
+    rc.bump_slice_versions(source="mobile_de", countries=["IT"])
+    after = _keys()
+    assert after["de_ctx"] == before["de_ctx"]
+    assert after["eu_count"] != before["eu_count"]
+    assert after["mobile_de_list"] != before["mobile_de_list"]
+
+    rc.bump_dataset_version()
+    assert all(a != b for a, b in zip(_keys().values(), after.values()))
+
+
+def test_keys_unchanged_until_first_slice_bump(fake_redis):
+    assert rc.build_cars_count_key({"region": "EU"}).endswith(":v100")
+    seen = []
+    rc.on_dataset_version_change(seen.append)
+    rc.bump_slice_versions(source="che168", region="CN")
+    assert len(seen) == 1 and rc.region_for_country("cn") == "CN" and rc.region_for_country("de") == "EU"
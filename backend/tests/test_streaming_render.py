@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import asyncio
+import gzip
+from concurrent.futures import Future
+
+import pytest
+
+jinja2 = pytest.importorskip("jinja2")
+
+from starlette.requests import Request
+
+from backend.app.utils.streaming_render import (
+    STREAM_FLUSH_MARKER,
+    Deferred,
+    install_streaming_globals,
+    stream_template_response,
+)
+
+
+class _Templates:
+    def __init__(self, sources: dict[str, str]) -> None:
+        self.env = jinja2.Environment(loader=jinja2.DictLoader(sources), autoescape=True)
+
+    def get_template(self, name: str):
+        return self.env.get_template(name)
+
+
+def _request(accept_encoding: str = "") -> Request:
+    headers = [(b"accept-encoding", accept_encoding.encode())] if accept_encoding else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers, "query_string": b""})
+
+
+async def _collect(response) -> list[bytes]:
+    return [chunk async for chunk in response.body_iterator]
+
+
+_SOURCES = {
+    "page.html": "<head></head>{{ stream_flush() }}<b>{{ total }}</b>{% for x in items %}<i>{{ x }}</i>{% endfor %}",
+}
+
+
+def test_stream_flushes_head_before_deferred_block_resolves():
+    templates = _Templates(_SOURCES)
+    future: Future = Future()
+    items = Deferred(future, default=[], pick=lambda r: r["items"])
+    total = Deferred(future, default=0, pick=lambda r: r["total"])
+    response = stream_template_response(_request(), templates, "page.html", {"items": items, "total": total})
+
+    async def _run():
+        iterator = response.body_iterator
+        first = await iterator.__anext__()
+        assert first == b"<head></head>"
+        assert not future.done()
+        future.set_result({"items": ["a", "<b>"], "total": 2})
+        rest = [chunk async for chunk in iterator]
+        return b"".join(rest)
+
+    assert asyncio.run(_run()) == b"<b>2</b><i>a</i><i>&lt;b&gt;</i>"
+
+
+def test_stream_gzip_and_failed_blocks_use_default():
+    templates = _Templates(_SOURCES)
+    future: Future = Future()
+    future.set_exception(RuntimeError("boom"))
+    response = stream_template_response(
+        _request("gzip, br"),
+        templates,
+        "page.html",
+        {"items": Deferred(future, default=[]), "total": Deferred(future, default=0)},
+    )
+    assert response.headers["content-encoding"] == "gzip"
+    body = gzip.decompress(b"".join(asyncio.run(_collect(response))))
+    assert body == b"<head></head><b>0</b>"
+
+
+def test_flush_marker_is_empty_outside_streaming():
+    templates = _Templates(_SOURCES)
+    install_streaming_globals(templates.env)
+    html = templates.get_template("page.html").render(items=[], total=1)
+    assert STREAM_FLUSH_MARKER not in html
+    assert html == "<head></head><b>1</b>"
+
+
+def test_home_hero_streams_before_media_and_count_resolve():
+    from pathlib import Path
+
+    from fastapi.templating import Jinja2Templates
+
+    from backend.app.utils.home_content import build_home_content
+
+    templates = Jinja2Templates(directory=str(Path(__file__).resolve().parents[1] / "app/templates"))
+    media: Future = Future()
+    total: Future = Future()
+    context = {
+        "home": build_home_content({}),
+        "content": {},
+        "hero_videos": Deferred(media, default=[], pick=lambda r: r["hero_videos"]),
+        "collage_images": Deferred(media, default=[], pick=lambda r: r["collage_images"]),
+        "total_cars": Deferred(total, default=0),
+        "recommendation_blocks": [],
+        "recommended_cars": [],
+        "countries_labeled": [],
+        "body_type_stats": [],
+        "brand_stats": [],
+        "brand_logos": [],
+        "partner_logos": [],
+        "fx_rates": {},
+    }
+    request = Request(
+        {"type": "http", "method": "GET", "path": "/", "headers": [], "query_string": b"", "server": ("t", 80)}
+    )
+    response = stream_template_response(request, templates, "home.html", context)
+
+    async def _run():
+        iterator = response.body_iterator
+        head = b""
+        while b'id="home-partners"' not in head:
+            head += await iterator.__anext__()
+        assert not media.done() and not total.done()
+        media.set_result({"hero_videos": ["/static/hero.mp4"], "collage_images": []})
+        total.set_result(1234)
+        return head, b"".join([chunk async for chunk in iterator])
+
+    head, rest = asyncio.run(_run())
+    assert b'id="home-badge-count" data-count="" data-home-count>' in head
+    assert b"hero-video-el" not in head
+    assert b'<template id="hero-video-tpl">' in rest and b'data-src="/static/hero.mp4"' in rest
+    assert b"String(1234)" in rest
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from backend.app.utils import thumbs
+
+
+UUID_A = "0a1b2c3d-0000-4000-8000-000000000001"
+UUID_B = "0a1b2c3d-0000-4000-8000-000000000002"
+
+
+class _CountingRedis:
+    def __init__(self, rules):
+        self.rules = rules
+        self.mget_calls = 0
+
+    def mget(self, keys):
+        self.mget_calls += 1
+        return [self.rules.get(key) for key in keys]
+
+    def get(self, key):
+        raise AssertionError("batch resolver must not issue per-card GETs")
+
+
+def test_page_resolves_with_one_mget_and_no_inline_probe(tmp_path, monkeypatch):
+    bucket = tmp_path / "машины" / "mirror" / "001"
+    bucket.mkdir(parents=True)
+    (bucket / "1001_abc.webp").write_bytes(b"x")
+    monkeypatch.setattr(thumbs, "_media_root", lambda: tmp_path)
+    monkeypatch.setattr(thumbs, "local_media_index", thumbs.LocalMediaIndex())
+    client = _CountingRedis({f"img_rule:{UUID_A}": "mo-640.jpg", f"img_rule:{UUID_B}": "none"})
+    monkeypatch.setattr(thumbs, "get_redis", lambda: client)
+    monkeypatch.setenv("THUMB_PROBE_REMOTE", "1")
+    queued = []
+    monkeypatch.setattr(thumbs._probe_worker, "enqueue", lambda url, key: queued.append(key))
+    monkeypatch.setattr(thumbs, "_probe_url", lambda *a, **k: (_ for _ in ()).throw(AssertionError("inline probe")))
+
+    unknown = "0a1b2c3d-0000-4000-8000-000000000003"
+    results = thumbs.resolve_thumbnail_urls(
+        [
+            (UUID_A, "/media/машины/mirror/001/1001_abc.webp"),
+            (UUID_A, "/media/машины/mirror/001/missing.webp"),
+            (UUID_B, None),
+            (unknown, None),
+            ("//2sc2.autoimg.cn/escimg/test.jpg", None),
+            (None, None),
+        ]
+    )
+
+    assert results[0] == "/media/машины/mirror/001/1001_abc.webp"
+    assert results[1].endswith(f"{UUID_A}?rule=mo-640.jpg")
+    assert results[2].endswith(f"{UUID_B}?rule=mo-1024.jpg")
+    assert results[3].endswith(f"{unknown}?rule=mo-1024.jpg")
+    assert results[4] == "https://2sc2.autoimg.cn/escimg/test.jpg"
+    assert results[5] is None
+    assert client.mget_calls == 1
+    assert queued == [f"img_rule:{unknown}"]
+
+
+def test_local_index_rejects_traversal(tmp_path, monkeypatch):
+    (tmp_path / "a.webp").write_bytes(b"x")
+    monkeypatch.setattr(thumbs, "_media_root", lambda: tmp_path / "sub")
+    index = thumbs.LocalMediaIndex()
+    assert index.exists("/media/../a.webp") is False
+    assert index.exists("https://example.com/a.webp") is False
@@ -221,7 +221,7 @@ def test_deploy_cron_has_midday_public_prewarm():
     assert 'curl -fsS --max-time 20 "http://localhost:8000/catalog?region=KR&sort=price_asc" >/dev/null || true' in script
     assert "def _cheap_light_price_order_clause" in service
     assert "def _should_use_light_price_window_sort" in service
-    assert "sort_items_by_display_price(items, sort=sort)" in service
+    assert "annotate_display_prices_vectorized(" in service
     assert 'os.getenv("DETAIL_SIMILAR_OFFERS_ENABLED", "0") != "0"' in pages_router
 
 
@@ -1050,8 +1050,8 @@ def test_recommended_auto_uses_reg_year_and_effective_specs_limits():
     assert "power_hp_max: int | None = None" in service
     assert "engine_cc_max: int | None = None" in service
     assert "body_type: str | None = None" in service
-    assert "power_hp_expr = func.coalesce(Car.power_hp, Car.inferred_power_hp)" in service
-    assert "engine_cc_expr = func.coalesce(Car.engine_cc, Car.inferred_engine_cc)" in service
+    assert "power_hp_expr = Car.effective_power_hp" in service
+    assert "engine_cc_expr = Car.effective_engine_cc" in service
 
 
 def test_model_filters_normalize_whitespace_and_merge_overlapping_regions():
@@ -1297,7 +1297,7 @@ def test_registration_year_filters_fallback_to_car_year_when_missing():
     assert "def _effective_registration_year_expr(cls)" in service
     assert "def _effective_registration_month_floor_expr(cls)" in service
     assert "def _effective_registration_month_ceil_expr(cls)" in service
-    assert "else_=Car.registration_year" in service
+    assert "return Car.effective_reg_year" in service
     assert "reg_year_expr = self._effective_registration_year_expr()" in service
     assert "reg_month_floor_expr = self._effective_registration_month_floor_expr()" in service
     assert "reg_month_ceil_expr = self._effective_registration_month_ceil_expr()" in service
@@ -0,0 +1,47 @@
+"""car_payload_values catalog for advanced filter options
+
+Revision ID: 0042_car_payload_values
+Revises: 0041_payload_exact_text_btree
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0042_car_payload_values"
+down_revision = "0041_payload_exact_text_btree"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "car_payload_values",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("payload_key", sa.String(length=64), nullable=False),
+        sa.Column("region", sa.String(length=8), nullable=False, server_default=""),
+        sa.Column("country", sa.String(length=8), nullable=False, server_default=""),
+        sa.Column("brand", sa.String(length=120), nullable=False, server_default=""),
+        sa.Column("value", sa.String(length=255), nullable=False),
+        sa.Column("total", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.UniqueConstraint(
+            "payload_key",
+            "region",
+            "country",
+            "brand",
+            "value",
+            name="uq_car_payload_values_slice_value",
+        ),
+    )
+    op.create_index(
+        "idx_car_payload_values_key_slice",
+        "car_payload_values",
+        ["payload_key", "region", "country", "brand"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_car_payload_values_key_slice", table_name="car_payload_values")
+    op.drop_table("car_payload_values")
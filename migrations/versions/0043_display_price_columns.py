@@ -0,0 +1,45 @@
+"""persisted public display price for catalog price sorting
+
+Revision ID: 0043_display_price_columns
+Revises: 0042_car_payload_values
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0043_display_price_columns"
+down_revision = "0042_car_payload_values"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("cars", sa.Column("display_price_rub", sa.Numeric(14, 2), nullable=True))
+    op.add_column("cars", sa.Column("display_price_group", sa.SmallInteger(), nullable=True))
+    ctx = op.get_context()
+    with ctx.autocommit_block():
+        op.execute(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_cars_avail_display_price_asc
+            ON cars (display_price_group, display_price_rub, id)
+            WHERE is_available = true
+            """
+        )
+        op.execute(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_cars_avail_display_price_desc
+            ON cars (display_price_group, display_price_rub DESC NULLS LAST, id)
+            WHERE is_available = true
+            """
+        )
+
+
+def downgrade() -> None:
+    ctx = op.get_context()
+    with ctx.autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_cars_avail_display_price_desc")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_cars_avail_display_price_asc")
+    op.drop_column("cars", "display_price_group")
+    op.drop_column("cars", "display_price_rub")
@@ -0,0 +1,110 @@
+"""stored effective spec/registration columns with range indexes
+
+The upgrade also NULLs fallback registration years on legacy KR rows. That
+data step is one-way: the downgrade drops the new columns and indexes but
+cannot restore the registration_year values it cleared.
+
+Revision ID: 0044_effective_spec_columns
+Revises: 0043_display_price_columns
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0044_effective_spec_columns"
+down_revision = "0043_display_price_columns"
+branch_labels = None
+depends_on = None
+
+
+_INDEXES = (
+    ("idx_cars_avail_eff_engine_cc", "effective_engine_cc"),
+    ("idx_cars_avail_eff_power_hp", "effective_power_hp"),
+    ("idx_cars_avail_eff_power_kw", "effective_power_kw"),
+    ("idx_cars_avail_eff_reg_year", "effective_reg_year"),
+)
+
+
+def upgrade() -> None:
+    # Old KR imports persisted the fallback registration year into the real
+    # column. Current imports keep it NULL and only flag the payload, so align
+    # legacy rows before COALESCE(registration_year, year) becomes the stored
+    # effective year.
+    op.execute(
+        """
+        UPDATE cars
+        SET registration_year = NULL
+        WHERE country LIKE 'KR%'
+          AND registration_year IS NOT NULL
+          AND (
+            COALESCE(jsonb_extract_path_text(source_payload::jsonb, 'registration_year_defaulted'), 'false') = 'true'
+            OR (
+              COALESCE(jsonb_extract_path_text(source_payload::jsonb, 'registration_defaulted'), 'false') = 'true'
+              AND COALESCE(jsonb_extract_path_text(source_payload::jsonb, 'registration_default_year'), '')
+                  = registration_year::text
+            )
+          )
+        """
+    )
+    op.add_column(
+        "cars",
+        sa.Column(
+            "effective_engine_cc",
+            sa.Integer,
+            sa.Computed("COALESCE(engine_cc, inferred_engine_cc)", persisted=True),
+            nullable=True,
+        ),
+    )
+    op.add_column(
+        "cars",
+        sa.Column(
+            "effective_power_hp",
+            sa.Numeric(10, 2),
+            sa.Computed("COALESCE(power_hp, inferred_power_hp)", persisted=True),
+            nullable=True,
+        ),
+    )
+    op.add_column(
+        "cars",
+        sa.Column(
+            "effective_power_kw",
+            sa.Numeric(10, 2),
+            sa.Computed("COALESCE(power_kw, inferred_power_kw)", persisted=True),
+            nullable=True,
+        ),
+    )
+    op.add_column(
+        "cars",
+        sa.Column(
+            "effective_reg_year",
+            sa.Integer,
+            sa.Computed("COALESCE(registration_year, year)", persisted=True),
+            nullable=True,
+        ),
+    )
+    ctx = op.get_context()
+    with ctx.autocommit_block():
+        for name, column in _INDEXES:
+            op.execute(
+                f"""
+                CREATE INDEX CONCURRENTLY IF NOT EXISTS {name}
+                ON cars ({column}, id)
+                WHERE is_available = true
+                """
+            )
+
+
+def downgrade() -> None:
+    # Irreversible part: the KR fallback registration_year values cleared in
+    # upgrade() are not restored (they were defaults, not real dates; the
+    # payload still carries registration_default_year for reference).
+    ctx = op.get_context()
+    with ctx.autocommit_block():
+        for name, _ in reversed(_INDEXES):
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+    op.drop_column("cars", "effective_reg_year")
+    op.drop_column("cars", "effective_power_kw")
+    op.drop_column("cars", "effective_power_hp")
+    op.drop_column("cars", "effective_engine_cc")
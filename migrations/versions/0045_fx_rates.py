@@ -0,0 +1,33 @@
+"""fx_rates history table
+
+Revision ID: 0045_fx_rates
+Revises: 0044_effective_spec_columns
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0045_fx_rates"
+down_revision = "0044_effective_spec_columns"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "fx_rates",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("currency", sa.String(length=8), nullable=False),
+        sa.Column("rate", sa.Numeric(14, 6), nullable=False),
+        sa.Column("source", sa.String(length=32), nullable=False, server_default="cbr"),
+        sa.Column("rate_date", sa.DateTime(), nullable=True),
+        sa.Column("fetched_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index("idx_fx_rates_currency_fetched", "fx_rates", ["currency", "fetched_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("idx_fx_rates_currency_fetched", table_name="fx_rates")
+    op.drop_table("fx_rates")
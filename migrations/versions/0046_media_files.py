@@ -0,0 +1,33 @@
+"""media_files manifest of the local media tree
+
+Revision ID: 0046_media_files
+Revises: 0045_fx_rates
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0046_media_files"
+down_revision = "0045_fx_rates"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "media_files",
+        sa.Column("rel_path", sa.String(length=1024), primary_key=True),
+        sa.Column("dir", sa.String(length=1024), nullable=False),
+        sa.Column("size", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("mtime", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("sha1", sa.String(length=40), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index("idx_media_files_dir", "media_files", ["dir"])
+
+
+def downgrade() -> None:
+    op.drop_index("idx_media_files_dir", table_name="media_files")
+    op.drop_table("media_files")
@@ -0,0 +1,35 @@
+"""car_images.phash perceptual hash for image dedup
+
+Revision ID: 0047_car_image_phash
+Revises: 0046_media_files
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0047_car_image_phash"
+down_revision = "0046_media_files"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("car_images", sa.Column("phash", sa.String(length=16), nullable=True))
+    ctx = op.get_context()
+    with ctx.autocommit_block():
+        op.execute(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_car_images_phash
+            ON car_images (phash)
+            WHERE phash IS NOT NULL
+            """
+        )
+
+
+def downgrade() -> None:
+    ctx = op.get_context()
+    with ctx.autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_car_images_phash")
+    op.drop_column("car_images", "phash")
@@ -0,0 +1,25 @@
+"""cars.detail_etag / detail_last_modified for conditional detail fetches
+
+Revision ID: 0048_car_detail_validators
+Revises: 0047_car_image_phash
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0048_car_detail_validators"
+down_revision = "0047_car_image_phash"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("cars", sa.Column("detail_etag", sa.String(length=255), nullable=True))
+    op.add_column("cars", sa.Column("detail_last_modified", sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("cars", "detail_last_modified")
+    op.drop_column("cars", "detail_etag")
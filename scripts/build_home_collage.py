@@ -145,6 +145,42 @@ def interleave_groups(
     return output
 
 
+def dhash(path: Path, size: int = 8) -> int | None:
+    """64-bit difference hash; same algorithm as backend/app/services/image_dedup.py."""
+    try:
+        with Image.open(path) as img:
+            gray = ImageOps.exif_transpose(img).convert("L").resize((size + 1, size), Image.Resampling.LANCZOS)
+    except Exception:
+        return None
+    pixels = list(gray.getdata())
+    value = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for col in range(size):
+            value = (value << 1) | (1 if pixels[offset + col] > pixels[offset + col + 1] else 0)
+    return value
+
+
+def drop_near_duplicates(groups: dict[str, list[Path]], max_distance: int) -> tuple[dict[str, list[Path]], int]:
+    """Keep the first copy of pictures that appear (re-encoded or resized) in several folders."""
+    kept_hashes: list[int] = []
+    out: dict[str, list[Path]] = {}
+    dropped = 0
+    for key in sorted(groups):
+        paths: list[Path] = []
+        for path in groups[key]:
+            value = dhash(path)
+            if value is not None and any(bin(value ^ seen).count("1") <= max_distance for seen in kept_hashes):
+                dropped += 1
+                continue
+            if value is not None:
+                kept_hashes.append(value)
+            paths.append(path)
+        if paths:
+            out[key] = paths
+    return out, dropped
+
+
 def convert_image(src: Path, dst: Path, *, max_width: int, quality: int) -> tuple[int, int]:
     with Image.open(src) as img:
         img = ImageOps.exif_transpose(img)
@@ -176,6 +212,12 @@ def main() -> None:
     parser.add_argument("--mobile-max-width", type=int, default=176)
     parser.add_argument("--mobile-quality", type=int, default=44)
     parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--dedup-distance",
+        type=int,
+        default=4,
+        help="skip pictures within this dHash distance of one already picked (-1 disables)",
+    )
     parser.add_argument("--clean", action="store_true")
     args = parser.parse_args()
 
@@ -199,6 +241,10 @@ def main() -> None:
         if selected:
             curated_groups[key] = selected
 
+    duplicates_dropped = 0
+    if args.dedup_distance >= 0:
+        curated_groups, duplicates_dropped = drop_near_duplicates(curated_groups, args.dedup_distance)
+
     ordered = interleave_groups(
         curated_groups,
         limit=args.limit,
@@ -255,6 +301,7 @@ def main() -> None:
         "output_root": str(output_root),
         "groups_total": len(grouped_paths),
         "groups_used": len(curated_groups),
+        "duplicates_dropped": duplicates_dropped,
         "images_written": len(manifest),
     }
     print(json.dumps(summary, ensure_ascii=False, indent=2))
@@ -18,6 +18,9 @@ fi
 if [ "${DRY_RUN:-0}" = "1" ]; then
   FX_ARGS+=(--dry-run)
 fi
+if [ "${FX_DEPENDENT_ONLY:-1}" = "1" ]; then
+  FX_ARGS+=(--fx-dependent-only)
+fi
 if [ "${TELEGRAM:-0}" = "1" ]; then
   FX_ARGS+=(--telegram)
 fi
@@ -6,6 +6,8 @@ cd "$ROOT_DIR"
 
 LIMIT="${HERO_LIMIT:-25000}"
 WORKERS="${HERO_WORKERS:-8}"
+ENGINE="${HERO_ENGINE:-async}"
+PER_HOST="${HERO_PER_HOST:-8}"
 TIMEOUT="${HERO_TIMEOUT:-8}"
 QUALITY="${HERO_QUALITY:-82}"
 MAX_WIDTH="${HERO_MAX_WIDTH:-1280}"
@@ -15,6 +17,7 @@ ORDER_BY="${HERO_ORDER_BY:-updated_desc}"
 OFFSET="${HERO_OFFSET:-0}"
 TELEGRAM="${HERO_TELEGRAM:-0}"
 TELEGRAM_INTERVAL="${HERO_TELEGRAM_INTERVAL:-1800}"
+DEDUP="${HERO_DEDUP:-0}"
 
 ARGS=(
   --region EU
@@ -24,7 +27,9 @@ ARGS=(
   --offset-cars "$OFFSET"
   --max-images-per-car 1
   --order-by "$ORDER_BY"
+  --engine "$ENGINE"
   --workers "$WORKERS"
+  --per-host "$PER_HOST"
   --timeout "$TIMEOUT"
   --max-width "$MAX_WIDTH"
   --quality "$QUALITY"
@@ -41,6 +46,20 @@ if [ "${TELEGRAM}" = "1" ]; then
   ARGS+=(--telegram --telegram-interval "$TELEGRAM_INTERVAL")
 fi
 
-echo "[mirror_de_hero_images] start $(date -Iseconds) limit=${LIMIT} offset=${OFFSET} updated_since_hours=${UPDATED_SINCE_HOURS} order_by=${ORDER_BY} workers=${WORKERS} width=${MAX_WIDTH} telegram=${TELEGRAM}"
+echo "[mirror_de_hero_images] start $(date -Iseconds) limit=${LIMIT} offset=${OFFSET} updated_since_hours=${UPDATED_SINCE_HOURS} order_by=${ORDER_BY} engine=${ENGINE} workers=${WORKERS} width=${MAX_WIDTH} telegram=${TELEGRAM}"
 docker compose exec -T web python -m backend.app.scripts.mirror_car_images_local "${ARGS[@]}"
+REPORT_HOST="$ROOT_DIR/artifacts/$(basename "$REPORT_JSON")"
+if [ -f "$REPORT_HOST" ]; then
+  python3 - "$REPORT_HOST" <<'PY'
+import json, sys
+with open(sys.argv[1], 'r', encoding='utf-8') as fh:
+    t = json.load(fh).get("throughput") or {}
+failures = ",".join(f"{k}:{v}" for k, v in (t.get("failures_by_code") or {}).items()) or "-"
+print(f"[mirror_de_hero_images] throughput img_s={t.get('images_per_sec')} mb_s={t.get('mb_per_sec')} failures={failures}")
+PY
+fi
+if [ "${DEDUP}" = "1" ]; then
+  echo "[mirror_de_hero_images] dedup"
+  docker compose exec -T web python -m backend.app.scripts.dedup_car_images
+fi
 echo "[mirror_de_hero_images] done $(date -Iseconds)"
@@ -29,6 +29,8 @@ HOT_LIMIT="${HOT_LIMIT:-20000}"
 
 CHUNK_LIMIT="${CHUNK_LIMIT:-20000}"
 WORKERS="${WORKERS:-8}"
+ENGINE="${ENGINE:-async}"
+PER_HOST="${PER_HOST:-8}"
 TIMEOUT="${TIMEOUT:-8}"
 MAX_WIDTH="${MAX_WIDTH:-1280}"
 QUALITY="${QUALITY:-82}"
@@ -164,11 +166,23 @@ import json, sys
 path, key = sys.argv[1], sys.argv[2]
 with open(path, 'r', encoding='utf-8') as fh:
     data = json.load(fh)
-value = data.get(key)
+value = data
+for part in key.split('.'):
+    value = value.get(part) if isinstance(value, dict) else None
+if isinstance(value, dict):
+    value = ",".join(f"{k}:{v}" for k, v in value.items()) or "-"
 print(value if value is not None else "")
 PY
 }
 
+report_throughput() {
+  local path="$1"
+  printf 'img_s=%s mb_s=%s failures=%s' \
+    "$(parse_report_field "$path" throughput.images_per_sec)" \
+    "$(parse_report_field "$path" throughput.mb_per_sec)" \
+    "$(parse_report_field "$path" throughput.failures_by_code)"
+}
+
 run_mirror_cmd() {
   local wall_timeout="$1"
   local log_file="$2"
@@ -211,7 +225,9 @@ run_one_chunk() {
     --offset-cars "$offset" \
     --max-images-per-car "$MAX_IMAGES_PER_CAR" \
     --order-by "$ORDER_BY" \
+    --engine "$ENGINE" \
     --workers "$WORKERS" \
+    --per-host "$PER_HOST" \
     --timeout "$TIMEOUT" \
     --max-width "$MAX_WIDTH" \
     --quality "$QUALITY" \
@@ -230,6 +246,7 @@ run_one_chunk() {
     mirrored="$(parse_report_field "$report_host" mirrored)"
     rewritten="$(parse_report_field "$report_host" rewritten)"
     failed="$(parse_report_field "$report_host" failed)"
+    echo "[mirror_de_top_brands] throughput brand=${brand} offset=${offset} $(report_throughput "$report_host")" >&2
   else
     checked=0
     mirrored=0
@@ -246,7 +263,7 @@ run_one_chunk() {
 
 run_hot_pass() {
   local brand="$1"
-  local safe report_host report_container checked mirrored rewritten failed rc=0
+  local safe report_host report_container checked mirrored rewritten failed throughput rc=0
   local tg_args=()
   safe="$(safe_brand "$brand")"
   report_host="$ROOT_DIR/artifacts/mirror_de_top_hot_${safe}.json"
@@ -268,7 +285,9 @@ run_hot_pass() {
     --max-images-per-car "$MAX_IMAGES_PER_CAR" \
     --order-by listing_desc \
     --updated-since-hours "$HOT_HOURS" \
+    --engine "$ENGINE" \
     --workers "$WORKERS" \
+    --per-host "$PER_HOST" \
     --timeout "$TIMEOUT" \
     --max-width "$MAX_WIDTH" \
     --quality "$QUALITY" \
@@ -286,11 +305,13 @@ run_hot_pass() {
     mirrored="$(parse_report_field "$report_host" mirrored)"
     rewritten="$(parse_report_field "$report_host" rewritten)"
     failed="$(parse_report_field "$report_host" failed)"
+    throughput="$(report_throughput "$report_host")"
   else
     checked=0
     mirrored=0
     rewritten=0
     failed="$HOT_LIMIT"
+    throughput="n/a"
   fi
   if [ "$rc" -eq 124 ]; then
     echo "[mirror_de_top_brands] hot_timeout brand=${brand} limit=${HOT_LIMIT} wall=${HOT_WALL_TIMEOUT_SEC}s"
@@ -298,7 +319,7 @@ run_hot_pass() {
     echo "[mirror_de_top_brands] hot_failed brand=${brand} limit=${HOT_LIMIT} rc=${rc}"
   fi
   state_set "$brand" hot_done 1
-  tg "de_top_brands hot done: ${brand} checked=${checked} mirrored=${mirrored} rewritten=${rewritten} failed=${failed} rc=${rc}"
+  tg "de_top_brands hot done: ${brand} checked=${checked} mirrored=${mirrored} rewritten=${rewritten} failed=${failed} rc=${rc} ${throughput}"
 }
 
 brands=()
@@ -91,6 +91,13 @@ docker compose exec -T web python -m backend.app.scripts.refresh_spec_inference
 echo "[mobilede_pipeline] step=car_counts_refresh"
 docker compose exec -T web python -m backend.app.tools.car_counts_refresh --report
 
+# car_payload_values is maintained incrementally by the importer; a full
+# rebuild is only needed after the initial migration or to repair drift.
+if [ "${PAYLOAD_VALUES_REFRESH:-0}" = "1" ]; then
+  echo "[mobilede_pipeline] step=payload_values_refresh"
+  docker compose exec -T web python -m backend.app.tools.payload_values_refresh --report
+fi
+
 echo "[mobilede_pipeline] step=mirror_mobilede_thumbs"
 MIRROR_TG_ARGS=()
 if [ "${MIRROR_TELEGRAM:-0}" = "1" ]; then